@@ -0,0 +1 @@
+# 基准测试
\ No newline at end of file
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+故障恢复基准测试
+
+在模拟 Gemini 服务中按计划注入生产环境常见的故障，运行完整工作流，
+对比无故障基线，报告每种故障的：
+- 恢复耗时：故障触发到该对话下一次成功取图的时间
+- 浪费的工作：比基线多出的发送轮次、页面加载、图片请求与墙钟耗时
+- 结果：最终保存的图片数，是否完整
+
+使用方法:
+    python -m benchmarks.bench_faults --output bench_faults.json
+    python -m benchmarks.bench_faults --faults refusal lazy_render --turn 2
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_workflow import run_scenario
+from benchmarks.harness import run_child, write_report
+from src.mock.gemini_server import FAULT_KINDS, MockGeminiConfig, parse_fault_schedule
+
+
+def drop_cdp_on_fault(server, workflows):
+    """注册故障回调：cdp_drop 触发时断开对应工作流的 CDP 连接"""
+    def listener(kind, chat_id, turn_index):
+        if kind != 'cdp_drop':
+            return
+        for workflow in workflows:
+            if workflow.browser and chat_id in (workflow.page.url if workflow.page else ''):
+                asyncio.get_running_loop().create_task(workflow.browser.close())
+
+    server.state.fault_listeners.append(listener)
+
+
+def count_events(events: list) -> dict:
+    """统计事件日志中的工作量"""
+    counts = {'sends': 0, 'image_sends': 0, 'page_loads': 0, 'image_fetches': 0}
+    for event in events:
+        if event['event'] == 'send':
+            counts['sends'] += 1
+            if event.get('mode') == 'images':
+                counts['image_sends'] += 1
+        elif event['event'] == 'page':
+            counts['page_loads'] += 1
+        elif event['event'] == 'image':
+            counts['image_fetches'] += 1
+    return counts
+
+
+def recovery_metrics(events: list) -> dict:
+    """根据事件日志计算恢复耗时
+
+    恢复耗时定义为故障触发到同一对话下一次成功取图的时间；
+    没有后续取图时视为未恢复（recovered 为 False）。
+    """
+    faults = [event for event in events if event['event'] == 'fault']
+    if not faults:
+        return {'injected': False}
+    fault = faults[0]
+    for event in events:
+        if event['event'] == 'image' and event['chat_id'] == fault['chat_id'] and event['time'] >= fault['time']:
+            return {
+                'injected': True,
+                'fault_time': fault['time'],
+                'recovered': True,
+                'time_to_recover': round(event['time'] - fault['time'], 3),
+            }
+    return {'injected': True, 'fault_time': fault['time'], 'recovered': False, 'time_to_recover': None}
+
+
+def summarize(result: dict) -> dict:
+    """提取单个场景的关键指标"""
+    job = result['job_results'][0]
+    return {
+        'wall_time': result['wall_time'],
+        'images_saved': job['images_saved'],
+        'complete': result['ok_jobs'] == result['jobs'],
+        'work': count_events(result['mock_events']),
+        'recovery': recovery_metrics(result['mock_events']),
+        'phases': job['phases'],
+        'dead_time': job['dead_time'],
+    }
+
+
+def compare_to_baseline(summary: dict, baseline: dict) -> dict:
+    """计算相对基线多出的工作量"""
+    return {
+        'extra_wall_time': round(summary['wall_time'] - baseline['wall_time'], 3),
+        'wasted_turns': summary['work']['sends'] - baseline['work']['sends'],
+        'extra_page_loads': summary['work']['page_loads'] - baseline['work']['page_loads'],
+        'extra_image_fetches': summary['work']['image_fetches'] - baseline['work']['image_fetches'],
+        'missing_images': baseline['images_saved'] - summary['images_saved'],
+    }
+
+
+def child_main(args):
+    """子进程入口：运行单个故障场景并写出 JSON 结果"""
+    config = MockGeminiConfig(
+        text_latency=args.text_latency,
+        image_latency=args.image_latency,
+        image_width=args.image_width,
+        image_height=args.image_height,
+        panels=args.panels,
+        seed=0,
+        faults=parse_fault_schedule(args.schedule),
+        slow_render_factor=args.slow_factor,
+    )
+    result = asyncio.run(run_scenario(args.panels, 1, config, setup=drop_cdp_on_fault))
+    with open(args.result_file, 'w', encoding='utf-8') as f:
+        json.dump(summarize(result), f, ensure_ascii=False)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='故障恢复基准测试（模拟 Gemini + 无头 Chromium）')
+    parser.add_argument('--faults', nargs='+', choices=FAULT_KINDS, default=list(FAULT_KINDS),
+                        help='要测试的故障类型（默认: 全部）')
+    parser.add_argument('--turn', type=int, default=2, help='在第几次生图请求注入故障（默认: 2）')
+    parser.add_argument('--panels', type=int, default=12, help='脚本宫格数（默认: 12，即 3 个批次）')
+    parser.add_argument('--text-latency', type=float, default=0.5, help='模拟文本响应延迟，秒（默认: 0.5）')
+    parser.add_argument('--image-latency', type=float, default=1.0, help='模拟图片生成延迟，秒（默认: 1.0）')
+    parser.add_argument('--slow-factor', type=float, default=10.0, help='slow_render 的延迟倍数（默认: 10）')
+    parser.add_argument('--image-width', type=int, default=1024, help='模拟图片宽度（默认: 1024）')
+    parser.add_argument('--image-height', type=int, default=1536, help='模拟图片高度（默认: 1536）')
+    parser.add_argument('--timeout', type=float, default=1800, help='单个场景超时，秒（默认: 1800）')
+    parser.add_argument('--output', '-o', type=str, default=None, help='结果输出文件（默认: 标准输出）')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--schedule', type=str, default='', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args)
+        return
+
+    common_args = [
+        '--panels', str(args.panels),
+        '--text-latency', str(args.text_latency),
+        '--image-latency', str(args.image_latency),
+        '--slow-factor', str(args.slow_factor),
+        '--image-width', str(args.image_width),
+        '--image-height', str(args.image_height),
+    ]
+
+    results = []
+    baseline = None
+    for fault in [None, *args.faults]:
+        name = fault or 'baseline'
+        schedule = f"{fault}:{args.turn}" if fault else ''
+        print(f"运行场景: {name}...", file=sys.stderr)
+        result = run_child('benchmarks.bench_faults', [*common_args, '--schedule', schedule], args.timeout)
+        result['fault'] = name
+        if 'error' in result:
+            print(f"  ✗ 失败: {result['error']}", file=sys.stderr)
+        elif fault is None:
+            baseline = result
+        elif baseline is not None:
+            result['versus_baseline'] = compare_to_baseline(result, baseline)
+        if 'error' not in result:
+            recovery = result['recovery'].get('time_to_recover')
+            recovery_text = f", 恢复耗时 {recovery:.1f} 秒" if recovery is not None else ''
+            print(f"  ✓ 耗时 {result['wall_time']:.1f} 秒, 保存 {result['images_saved']} 张{recovery_text}",
+                  file=sys.stderr)
+        results.append(result)
+
+    write_report('faults', results, args.output, extra={
+        'fault_turn': args.turn,
+        'panels': args.panels,
+        'mock': {
+            'text_latency': args.text_latency,
+            'image_latency': args.image_latency,
+            'slow_render_factor': args.slow_factor,
+        },
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+命令行启动耗时基准测试
+
+多次以新进程运行 main.py 的几种快速退出路径，统计墙钟耗时，并检查：
+- 是否导入了浏览器相关的重量级模块（playwright、aiohttp、pyperclip）
+- 是否创建了日志文件
+
+场景：
+- help: python main.py --help
+- bad_args: python main.py（缺少 --concept，参数校验失败）
+- bad_session: python main.py missing_session.txt（session 文件不存在）
+
+使用方法:
+    python -m benchmarks.bench_startup --output bench_startup.json
+    python -m benchmarks.bench_startup --repeat 50
+"""
+
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import PROJECT_ROOT, directory_size, prepare_workdir, write_report
+
+
+HEAVY_MODULES = ('playwright', 'aiohttp', 'pyperclip')
+
+SCENARIOS = {
+    'help': ['--help'],
+    'bad_args': [],
+    'bad_session': ['missing_session.txt'],
+}
+
+
+def heavy_imports(args: list, cwd: Path) -> list:
+    """用 -X importtime 运行一次，返回导入过的重量级顶层模块"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', str(PROJECT_ROOT / 'main.py'), *args],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    imported = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        module = line.rsplit('|', 1)[-1].strip().split('.')[0]
+        if module in HEAVY_MODULES:
+            imported.add(module)
+    return sorted(imported)
+
+
+def run_scenario(name: str, args: list, repeat: int) -> dict:
+    """在隔离目录中重复运行一个场景"""
+    workdir = prepare_workdir(f'bench_startup_{name}_')
+    try:
+        timings = []
+        returncode = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            completed = subprocess.run(
+                [sys.executable, str(PROJECT_ROOT / 'main.py'), *args],
+                cwd=workdir,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            timings.append(time.perf_counter() - start)
+            returncode = completed.returncode
+
+        _, log_files = directory_size(workdir / 'data' / 'logs')
+        timings_ms = sorted(t * 1000 for t in timings)
+        return {
+            'scenario': name,
+            'args': args,
+            'repeat': repeat,
+            'returncode': returncode,
+            'median_ms': round(statistics.median(timings_ms), 1),
+            'min_ms': round(timings_ms[0], 1),
+            'p90_ms': round(timings_ms[min(len(timings_ms) - 1, int(len(timings_ms) * 0.9))], 1),
+            'heavy_imports': heavy_imports(args, workdir),
+            'log_files_created': log_files,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_interpreter_baseline(repeat: int) -> float:
+    """空解释器（python -c pass）启动耗时中位数（毫秒）"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'pass'])
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 1)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='main.py 命令行启动耗时基准测试')
+    parser.add_argument('--repeat', type=int, default=20, help='每个场景的运行次数（默认: 20）')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help='要运行的场景（默认: 全部）')
+    parser.add_argument('--output', '-o', type=str, default=None, help='结果输出文件（默认: 标准输出）')
+    args = parser.parse_args()
+
+    # 解释器本身的启动耗时作为参照
+    baseline = run_interpreter_baseline(args.repeat)
+
+    results = []
+    for name in args.scenarios:
+        print(f"运行场景: {name}...", file=sys.stderr)
+        result = run_scenario(name, SCENARIOS[name], args.repeat)
+        print(f"  ✓ 中位数 {result['median_ms']:.1f} ms, 重量级模块: {result['heavy_imports'] or '无'}, "
+              f"日志文件: {result['log_files_created']}", file=sys.stderr)
+        results.append(result)
+
+    write_report('startup', results, args.output, extra={'interpreter_median_ms': baseline})
+
+
+if __name__ == '__main__':
+    main()
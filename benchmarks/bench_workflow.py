@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+端到端工作流基准测试
+
+在本地模拟 Gemini 服务与无头 Chromium 上运行完整的 AutoMangaWorkflow.run
+（脚本 → 批次生成 → 收集保存 → 封面），统计：
+- 各阶段墙钟耗时
+- CDP 调用次数
+- 写入字节数
+- 峰值常驻内存
+
+默认场景：1 个任务下的 8/16/32 宫格脚本，以及 8 宫格脚本下的 4/8 个并发任务。
+每个场景在独立子进程中运行，结果以 JSON 输出，便于在版本之间对比回归。
+
+使用方法:
+    python -m benchmarks.bench_workflow --output bench_workflow.json
+    python -m benchmarks.bench_workflow --panels 8 --jobs 1   # 只跑单个场景
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.harness import (
+    directory_size,
+    peak_rss_kb,
+    prepare_workdir,
+    run_child,
+    write_report,
+)
+from src.mock.gemini_server import MockGeminiConfig, MockGeminiServer
+from src.utils.image_utils import MANIFEST_FILENAME
+
+
+# 默认场景：(宫格数, 并发任务数)
+DEFAULT_SCENARIOS = [(8, 1), (16, 1), (32, 1), (8, 4), (8, 8)]
+
+
+def mock_config_from_args(args, panels: int) -> MockGeminiConfig:
+    """根据命令行参数构造模拟服务配置"""
+    return MockGeminiConfig(
+        text_latency=args.text_latency,
+        image_latency=args.image_latency,
+        latency_jitter=args.jitter,
+        image_width=args.image_width,
+        image_height=args.image_height,
+        panels=panels,
+        seed=0,
+    )
+
+
+def summarize_phases(jobs: list) -> dict:
+    """汇总多个任务的阶段耗时（均值与最大值）"""
+    names = []
+    for job in jobs:
+        for name in job['phases']:
+            if name not in names:
+                names.append(name)
+    summary = {}
+    for name in names:
+        values = [job['phases'][name] for job in jobs if name in job['phases']]
+        summary[name] = {
+            'mean': round(statistics.fmean(values), 3),
+            'max': round(max(values), 3),
+        }
+    return summary
+
+
+async def run_scenario(
+    panels: int,
+    jobs: int,
+    config: MockGeminiConfig,
+    setup=None,
+    shared_browser: bool = False,
+) -> dict:
+    """运行一个场景：启动模拟服务，jobs 个工作流并发执行
+
+    Args:
+        panels: 脚本宫格数
+        jobs: 并发任务数
+        config: 模拟服务配置
+        setup: 可选回调 setup(server, workflows)，在工作流开始前调用（如注册故障回调）
+        shared_browser: 为 True 时所有任务共用一个 Chromium（各自独立的上下文），
+            否则每个任务自行启动一个 Chromium
+    """
+    workdir = prepare_workdir(f'bench_p{panels}_j{jobs}_')
+    os.chdir(workdir)
+
+    from src.core.auto_manga_workflow import AutoMangaWorkflow
+    from src.core.browser_launcher import ChromiumLauncher
+    from src.utils.cdp_stats import CDPStats
+
+    server = MockGeminiServer(config)
+    gemini_url = await server.start()
+    launcher = ChromiumLauncher() if shared_browser else None
+
+    try:
+        if launcher:
+            await launcher.start()
+
+        workflows = []
+        for index in range(1, jobs + 1):
+            workflow = AutoMangaWorkflow(
+                concept=f"bench-p{panels}-j{index}",
+                session_id=f"bench_p{panels}_j{jobs}_{index}",
+            )
+            if launcher:
+                # 连接共用的 Chromium，每个任务使用独立上下文
+                workflow.launch_mode = 'cdp'
+                workflow.context_mode = 'isolated'
+                workflow.cdp_url = launcher.cdp_url
+            else:
+                # 自行启动无头 Chromium
+                workflow.launch_mode = 'launch'
+            # 模拟服务不需要登录状态
+            workflow.storage_state_path = None
+            workflow.gemini_url = gemini_url
+            workflow.cdp_stats = CDPStats()
+            workflows.append(workflow)
+
+        if setup:
+            setup(server, workflows)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(workflow.run() for workflow in workflows))
+        wall_time = time.perf_counter() - start
+    finally:
+        if launcher:
+            await launcher.stop()
+        await server.stop()
+
+    expected_images = (panels + 3) // 4
+    job_results = []
+    for workflow in workflows:
+        theme_dir = Path(workflow.theme_dir) if workflow.theme_dir else None
+        images = sorted(
+            p for p in theme_dir.iterdir() if p.name != MANIFEST_FILENAME
+        ) if theme_dir and theme_dir.exists() else []
+        job_results.append({
+            'phases': workflow.phase_timer.snapshot(),
+            'cdp_calls': workflow.cdp_stats.total_calls,
+            'cdp_time_ms': round(workflow.cdp_stats.total_time * 1000, 1),
+            'dead_time': round(workflow.wait_accounting.dead_time, 3),
+            'condition_wait_time': round(workflow.wait_accounting.condition_wait_time, 3),
+            'images_saved': len([p for p in images if p.stem != '封面']),
+            'cover_saved': any(p.stem == '封面' for p in images),
+        })
+
+    images_bytes, images_files = directory_size(workdir / 'data' / 'images')
+    data_bytes, data_files = directory_size(workdir / 'data')
+
+    return {
+        'panels': panels,
+        'jobs': jobs,
+        'shared_browser': shared_browser,
+        'expected_images_per_job': expected_images,
+        'ok_jobs': sum(
+            1 for job in job_results if job['images_saved'] >= expected_images and job['cover_saved']
+        ),
+        'wall_time': round(wall_time, 3),
+        'phases': summarize_phases(job_results),
+        'cdp_calls': sum(job['cdp_calls'] for job in job_results),
+        'bytes_written': {
+            'images': images_bytes,
+            'image_files': images_files,
+            'total': data_bytes,
+            'total_files': data_files,
+        },
+        'peak_rss_kb': peak_rss_kb(),
+        'mock_stats': dict(server.state.stats),
+        'mock_events': list(server.state.events),
+        'job_results': job_results,
+        'workdir': str(workdir),
+    }
+
+
+def child_main(args):
+    """子进程入口：运行单个场景并写出 JSON 结果"""
+    config = mock_config_from_args(args, args.panels[0])
+    result = asyncio.run(run_scenario(args.panels[0], args.jobs[0], config, shared_browser=args.shared_browser))
+    result.pop('mock_events', None)
+    with open(args.result_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='端到端工作流基准测试（模拟 Gemini + 无头 Chromium）')
+    parser.add_argument('--panels', type=int, nargs='+', default=None,
+                        help='宫格数列表（与 --jobs 组成场景矩阵）')
+    parser.add_argument('--jobs', type=int, nargs='+', default=None,
+                        help='并发任务数列表（与 --panels 组成场景矩阵）')
+    parser.add_argument('--text-latency', type=float, default=0.5, help='模拟文本响应延迟，秒（默认: 0.5）')
+    parser.add_argument('--image-latency', type=float, default=1.0, help='模拟图片生成延迟，秒（默认: 1.0）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='模拟延迟抖动比例')
+    parser.add_argument('--image-width', type=int, default=1024, help='模拟图片宽度（默认: 1024）')
+    parser.add_argument('--image-height', type=int, default=1536, help='模拟图片高度（默认: 1536）')
+    parser.add_argument('--shared-browser', action='store_true',
+                        help='所有并发任务共用一个 Chromium（每个任务独立上下文），默认每个任务一个 Chromium')
+    parser.add_argument('--timeout', type=float, default=1800, help='单个场景超时，秒（默认: 1800）')
+    parser.add_argument('--output', '-o', type=str, default=None, help='结果输出文件（默认: 标准输出）')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child_main(args)
+        return
+
+    if args.panels is None and args.jobs is None:
+        scenarios = DEFAULT_SCENARIOS
+    else:
+        scenarios = [(p, j) for p in (args.panels or [8]) for j in (args.jobs or [1])]
+
+    results = []
+    for panels, jobs in scenarios:
+        print(f"运行场景: {panels} 宫格, {jobs} 个并发任务...", file=sys.stderr)
+        child_args = [
+            '--panels', str(panels),
+            '--jobs', str(jobs),
+            '--text-latency', str(args.text_latency),
+            '--image-latency', str(args.image_latency),
+            '--jitter', str(args.jitter),
+            '--image-width', str(args.image_width),
+            '--image-height', str(args.image_height),
+        ]
+        if args.shared_browser:
+            child_args.append('--shared-browser')
+        result = run_child('benchmarks.bench_workflow', child_args, args.timeout)
+        result.setdefault('panels', panels)
+        result.setdefault('jobs', jobs)
+        results.append(result)
+        if 'error' in result:
+            print(f"  ✗ 失败: {result['error']}", file=sys.stderr)
+        else:
+            print(f"  ✓ 耗时 {result['wall_time']:.1f} 秒, CDP 调用 {result['cdp_calls']} 次", file=sys.stderr)
+
+    write_report('workflow', results, args.output, extra={
+        'mock': {
+            'text_latency': args.text_latency,
+            'image_latency': args.image_latency,
+            'jitter': args.jitter,
+            'image_size': [args.image_width, args.image_height],
+        },
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+基准测试公共工具
+
+提供隔离工作目录、子进程运行、结果汇总等基准测试共用的功能。
+浏览器由工作流以 launch 模式自行启动（见 src/core/browser_launcher.py）。
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+def git_version() -> str:
+    """返回当前代码版本（git describe），无法获取时返回 unknown"""
+    try:
+        result = subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=PROJECT_ROOT,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        return result.stdout.strip() or 'unknown'
+    except Exception:
+        return 'unknown'
+
+
+def directory_size(path: Path) -> tuple:
+    """统计目录下文件总字节数与文件数
+
+    Returns:
+        tuple: (总字节数, 文件数)
+    """
+    total = 0
+    count = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+                count += 1
+            except OSError:
+                continue
+    return total, count
+
+
+def peak_rss_kb() -> dict:
+    """当前进程与已回收子进程的峰值常驻内存（KB）
+
+    子进程取的是所有已回收子进程中的最大值（浏览器进程关闭后才会计入）。
+    """
+    scale = 1024 if sys.platform == 'darwin' else 1  # macOS 单位是字节
+    return {
+        'python': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        'browser_max_process': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+    }
+
+
+def prepare_workdir(prefix: str) -> Path:
+    """创建隔离的工作目录，并链接项目的 assets 目录
+
+    工作流按相对路径读写 assets/ 与 data/，在隔离目录中运行可避免污染项目数据。
+    """
+    workdir = Path(tempfile.mkdtemp(prefix=prefix))
+    os.symlink(PROJECT_ROOT / 'assets', workdir / 'assets')
+    return workdir
+
+
+def run_child(module: str, args: list, timeout: float) -> dict:
+    """在独立子进程中运行一个基准场景，读取其 JSON 结果
+
+    每个场景使用独立进程，保证峰值内存等指标互不影响。
+
+    Args:
+        module: 场景模块（如 benchmarks.bench_workflow）
+        args: 传给子进程的参数
+        timeout: 超时时间（秒）
+
+    Returns:
+        dict: 子进程写出的结果；失败时包含 error 字段
+    """
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as result_file:
+        result_path = result_file.name
+    try:
+        completed = subprocess.run(
+            [sys.executable, '-m', module, '--child', '--result-file', result_path, *args],
+            cwd=PROJECT_ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=timeout,
+        )
+        if completed.returncode != 0:
+            return {'error': completed.stderr.strip().splitlines()[-1:] or ['子进程异常退出']}
+        with open(result_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except subprocess.TimeoutExpired:
+        return {'error': [f'超时（{timeout} 秒）']}
+    finally:
+        try:
+            os.unlink(result_path)
+        except OSError:
+            pass
+
+
+def write_report(benchmark: str, results: list, output: Optional[str], extra: dict = None):
+    """输出机器可读的基准测试报告（JSON）
+
+    Args:
+        benchmark: 基准测试名称
+        results: 各场景结果
+        output: 输出文件路径；为 None 时打印到标准输出
+        extra: 附加的顶层字段（如模拟服务配置）
+    """
+    report = {
+        'benchmark': benchmark,
+        'version': git_version(),
+        'python': sys.version.split()[0],
+        'platform': sys.platform,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        **(extra or {}),
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        Path(output).write_text(text + '\n', encoding='utf-8')
+        print(f"结果已写入: {output}")
+    else:
+        print(text)
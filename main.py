@@ -3,10 +3,12 @@
 Auto-Manga 自动漫画生成项目
 
 主入口脚本
+
+参数解析与校验、session 文件解析都在导入浏览器相关模块（playwright、aiohttp、pyperclip）
+之前完成，--help 或参数错误时不会加载这些模块，也不会创建日志文件。
 """
 
 import argparse
-import asyncio
 import sys
 import time
 
@@ -14,20 +16,9 @@ import time
 from src.utils.path_utils import setup_python_path
 project_root = setup_python_path(__file__)
 
-from src.core.auto_manga_workflow import AutoMangaWorkflow
-from src.utils.logger import init_logger
-
 
-async def main():
-    """主函数"""
-    # 生成会话ID
-    session_id = str(int(time.time()))
-    
-    # 初始化日志系统
-    logger = init_logger(session_id)
-    logger.info("=== Auto-Manga 自动漫画生成项目启动 ===")
-    
-    # 解析命令行参数
+def build_parser() -> argparse.ArgumentParser:
+    """构造命令行参数解析器"""
     parser = argparse.ArgumentParser(description='Auto-Manga 自动漫画生成项目')
     parser.add_argument('--concept', '-concept', type=str, default=None,
                         help='漫画概念/主题（例如：智能体、大模型领域的幻觉等）')
@@ -36,55 +27,189 @@ async def main():
                         help='封面生成测试模式，可选指定主题名称')
     parser.add_argument('session_file', type=str, nargs='?', default=None,
                         help='Session 文件路径（如果提供，将跳过脚本生成步骤）')
-    
-    args = parser.parse_args()
-    
-    # 确定运行模式
-    skip_script = False
-    session_file = None
-    skip_to_cover = False
-    theme_name = None
-    concept = args.concept
-    
-    if args.cover is not None:
-        # 封面测试模式
-        skip_to_cover = True
-        if args.cover:  # 如果提供了主题名称
-            theme_name = args.cover
-        logger.info("封面生成测试模式")
-        if theme_name:
-            logger.info(f"使用指定主题名称: {theme_name}")
-    elif args.session_file:
-        # Session 文件模式
-        session_file = args.session_file
-        skip_script = True
-        logger.info(f"将从 session 文件读取内容: {session_file}")
-        logger.info("跳过脚本生成步骤")
-    else:
-        # 正常流程：生成脚本
-        if concept is None:
-            logger.error("错误：未提供概念参数。请使用 --concept 或 -concept 参数指定概念。")
-            logger.info("示例: python main.py --concept 智能体")
+    parser.add_argument('--headless', action='store_true',
+                        help='自行启动无头 Chromium（使用导出的登录状态），无需手动启动 Chrome')
+    parser.add_argument('--export-storage-state', type=str, nargs='?', const='', default=None,
+                        metavar='PATH',
+                        help='从已登录的 Chrome（远程调试端口）导出登录状态，供 --headless 使用'
+                             '（默认: data/configs/storage_state.json）')
+    parser.add_argument('--harvest', type=str, default=None, metavar='CHAT_URL',
+                        help='只收集模式：打开已有的 Gemini 对话，保存其中所有生成的图片（需配合 --theme-dir）')
+    parser.add_argument('--theme-dir', type=str, default=None, metavar='DIR',
+                        help='--harvest 的保存目录（已存在的同序号图片会跳过）')
+    return parser
+
+
+def validate_args(args) -> None:
+    """校验参数组合，不合法时直接退出（此时尚未创建日志文件）"""
+    if args.harvest is not None:
+        if not args.harvest.startswith(('http://', 'https://')):
+            print(f"错误：--harvest 需要完整的对话 URL，收到: {args.harvest}", file=sys.stderr)
+            sys.exit(1)
+        if not args.theme_dir:
+            print("错误：--harvest 需要用 --theme-dir 指定保存目录。", file=sys.stderr)
+            print("示例: python main.py --harvest https://gemini.google.com/app/<对话ID> --theme-dir data/images/主题", file=sys.stderr)
             sys.exit(1)
-        logger.info(f"将生成新脚本，概念: {concept}")
-    
+        return
+    if args.export_storage_state is not None or args.cover is not None or args.session_file:
+        return
+    if args.concept is None:
+        print("错误：未提供概念参数。请使用 --concept 或 -concept 参数指定概念。", file=sys.stderr)
+        print("示例: python main.py --concept 智能体", file=sys.stderr)
+        sys.exit(1)
+
+
+def check_session_file(session_file: str, logger) -> int:
+    """在连接浏览器前解析 session 文件，返回宫格数量
+
+    文件不存在或格式错误时直接退出，避免先启动浏览器再失败。
+    """
+    from src.utils.file_utils import extract_table_from_session, get_absolute_path, load_text_from_file
+
+    filepath = get_absolute_path(session_file)
+    try:
+        _, panel_count = extract_table_from_session(load_text_from_file(filepath))
+    except Exception as e:
+        logger.error(f"Session 文件无效: {e}")
+        sys.exit(1)
+    return panel_count
+
+
+async def export_storage_state(path: str, session_id: str):
+    """连接已登录的 Chrome 并导出登录状态"""
+    from src.core.browser_controller import BrowserController
+
+    controller = BrowserController(session_id=session_id)
+    controller.launch_mode = 'cdp'
+    controller.context_mode = 'shared'  # 直接导出已登录的上下文
+    try:
+        await controller.connect_to_browser()
+        await controller.export_storage_state(path or None)
+    finally:
+        await controller.close()
+
+
+async def harvest_chat(args, session_id: str, logger) -> list:
+    """打开已有对话，渲染并并行保存其中所有生成的图片（按批次编号，跳过已存在的文件）"""
+    from src.core.batch_reconciler import BatchReconciler
+    from src.core.browser_controller import BrowserController
+    from src.core.image_harvester import ImageHarvester
+    from src.core.image_saver import ImageSaver
+
+    controller = BrowserController(session_id=session_id)
+    if args.headless:
+        controller.launch_mode = 'launch'
+    controller.gemini_url = args.harvest
+    try:
+        await controller.connect_to_browser()
+        await controller.open_gemini()
+
+        harvester = ImageHarvester(controller.page, session_id)
+        if not await harvester.wait_for_containers(1, timeout=60):
+            logger.error("对话中没有找到生成的图片")
+            return []
+        count = await harvester.load_all_containers()
+        logger.info(f"对话中共有 {count} 个图片容器")
+        await harvester.harvest()
+
+        # 与正常运行一样按批次编号命名：重试遗留的容器和额外的回复不保存，也不会让后面的批次错位
+        names = await BatchReconciler(controller.page, [], session_id).harvest_names()
+        if names is None:
+            logger.warning("对话中没有找到宫格范围（P起-P止），按容器顺序编号")
+
+        saver = ImageSaver(
+            controller.page, session_id,
+            download_dir=controller.download_dir, direct_downloads=controller.direct_downloads,
+        )
+        saved_files = await saver.save_containers_parallel(args.theme_dir, names)
+        for idx, file in enumerate(saved_files, 1):
+            print(f"  {idx}. {file}")
+        return saved_files
+    finally:
+        await controller.close()
+
+
+async def run_workflow(args, session_id: str, logger) -> bool:
+    """导入工作流并按运行模式执行，返回工作流是否执行完成"""
+    from src.core.auto_manga_workflow import AutoMangaWorkflow
+
     try:
         # 创建控制器并运行工作流
-        if skip_to_cover:
+        if args.cover is not None:
             workflow = AutoMangaWorkflow(session_id=session_id)
-            await workflow.run(skip_to_cover=True, theme_name=theme_name)
-        elif skip_script:
+            run_kwargs = {'skip_to_cover': True, 'theme_name': args.cover or None}
+        elif args.session_file:
             workflow = AutoMangaWorkflow(session_id=session_id)  # 不需要 concept，因为跳过生成
-            await workflow.run(skip_script_generation=True, session_file=session_file)
+            run_kwargs = {'skip_script_generation': True, 'session_file': args.session_file}
         else:
-            workflow = AutoMangaWorkflow(concept=concept, session_id=session_id)
-            await workflow.run()
-            
-        logger.info("=== 工作流执行完成 ===")
+            workflow = AutoMangaWorkflow(concept=args.concept, session_id=session_id)
+            run_kwargs = {}
+        if args.headless:
+            workflow.launch_mode = 'launch'
+        completed = await workflow.run(**run_kwargs)
+
+        if completed:
+            logger.info("=== 工作流执行完成 ===")
+        return completed
     except Exception as e:
         logger.exception(f"工作流执行过程中发生错误: {str(e)}")
         raise
 
 
+def main(argv=None):
+    """主函数"""
+    # 解析并校验命令行参数（不导入浏览器相关模块）
+    args = build_parser().parse_args(argv)
+    validate_args(args)
+
+    # 生成会话ID
+    session_id = str(int(time.time()))
+
+    # 初始化日志系统
+    from src.utils.logger import init_logger
+    logger = init_logger(session_id)
+    logger.info("=== Auto-Manga 自动漫画生成项目启动 ===")
+
+    # 后台压缩、清理其他会话的旧日志
+    from src.utils.log_retention import start_background_retention
+    start_background_retention(session_id)
+
+    import asyncio
+
+    if args.export_storage_state is not None:
+        # 导出登录状态模式
+        logger.info("导出登录状态")
+        asyncio.run(export_storage_state(args.export_storage_state, session_id))
+        return
+
+    if args.harvest is not None:
+        # 只收集模式
+        logger.info(f"只收集模式: {args.harvest} -> {args.theme_dir}")
+        if not asyncio.run(harvest_chat(args, session_id, logger)):
+            logger.error("只收集模式没有保存任何图片")
+            sys.exit(1)
+        return
+
+    # 确定运行模式
+    if args.headless:
+        logger.info("使用自行启动的无头 Chromium")
+    if args.cover is not None:
+        # 封面测试模式
+        logger.info("封面生成测试模式")
+        if args.cover:
+            logger.info(f"使用指定主题名称: {args.cover}")
+    elif args.session_file:
+        # Session 文件模式
+        logger.info(f"将从 session 文件读取内容: {args.session_file}")
+        panel_count = check_session_file(args.session_file, logger)
+        logger.info(f"跳过脚本生成步骤（宫格数量: {panel_count}）")
+    else:
+        # 正常流程：生成脚本
+        logger.info(f"将生成新脚本，概念: {args.concept}")
+
+    if not asyncio.run(run_workflow(args, session_id, logger)):
+        sys.exit(1)
+
+
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    main()
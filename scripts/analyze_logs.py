@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+分析运行日志：各阶段耗时、批次延迟、重试和失败，并给出多次运行的分位数
+
+使用方法:
+python scripts/analyze_logs.py [日志文件或目录 ...] [--runs] [--json] [--top N]
+
+不指定时分析 data/logs 下所有 *_run.log 和 *_run.log.gz（逐行流式读取，压缩日志直接读取）。
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config.settings import DEFAULT_LOGS_DIR
+from src.utils.log_analyzer import RunReport, analyze_logs
+
+
+def format_run(report: RunReport) -> str:
+    """单次运行的一行摘要"""
+    phases = " ".join(f"{name}={seconds:.0f}s" for name, seconds in report.phases.items())
+    failed = sum(batch.outcome == 'failed' for batch in report.batches)
+    return (f"{report.session}  {report.status:<10} {report.duration:7.0f}s  批次 {len(report.batches)}"
+            f"（失败 {failed}）  重试 {report.retry_count}  错误 {report.errors}  {phases}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='分析运行日志，输出各阶段耗时和批次延迟的分位数')
+    parser.add_argument('paths', nargs='*', default=[str(project_root / DEFAULT_LOGS_DIR)],
+                        help='日志文件或目录（默认: data/logs）')
+    parser.add_argument('--runs', action='store_true', help='同时输出每次运行的明细')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出（明细为每行一个 JSON 对象）')
+    parser.add_argument('--top', type=int, default=10, help='列出最常见的警告/错误数量（默认: 10）')
+    args = parser.parse_args()
+
+    def on_run(report: RunReport):
+        if args.json:
+            print(json.dumps(report.to_dict(), ensure_ascii=False, default=str))
+        else:
+            print(format_run(report))
+
+    analysis = analyze_logs(args.paths, on_run if args.runs else None)
+    if args.json:
+        print(json.dumps(analysis.to_dict(args.top), ensure_ascii=False))
+    else:
+        if args.runs:
+            print()
+        print(analysis.format_report(args.top))
+    if analysis.runs == 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
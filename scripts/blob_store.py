@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+管理内容寻址的图片存储（data/blobs）
+
+使用方法:
+python scripts/blob_store.py ingest [data/images ...]   # 把已有主题目录中的图片换成指向 blob 的硬链接
+python scripts/blob_store.py gc [--dry-run]             # 删除不再被任何主题目录引用的 blob
+python scripts/blob_store.py stats                      # 查看 blob 数量、占用和去重节省的空间
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config.settings import BLOB_STORE_DIR, DEFAULT_IMAGES_DIR
+from src.utils.blob_store import BlobStore
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1024 / 1024:.2f} MB"
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='管理内容寻址的图片存储')
+    parser.add_argument('--store', type=str, default=BLOB_STORE_DIR, help=f'存储目录（默认: {BLOB_STORE_DIR}）')
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest = commands.add_parser('ingest', help='把目录中已有的图片纳入存储')
+    ingest.add_argument('directories', nargs='*', default=[DEFAULT_IMAGES_DIR],
+                        help=f'要处理的目录（默认: {DEFAULT_IMAGES_DIR}）')
+    gc = commands.add_parser('gc', help='删除未被引用的 blob')
+    gc.add_argument('--dry-run', action='store_true', help='只统计，不删除')
+    commands.add_parser('stats', help='查看存储统计')
+    args = parser.parse_args()
+
+    store = BlobStore(args.store)
+    if args.command == 'ingest':
+        for directory in args.directories:
+            ingested, freed = store.ingest_tree(directory)
+            print(f"{directory}: 纳入 {ingested} 个文件，去重释放 {_mb(freed)}")
+    elif args.command == 'gc':
+        result = store.gc(dry_run=args.dry_run)
+        action = '可删除' if args.dry_run else '已删除'
+        print(f"{action} {result.removed} 个未引用的 blob（{_mb(result.freed_bytes)}），保留 {result.kept} 个")
+    else:
+        stats = store.stats()
+        print(f"blob: {stats.blobs} 个，占用 {_mb(stats.bytes)}")
+        print(f"主题目录中的文件合计 {_mb(stats.linked_bytes)}，去重节省 {_mb(max(stats.saved_bytes, 0))}")
+        print(f"未被引用: {stats.unreferenced} 个（运行 gc 删除）")
+
+
+if __name__ == '__main__':
+    main()
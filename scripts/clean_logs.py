@@ -1,71 +1,67 @@
 #!/usr/bin/env python3
 """
-清理旧的日志文件
+整理日志目录：压缩已关闭的会话日志，删除过期日志，并把日志目录控制在总大小上限内
 
 使用方法:
-python scripts/clean_logs.py [days]
+python scripts/clean_logs.py [days] [--max-mb N] [--idle SECONDS] [--dry-run]
 
-如果不指定天数，默认删除7天前的日志文件
+如果不指定天数，使用 settings.LOG_RETENTION_DAYS；已压缩的文件记录在日志目录的 .archive_index.json 中，
+重复运行只处理新增的日志。每次运行 main.py 时也会在后台自动整理。
 """
 
-import os
+import argparse
 import sys
-import time
 from pathlib import Path
-from datetime import datetime, timedelta
 
-# 获取项目根目录
+# 添加项目根目录到 Python 路径
 project_root = Path(__file__).parent.parent
-logs_dir = project_root / "data" / "logs"
+sys.path.insert(0, str(project_root))
+
+from src.config.settings import (
+    DEFAULT_LOGS_DIR,
+    LOG_COMPRESS_IDLE,
+    LOG_RETENTION_DAYS,
+    LOG_RETENTION_MAX_BYTES,
+)
+from src.utils.log_retention import ARCHIVE_INDEX_FILENAME, LogRetention
 
-def clean_old_logs(days=7):
-    """
-    清理指定天数前的日志文件
-    
-    Args:
-        days: 保留的天数，默认7天
-    """
-    if not logs_dir.exists():
-        print(f"日志目录不存在: {logs_dir}")
-        return
-    
-    # 计算截止时间
-    cutoff_time = time.time() - (days * 24 * 60 * 60)
-    
-    # 统计
-    deleted_files = 0
-    total_size = 0
-    
-    print(f"清理 {days} 天前的日志文件...")
-    print(f"日志目录: {logs_dir}")
-    
-    # 遍历日志文件
-    for log_file in logs_dir.glob("*.log"):
-        if log_file.stat().st_mtime < cutoff_time:
-            file_size = log_file.stat().st_size
-            total_size += file_size
-            log_file.unlink()
-            deleted_files += 1
-            print(f"已删除: {log_file.name}")
-    
-    # 显示统计信息
-    if deleted_files > 0:
-        print(f"\n清理完成! 共删除 {deleted_files} 个文件, 释放空间 {total_size / 1024 / 1024:.2f} MB")
-    else:
-        print("没有需要清理的文件")
 
 def main():
-    # 获取天数参数
-    days = 7
-    if len(sys.argv) > 1:
-        try:
-            days = int(sys.argv[1])
-        except ValueError:
-            print("错误: 天数必须是整数")
-            sys.exit(1)
-    
-    # 执行清理
-    clean_old_logs(days)
+    """主函数"""
+    parser = argparse.ArgumentParser(description='压缩、清理日志目录')
+    parser.add_argument('days', type=int, nargs='?', default=LOG_RETENTION_DAYS,
+                        help=f'保留天数（默认: {LOG_RETENTION_DAYS}）')
+    parser.add_argument('--max-mb', type=float, default=LOG_RETENTION_MAX_BYTES / 1024 / 1024,
+                        help=f'日志目录总大小上限，单位 MB（默认: {LOG_RETENTION_MAX_BYTES // 1024 // 1024}）')
+    parser.add_argument('--idle', type=float, default=LOG_COMPRESS_IDLE,
+                        help=f'日志多久没有写入视为已关闭、可以压缩，单位秒（默认: {LOG_COMPRESS_IDLE}）')
+    parser.add_argument('--log-dir', type=str, default=str(project_root / DEFAULT_LOGS_DIR),
+                        help='日志目录（默认: data/logs）')
+    parser.add_argument('--dry-run', action='store_true', help='只显示将要压缩和删除的数量，不做改动')
+    args = parser.parse_args()
+
+    log_dir = Path(args.log_dir)
+    if not log_dir.exists():
+        print(f"日志目录不存在: {log_dir}")
+        return
+
+    print(f"整理日志目录: {log_dir}（保留 {args.days} 天，总量上限 {args.max_mb:.0f} MB）")
+    retention = LogRetention(
+        log_dir, max_age_days=args.days, max_total_bytes=int(args.max_mb * 1024 * 1024),
+        compress_idle=args.idle,
+    )
+    result = retention.run(dry_run=args.dry_run)
+    if result.skipped:
+        print("另一个进程正在整理日志，跳过")
+        return
+
+    prefix = "将" if args.dry_run else "已"
+    print(f"{prefix}压缩: {result.compressed} 个文件（{result.compressed_bytes / 1024 / 1024:.2f} MB）")
+    print(f"{prefix}删除: {result.deleted} 个文件")
+    if not args.dry_run:
+        print(f"释放空间 {result.freed_bytes / 1024 / 1024:.2f} MB，日志目录现为 {result.total_bytes / 1024 / 1024:.2f} MB")
+        print(f"压缩记录: {log_dir / ARCHIVE_INDEX_FILENAME}")
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+把主题目录中的图片按顺序拼成公众号长图（封面在最上面）
+
+使用方法:
+python scripts/compose_strip.py data/images/主题 [--width 1080] [--gutter 24] [--max-height 12000] [--panels]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config.settings import STRIP_GUTTER, STRIP_MAX_HEIGHT, STRIP_WIDTH
+from src.postprocess.strip_composer import STRIP_DIRNAME, compose_theme_strips
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='把主题目录中的图片拼成竖向长图')
+    parser.add_argument('theme_dir', type=str, help='主题目录')
+    parser.add_argument('--width', '-w', type=int, default=STRIP_WIDTH, help=f'长图宽度（默认: {STRIP_WIDTH}）')
+    parser.add_argument('--gutter', '-g', type=int, default=STRIP_GUTTER, help=f'图片间隔（默认: {STRIP_GUTTER}）')
+    parser.add_argument('--max-height', type=int, default=STRIP_MAX_HEIGHT,
+                        help=f'每张长图的最大高度，超过时分成多张（默认: {STRIP_MAX_HEIGHT}）')
+    parser.add_argument('--panels', action='store_true', help='使用 panels/ 中切分后的宫格，而不是 4 宫格拼图')
+    parser.add_argument('--no-cover', action='store_true', help='不在最上面放封面')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help=f'输出目录（默认: 主题目录/{STRIP_DIRNAME}）')
+    args = parser.parse_args()
+
+    outputs = compose_theme_strips(
+        args.theme_dir, use_panels=args.panels, include_cover=not args.no_cover, output_dir=args.output,
+        width=args.width, gutter=args.gutter, max_height=args.max_height,
+    )
+    for output in outputs:
+        print(f"  {output}")
+    if not outputs:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,68 @@
 #!/usr/bin/env python3
 """
 将 data/images 目录下所有图片转换为 JPEG 格式，减小文件大小
+
+- 只遍历一次目录树，按扩展名（不区分大小写）筛选图片
+- 在目标目录保存转换清单（.convert_manifest.json），记录每个源文件的 mtime、大小、内容哈希和转换参数，
+  再次运行时只转换新增或内容有变化的文件
+- 转换在进程池中并行执行（默认与 CPU 核数相同），透明通道用 NumPy 向量化地合成到白色背景上
 """
 
+import hashlib
+import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 try:
+    import numpy as np
     from PIL import Image
 except ImportError:
-    print("错误: 需要安装 Pillow 库")
-    print("请运行: pip install Pillow")
+    print("错误: 需要安装 Pillow 和 NumPy 库")
+    print("请运行: pip install Pillow numpy")
     sys.exit(1)
 
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.utils.file_utils import AtomicWriter, atomic_write_text
+
 # 支持的图片格式
 SUPPORTED_FORMATS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp', '.tiff', '.tif'}
 
+# 转换清单文件名（保存在目标目录下）
+MANIFEST_FILENAME = '.convert_manifest.json'
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: Path) -> str:
+    """计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def flatten_alpha(img: Image.Image, background=(255, 255, 255)) -> Image.Image:
+    """
+    去掉透明通道：按 alpha 把像素合成到背景色上（NumPy 向量化），其他模式直接转为 RGB
+
+    Args:
+        img: 输入图片
+        background: 背景色，默认白色
+    """
+    if img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info):
+        rgba = np.asarray(img.convert('RGBA'), dtype=np.uint16)
+        alpha = rgba[..., 3:]
+        rgb = (rgba[..., :3] * alpha + np.array(background, dtype=np.uint16) * (255 - alpha) + 127) // 255
+        return Image.fromarray(rgb.astype(np.uint8), 'RGB')
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
 
 def convert_image_to_jpeg(input_path: Path, output_path: Path, quality: int = 85):
     """
@@ -29,26 +75,74 @@ def convert_image_to_jpeg(input_path: Path, output_path: Path, quality: int = 85
     """
     try:
         with Image.open(input_path) as img:
-            # 如果图片有透明通道，转换为 RGB
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # 创建白色背景
-                rgb_img = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                rgb_img.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-                img = rgb_img
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # 保存为 JPEG
-            img.save(output_path, 'JPEG', quality=quality, optimize=True)
+            img = flatten_alpha(img)
+            # 保存为 JPEG（先写临时文件，中断时不会留下写了一半的输出）
+            with AtomicWriter(output_path) as f:
+                img.save(f, 'JPEG', quality=quality, optimize=True)
             return True
     except Exception as e:
         print(f"转换失败 {input_path}: {e}", file=sys.stderr)
         return False
 
 
-def convert_images_in_directory(directory: str, quality: int = 85, delete_original: bool = False):
+def _convert_job(input_path: str, output_path: str, quality: int) -> dict:
+    """在子进程中转换一个文件，返回写入清单所需的信息"""
+    source = Path(input_path)
+    stat = source.stat()
+    ok = convert_image_to_jpeg(source, Path(output_path), quality)
+    return {
+        'ok': ok,
+        'mtime': stat.st_mtime,
+        'size': stat.st_size,
+        'sha256': file_sha256(source),
+        'output_size': Path(output_path).stat().st_size if ok else 0,
+    }
+
+
+def scan_images(dir_path: Path) -> list:
+    """遍历一次目录树，返回所有支持格式的图片（按路径排序）"""
+    image_files = []
+    for root, _, files in os.walk(dir_path):
+        for name in files:
+            if os.path.splitext(name)[1].lower() in SUPPORTED_FORMATS:
+                image_files.append(Path(root) / name)
+    return sorted(image_files)
+
+
+def load_manifest(dir_path: Path) -> dict:
+    """读取转换清单，文件不存在或损坏时返回空清单"""
+    try:
+        with open(dir_path / MANIFEST_FILENAME, 'r', encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(dir_path: Path, entries: dict):
+    """原子写入转换清单"""
+    atomic_write_text(dir_path / MANIFEST_FILENAME, json.dumps(
+        {'version': 1, 'files': entries}, ensure_ascii=False, indent=2, sort_keys=True
+    ))
+
+
+def is_up_to_date(entry: dict, img_path: Path, output_path: Path, quality: int) -> bool:
+    """源文件与清单记录一致（mtime/大小相同，或内容哈希相同）且输出文件存在时无需转换
+
+    mtime 变化但内容未变（例如被复制或 touch）时，顺带更新清单中的 mtime。
+    """
+    if not entry or entry.get('quality') != quality or not output_path.exists():
+        return False
+    stat = img_path.stat()
+    if entry.get('mtime') == stat.st_mtime and entry.get('size') == stat.st_size:
+        return True
+    if entry.get('size') == stat.st_size and entry.get('sha256') == file_sha256(img_path):
+        entry['mtime'] = stat.st_mtime
+        return True
+    return False
+
+
+def convert_images_in_directory(directory: str, quality: int = 85, delete_original: bool = False,
+                                workers: int = None, force: bool = False):
     """
     将目录下所有图片转换为 JPEG 格式
     
@@ -56,6 +150,8 @@ def convert_images_in_directory(directory: str, quality: int = 85, delete_origin
         directory: 目标目录路径
         quality: JPEG 质量 (1-100)，默认 85
         delete_original: 是否删除原始文件，默认 False
+        workers: 并行进程数，默认为 CPU 核数
+        force: 忽略转换清单，重新转换所有文件
     """
     dir_path = Path(directory)
     
@@ -68,10 +164,7 @@ def convert_images_in_directory(directory: str, quality: int = 85, delete_origin
         return
     
     # 查找所有图片文件
-    image_files = []
-    for ext in SUPPORTED_FORMATS:
-        image_files.extend(dir_path.rglob(f'*{ext}'))
-        image_files.extend(dir_path.rglob(f'*{ext.upper()}'))
+    image_files = scan_images(dir_path)
     
     if not image_files:
         print(f"在 {directory} 中未找到图片文件")
@@ -79,56 +172,87 @@ def convert_images_in_directory(directory: str, quality: int = 85, delete_origin
     
     print(f"找到 {len(image_files)} 个图片文件")
     
-    converted_count = 0
+    manifest = {} if force else load_manifest(dir_path)
+    jobs = []
     skipped_count = 0
-    failed_count = 0
-    total_original_size = 0
-    total_new_size = 0
     
     for img_path in image_files:
         # 跳过已经是 JPEG 格式的文件
         if img_path.suffix.lower() in ('.jpg', '.jpeg'):
-            print(f"跳过（已是 JPEG）: {img_path}")
             skipped_count += 1
             continue
         
         # 生成输出文件名
         output_path = img_path.with_suffix('.jpg')
+        key = img_path.relative_to(dir_path).as_posix()
+        entry = manifest.get(key)
+        
+        if is_up_to_date(entry, img_path, output_path, quality):
+            skipped_count += 1
+            continue
         
-        # 如果输出文件已存在，跳过
-        if output_path.exists():
+        # 输出文件已存在但清单中没有记录（旧版本脚本转换的），沿用旧行为跳过，并补记到清单
+        if entry is None and output_path.exists() and not force:
+            stat = img_path.stat()
+            manifest[key] = {
+                'mtime': stat.st_mtime, 'size': stat.st_size, 'sha256': file_sha256(img_path),
+                'quality': quality, 'output': output_path.relative_to(dir_path).as_posix(),
+            }
             print(f"跳过（输出文件已存在）: {img_path} -> {output_path}")
             skipped_count += 1
             continue
         
-        # 获取原始文件大小
-        original_size = img_path.stat().st_size
+        jobs.append((key, img_path, output_path))
+    
+    converted_count = 0
+    failed_count = 0
+    total_original_size = 0
+    total_new_size = 0
+    
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    print(f"需要转换 {len(jobs)} 个文件（跳过 {skipped_count} 个），使用 {workers} 个进程")
+    
+    def record(key, img_path, output_path, result):
+        nonlocal converted_count, failed_count, total_original_size, total_new_size
+        if not result['ok']:
+            failed_count += 1
+            return
+        original_size = result['size']
+        new_size = result['output_size']
         total_original_size += original_size
+        total_new_size += new_size
+        reduction_percent = ((original_size - new_size) / original_size * 100) if original_size > 0 else 0
+        print(f"  ✓ {img_path} -> {output_path.name}: {original_size / 1024:.2f} KB -> {new_size / 1024:.2f} KB "
+              f"(减少 {reduction_percent:.1f}%)")
+        manifest[key] = {
+            'mtime': result['mtime'], 'size': original_size, 'sha256': result['sha256'],
+            'quality': quality, 'output': output_path.relative_to(dir_path).as_posix(),
+        }
+        converted_count += 1
         
-        # 转换图片
-        print(f"转换: {img_path} -> {output_path}")
-        if convert_image_to_jpeg(img_path, output_path, quality):
-            # 获取新文件大小
-            new_size = output_path.stat().st_size
-            total_new_size += new_size
-            
-            size_reduction = original_size - new_size
-            reduction_percent = (size_reduction / original_size * 100) if original_size > 0 else 0
+        # 如果指定删除原始文件
+        if delete_original:
+            try:
+                img_path.unlink()
+                print(f"  ✓ 已删除原始文件: {img_path}")
+            except Exception as e:
+                print(f"  ⚠ 删除原始文件失败: {e}", file=sys.stderr)
             
-            print(f"  ✓ 完成: {original_size / 1024:.2f} KB -> {new_size / 1024:.2f} KB "
-                  f"(减少 {reduction_percent:.1f}%)")
-            
-            converted_count += 1
-            
-            # 如果指定删除原始文件
-            if delete_original:
-                try:
-                    img_path.unlink()
-                    print(f"  ✓ 已删除原始文件: {img_path}")
-                except Exception as e:
-                    print(f"  ⚠ 删除原始文件失败: {e}", file=sys.stderr)
-        else:
-            failed_count += 1
+    try:
+        if workers == 1:
+            for key, img_path, output_path in jobs:
+                record(key, img_path, output_path, _convert_job(str(img_path), str(output_path), quality))
+        elif jobs:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    pool.submit(_convert_job, str(img_path), str(output_path), quality): (key, img_path, output_path)
+                    for key, img_path, output_path in jobs
+                }
+                for future in as_completed(futures):
+                    record(*futures[future], future.result())
+    finally:
+        # 中断时也保存已完成的部分
+        save_manifest(dir_path, manifest)
     
     # 打印统计信息
     print("\n" + "="*60)
@@ -171,6 +295,17 @@ def main():
         action='store_true',
         help='转换后删除原始文件（默认: 不删除）'
     )
+    parser.add_argument(
+        '--workers', '-j',
+        type=int,
+        default=None,
+        help='并行进程数（默认: CPU 核数）'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='忽略转换清单，重新转换所有文件'
+    )
     
     args = parser.parse_args()
     
@@ -186,7 +321,9 @@ def main():
     convert_images_in_directory(
         str(directory),
         quality=args.quality,
-        delete_original=args.delete_original
+        delete_original=args.delete_original,
+        workers=args.workers,
+        force=args.force
     )
 
 
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+把主题目录中的长图（或按顺序排列的图片）编码为发布用的 JPEG / WebP / AVIF
+
+使用方法:
+python scripts/encode_publish.py data/images/主题 [--max-kb 1024] [--ssim 0.95] [--formats jpeg webp]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config.settings import PUBLISH_FORMATS, PUBLISH_MAX_BYTES, PUBLISH_TARGET_SSIM
+from src.postprocess.publish_encoder import PUBLISH_DIRNAME, encode_for_publish
+from src.postprocess.strip_composer import STRIP_DIRNAME, ordered_theme_images
+from src.utils.file_utils import dedupe_image_stems, get_image_files
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='把图片编码为发布用的多种格式')
+    parser.add_argument('theme_dir', type=str, help=f'主题目录（优先使用 {STRIP_DIRNAME}/ 中的长图）')
+    parser.add_argument('--formats', nargs='+', default=list(PUBLISH_FORMATS), help='输出格式（默认: %(default)s）')
+    parser.add_argument('--max-kb', type=int, default=PUBLISH_MAX_BYTES // 1024 if PUBLISH_MAX_BYTES else 0,
+                        help='每个文件的体积上限 KB，0 表示不限制（默认: %(default)s）')
+    parser.add_argument('--ssim', type=float, default=PUBLISH_TARGET_SSIM or 0,
+                        help='目标 SSIM，0 表示直接使用最高质量（默认: %(default)s）')
+    parser.add_argument('--workers', '-j', type=int, default=None, help='进程数（默认: CPU 核数）')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help=f'输出目录（默认: 主题目录/{PUBLISH_DIRNAME}）')
+    args = parser.parse_args()
+
+    theme_dir = Path(args.theme_dir)
+    sources = sorted(dedupe_image_stems(get_image_files(str(theme_dir / STRIP_DIRNAME)))) or ordered_theme_images(theme_dir)
+    if not sources:
+        print(f"在 {theme_dir} 中未找到图片文件", file=sys.stderr)
+        sys.exit(1)
+
+    results = encode_for_publish(
+        sources, args.output or theme_dir / PUBLISH_DIRNAME, formats=args.formats,
+        max_bytes=args.max_kb * 1024 or None, target_ssim=args.ssim or None, workers=args.workers,
+    )
+    for result in results:
+        ssim = f" SSIM {result.ssim:.3f}" if result.ssim is not None else ""
+        note = "（缓存）" if result.cached else ""
+        print(f"  {result.path}: 质量 {result.quality}, {result.bytes / 1024:.0f} KB{ssim}{note}")
+
+
+if __name__ == '__main__':
+    main()
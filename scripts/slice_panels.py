@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+把主题目录中按批次编号保存的 4 宫格拼图切成单独的宫格（P1…Pn）
+
+使用方法:
+python scripts/slice_panels.py data/images/主题 --panels 32 [--output DIR] [--workers N]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.postprocess.panel_slicer import PANELS_DIRNAME, slice_theme_images
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='把 4 宫格拼图切成单独的宫格')
+    parser.add_argument('theme_dir', type=str, help='主题目录（包含 1.png、2.png ... 批次图片）')
+    parser.add_argument('--panels', '-n', type=int, required=True, help='宫格总数')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                        help=f'输出目录（默认: 主题目录/{PANELS_DIRNAME}）')
+    parser.add_argument('--workers', '-j', type=int, default=None, help='进程数（默认: CPU 核数）')
+    args = parser.parse_args()
+
+    panels = slice_theme_images(args.theme_dir, args.panels, args.output, args.workers)
+    for number in sorted(panels):
+        print(f"  P{number}: {panels[number]}")
+    if len(panels) < args.panels:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,39 @@
 项目配置设置
 """
 
+import os
+from urllib.parse import urlparse
+
 # Chrome远程调试配置
 CHROME_DEBUG_PORT = 9222
 CHROME_CDP_URL = f"http://localhost:{CHROME_DEBUG_PORT}"
 CHROME_USER_DATA_DIR = "$HOME/chrome_debug_profile"
 
+# 浏览器启动方式
+# - cdp: 连接手动启动的 Chrome（CHROME_CDP_URL）
+# - launch: 自行启动并看管本地 Chromium（默认无头），登录状态从 STORAGE_STATE_PATH 加载
+# 可通过环境变量 AUTO_MANGA_BROWSER_MODE 设置，或使用 main.py --headless
+BROWSER_LAUNCH_MODE = os.environ.get("AUTO_MANGA_BROWSER_MODE", "cdp")
+BROWSER_HEADLESS = os.environ.get("AUTO_MANGA_HEADLESS", "1") == "1"
+# Chromium 可执行文件，未设置时使用 Playwright 自带的 Chromium
+CHROMIUM_EXECUTABLE = os.environ.get("AUTO_MANGA_CHROME_PATH")
+BROWSER_LAUNCH_TIMEOUT = 30000  # 等待浏览器调试端口就绪 (毫秒)
+# 导出的登录状态（cookies + localStorage），由 main.py --export-storage-state 生成
+STORAGE_STATE_PATH = "data/configs/storage_state.json"
+# 浏览器上下文方式
+# - isolated: 每个任务创建独立的上下文（克隆登录状态），拥有自己的页面、cookies 和下载目录，
+#   多个任务可以并行共用一个 Chrome
+# - shared: 复用浏览器的第一个上下文和第一个页面（旧行为）
+# 可通过环境变量 AUTO_MANGA_CONTEXT_MODE 设置；launch 模式总是使用独立上下文
+BROWSER_CONTEXT_MODE = os.environ.get("AUTO_MANGA_CONTEXT_MODE", "isolated")
+# 独立上下文中通过 CDP 让浏览器把下载直接写入主题目录（省去 Playwright 临时目录中的拷贝）
+# 可通过环境变量 AUTO_MANGA_DIRECT_DOWNLOADS=0 关闭，改用 page.expect_download + save_as
+DIRECT_DOWNLOADS = os.environ.get("AUTO_MANGA_DIRECT_DOWNLOADS", "1") == "1"
+
 # Gemini网站配置
-GEMINI_URL = "https://gemini.google.com/app"
+# 可通过环境变量 AUTO_MANGA_GEMINI_URL 指向本地模拟服务（见 src/mock/gemini_server.py）
+GEMINI_URL = os.environ.get("AUTO_MANGA_GEMINI_URL", "https://gemini.google.com/app")
+GEMINI_ORIGIN = "{0.scheme}://{0.netloc}".format(urlparse(GEMINI_URL))
 
 # 文件路径配置
 DEFAULT_IMAGE_PATH = "assets/samples/demo.png"
@@ -17,16 +43,75 @@ DEFAULT_IMAGES_DIR = "data/images"
 DEFAULT_SESSIONS_DIR = "sessions"
 DEFAULT_CONFIGS_DIR = "data/configs"
 DEFAULT_LOGS_DIR = "data/logs"
+DEFAULT_DOWNLOADS_DIR = "data/downloads"  # 各任务的下载暂存目录（按会话划分）
+DOWNLOAD_CHUNK_SIZE = 256 * 1024  # 图片 URL 流式下载的分块大小 (字节)
+
+# 图片下载策略引擎（见 src/core/download_engine.py）
+DOWNLOAD_STATS_PATH = "data/configs/download_stats.json"  # 各下载策略的历史成功率与耗时
+DOWNLOAD_STATS_DECAY = 0.5  # 每次启动时历史计数的衰减系数
+DOWNLOAD_BREAKER_THRESHOLD = 3  # 连续失败多少次后熔断
+DOWNLOAD_BREAKER_COOLDOWN = 120  # 熔断冷却时间 (秒)
+# 保存后的图片质量检查（见 src/utils/image_quality.py），未通过时换下一种下载方式重新获取
+IMAGE_QUALITY_GATE = True
+QUALITY_MIN_SIDE = 256  # 短边最小像素数
+QUALITY_MIN_BYTES = 2048  # 最小文件大小 (字节)
+QUALITY_MIN_BYTES_PER_PIXEL = 0.002  # 每像素最小字节数（纯色 PNG 约 0.003，真实图片远高于此）
+QUALITY_MIN_STD = 6.0  # 亮度标准差下限，低于此值视为纯色图
+# 近似重复检测（见 src/utils/perceptual_hash.py）：两个感知哈希的汉明距离都不超过阈值时视为近似重复
+DHASH_MAX_DISTANCE = 10
+PHASH_MAX_DISTANCE = 10
+IMAGE_CATALOG_PATH = "data/images/catalog.json"  # 所有主题图片的哈希目录，用于发现跨主题/跨运行的重复
+SKIP_DUPLICATE_IMAGES = False  # 新保存的图片与已有图片（近似）重复时删除，不保存第二份
+# 内容寻址存储（见 src/utils/blob_store.py）：每份图片内容只保存一次，主题目录中是指向它的硬链接
+# 需要与 data/images 在同一文件系统；可通过环境变量 AUTO_MANGA_BLOB_STORE=0 关闭
+BLOB_STORE = os.environ.get("AUTO_MANGA_BLOB_STORE", "1") == "1"
+BLOB_STORE_DIR = "data/blobs"
+
+# 后期处理：把每张 4 宫格拼图切成单独的宫格（见 src/postprocess/panel_slicer.py）
+# 可通过环境变量 AUTO_MANGA_SLICE_PANELS=0 关闭
+PANEL_SLICING = os.environ.get("AUTO_MANGA_SLICE_PANELS", "1") == "1"
+PANEL_SLICE_WORKERS = None  # 切分使用的进程数，None 表示 CPU 核数
+# 后期处理：公众号长图拼接（见 src/postprocess/strip_composer.py）
+STRIP_WIDTH = 1080  # 长图宽度 (像素)
+STRIP_GUTTER = 24  # 图片之间的间隔 (像素)
+STRIP_MAX_HEIGHT = 12000  # 每张长图的最大高度 (像素)，超过时分成多张
+# 后期处理：发布编码（见 src/postprocess/publish_encoder.py）
+PUBLISH_FORMATS = ("jpeg", "webp", "avif")  # 当前 Pillow 不支持的格式会跳过
+PUBLISH_MAX_BYTES = 1024 * 1024  # 每个文件的体积上限 (字节)，None 表示不限制
+PUBLISH_TARGET_SSIM = 0.95  # 目标感知质量（亮度 SSIM），None 表示直接使用最高质量
+PUBLISH_QUALITY_RANGE = (30, 95)  # 编码质量的查找范围
+PUBLISH_CACHE_DIR = "data/cache/publish"  # 编码结果缓存（按源文件哈希 + 编码参数）
 
 # 日志配置
 LOG_LEVEL = "DEBUG"  # 可选: DEBUG, INFO, WARNING, ERROR, CRITICAL
 LOG_MAX_BYTES = 10 * 1024 * 1024  # 日志文件最大大小 (10MB)
 LOG_BACKUP_COUNT = 5  # 保留的日志备份数量
+# 日志保留（见 src/utils/log_retention.py 和 scripts/clean_logs.py）
+LOG_RETENTION_DAYS = 30  # 超过天数的日志和压缩包删除
+LOG_RETENTION_MAX_BYTES = 500 * 1024 * 1024  # 日志目录总大小上限，超过时从最旧的开始删除
+LOG_COMPRESS_IDLE = 3600  # 日志超过该时间没有写入视为已关闭，压缩为 .log.gz (秒)
+# 运行期间后台整理日志的间隔 (秒)，启动时先整理一次；环境变量 AUTO_MANGA_LOG_RETENTION=0 关闭
+LOG_RETENTION_INTERVAL = None if os.environ.get("AUTO_MANGA_LOG_RETENTION", "1") == "0" else 3600
+
+# 性能统计配置
+# 开启后统计每次 Playwright 协议调用的次数与耗时，运行结束时输出报告
+# 可通过环境变量 AUTO_MANGA_CDP_STATS=1 开启
+CDP_INSTRUMENTATION = os.environ.get("AUTO_MANGA_CDP_STATS", "0") == "1"
 
 # 超时配置 (毫秒)
 RESPONSE_TIMEOUT = 120000  # 等待响应生成
+COPY_BUTTON_TIMEOUT = 10000  # 脚本回复结束后等待复制按钮出现
 IMAGE_GENERATION_TIMEOUT = 60000  # 等待图片生成
 UPLOAD_TIMEOUT = 15000  # 文件上传
+IMAGE_HARVEST_TIMEOUT = 15000  # 收集图片时每个容器等待图片加载的最长时间
+
+# 批次失败重试（见 src/core/response_classifier.py）
+BATCH_RETRY_LIMIT = 2  # 每个批次因拒绝/出错/额度用尽最多重试的次数
+RECONCILE_ROUNDS = 1  # 全部批次发送完后，对缺失批次重新请求的轮数（见 src/core/batch_reconciler.py）
+ERROR_RETRY_DELAY = 5  # 出错后重试前的等待 (秒)
+QUOTA_BACKOFF = 60  # 额度用尽后重试前的等待 (秒)，每次重试翻倍
+# 被拒绝时换一种说法重新请求
+REFUSAL_REPHRASE_TEMPLATE = "请用轻松、卡通化的画风重新绘制，避免写实人物和敏感元素。\n{prompt}"
 
 # 选择器配置 (用于定位页面元素)
 SELECTORS = {
@@ -89,6 +174,15 @@ SELECTORS = {
         '.send-button-container button',
         'button:has(mat-icon[data-mat-icon-name="send"])',
     ],
+    # 模型回复与用户消息（用于识别最新一轮回复是拒绝、出错还是额度用尽）
+    "model_response": [
+        'model-response',
+        '[data-test-id="model-response"]',
+    ],
+    "user_query": [
+        'user-query',
+        '.user-query',
+    ],
 }
 
 # 提示词配置
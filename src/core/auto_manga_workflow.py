@@ -10,17 +10,29 @@ from typing import List
 
 import pyperclip
 
+from src.core.batch_reconciler import BatchRange, BatchReconciler, plan_batches
 from src.core.browser_controller import BrowserController
+from src.core.image_harvester import ImageHarvester
+from src.core.response_classifier import ResponseClassification, ResponseClassifier, ResponseOutcome
 from src.config.settings import (
     SELECTORS, 
     SCRIPT_PROMPT_TEMPLATE, 
     IMAGE_GENERATION_PROMPT,
     RESPONSE_TIMEOUT,
+    COPY_BUTTON_TIMEOUT,
     UPLOAD_TIMEOUT,
     DEFAULT_IMAGE_PATH,
     DEFAULT_COVER_IMAGE_PATH,
     DEFAULT_IMAGES_DIR,
-    DEFAULT_SESSIONS_DIR
+    DEFAULT_SESSIONS_DIR,
+    IMAGE_CATALOG_PATH,
+    BATCH_RETRY_LIMIT,
+    RECONCILE_ROUNDS,
+    PANEL_SLICING,
+    PANEL_SLICE_WORKERS,
+    ERROR_RETRY_DELAY,
+    QUOTA_BACKOFF,
+    REFUSAL_REPHRASE_TEMPLATE,
 )
 from src.utils.browser_utils import find_working_selector, wait_for_content_stabilization, verify_upload
 from src.utils.file_utils import (
@@ -30,7 +42,16 @@ from src.utils.file_utils import (
     get_absolute_path,
     get_file_size
 )
+from src.utils.image_utils import rename_image_file
 from src.utils.logger import get_logger
+from src.utils.timing import (
+    PhaseTimer,
+    WaitAccounting,
+    fixed_sleep,
+    tracked_wait,
+    use_wait_accounting,
+    reset_wait_accounting
+)
 
 
 class AutoMangaWorkflow(BrowserController):
@@ -44,6 +65,9 @@ class AutoMangaWorkflow(BrowserController):
         self.theme_name = None  # 主题名称
         self.theme_dir = None  # 主题文件夹路径
         self.logger = get_logger(session_id)
+        self.wait_accounting = WaitAccounting()  # 本次运行的等待耗时统计
+        # 本次运行各阶段的耗时（阶段切换写入日志，供 scripts/analyze_logs.py 还原未正常结束的运行）
+        self.phase_timer = PhaseTimer(on_begin=lambda name: self.logger.debug(f"阶段开始: {name}"))
     
     def build_script_prompt(self) -> str:
         """构建漫画脚本生成提示词"""
@@ -201,7 +225,7 @@ class AutoMangaWorkflow(BrowserController):
             # 点击输入框获得焦点
             self.logger.debug("点击输入框...")
             await input_element.click()
-            await asyncio.sleep(0.3)
+            await fixed_sleep(0.3)
             
             # 方法1: 使用 JavaScript 直接设置内容（推荐，避免换行触发发送）
             self.logger.debug("使用 JavaScript 直接设置内容...")
@@ -236,7 +260,7 @@ class AutoMangaWorkflow(BrowserController):
                     {"selector": selector, "text": query}
                 )
                 
-                await asyncio.sleep(0.5)  # 等待内容设置完成
+                await fixed_sleep(0.5)  # 等待内容设置完成
                 self.logger.debug("✓ 内容已通过 JavaScript 设置")
                 
             except Exception as js_error:
@@ -246,21 +270,21 @@ class AutoMangaWorkflow(BrowserController):
                 self.logger.debug("使用剪贴板粘贴方式...")
                 # 清空输入框
                 await self.page.keyboard.press('Meta+a')
-                await asyncio.sleep(0.1)
+                await fixed_sleep(0.1)
                 await self.page.keyboard.press('Control+a')
-                await asyncio.sleep(0.1)
+                await fixed_sleep(0.1)
                 await self.page.keyboard.press('Backspace')
-                await asyncio.sleep(0.2)
+                await fixed_sleep(0.2)
                 
                 # 设置剪贴板内容
                 pyperclip.copy(query)
-                await asyncio.sleep(0.2)
+                await fixed_sleep(0.2)
                 
                 # 粘贴（Mac 使用 Cmd+V，其他系统使用 Ctrl+V）
                 await self.page.keyboard.press('Meta+v')
-                await asyncio.sleep(0.3)
+                await fixed_sleep(0.3)
                 await self.page.keyboard.press('Control+v')
-                await asyncio.sleep(0.5)  # 等待粘贴完成
+                await fixed_sleep(0.5)  # 等待粘贴完成
                 self.logger.debug("✓ 内容已通过剪贴板粘贴")
             
             # 验证内容是否已正确设置（可选）
@@ -312,16 +336,17 @@ class AutoMangaWorkflow(BrowserController):
                     else:
                         self.logger.debug(f"✓ 找到发送按钮: {send_button_selector}")
                         await send_button.click()
-                        await asyncio.sleep(0.5)  # 等待发送完成
+                        await fixed_sleep(0.5)  # 等待发送完成
                         self.logger.debug("✓ 已点击发送按钮")
             
-            await asyncio.sleep(0.5)  # 额外等待确保发送完成
+            await fixed_sleep(0.5)  # 额外等待确保发送完成
             self.logger.debug("消息已发送")
             
         except Exception as e:
             self.logger.error(f"发送消息失败: {e}")
             raise
     
+    @tracked_wait("等待响应生成")
     async def wait_for_response(self) -> bool:
         """等待 Gemini 生成响应完成"""
         self.logger.debug("等待响应生成...")
@@ -345,8 +370,8 @@ class AutoMangaWorkflow(BrowserController):
             else:
                 self.logger.warning("等待响应内容稳定超时")
             
-            # 额外等待一下，确保表格完全渲染
-            await asyncio.sleep(2)
+            # 额外等待一下，确保表格完全渲染（无条件等待，计入死等）
+            await fixed_sleep(2, dead=True)
             self.logger.debug("✓ 响应生成完成")
             
             return True
@@ -355,6 +380,23 @@ class AutoMangaWorkflow(BrowserController):
             self.logger.error(f"等待响应失败: {e}")
             return False
     
+    @tracked_wait("等待复制按钮")
+    async def wait_for_copy_button(self, timeout: int = COPY_BUTTON_TIMEOUT) -> bool:
+        """等待表格的复制按钮出现（回复完全结束后才显示），代替固定等待 10 秒
+        
+        Args:
+            timeout: 最长等待时间（毫秒）
+            
+        Returns:
+            bool: 是否等到了复制按钮（超时后仍继续尝试复制）
+        """
+        try:
+            await self.page.wait_for_selector(', '.join(SELECTORS["copy_button"]), state='visible', timeout=timeout)
+            return True
+        except Exception as e:
+            self.logger.debug(f"等待复制按钮超时: {e}，继续尝试复制")
+            return False
+    
     async def copy_table_content(self) -> str:
         """找到并点击复制表格按钮，获取复制的内容"""
         self.logger.debug("准备复制表格内容...")
@@ -391,14 +433,22 @@ class AutoMangaWorkflow(BrowserController):
                 else:
                     raise Exception("无法定位到复制按钮")
             
+            # 记录点击前的剪贴板内容，用于判断复制是否真正生效
+            previous_content = self._read_clipboard()
+            
             # 点击复制按钮
             self.logger.debug("点击复制按钮...")
             await copy_button.click()
-            await asyncio.sleep(1)  # 等待复制操作完成
+            await fixed_sleep(1)  # 等待复制操作完成
             
             # 从剪贴板获取内容
             self.logger.debug("从剪贴板获取内容...")
-            copied_content = pyperclip.paste()
+            copied_content = self._read_clipboard()
+            
+            # 无头浏览器或没有系统剪贴板时，复制按钮不会写入系统剪贴板，改为从页面读取表格
+            if not copied_content or copied_content == previous_content:
+                self.logger.debug("剪贴板内容未更新，改为从页面读取表格...")
+                copied_content = await self._read_table_from_page()
             
             if copied_content:
                 self.copied_table_content = copied_content
@@ -412,6 +462,27 @@ class AutoMangaWorkflow(BrowserController):
             self.logger.error(f"复制表格失败: {e}")
             raise
     
+    def _read_clipboard(self) -> str:
+        """读取系统剪贴板，没有可用的剪贴板时返回空字符串"""
+        try:
+            return pyperclip.paste() or ""
+        except Exception as e:
+            self.logger.debug(f"读取剪贴板失败: {e}")
+            return ""
+    
+    async def _read_table_from_page(self) -> str:
+        """从最新的响应中读取表格，转换为 Markdown 表格文本（不含分隔行）"""
+        return await self.page.evaluate("""
+            () => {
+                const tables = document.querySelectorAll('.response-container table, .model-response table, [data-test-id="model-response"] table');
+                if (!tables.length) return '';
+                const table = tables[tables.length - 1];
+                return Array.from(table.rows)
+                    .map(row => '| ' + Array.from(row.cells).map(cell => cell.innerText.trim()).join(' | ') + ' |')
+                    .join('\\n');
+            }
+        """)
+    
     def save_to_file(self, query: str, response: str, filename: str = None) -> str:
         """保存查询和响应到本地 txt 文件"""
         content = f"""
@@ -480,7 +551,7 @@ class AutoMangaWorkflow(BrowserController):
                 self.logger.debug("点击 New chat 按钮...")
                 await new_chat_button.click()
             
-            await asyncio.sleep(2)  # 等待新聊天窗口加载
+            await fixed_sleep(2)  # 等待新聊天窗口加载
             
             # 等待新页面加载完成
             await self.page.wait_for_load_state('domcontentloaded')
@@ -513,7 +584,7 @@ class AutoMangaWorkflow(BrowserController):
             # 点击 Tools 按钮
             self.logger.debug("点击 Tools 按钮...")
             await tools_button.click()
-            await asyncio.sleep(0.5)  # 等待菜单展开
+            await fixed_sleep(0.5)  # 等待菜单展开
             
             # 查找并点击 Create Images 选项
             create_images_selector = await find_working_selector(
@@ -541,7 +612,7 @@ class AutoMangaWorkflow(BrowserController):
                 self.logger.debug("点击 Create Images...")
                 await create_images_element.click()
             
-            await asyncio.sleep(0.5)  # 等待工具切换完成
+            await fixed_sleep(0.5)  # 等待工具切换完成
             self.logger.debug("Create Images 工具已选择")
             
         except Exception as e:
@@ -592,7 +663,7 @@ class AutoMangaWorkflow(BrowserController):
             # 点击输入框获得焦点
             self.logger.debug("点击输入框...")
             await input_element.click()
-            await asyncio.sleep(0.3)
+            await fixed_sleep(0.3)
             
             # 使用 JavaScript 追加文本内容（不清空现有内容，可能包含图片）
             self.logger.debug("使用 JavaScript 追加内容...")
@@ -625,7 +696,7 @@ class AutoMangaWorkflow(BrowserController):
                 {"selector": selector, "text": text}
             )
             
-            await asyncio.sleep(0.5)  # 等待内容设置完成
+            await fixed_sleep(0.5)  # 等待内容设置完成
             self.logger.debug("✓ 内容已通过 JavaScript 设置")
             
             # 点击发送按钮发送消息
@@ -661,16 +732,133 @@ class AutoMangaWorkflow(BrowserController):
                     else:
                         self.logger.debug(f"✓ 找到发送按钮: {send_button_selector}")
                         await send_button.click()
-                        await asyncio.sleep(0.5)  # 等待发送完成
+                        await fixed_sleep(0.5)  # 等待发送完成
                         self.logger.debug("✓ 已点击发送按钮")
             
-            await asyncio.sleep(0.5)  # 额外等待确保发送完成
+            await fixed_sleep(0.5)  # 额外等待确保发送完成
             self.logger.debug("多模态消息已发送")
             
         except Exception as e:
             self.logger.error(f"发送多模态消息失败: {e}")
             raise
     
+    async def generate_batch(
+        self, batch: BatchRange, message: str, panel_prompt: str, saved_image_urls: set, multimodal: bool = False
+    ) -> tuple:
+        """发送一个批次的生成请求并等待图片，被拒绝、出错或额度用尽时按类型重试（最多 BATCH_RETRY_LIMIT 次）
+        
+        Args:
+            batch: 批次的宫格范围
+            message: 首次发送的完整消息
+            panel_prompt: 本批次的提示词（重试时使用，不含首批的表格内容）
+            saved_image_urls: 已检测到的图片URL集合（成功时加入新图片）
+            multimodal: 首次发送是否使用多模态消息（首批需要附带示例图片）
+            
+        Returns:
+            tuple: (是否成功, 新生成的图片URL列表, 最新回复的分类)
+        """
+        container_selector = '.attachment-container.generated-images'
+        full_message = message
+        for attempt in range(BATCH_RETRY_LIMIT + 1):
+            # 发送消息前，记录当前图片数量（用于检测新生成的图片）
+            try:
+                existing_images = await self.page.query_selector_all(f'{container_selector} img[src]')
+                initial_image_count = len(existing_images)
+                self.logger.debug(f"发送消息前，当前图片数量: {initial_image_count}")
+            except:
+                initial_image_count = 0
+                self.logger.debug("无法获取当前图片数量，使用默认值 0")
+            
+            # 发送消息（第一次使用多模态，后续批次和重试只发送文本）
+            self.logger.debug(f"发送生成请求: {batch.label}")
+            if multimodal and attempt == 0:
+                # 第一次：需要包含图片和表格，使用多模态消息
+                await self.send_multimodal_message(full_message)
+            else:
+                # 后续批次：只发送文本提示词（图片和表格已在对话历史中）
+                await self.send_message(full_message)
+            
+            self.logger.debug(f"等待批次 {batch.index + 1} 图片生成...")
+            success, new_image_urls, response = await self.wait_for_images_generated(
+                initial_image_count=initial_image_count,
+                saved_image_urls=saved_image_urls
+            )
+            if success or not response.outcome.is_failure or attempt == BATCH_RETRY_LIMIT:
+                break
+            full_message = await self.prepare_batch_retry(response, panel_prompt, attempt)
+        
+        if success and len(new_image_urls) > 0:
+            # 将新生成的图片URL加入已保存列表（用于后续批次检测）
+            saved_image_urls.update(new_image_urls)
+            self.logger.debug(f"✓ 批次 {batch.index + 1} 图片生成完成，检测到 {len(new_image_urls)} 张新图片")
+        elif success:
+            self.logger.warning(f"批次 {batch.index + 1} 图片生成成功，但未检测到新图片URL")
+        else:
+            self.logger.warning(f"批次 {batch.index + 1} ({batch.label}) 图片生成失败（{response.summary}）")
+        return success, new_image_urls, response
+    
+    async def reconcile_batches(self, batches: List[BatchRange], saved_image_urls: set) -> List[str]:
+        """对账：找出没有图片的批次，只重新发送这些批次的提示词（最多 RECONCILE_ROUNDS 轮）
+        
+        Args:
+            batches: 所有批次
+            saved_image_urls: 已检测到的图片URL集合
+            
+        Returns:
+            List[str]: 每个图片容器保存时使用的文件名（按批次编号，见 BatchReconciler.container_names）；
+                       无法读取页面时返回 None（按容器顺序编号）
+        """
+        reconciler = BatchReconciler(self.page, batches, self.session_id)
+        harvester = ImageHarvester(self.page, self.session_id)
+        try:
+            for round_index in range(RECONCILE_ROUNDS + 1):
+                assignments = await reconciler.map_containers()
+                missing = reconciler.missing(assignments)
+                if not missing:
+                    self.logger.debug(f"✓ 对账完成，{len(batches)} 个批次都有图片")
+                    break
+                labels = ', '.join(batch.label for batch in missing)
+                if round_index == RECONCILE_ROUNDS:
+                    self.logger.error(f"重试后仍缺少以下批次的图片，对应宫格将空缺: {labels}")
+                    break
+                
+                self.logger.warning(f"以下批次没有图片，只重新请求这些批次: {labels}")
+                for batch in missing:
+                    prompt = self.build_panel_generation_prompt(
+                        batch.start_panel, batch.end_panel, is_first_batch=(batch.index == 0)
+                    )
+                    await self.generate_batch(batch, prompt, prompt, saved_image_urls)
+                await harvester.harvest()
+            
+            return reconciler.container_names(assignments, await harvester.count_containers())
+        except Exception as e:
+            self.logger.warning(f"批次对账失败: {e}，按容器顺序保存")
+            return None
+    
+    async def prepare_batch_retry(self, response: ResponseClassification, prompt: str, attempt: int) -> str:
+        """根据失败类型准备批次重试，返回要重新发送的提示词
+        
+        - 拒绝：换一种说法（REFUSAL_REPHRASE_TEMPLATE）立即重试
+        - 出错：等待 ERROR_RETRY_DELAY 秒后原样重试
+        - 额度用尽：退避 QUOTA_BACKOFF 秒（每次重试翻倍）后原样重试
+        
+        Args:
+            response: 失败回复的分类
+            prompt: 本批次的提示词（不含首批的表格内容，表格已在对话历史中）
+            attempt: 已重试的次数（从 0 开始）
+        """
+        if response.outcome is ResponseOutcome.REFUSAL:
+            self.logger.info("生成请求被拒绝，换一种说法重试...")
+            return REFUSAL_REPHRASE_TEMPLATE.format(prompt=prompt)
+        if response.outcome is ResponseOutcome.QUOTA:
+            delay = QUOTA_BACKOFF * (2 ** attempt)
+        else:
+            delay = ERROR_RETRY_DELAY
+        self.logger.info(f"模型回复{'额度用尽' if response.outcome is ResponseOutcome.QUOTA else '出错'}，{delay} 秒后重试...")
+        await fixed_sleep(delay)
+        return prompt
+    
+    @tracked_wait("等待图片生成")
     async def wait_for_images_generated(self, initial_image_count: int = 0, saved_image_urls: set = None) -> tuple:
         """等待图片生成完成
         
@@ -679,7 +867,9 @@ class AutoMangaWorkflow(BrowserController):
             saved_image_urls: 已保存的图片URL集合，用于排除已保存的图片
             
         Returns:
-            tuple: (是否成功, 新生成的图片URL列表)
+            tuple: (是否成功, 新生成的图片URL列表, 最新回复的分类 ResponseClassification)
+                   最新回复被识别为拒绝/出错/额度用尽时立即返回失败，不再等到超时；
+                   本地出错时返回 LOCAL_ERROR（不重新发送）
         """
         if saved_image_urls is None:
             saved_image_urls = set()
@@ -689,13 +879,18 @@ class AutoMangaWorkflow(BrowserController):
         try:
             # 导入ImageSaver用于URL处理
             from src.core.image_saver import ImageSaver
-            saver = ImageSaver(self.page, self.session_id)
+            saver = ImageSaver(
+                self.page, self.session_id, download_dir=self.download_dir, direct_downloads=self.direct_downloads
+            )
+            
+            classifier = ResponseClassifier(self.page, self.session_id)
+            response = ResponseClassification(ResponseOutcome.PENDING)
             
             # 等待新的响应容器出现（通过检测响应容器的数量变化）
             container_selector = '.attachment-container.generated-images'
             
-            # 先等待一小段时间，确保消息已发送
-            await asyncio.sleep(1)
+            # 先等待一小段时间，确保消息已发送（无条件等待，计入死等）
+            await fixed_sleep(1, dead=True)
             
             # 记录开始时间
             start_time = time.time()
@@ -712,8 +907,8 @@ class AutoMangaWorkflow(BrowserController):
             while True:
                 elapsed = time.time() - start_time
                 if elapsed > timeout_seconds:
-                    self.logger.warning("等待新图片生成超时")
-                    return (False, [])
+                    self.logger.warning(f"等待新图片生成超时（最新回复: {response.summary}）")
+                    return (False, [], response)
                 
                 try:
                     # 获取所有图片容器
@@ -772,16 +967,23 @@ class AutoMangaWorkflow(BrowserController):
                                         self.logger.debug(f"✓ 最新容器中有 {len(latest_urls)} 张新图片")
                                         break
                     
+                    # 还没有新图片时识别最新回复：拒绝、出错、额度用尽时立即返回，由调用方决定如何重试
+                    if not new_urls:
+                        response = await classifier.classify_latest()
+                        if response.outcome.is_failure:
+                            self.logger.warning(f"模型回复未生成图片（{response.summary}）")
+                            return (False, [], response)
+                    
                     # 短暂等待后继续检查
-                    await asyncio.sleep(0.5)
+                    await fixed_sleep(0.5)
                     
                 except Exception as e:
                     self.logger.debug(f"检查图片状态时出错: {e}，继续等待...")
-                    await asyncio.sleep(0.5)
+                    await fixed_sleep(0.5)
             
             if not new_images_detected or len(new_image_urls) == 0:
                 self.logger.warning("未检测到新图片")
-                return (False, [])
+                return (False, [], response)
             
             # 等待新图片加载完成
             self.logger.debug("等待新图片加载完成...")
@@ -805,109 +1007,63 @@ class AutoMangaWorkflow(BrowserController):
                 max_timeout=RESPONSE_TIMEOUT
             ):
                 self.logger.debug(f"✓ 新图片加载完成，共 {len(new_image_urls)} 张新图片")
-                return (True, new_image_urls)
+                return (True, new_image_urls, ResponseClassification(ResponseOutcome.IMAGES, image_count=len(new_image_urls)))
             else:
                 self.logger.warning("新图片加载超时")
-                return (False, [])
+                return (False, [], ResponseClassification(ResponseOutcome.PENDING))
                 
         except Exception as e:
+            # 本地异常不是页面报告的失败，不能触发重新发送（否则会重复生成同一批次）
             self.logger.error(f"等待图片生成失败: {e}")
-            return (False, [])
+            return (False, [], ResponseClassification(ResponseOutcome.LOCAL_ERROR, str(e)))
     
+    @tracked_wait("等待所有批次完成")
     async def wait_for_all_batches_completed(self, total_batches: int, saved_image_urls: set, max_wait_time: int = 300):
-        """等待所有批次生成完成
+        """等待所有批次生成完成，并依次滚动每个图片容器让懒加载的图片全部渲染
+        
+        不刷新页面：等待容器数量达到批次数后，用 ImageHarvester 在页面内逐个滚动容器并确认图片加载完成。
         
         Args:
             total_batches: 总批次数
-            saved_image_urls: 已保存的图片URL集合（用于排除已存在的图片）
+            saved_image_urls: 已保存的图片URL集合（用于统计未在生成阶段检测到的图片）
             max_wait_time: 最大等待时间（秒）
+            
+        Returns:
+            List[HarvestedContainer]: 按页面顺序的各容器收集结果
         """
         self.logger.debug(f"等待所有 {total_batches} 个批次生成完成...")
         
-        container_selector = '.attachment-container.generated-images'
-        start_time = time.time()
-        wait_count = 0  # 等待次数计数器
-        base_wait_interval = 3  # 基础等待间隔（秒）
-        refresh_interval = 5  # 每5次等待后刷新一次
+        harvester = ImageHarvester(self.page, self.session_id)
+        if await harvester.wait_for_containers(total_batches, timeout=max_wait_time):
+            self.logger.debug(f"✓ 检测到 {total_batches} 个图片容器")
+        else:
+            self.logger.warning(f"等待所有批次完成超时（{max_wait_time}秒），当前容器数量: {await harvester.count_containers()}")
         
-        while True:
-            elapsed = time.time() - start_time
-            if elapsed > max_wait_time:
-                self.logger.warning(f"等待所有批次完成超时（{max_wait_time}秒）")
-                break
-            
-            try:
-                # 每隔一定次数后刷新页面
-                if wait_count > 0 and wait_count % refresh_interval == 0:
-                    self.logger.debug(f"已等待 {wait_count} 次，执行页面刷新...")
-                    try:
-                        await self.page.reload(wait_until='domcontentloaded')
-                        self.logger.debug("页面刷新完成，等待页面稳定...")
-                        await asyncio.sleep(2)  # 等待页面稳定
-                    except Exception as refresh_error:
-                        self.logger.warning(f"页面刷新失败: {refresh_error}，继续检查...")
-                
-                # 获取所有图片容器
-                containers = await self.page.query_selector_all(container_selector)
-                current_container_count = len(containers)
-                
-                # 获取所有图片的URL
-                from src.core.image_saver import ImageSaver
-                saver = ImageSaver(self.page, self.session_id)
-                all_images = await self.page.query_selector_all(f'{container_selector} img[src]')
-                
-                # 收集所有图片URL（排除已存在的）
-                current_image_urls = set()
-                for img in all_images:
-                    try:
-                        img_src = await img.get_attribute('src')
-                        if img_src:
-                            processed_url = saver._process_image_url(img_src)
-                            if processed_url not in saved_image_urls:
-                                current_image_urls.add(processed_url)
-                    except:
-                        continue
-                
-                # 检查是否所有批次都已完成（容器数量应该等于批次数）
-                if current_container_count >= total_batches:
-                    self.logger.debug(f"✓ 检测到 {current_container_count} 个图片容器（期望 {total_batches} 个）")
-                    
-                    # 等待所有图片加载完成
-                    from src.utils.browser_utils import wait_for_images_loading
-                    if await wait_for_images_loading(
-                        self.page,
-                        container_selector,
-                        max_timeout=RESPONSE_TIMEOUT
-                    ):
-                        self.logger.debug(f"✓ 所有批次图片已生成并加载完成")
-                        return
-                
-                # 计算动态等待间隔（随着等待次数增加而增加，但不超过10秒）
-                wait_interval = min(base_wait_interval + (wait_count // refresh_interval), 10)
-                self.logger.debug(f"当前容器数量: {current_container_count}/{total_batches}，继续等待... (等待间隔: {wait_interval}秒)")
-                await asyncio.sleep(wait_interval)
-                wait_count += 1
-                
-            except Exception as e:
-                # 计算动态等待间隔
-                wait_interval = min(base_wait_interval + (wait_count // refresh_interval), 10)
-                self.logger.debug(f"检查批次状态时出错: {e}，继续等待... (等待间隔: {wait_interval}秒)")
-                await asyncio.sleep(wait_interval)
-                wait_count += 1
+        results = await harvester.harvest()
+        harvested_urls = {url for item in results for url in item.urls}
+        late_urls = harvested_urls - saved_image_urls
+        if late_urls:
+            self.logger.debug(f"收集阶段新发现 {len(late_urls)} 张图片（生成阶段未检测到）")
+        if results and all(item.ready for item in results):
+            self.logger.debug("✓ 所有批次图片已生成并加载完成")
+        return results
     
-    async def save_all_images_sequentially(self, save_dir: str, total_batches: int) -> List[str]:
+    async def save_all_images_sequentially(self, save_dir: str, total_batches: int, names: List[str] = None) -> List[str]:
         """按顺序保存所有生成的图片容器
         
         Args:
             save_dir: 保存目录
             total_batches: 总批次数（用于验证容器数量）
+            names: 每个容器的文件名（按批次编号，见 BatchReconciler），为 None 时按容器顺序编号
             
         Returns:
             List[str]: 保存的文件路径列表（按顺序）
         """
         from src.core.image_saver import ImageSaver
-        saver = ImageSaver(self.page, self.session_id)
-        return await saver.save_all_images_sequentially(save_dir, total_batches)
+        saver = ImageSaver(
+            self.page, self.session_id, download_dir=self.download_dir, direct_downloads=self.direct_downloads
+        )
+        return await saver.save_all_images_sequentially(save_dir, total_batches, names)
     
     async def save_generated_images(self, save_dir: str = DEFAULT_IMAGES_DIR, target_image_urls: List[str] = None) -> List[str]:
         """保存生成的图片到本地文件夹
@@ -920,7 +1076,9 @@ class AutoMangaWorkflow(BrowserController):
             List[str]: 保存的文件路径列表
         """
         from src.core.image_saver import ImageSaver
-        saver = ImageSaver(self.page, self.session_id)
+        saver = ImageSaver(
+            self.page, self.session_id, download_dir=self.download_dir, direct_downloads=self.direct_downloads
+        )
         if target_image_urls:
             # 只保存指定URL的图片
             return await saver.save_images_by_urls(save_dir, target_image_urls)
@@ -976,12 +1134,12 @@ class AutoMangaWorkflow(BrowserController):
             print("步骤3: 上传封面模板图片")
             print("-"*80)
             await self.upload_image(cover_image_path)
-            await asyncio.sleep(1)  # 等待图片上传完成
+            await fixed_sleep(1)  # 等待图片上传完成
             
             # 发送多模态消息（包含图片和文本）
             self.logger.debug("发送封面生成请求...")
             await self.send_multimodal_message(cover_query)
-            await asyncio.sleep(2)  # 发送消息后滚动
+            await fixed_sleep(2)  # 发送消息后滚动
             self.logger.debug("发送消息后滚动到底部，确保新生成的响应被渲染")
             # ==================== 新增修复代码 ====================
             # 发送消息后，强制页面滚动到底部，确保新生成的响应被渲染
@@ -1004,7 +1162,9 @@ class AutoMangaWorkflow(BrowserController):
                 
                 # 记录发送前的所有图片URL
                 from src.core.image_saver import ImageSaver
-                saver = ImageSaver(self.page, self.session_id)
+                saver = ImageSaver(
+                    self.page, self.session_id, download_dir=self.download_dir, direct_downloads=self.direct_downloads
+                )
                 for img in existing_images:
                     try:
                         img_src = await img.get_attribute('src')
@@ -1018,7 +1178,7 @@ class AutoMangaWorkflow(BrowserController):
             
             # 等待新图片生成（使用更长的超时时间）
             self.logger.debug("等待封面图片生成（最多等待 180 秒）...")
-            success, new_image_urls = await self.wait_for_images_generated(
+            success, new_image_urls, _ = await self.wait_for_images_generated(
                 initial_image_count=initial_image_count,
                 saved_image_urls=initial_image_urls  # 排除发送前已存在的图片
             )
@@ -1027,14 +1187,8 @@ class AutoMangaWorkflow(BrowserController):
             if len(new_image_urls) > 0:
                 self.logger.debug(f"✓ 检测到 {len(new_image_urls)} 张新图片URL，尝试保存...")
                 
-                # 发送"下一步"消息，让页面自动滚动，渲染出最后一张图片
-                try:
-                    self.logger.debug("发送'下一步'消息，触发页面滚动...")
-                    await self.send_message("下一步")
-                    await asyncio.sleep(3)  # 等待3秒，让页面自动滚动并渲染图片
-                    self.logger.debug("✓ 页面滚动完成")
-                except Exception as e:
-                    self.logger.warning(f"发送'下一步'消息失败: {e}，继续执行...")
+                # 滚动各图片容器，确认封面图片已渲染（不发送额外消息）
+                await ImageHarvester(self.page, self.session_id).harvest()
                 
                 # 保存封面图片（即使加载超时也尝试保存）
                 self.logger.debug("保存封面图片...")
@@ -1044,17 +1198,8 @@ class AutoMangaWorkflow(BrowserController):
                     # 封面图片应该只有一张，取第一张
                     cover_file = saved_files[0]
                     
-                    # 重命名为 "封面.png"
-                    cover_path = Path(cover_file)
-                    cover_dir = cover_path.parent
-                    new_cover_path = cover_dir / "封面.png"
-                    
-                    # 如果目标文件已存在，先删除
-                    if new_cover_path.exists():
-                        new_cover_path.unlink()
-                    
-                    # 重命名文件
-                    cover_path.rename(new_cover_path)
+                    # 重命名为 "封面"，扩展名保持按文件内容识别出的格式（同时更新图片清单）
+                    new_cover_path = await asyncio.to_thread(rename_image_file, cover_file, "封面", IMAGE_CATALOG_PATH)
                     self.logger.debug(f"✓ 封面图片已保存并重命名: {new_cover_path}")
                     return str(new_cover_path)
                 else:
@@ -1066,24 +1211,17 @@ class AutoMangaWorkflow(BrowserController):
                             latest_container = containers[-1]
                             # 使用 save_all_images_sequentially 的备用逻辑
                             from src.core.image_saver import ImageSaver
-                            saver = ImageSaver(self.page, self.session_id)
+                            saver = ImageSaver(
+                                self.page, self.session_id, download_dir=self.download_dir, direct_downloads=self.direct_downloads
+                            )
                             # 尝试直接保存最新容器中的图片
                             saved_files = await saver.save_all_images(save_dir)
                             if saved_files:
                                 # 取最后一张（应该是封面图片）
                                 cover_file = saved_files[-1]
                                 
-                                # 重命名为 "封面.png"
-                                cover_path = Path(cover_file)
-                                cover_dir = cover_path.parent
-                                new_cover_path = cover_dir / "封面.png"
-                                
-                                # 如果目标文件已存在，先删除
-                                if new_cover_path.exists():
-                                    new_cover_path.unlink()
-                                
-                                # 重命名文件
-                                cover_path.rename(new_cover_path)
+                                # 重命名为 "封面"，扩展名保持按文件内容识别出的格式（同时更新图片清单）
+                                new_cover_path = await asyncio.to_thread(rename_image_file, cover_file, "封面", IMAGE_CATALOG_PATH)
                                 self.logger.debug(f"✓ 封面图片已保存并重命名（备用方法）: {new_cover_path}")
                                 return str(new_cover_path)
                     except Exception as backup_error:
@@ -1121,12 +1259,23 @@ class AutoMangaWorkflow(BrowserController):
             session_file: 当 skip_script_generation=True 时，指定要读取的 session 文件路径
             skip_to_cover: 是否跳过脚本和漫画生成，直接测试封面生成
             theme_name: 当 skip_to_cover=True 时，指定主题名称（用于封面生成）
+        
+        Returns:
+            bool: 工作流是否执行完成（出错时已记录错误日志并返回 False）
         """
         if concept:
             self.concept = concept
         
+        # 统计本次运行的固定休眠与条件等待耗时
+        self.wait_accounting.reset()
+        self.phase_timer.reset()
+        if self.cdp_stats is not None:
+            self.cdp_stats.reset()
+        accounting_token = use_wait_accounting(self.wait_accounting)
+        
         try:
             # 步骤1: 连接浏览器并打开 Gemini
+            self.phase_timer.begin("connect")
             await self.connect_to_browser()
             await self.open_gemini()
             
@@ -1151,6 +1300,7 @@ class AutoMangaWorkflow(BrowserController):
                 self.logger.info(f"✓ 主题文件夹: {self.theme_dir}")
                 
                 # 直接生成封面图片（generate_cover_image 内部会处理 New Chat 和 Create Images 工具选择）
+                self.phase_timer.begin("cover")
                 save_dir = self.theme_dir if self.theme_dir else images_dir
                 cover_file = await self.generate_cover_image(
                     cover_image_path=DEFAULT_COVER_IMAGE_PATH,
@@ -1165,9 +1315,10 @@ class AutoMangaWorkflow(BrowserController):
                 print("\n" + "="*80)
                 print("✓ 封面生成测试完成！")
                 print("="*80)
-                return
+                return True
             
             # 步骤2: 生成脚本或从文件读取
+            self.phase_timer.begin("script")
             panel_count = 0  # 宫格总数
             if skip_script_generation:
                 # 跳过脚本生成，直接从 session 文件读取
@@ -1204,7 +1355,7 @@ class AutoMangaWorkflow(BrowserController):
                     self.logger.debug("✓ 脚本生成完成")
                 else:
                     self.logger.warning("脚本生成可能未完成，继续尝试复制")
-                await asyncio.sleep(10)  # 避免错误检查按钮
+                await self.wait_for_copy_button()  # 避免错误检查按钮
                 
                 # 步骤4: 复制表格内容
                 print("\n" + "="*80)
@@ -1221,7 +1372,7 @@ class AutoMangaWorkflow(BrowserController):
                 print("\n" + "="*80)
                 print("步骤4: 保存结果到文件")
                 print("="*80)
-                session_file = self.save_to_file(script_prompt, copied_content)
+                session_file = await asyncio.to_thread(self.save_to_file, script_prompt, copied_content)
                 
                 # 步骤5.5: 生成主题名称并创建主题文件夹
                 print("\n" + "="*80)
@@ -1234,6 +1385,7 @@ class AutoMangaWorkflow(BrowserController):
                 self.logger.info(f"✓ 主题文件夹: {self.theme_dir}")
             
             # 步骤6: 打开新聊天窗口
+            self.phase_timer.begin("setup")
             print("\n" + "="*80)
             print("步骤5: 打开新聊天窗口")
             print("="*80)
@@ -1252,7 +1404,7 @@ class AutoMangaWorkflow(BrowserController):
             print(f"步骤{step_num}: 上传 demo.png 图片")
             print("="*80)
             await self.upload_image(demo_image_path)
-            await asyncio.sleep(1)  # 等待图片上传完成
+            await fixed_sleep(1)  # 等待图片上传完成
             
             # 步骤9-10: 循环生成宫格图片（每4个一组）
             print("\n" + "="*80)
@@ -1268,7 +1420,9 @@ class AutoMangaWorkflow(BrowserController):
             container_selector = '.attachment-container.generated-images'
             try:
                 from src.core.image_saver import ImageSaver
-                saver = ImageSaver(self.page, self.session_id)
+                saver = ImageSaver(
+                    self.page, self.session_id, download_dir=self.download_dir, direct_downloads=self.direct_downloads
+                )
                 existing_images = await self.page.query_selector_all(f'{container_selector} img[src]')
                 for img in existing_images:
                     try:
@@ -1283,14 +1437,16 @@ class AutoMangaWorkflow(BrowserController):
                 self.logger.debug("无法收集现有图片URL，使用空集合")
             
             # 第一阶段：发送所有批次的生成请求，只等待生成完成，不立即保存
+            self.phase_timer.begin("batches")
             print("\n" + "-"*80)
             print("第一阶段：发送所有批次的生成请求")
             print("-"*80)
             
+            batches = plan_batches(panel_count)
             for batch_index in range(total_batches):
                 # 计算当前批次的宫格范围
-                start_panel = batch_index * 4 + 1
-                end_panel = min((batch_index + 1) * 4, panel_count)
+                start_panel = batches[batch_index].start_panel
+                end_panel = batches[batch_index].end_panel
                 
                 print("\n" + "-"*80)
                 print(f"批次 {batch_index + 1}/{total_batches}: 生成 P{start_panel}-P{end_panel} 宫格")
@@ -1306,40 +1462,11 @@ class AutoMangaWorkflow(BrowserController):
                     panel_prompt = self.build_panel_generation_prompt(start_panel, end_panel, is_first_batch=False)
                     full_message = panel_prompt
                 
-                # 发送消息前，记录当前图片数量（用于检测新生成的图片）
-                try:
-                    existing_images = await self.page.query_selector_all(f'{container_selector} img[src]')
-                    initial_image_count = len(existing_images)
-                    self.logger.debug(f"发送消息前，当前图片数量: {initial_image_count}")
-                except:
-                    initial_image_count = 0
-                    self.logger.debug("无法获取当前图片数量，使用默认值 0")
-                
-                # 发送消息（第一次使用多模态，后续批次只发送文本）
-                self.logger.debug(f"发送生成请求: P{start_panel}-P{end_panel}")
-                if batch_index == 0:
-                    # 第一次：需要包含图片和表格，使用多模态消息
-                    await self.send_multimodal_message(full_message)
-                else:
-                    # 后续批次：只发送文本提示词（图片和表格已在对话历史中）
-                    await self.send_message(full_message)
-                
-                # 等待当前批次的图片生成完成（不保存）
+                # 等待当前批次的图片生成完成（不保存）；被拒绝、出错或额度用尽时立即按类型重试
                 t1 = time.time()
-                self.logger.debug(f"等待批次 {batch_index + 1} 图片生成...")
-                success, new_image_urls = await self.wait_for_images_generated(
-                    initial_image_count=initial_image_count,
-                    saved_image_urls=saved_image_urls
+                await self.generate_batch(
+                    batches[batch_index], full_message, panel_prompt, saved_image_urls, multimodal=(batch_index == 0)
                 )
-                
-                if success and len(new_image_urls) > 0:
-                    # 将新生成的图片URL加入已保存列表（用于后续批次检测）
-                    saved_image_urls.update(new_image_urls)
-                    self.logger.debug(f"✓ 批次 {batch_index + 1} 图片生成完成，检测到 {len(new_image_urls)} 张新图片")
-                elif success:
-                    self.logger.warning(f"批次 {batch_index + 1} 图片生成成功，但未检测到新图片URL")
-                else:
-                    self.logger.warning(f"批次 {batch_index + 1} (P{start_panel}-P{end_panel}) 图片生成超时或失败")
                 t2 = time.time()
                 print(f"批次 {batch_index + 1} 图片生成完成，耗时: {t2 - t1} 秒")
                 if t2 - t1 > 20:
@@ -1349,29 +1476,20 @@ class AutoMangaWorkflow(BrowserController):
                 # 如果不是最后一批，等待一下再继续
                 if batch_index < total_batches - 1:
                     self.logger.debug(f"等待 {sleep_time} 秒后继续下一批次...")
-                    await asyncio.sleep(sleep_time)
+                    await fixed_sleep(sleep_time)
             
-            # 发送"下一步"消息，让页面自动滚动，渲染出最后一张图片
-            try:
-                self.logger.debug("发送'下一步'消息，触发页面滚动...")
-                await self.send_message("下一步")
-                await asyncio.sleep(3)  # 等待3秒，让页面自动滚动并渲染图片
-                self.logger.debug("✓ 页面滚动完成")
-                
-                # 刷新页面
-                self.logger.debug("刷新页面...")
-                await self.page.reload()
-                await self.page.wait_for_load_state('domcontentloaded')
-                self.logger.debug("✓ 页面刷新完成")
-            except Exception as e:
-                self.logger.warning(f"发送'下一步'消息或刷新页面失败: {e}，继续执行...")
-
+            # 收集阶段：逐个滚动图片容器让懒加载的图片渲染（不发送额外消息，也不刷新页面）
+            self.phase_timer.begin("harvest")
             # 第二阶段：等待所有批次生成完成
             print("\n" + "="*80)
             print("第二阶段：等待所有批次生成完成")
             print("="*80)
             await self.wait_for_all_batches_completed(total_batches, saved_image_urls)
             
+            # 对账：把图片容器对应回宫格范围，只重新请求没有图片的批次
+            self.phase_timer.begin("reconcile")
+            container_names = await self.reconcile_batches(batches, saved_image_urls)
+            
             # 第三阶段：统一检测所有图片容器，按顺序下载保存
             print("\n" + "="*80)
             print("第三阶段：统一检测并顺序保存所有图片")
@@ -1384,7 +1502,7 @@ class AutoMangaWorkflow(BrowserController):
             else:
                 self.logger.info(f"图片将保存到默认文件夹: {save_dir}")
             
-            saved_files = await self.save_all_images_sequentially(save_dir, total_batches)
+            saved_files = await self.save_all_images_sequentially(save_dir, total_batches, container_names)
             
             if saved_files:
                 self.logger.debug(f"✓ 成功保存 {len(saved_files)} 张图片到 {save_dir}")
@@ -1393,7 +1511,17 @@ class AutoMangaWorkflow(BrowserController):
             else:
                 self.logger.warning("未保存任何图片")
             
+            # 后期处理：把每张 4 宫格拼图切成单独的宫格，按全局编号保存到 panels/（P1…Pn）
+            if saved_files and PANEL_SLICING:
+                self.phase_timer.begin("slice")
+                from src.postprocess.panel_slicer import slice_theme_images
+                await asyncio.to_thread(
+                    slice_theme_images, save_dir, panel_count,
+                    workers=PANEL_SLICE_WORKERS, session_id=self.session_id,
+                )
+            
             # 第四阶段：生成封面图片
+            self.phase_timer.begin("cover")
             if self.theme_name and self.theme_dir:
                 cover_file = await self.generate_cover_image(
                     cover_image_path=DEFAULT_COVER_IMAGE_PATH,
@@ -1409,13 +1537,22 @@ class AutoMangaWorkflow(BrowserController):
             print("\n" + "="*80)
             print(f"✓ 工作流完成！共生成 {total_batches} 批次，{panel_count} 个宫格")
             print("="*80)
+            return True
             
         except Exception as e:
             self.logger.error(f"工作流执行失败: {e}")
             import traceback
             traceback.print_exc()
+            return False
         finally:
+            self.phase_timer.begin("close")
             await self.close()
+            self.phase_timer.finish()
+            self.logger.info(self.phase_timer.format_summary())
+            self.logger.info(self.wait_accounting.format_report())
+            if self.cdp_stats is not None:
+                self.logger.info(self.cdp_stats.format_report())
+            reset_wait_accounting(accounting_token)
 
 
 async def main():
@@ -0,0 +1,133 @@
+"""
+批次对账模块
+
+每个批次请求生成 4 个宫格（P1-P4、P5-P8……）。此前第二阶段只在图片容器数量与批次数不一致时给出警告，
+缺失的批次在结果中变成无声的空缺，而且后面的图片按容器顺序编号会整体错位。
+
+这里把页面上的每个图片容器映射回它所属的宫格范围（取容器前最后一条用户消息中的 "P起-P止"），
+找出没有图片的批次，只重新发送这些批次的提示词；保存时按批次编号命名文件，重试产生的容器不会打乱顺序。
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src.config.settings import SELECTORS
+from src.core.image_harvester import GENERATED_CONTAINER_SELECTOR
+from src.utils.logger import get_logger
+
+
+PANEL_RANGE_PATTERN = re.compile(r'P(\d+)\s*[-–~]\s*P(\d+)')
+
+
+@dataclass(frozen=True)
+class BatchRange:
+    """一个批次负责的宫格范围"""
+    index: int  # 批次序号（从 0 开始）
+    start_panel: int
+    end_panel: int
+
+    @property
+    def label(self) -> str:
+        return f"P{self.start_panel}-P{self.end_panel}"
+
+
+def plan_batches(panel_count: int, panels_per_batch: int = 4) -> List[BatchRange]:
+    """按宫格数量划分批次"""
+    return [
+        BatchRange(index, start, min(start + panels_per_batch - 1, panel_count))
+        for index, start in enumerate(range(1, panel_count + 1, panels_per_batch))
+    ]
+
+
+def parse_panel_range(text: str) -> Optional[tuple]:
+    """取文本中最后一个 "P起-P止"（首批消息前面带有整张脚本表格）"""
+    matches = PANEL_RANGE_PATTERN.findall(text or '')
+    if not matches:
+        return None
+    start, end = matches[-1]
+    return int(start), int(end)
+
+
+# 按文档顺序遍历用户消息和图片容器，记录每个容器之前最后一条用户消息的文本
+_CONTAINER_QUERIES_SCRIPT = """
+({querySelector, containerSelector}) => {
+  const results = [];
+  let lastQuery = '';
+  for (const element of document.querySelectorAll(`${querySelector}, ${containerSelector}`)) {
+    if (element.matches(containerSelector)) {
+      results.push({query: lastQuery, images: element.querySelectorAll('img[src]').length});
+    } else {
+      lastQuery = element.innerText || '';
+    }
+  }
+  return results;
+}
+"""
+
+
+class BatchReconciler:
+    """把图片容器对应到批次，找出缺失的批次"""
+
+    def __init__(self, page, batches: List[BatchRange], session_id: Optional[str] = None,
+                 container_selector: str = GENERATED_CONTAINER_SELECTOR):
+        self.page = page
+        self.batches = batches
+        self.logger = get_logger(session_id)
+        self.container_selector = container_selector
+
+    def assign(self, container_queries: List[dict]) -> Dict[int, int]:
+        """根据每个容器前的用户消息，返回 {批次序号: 容器序号}
+
+        同一批次有多个容器（重试后原请求也生成了图片）时取最后一个；
+        没有图片或无法识别范围的容器不参与对应。
+        """
+        by_range = {(batch.start_panel, batch.end_panel): batch.index for batch in self.batches}
+        assignments = {}
+        for container_index, item in enumerate(container_queries):
+            if not item.get('images'):
+                continue
+            batch_index = by_range.get(parse_panel_range(item.get('query', '')))
+            if batch_index is not None:
+                assignments[batch_index] = container_index
+        return assignments
+
+    async def read_containers(self) -> List[dict]:
+        """读取页面：按顺序返回每个容器之前最后一条用户消息的文本和容器中的图片数"""
+        return await self.page.evaluate(_CONTAINER_QUERIES_SCRIPT, {
+            'querySelector': ', '.join(SELECTORS["user_query"]),
+            'containerSelector': self.container_selector,
+        })
+
+    async def map_containers(self) -> Dict[int, int]:
+        """读取页面，返回 {批次序号: 容器序号}"""
+        return self.assign(await self.read_containers())
+
+    async def harvest_names(self) -> Optional[List[Optional[str]]]:
+        """只收集模式：按页面上出现的最大宫格编号划分批次，返回每个容器的文件名（见 container_names）
+
+        页面上没有任何 "P起-P止" 时返回 None（由调用方按容器顺序编号）。
+        """
+        container_queries = await self.read_containers()
+        ranges = [parse_panel_range(item.get('query', '')) for item in container_queries]
+        panel_count = max((end for _, end in filter(None, ranges)), default=0)
+        if not panel_count:
+            return None
+        self.batches = plan_batches(panel_count)
+        assignments = self.assign(container_queries)
+        missing = self.missing(assignments)
+        if missing:
+            self.logger.warning(f"对话中以下批次没有图片: {', '.join(batch.label for batch in missing)}")
+        return self.container_names(assignments, len(container_queries))
+
+    def missing(self, assignments: Dict[int, int]) -> List[BatchRange]:
+        """没有对应图片容器的批次"""
+        return [batch for batch in self.batches if batch.index not in assignments]
+
+    def container_names(self, assignments: Dict[int, int], container_count: int) -> List[Optional[str]]:
+        """每个容器保存时使用的文件名（不含扩展名）：按批次编号；不属于任何批次的容器为 None（不保存）"""
+        names: List[Optional[str]] = [None] * container_count
+        for batch_index, container_index in assignments.items():
+            if container_index < container_count:
+                names[container_index] = str(batch_index + 1)
+        return names
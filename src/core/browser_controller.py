@@ -5,8 +5,23 @@
 import asyncio
 import aiohttp
 import json
+import os
+import shutil
+import uuid
 from playwright.async_api import async_playwright
-from src.config.settings import CHROME_CDP_URL, GEMINI_URL
+from src.config.settings import (
+    CHROME_CDP_URL,
+    GEMINI_URL,
+    CDP_INSTRUMENTATION,
+    BROWSER_LAUNCH_MODE,
+    BROWSER_CONTEXT_MODE,
+    STORAGE_STATE_PATH,
+    DEFAULT_DOWNLOADS_DIR,
+    DIRECT_DOWNLOADS,
+)
+from src.core.browser_launcher import ChromiumLauncher
+from src.core.direct_downloads import DirectDownloads
+from src.utils.cdp_stats import CDPStats, instrument
 from src.utils.logger import get_logger
 
 
@@ -15,12 +30,26 @@ class BrowserController:
     
     def __init__(self, cdp_url: str = CHROME_CDP_URL, session_id: str = None):
         self.cdp_url = cdp_url
+        self.gemini_url = GEMINI_URL
         self.session_id = session_id
         self.playwright = None
         self.browser = None
         self.context = None
         self.page = None
         self.logger = get_logger(session_id) if session_id else None
+        # CDP 调用统计（可选），开启后 self.page 会被包装
+        self.cdp_stats = CDPStats() if CDP_INSTRUMENTATION else None
+        # 浏览器启动方式：cdp 连接已启动的 Chrome，launch 自行启动无头 Chromium
+        self.launch_mode = BROWSER_LAUNCH_MODE
+        self.storage_state_path = STORAGE_STATE_PATH
+        self.launcher = None
+        # 上下文方式：isolated 为每个任务创建独立上下文，shared 复用第一个上下文与页面
+        self.context_mode = BROWSER_CONTEXT_MODE
+        self.owns_context = False
+        # 本任务的下载暂存目录（连接浏览器时创建，断开时清理）
+        self.download_dir = None
+        # 直接落盘下载器（仅在本任务独占的上下文中启用）
+        self.direct_downloads = None
     
     async def _get_websocket_url(self, http_url: str) -> str:
         """从 HTTP CDP 端点获取 WebSocket URL"""
@@ -67,9 +96,19 @@ class BrowserController:
         return ws_url
     
     async def connect_to_browser(self):
-        """连接到已启动的 Chrome 浏览器"""
+        """连接到浏览器
+
+        cdp 模式连接已启动的 Chrome，isolated 时克隆其第一个上下文的登录状态创建本任务的上下文，
+        shared 时直接复用第一个上下文和页面；launch 模式先启动（或重启）本地 Chromium，
+        再用导出的登录状态创建独立上下文。
+        """
         self.logger.debug("连接到 Chrome 浏览器...")
         
+        if self.launch_mode == 'launch':
+            if self.launcher is None:
+                self.launcher = ChromiumLauncher(session_id=self.session_id)
+            self.cdp_url = await self.launcher.ensure_running()
+        
         self.playwright = await async_playwright().start()
         
         try:
@@ -84,13 +123,20 @@ class BrowserController:
             self.logger.debug("CDP 连接成功")
             
             contexts = self.browser.contexts
-            if contexts:
+            if self.launch_mode == 'launch' or self.context_mode == 'isolated':
+                self.context = await self._new_job_context()
+                self.owns_context = True
+                self.logger.debug("创建本任务的独立上下文")
+            elif contexts:
                 self.context = contexts[0]
                 self.logger.debug("使用现有浏览器上下文")
             else:
                 self.context = await self.browser.new_context()
                 self.logger.debug("创建新上下文")
             
+            self.download_dir = os.path.join(DEFAULT_DOWNLOADS_DIR, self.session_id or uuid.uuid4().hex[:12])
+            os.makedirs(self.download_dir, exist_ok=True)
+            
             pages = self.context.pages
             if pages:
                 self.page = pages[0]
@@ -99,15 +145,76 @@ class BrowserController:
                 self.page = await self.context.new_page()
                 self.logger.debug("创建新页面")
             
+            if self.cdp_stats is not None:
+                self.page = instrument(self.page, self.cdp_stats)
+                self.logger.debug("已开启 CDP 调用统计")
+            
+            if DIRECT_DOWNLOADS and self.owns_context:
+                await self._enable_direct_downloads()
+            
         except Exception as e:
             self.logger.error(f"连接浏览器失败: {e}")
             raise
     
+    async def _clone_storage_state(self):
+        """获取新上下文使用的登录状态
+
+        cdp 模式优先克隆浏览器第一个上下文（用户已登录的上下文）的当前状态，
+        否则使用导出的登录状态文件。
+
+        Returns:
+            登录状态（dict 或文件路径），没有可用状态时返回 None
+        """
+        if self.launch_mode != 'launch' and self.browser.contexts:
+            self.logger.debug("克隆现有浏览器上下文的登录状态")
+            return await self.browser.contexts[0].storage_state()
+        if self.storage_state_path and os.path.exists(self.storage_state_path):
+            self.logger.debug(f"加载登录状态: {self.storage_state_path}")
+            return self.storage_state_path
+        return None
+    
+    async def _new_job_context(self):
+        """创建本任务独立的上下文（独立的 cookies、页面与下载）"""
+        storage_state = await self._clone_storage_state()
+        if storage_state is None and self.storage_state_path:
+            self.logger.warning(
+                f"未找到登录状态文件 {self.storage_state_path}，使用未登录的浏览器"
+                "（可先运行 python main.py --export-storage-state 导出）"
+            )
+        return await self.browser.new_context(storage_state=storage_state, accept_downloads=True)
+    
+    async def _enable_direct_downloads(self):
+        """启用直接落盘下载，失败时回退到 Playwright 的下载处理"""
+        downloads = DirectDownloads(self.browser, self.page, self.session_id)
+        try:
+            await downloads.start()
+            self.direct_downloads = downloads
+        except Exception as e:
+            self.logger.warning(f"启用直接落盘下载失败，使用 Playwright 下载: {e}")
+            await downloads.close()
+    
+    async def export_storage_state(self, path: str = None) -> str:
+        """导出当前浏览器上下文的登录状态（cookies + localStorage）
+
+        通常在 cdp 模式下连接已登录的 Chrome 后调用，导出的文件供 launch 模式复用。
+
+        Args:
+            path: 输出路径，默认 settings.STORAGE_STATE_PATH
+
+        Returns:
+            str: 输出文件路径
+        """
+        path = path or self.storage_state_path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        await self.context.storage_state(path=path)
+        self.logger.info(f"✓ 登录状态已导出: {path}")
+        return path
+    
     async def open_gemini(self):
         """打开 Gemini 官网"""
         self.logger.debug("导航到 Gemini...")
         try:
-            await self.page.goto(GEMINI_URL, timeout=30000)
+            await self.page.goto(self.gemini_url, timeout=30000)
             await self.page.wait_for_load_state('domcontentloaded')
             self.logger.debug("页面加载完成")
         except Exception as e:
@@ -115,9 +222,23 @@ class BrowserController:
             raise
     
     async def close(self):
-        """断开连接"""
-        if self.browser:
-            await self.browser.close()
-            self.logger.debug("已断开连接")
-        if self.playwright:
-            await self.playwright.stop()
\ No newline at end of file
+        """断开连接（launch 模式下同时关闭自行启动的浏览器）"""
+        try:
+            if self.direct_downloads:
+                await self.direct_downloads.close()
+                self.direct_downloads = None
+            if self.context and self.owns_context:
+                try:
+                    await self.context.close()
+                except Exception as e:
+                    self.logger.debug(f"关闭上下文失败: {e}")
+            if self.browser:
+                await self.browser.close()
+                self.logger.debug("已断开连接")
+            if self.playwright:
+                await self.playwright.stop()
+        finally:
+            if self.download_dir:
+                shutil.rmtree(self.download_dir, ignore_errors=True)
+            if self.launcher:
+                await self.launcher.stop()
\ No newline at end of file
@@ -0,0 +1,214 @@
+"""
+Chromium 启动器
+
+自行启动并看管本地 Chromium 进程（默认无头），通过远程调试端口供 BrowserController 连接，
+不再需要手动启动带 --remote-debugging-port 的 Chrome。每个启动器使用独立的临时用户数据目录，
+一台机器上可以同时运行多个互相隔离的浏览器；登录状态通过导出的 storage state 文件复用
+（见 BrowserController.export_storage_state）。
+"""
+
+import asyncio
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import aiohttp
+
+from src.config.settings import BROWSER_HEADLESS, BROWSER_LAUNCH_TIMEOUT, CHROMIUM_EXECUTABLE
+from src.utils.logger import get_logger
+
+
+# 当前仍在运行的启动器，解释器退出时兜底关闭，避免遗留浏览器进程
+_running_launchers = set()
+
+
+@atexit.register
+def _kill_running_browsers():
+    for launcher in list(_running_launchers):
+        launcher.kill()
+
+
+async def resolve_chromium_executable(executable: Optional[str] = None) -> str:
+    """确定 Chromium 可执行文件路径
+
+    优先级：参数 > 环境变量 AUTO_MANGA_CHROME_PATH（settings.CHROMIUM_EXECUTABLE）> Playwright 自带的 Chromium
+    """
+    executable = executable or CHROMIUM_EXECUTABLE
+    if executable:
+        return executable
+    from playwright.async_api import async_playwright
+    async with async_playwright() as playwright:
+        return playwright.chromium.executable_path
+
+
+class ChromiumLauncher:
+    """启动并看管一个本地 Chromium 进程"""
+
+    def __init__(
+        self,
+        executable: Optional[str] = None,
+        headless: bool = BROWSER_HEADLESS,
+        session_id: Optional[str] = None,
+    ):
+        """
+        初始化启动器
+
+        Args:
+            executable: Chromium 可执行文件路径，None 时自动查找
+            headless: 是否无头运行
+            session_id: 会话ID（用于日志）
+        """
+        self.executable = executable
+        self.headless = headless
+        self.logger = get_logger(session_id)
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.user_data_dir: Optional[str] = None
+        self.port: Optional[int] = None
+        self.restarts = 0
+        self._stopping = False
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def cdp_url(self) -> str:
+        """远程调试 HTTP 端点"""
+        if self.port is None:
+            raise RuntimeError("浏览器尚未启动")
+        return f"http://127.0.0.1:{self.port}"
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    def _build_args(self) -> list:
+        """构造 Chromium 启动参数"""
+        args = [
+            # 端口为 0 时由浏览器自行选择空闲端口，并写入用户数据目录下的 DevToolsActivePort
+            '--remote-debugging-port=0',
+            f'--user-data-dir={self.user_data_dir}',
+            '--no-first-run',
+            '--no-default-browser-check',
+            '--disable-background-timer-throttling',
+            '--disable-backgrounding-occluded-windows',
+            '--disable-renderer-backgrounding',
+        ]
+        if self.headless:
+            args += ['--headless=new', '--disable-gpu']
+        if sys.platform.startswith('linux') and hasattr(os, 'geteuid') and os.geteuid() == 0:
+            # 以 root 运行时 Chromium 要求关闭沙箱
+            args.append('--no-sandbox')
+        args.append('about:blank')
+        return args
+
+    async def start(self) -> str:
+        """启动浏览器并等待调试端口就绪
+
+        Returns:
+            str: 远程调试 HTTP 端点
+        """
+        if self.is_running:
+            return self.cdp_url
+
+        self.executable = await resolve_chromium_executable(self.executable)
+        self.user_data_dir = tempfile.mkdtemp(prefix='auto_manga_chromium_')
+        self.port = None
+        self._stopping = False
+
+        self.logger.debug(f"启动 Chromium: {self.executable}（{'无头' if self.headless else '有界面'}）")
+        self.process = await asyncio.create_subprocess_exec(
+            self.executable,
+            *self._build_args(),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        _running_launchers.add(self)
+
+        try:
+            await self._wait_until_ready()
+        except Exception:
+            await self.stop()
+            raise
+
+        self._watch_task = asyncio.create_task(self._watch())
+        self.logger.debug(f"✓ Chromium 已启动（PID: {self.process.pid}，调试端口: {self.port}）")
+        return self.cdp_url
+
+    async def _wait_until_ready(self):
+        """等待 DevToolsActivePort 写出且 /json/version 可访问"""
+        port_file = Path(self.user_data_dir) / 'DevToolsActivePort'
+        deadline = time.monotonic() + BROWSER_LAUNCH_TIMEOUT / 1000
+        async with aiohttp.ClientSession() as session:
+            while time.monotonic() < deadline:
+                if self.process.returncode is not None:
+                    raise RuntimeError(f"Chromium 启动后立即退出（退出码: {self.process.returncode}）")
+                if self.port is None and port_file.exists():
+                    first_line = port_file.read_text().split('\n', 1)[0].strip()
+                    if first_line.isdigit():
+                        self.port = int(first_line)
+                if self.port is not None:
+                    try:
+                        async with session.get(f"{self.cdp_url}/json/version") as response:
+                            if response.status == 200:
+                                return
+                    except aiohttp.ClientError:
+                        pass
+                await asyncio.sleep(0.05)
+        raise RuntimeError(f"Chromium 未在 {BROWSER_LAUNCH_TIMEOUT / 1000:.0f} 秒内就绪")
+
+    async def _watch(self):
+        """看管浏览器进程，意外退出时记录日志（下次 ensure_running 时重启）"""
+        process = self.process
+        returncode = await process.wait()
+        if not self._stopping and process is self.process:
+            self.logger.warning(f"Chromium 进程意外退出（PID: {process.pid}，退出码: {returncode}）")
+            _running_launchers.discard(self)
+
+    async def ensure_running(self) -> str:
+        """确保浏览器在运行，意外退出时重新启动
+
+        Returns:
+            str: 远程调试 HTTP 端点（重启后端口会变化）
+        """
+        if self.is_running:
+            return self.cdp_url
+        if self.process is not None:
+            self.restarts += 1
+            self.logger.warning(f"重新启动 Chromium（第 {self.restarts} 次）")
+            self._cleanup_user_data_dir()
+        return await self.start()
+
+    async def stop(self, timeout: float = 10.0):
+        """关闭浏览器进程并清理用户数据目录"""
+        self._stopping = True
+        if self.is_running:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout)
+            except asyncio.TimeoutError:
+                self.process.kill()
+                await self.process.wait()
+            self.logger.debug("已关闭 Chromium")
+        if self._watch_task:
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+        _running_launchers.discard(self)
+        self._cleanup_user_data_dir()
+
+    def kill(self):
+        """立即结束浏览器进程（同步，供退出时兜底调用）"""
+        if self.is_running:
+            try:
+                self.process.kill()
+            except ProcessLookupError:
+                pass
+        _running_launchers.discard(self)
+        self._cleanup_user_data_dir()
+
+    def _cleanup_user_data_dir(self):
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            self.user_data_dir = None
@@ -0,0 +1,167 @@
+"""
+浏览器直接落盘下载
+
+通过 CDP 的 Browser.setDownloadBehavior（allowAndName）让浏览器把下载文件直接写入目标目录，
+完成后在同一目录内重命名为最终文件名。相比 page.expect_download + download.save_as，
+省去了 Playwright 临时目录中的一次完整拷贝，临时目录也不会随下载数量增长。
+
+下载行为按浏览器上下文（browserContextId）设置，每个任务的上下文互不影响。
+浏览器级 CDP 会话会收到所有上下文的 Browser.downloadWillBegin，只认领本页面框架（frameId）发起的下载，
+之后按 guid 跟踪 Browser.downloadProgress，多个任务共用一个 Chrome 时不会拿到彼此的下载。
+"""
+
+import asyncio
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from src.utils.cdp_stats import unwrap
+from src.utils.logger import get_logger
+
+
+def _collect_frame_ids(frame_tree: dict) -> Set[str]:
+    """Page.getFrameTree 结果中的所有框架 ID（含子框架）"""
+    ids = {frame_tree['frame']['id']}
+    for child in frame_tree.get('childFrames', []):
+        ids |= _collect_frame_ids(child)
+    return ids
+
+
+class DirectDownloads:
+    """基于 CDP 下载事件的直接落盘下载器（每个浏览器上下文一个）"""
+
+    def __init__(self, browser, page, session_id: Optional[str] = None):
+        """
+        初始化下载器
+
+        Args:
+            browser: Playwright Browser（通过 connect_over_cdp 连接的 Chromium）
+            page: 属于目标上下文的页面（用于查询 browserContextId）
+            session_id: 会话ID（用于日志）
+        """
+        self.browser = browser
+        self.page = unwrap(page)
+        self.logger = get_logger(session_id)
+        self.session = None
+        self.browser_context_id: Optional[str] = None
+        # 本页面的所有框架 ID（只认领这些框架发起的下载）
+        self.frame_ids: Set[str] = set()
+        self._directory: Optional[Path] = None
+        # 等待 downloadWillBegin 的请求（按点击顺序）
+        self._pending_begins: List[asyncio.Future] = []
+        # guid -> 完成状态
+        self._progress: Dict[str, asyncio.Future] = {}
+        # 并行下载时串行化"点击 → 下载开始"，保证 downloadWillBegin 与发起的点击一一对应
+        self._begin_lock = asyncio.Lock()
+
+    async def start(self):
+        """创建浏览器级 CDP 会话并订阅下载事件"""
+        page_session = await self.page.context.new_cdp_session(self.page)
+        try:
+            info = await page_session.send('Target.getTargetInfo')
+            self.browser_context_id = info['targetInfo'].get('browserContextId')
+            tree = await page_session.send('Page.getFrameTree')
+            self.frame_ids = _collect_frame_ids(tree['frameTree'])
+        finally:
+            await page_session.detach()
+
+        self.session = await self.browser.new_browser_cdp_session()
+        self.session.on('Browser.downloadWillBegin', self._on_download_will_begin)
+        self.session.on('Browser.downloadProgress', self._on_download_progress)
+        self.logger.debug(f"✓ 已启用直接落盘下载（browserContextId: {self.browser_context_id}）")
+
+    def _on_download_will_begin(self, event: dict):
+        if event.get('frameId') not in self.frame_ids:
+            return  # 其他上下文 / 页面发起的下载
+        while self._pending_begins:
+            future = self._pending_begins.pop(0)
+            if not future.done():
+                self._progress.setdefault(event['guid'], asyncio.get_running_loop().create_future())
+                future.set_result(event)
+                return
+        self.logger.debug(f"忽略非本任务发起的下载: {event.get('suggestedFilename')}")
+
+    def _on_download_progress(self, event: dict):
+        if event.get('state') not in ('completed', 'canceled'):
+            return
+        future = self._progress.get(event['guid'])
+        if future is None:
+            return  # 不是本任务认领的下载
+        if not future.done():
+            future.set_result(event['state'])
+
+    async def _set_directory(self, directory: Path):
+        """把本上下文的下载目录切换到 directory（与当前相同时跳过）"""
+        directory = directory.resolve()
+        if directory == self._directory:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        params = {
+            'behavior': 'allowAndName',
+            'downloadPath': str(directory),
+            'eventsEnabled': True,
+        }
+        if self.browser_context_id:
+            params['browserContextId'] = self.browser_context_id
+        await self.session.send('Browser.setDownloadBehavior', params)
+        self._directory = directory
+
+    async def download(
+        self,
+        trigger: Callable[[], Awaitable],
+        directory: Path,
+        name_for: Callable[[str], str],
+        timeout: float = 30.0,
+    ) -> Path:
+        """触发一次下载，并把文件直接保存到 directory 下
+
+        Args:
+            trigger: 触发下载的操作（如点击下载按钮）
+            directory: 保存目录
+            name_for: 根据浏览器建议的文件名返回最终文件名
+            timeout: 等待下载开始与完成的超时时间（秒）
+
+        Returns:
+            Path: 最终文件路径
+
+        Raises:
+            Exception: 下载未开始、被取消或超时
+        """
+        directory = Path(directory)
+        async with self._begin_lock:
+            await self._set_directory(directory)
+            download_dir = self._directory
+
+            begin = asyncio.get_running_loop().create_future()
+            self._pending_begins.append(begin)
+            try:
+                await trigger()
+                event = await asyncio.wait_for(begin, timeout)
+            except BaseException:
+                if begin in self._pending_begins:
+                    self._pending_begins.remove(begin)
+                raise
+
+        guid = event['guid']
+        temp_path = download_dir / guid
+        try:
+            state = await asyncio.wait_for(self._progress[guid], timeout)
+            if state != 'completed':
+                raise Exception(f"下载被取消: {event.get('suggestedFilename')}")
+            final_path = directory / name_for(event.get('suggestedFilename') or '')
+            os.replace(temp_path, final_path)
+            return final_path
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            self._progress.pop(guid, None)
+
+    async def close(self):
+        """断开浏览器级 CDP 会话"""
+        if self.session:
+            try:
+                await self.session.detach()
+            except Exception:
+                pass
+            self.session = None
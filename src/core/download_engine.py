@@ -0,0 +1,346 @@
+"""
+图片下载策略引擎
+
+把"下载按钮 → 图片 URL → 元素截图"的三级回退统一成可插拔的策略列表：
+- 每个策略先做一次快速的可用性检查（没有下载按钮、没有图片元素时立即跳过，不等超时）
+- 按本次运行和历史运行中观测到的成功率排序，成功率高的策略先试；兜底策略（截图）总在最后
+- 连续失败达到阈值的策略进入熔断，冷却期内不再尝试；冷却结束后只放行一次试探，成功则恢复，失败则重新熔断
+- 记录每个策略的尝试次数、成功次数和耗时，统计保存在 data/configs/download_stats.json
+- 可选的质量检查（validator）：保存的是占位图、加载动画等时删除文件、计为失败，换下一个策略重新获取
+"""
+
+import abc
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from src.config.settings import (
+    DOWNLOAD_BREAKER_COOLDOWN,
+    DOWNLOAD_BREAKER_THRESHOLD,
+    DOWNLOAD_STATS_DECAY,
+    DOWNLOAD_STATS_PATH,
+)
+from src.utils.file_utils import atomic_write_text
+
+
+class StrategyUnavailable(Exception):
+    """策略在当前容器上不可用（如没有下载按钮），不计为失败"""
+
+
+@dataclass
+class DownloadJob:
+    """一张待保存的图片"""
+    container: object  # 图片容器元素
+    save_dir: Path  # 保存目录
+    stem: str  # 文件名（不含扩展名）
+    default_ext: str = '.png'  # 无法从 URL / 建议文件名得到扩展名时使用
+    keep_suggested_name: bool = False  # 原生下载时沿用浏览器建议的文件名
+    img_element: object = None  # 已找到的图片元素（可选）
+
+
+@dataclass
+class StrategyStats:
+    """单个策略的统计（attempts / successes / unavailable / latency_ema 跨运行保存）"""
+    attempts: float = 0
+    successes: float = 0
+    unavailable: float = 0
+    latency_ema: Optional[float] = None  # 成功下载耗时的指数滑动平均（秒）
+    # 以下只在本次运行内有效
+    run_attempts: int = 0
+    run_successes: int = 0
+    run_latencies: List[float] = field(default_factory=list)
+    consecutive_failures: int = 0
+    open_until: float = 0.0
+    probing: bool = False  # 半开状态下的试探正在进行（并发保存时只放行一次）
+
+    @property
+    def success_rate(self) -> float:
+        """平滑后的成功率（没有记录时为 0.5）"""
+        return (self.successes + 1) / (self.attempts + 2)
+
+    def is_open(self, now: float = None) -> bool:
+        """熔断是否生效"""
+        return (now or time.monotonic()) < self.open_until
+
+    def is_half_open(self, now: float = None) -> bool:
+        """冷却已结束但还没有试探成功"""
+        return self.consecutive_failures >= DOWNLOAD_BREAKER_THRESHOLD and not self.is_open(now)
+
+    def admit(self, now: float = None) -> bool:
+        """本次是否可以尝试该策略：熔断中不放行；半开状态只放行一次试探"""
+        if self.is_open(now):
+            return False
+        if self.is_half_open(now):
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def record(self, success: bool, latency: float):
+        self.probing = False
+        self.attempts += 1
+        self.run_attempts += 1
+        if success:
+            self.successes += 1
+            self.run_successes += 1
+            self.run_latencies.append(latency)
+            self.latency_ema = latency if self.latency_ema is None else 0.8 * self.latency_ema + 0.2 * latency
+            self.consecutive_failures = 0
+            self.open_until = 0.0
+        else:
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= DOWNLOAD_BREAKER_THRESHOLD:
+                self.open_until = time.monotonic() + DOWNLOAD_BREAKER_COOLDOWN
+
+    def to_dict(self) -> dict:
+        return {
+            'attempts': round(self.attempts, 3),
+            'successes': round(self.successes, 3),
+            'unavailable': round(self.unavailable, 3),
+            'latency_ema': round(self.latency_ema, 4) if self.latency_ema is not None else None,
+        }
+
+
+class DownloadStatsStore:
+    """所有策略的统计，进程内共享，按需写回文件"""
+
+    def __init__(self, path: Optional[str] = DOWNLOAD_STATS_PATH):
+        self.path = Path(path) if path else None
+        self.strategies: Dict[str, StrategyStats] = {}
+        self.load()
+
+    def load(self):
+        """读取历史统计；历史计数按 DOWNLOAD_STATS_DECAY 衰减，近期运行的权重更高"""
+        if not self.path:
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return
+        for name, values in data.get('strategies', {}).items():
+            self.strategies[name] = StrategyStats(
+                attempts=values.get('attempts', 0) * DOWNLOAD_STATS_DECAY,
+                successes=values.get('successes', 0) * DOWNLOAD_STATS_DECAY,
+                unavailable=values.get('unavailable', 0) * DOWNLOAD_STATS_DECAY,
+                latency_ema=values.get('latency_ema'),
+            )
+
+    def save(self):
+        """原子写回统计文件"""
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {'version': 1, 'strategies': {name: s.to_dict() for name, s in self.strategies.items()}}
+        atomic_write_text(self.path, json.dumps(data, ensure_ascii=False, indent=2) + '\n')
+
+    def get(self, name: str) -> StrategyStats:
+        return self.strategies.setdefault(name, StrategyStats())
+
+
+_shared_store: Optional[DownloadStatsStore] = None
+
+
+def get_download_stats() -> DownloadStatsStore:
+    """获取进程内共享的下载统计（首次调用时从文件加载）"""
+    global _shared_store
+    if _shared_store is None:
+        _shared_store = DownloadStatsStore()
+    return _shared_store
+
+
+class DownloadStrategy(abc.ABC):
+    """下载策略基类
+
+    子类实现 save()：策略不可用时抛出 StrategyUnavailable（立即跳过），
+    下载失败时抛出其它异常，成功时返回保存的文件路径。
+    """
+
+    name = 'base'
+    label = ''  # 日志中的中文名称
+    last_resort = False  # 兜底策略：不参与成功率排序，总在最后尝试
+
+    @abc.abstractmethod
+    async def save(self, saver, job: DownloadJob) -> Path:
+        """保存一张图片，返回保存的文件路径"""
+
+
+class ButtonDownloadStrategy(DownloadStrategy):
+    """点击下载按钮，使用浏览器原生下载（原始清晰度）"""
+
+    name = 'button'
+    label = '原生下载'
+
+    async def save(self, saver, job: DownloadJob) -> Path:
+        download_button = await saver._find_download_button(job.container)
+        if not download_button:
+            raise StrategyUnavailable("未找到下载按钮")
+
+        def name_for(suggested: str) -> str:
+            if job.keep_suggested_name and suggested:
+                return suggested
+            return job.stem + (Path(suggested).suffix or job.default_ext)
+
+        return await saver._download_via_button(download_button, job.save_dir, name_for)
+
+
+class UrlDownloadStrategy(DownloadStrategy):
+    """直接下载图片 URL"""
+
+    name = 'url'
+    label = 'URL下载'
+
+    async def save(self, saver, job: DownloadJob) -> Path:
+        img_element = job.img_element or await job.container.query_selector('img[src]')
+        if not img_element:
+            raise StrategyUnavailable("未找到图片元素")
+        img_src = await img_element.get_attribute('src')
+        if not img_src:
+            raise StrategyUnavailable("图片没有 src 属性")
+
+        img_src = saver._process_image_url(img_src)
+        saver.logger.debug(f"尝试直接下载图片 URL: {img_src[:80]}...")
+        ext = os.path.splitext(urlparse(img_src).path)[1]
+        file_path = job.save_dir / f"{job.stem}{ext or job.default_ext}"
+        await saver._download_url(img_src, file_path)
+        return file_path
+
+
+class ScreenshotStrategy(DownloadStrategy):
+    """元素截图（兜底方案，清晰度较低）"""
+
+    name = 'screenshot'
+    label = '截图方式，清晰度较低'
+    last_resort = True
+
+    async def save(self, saver, job: DownloadJob) -> Path:
+        img_element = job.img_element or await job.container.query_selector('img[src]')
+        if not img_element:
+            raise StrategyUnavailable("未找到图片元素")
+        file_path = job.save_dir / f"{job.stem}.png"
+        await saver._save_screenshot(img_element, file_path)
+        return file_path
+
+
+DEFAULT_STRATEGIES = (ButtonDownloadStrategy, UrlDownloadStrategy, ScreenshotStrategy)
+
+
+class DownloadEngine:
+    """按成功率排序依次尝试下载策略"""
+
+    def __init__(
+        self,
+        saver,
+        strategies: Sequence[DownloadStrategy] = None,
+        stats: DownloadStatsStore = None,
+        clock: Callable[[], float] = time.monotonic,
+        validator: Callable[[Path], object] = None,
+    ):
+        """
+        初始化下载引擎
+
+        Args:
+            saver: ImageSaver（提供下载、截图等底层操作）
+            strategies: 策略实例列表，顺序即成功率相同时的优先级；默认按钮 → URL → 截图
+            stats: 统计存储，默认使用进程内共享的统计
+            clock: 计时函数
+            validator: 保存后的质量检查（在线程中执行，返回带 ok / summary 的结果，如 check_image_quality）
+        """
+        self.saver = saver
+        self.logger = saver.logger
+        self.strategies = list(strategies) if strategies is not None else [cls() for cls in DEFAULT_STRATEGIES]
+        self.stats = stats or get_download_stats()
+        self.clock = clock
+        self.validator = validator
+
+    def ordered_strategies(self) -> List[DownloadStrategy]:
+        """本次尝试的策略顺序：可用策略按成功率降序，最后是兜底策略
+
+        熔断中的策略在冷却结束前不出现在列表中（兜底策略之后没有别的方式，总是保留）。
+        """
+        now = time.monotonic()
+
+        def sort_key(item):
+            index, strategy = item
+            stats = self.stats.get(strategy.name)
+            return (strategy.last_resort, -stats.success_rate, index)
+
+        return [
+            strategy for _, strategy in sorted(enumerate(self.strategies), key=sort_key)
+            if strategy.last_resort or not self.stats.get(strategy.name).is_open(now)
+        ]
+
+    async def save(self, job: DownloadJob) -> Tuple[Path, str]:
+        """依次尝试各策略保存一张图片
+
+        Returns:
+            tuple: (保存的文件路径, 成功的策略名称)
+
+        Raises:
+            Exception: 所有策略都失败
+        """
+        errors = []
+        for strategy in self.ordered_strategies():
+            stats = self.stats.get(strategy.name)
+            if not strategy.last_resort and not stats.admit():
+                # 其它并发任务正在做半开试探，或在排序之后刚被熔断
+                continue
+            start = self.clock()
+            try:
+                file_path = await strategy.save(self.saver, job)
+            except StrategyUnavailable as e:
+                stats.probing = False
+                stats.unavailable += 1
+                errors.append(f"{strategy.name}: {e}")
+                continue
+            except Exception as e:
+                stats.record(False, self.clock() - start)
+                if stats.is_open():
+                    self.logger.debug(f"下载策略 {strategy.name} 连续失败 {stats.consecutive_failures} 次，暂时熔断")
+                self.logger.debug(f"{strategy.label}失败: {e}")
+                errors.append(f"{strategy.name}: {e}")
+                continue
+
+            if self.validator is not None:
+                report = await asyncio.to_thread(self.validator, file_path)
+                if not report.ok:
+                    stats.record(False, self.clock() - start)
+                    self.logger.warning(f"{strategy.label}保存的图片未通过质量检查（{report.summary}），换下一种方式重新获取")
+                    errors.append(f"{strategy.name}: 质量检查未通过（{report.summary}）")
+                    try:
+                        file_path.unlink()
+                    except OSError:
+                        pass
+                    continue
+
+            stats.record(True, self.clock() - start)
+            self.logger.debug(f"✓ 图片已保存（{strategy.label}）: {file_path.absolute()}")
+            return file_path, strategy.name
+
+        raise Exception("所有下载方式都失败（" + "; ".join(errors) + "）")
+
+    def save_stats(self):
+        """写回统计文件（失败时只记录日志）"""
+        try:
+            self.stats.save()
+        except Exception as e:
+            self.logger.debug(f"保存下载统计失败: {e}")
+
+    def format_summary(self) -> str:
+        """本次运行各策略的统计摘要"""
+        lines = []
+        for strategy in self.strategies:
+            stats = self.stats.get(strategy.name)
+            if not stats.run_attempts:
+                continue
+            latencies = sorted(stats.run_latencies)
+            median = f"{latencies[len(latencies) // 2]:.2f}s" if latencies else "-"
+            lines.append(
+                f"{strategy.name}: {stats.run_successes}/{stats.run_attempts} 成功, "
+                f"耗时中位数 {median}, 历史成功率 {stats.success_rate:.0%}"
+            )
+        return "\n".join(lines)
@@ -14,6 +14,7 @@ from playwright.async_api import async_playwright
 from src.core.browser_controller import BrowserController
 from src.config.settings import SELECTORS, UPLOAD_TIMEOUT, IMAGE_GENERATION_TIMEOUT
 from src.utils.browser_utils import find_working_selector, wait_for_images_loading, verify_upload
+from src.utils.file_utils import atomic_write_bytes
 from src.utils.logger import get_logger
 
 
@@ -266,8 +267,7 @@ class GeminiCDPController(BrowserController):
                                 file_path = save_path / filename
                                 
                                 content = await response.body()
-                                with open(file_path, 'wb') as f:
-                                    f.write(content)
+                                await asyncio.to_thread(atomic_write_bytes, file_path, content)
                                 
                                 saved_files.append(str(file_path.absolute()))
                                 self.logger.debug(f"✓ 图片已保存（URL下载）: {file_path.absolute()}")
@@ -0,0 +1,151 @@
+"""
+生成图片收集模块
+
+Gemini 只渲染进入视口的图片（懒加载），此前的做法是额外发送一条"下一步"消息让页面滚动到底部，
+再整页刷新，等待期间还会周期性刷新页面。这里改为在页面内依次把每个图片容器滚动到视口中，
+用 IntersectionObserver 确认容器可见、再等待容器内的图片解码完成，一次调用收集所有最终 URL：
+不需要额外的对话轮次，也不需要刷新页面。
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from src.config.settings import IMAGE_HARVEST_TIMEOUT
+from src.utils.logger import get_logger
+
+
+GENERATED_CONTAINER_SELECTOR = '.attachment-container.generated-images'
+
+
+# 在页面内按顺序滚动每个容器：IntersectionObserver 确认进入视口后，等待容器内所有图片都有 src 且解码完成
+_HARVEST_SCRIPT = """
+async ({selector, timeoutMs}) => {
+  const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+  const whenVisible = element => new Promise(resolve => {
+    const observer = new IntersectionObserver(entries => {
+      if (entries.some(entry => entry.isIntersecting)) {
+        observer.disconnect();
+        resolve(true);
+      }
+    });
+    observer.observe(element);
+  });
+  const imagesReady = element => {
+    const images = Array.from(element.querySelectorAll('img'));
+    return images.length > 0 && images.every(img => img.getAttribute('src') && img.complete && img.naturalWidth > 0);
+  };
+
+  const results = [];
+  const containers = Array.from(document.querySelectorAll(selector));
+  for (const [index, container] of containers.entries()) {
+    const deadline = performance.now() + timeoutMs;
+    container.scrollIntoView({block: 'center'});
+    const visible = await Promise.race([whenVisible(container), sleep(timeoutMs).then(() => false)]);
+    while (!imagesReady(container) && performance.now() < deadline) {
+      await sleep(50);
+    }
+    results.push({
+      index,
+      visible,
+      ready: imagesReady(container),
+      urls: Array.from(container.querySelectorAll('img'))
+        .map(img => img.currentSrc || img.src)
+        .filter(Boolean),
+    });
+  }
+  return results;
+}
+"""
+
+
+@dataclass
+class HarvestedContainer:
+    """一个生成图片容器的收集结果"""
+    index: int  # 容器序号（从 0 开始，按页面顺序）
+    urls: List[str] = field(default_factory=list)  # 容器内图片的最终 URL（绝对地址）
+    ready: bool = False  # 图片是否都已加载完成
+    visible: bool = False  # 是否确认进入过视口
+
+
+class ImageHarvester:
+    """按顺序收集页面上所有生成图片容器的最终图片 URL"""
+
+    def __init__(self, page, session_id: Optional[str] = None, container_selector: str = GENERATED_CONTAINER_SELECTOR):
+        self.page = page
+        self.logger = get_logger(session_id)
+        self.container_selector = container_selector
+
+    async def count_containers(self) -> int:
+        """当前页面上的生成图片容器数量"""
+        return await self.page.locator(self.container_selector).count()
+
+    async def wait_for_containers(self, expected: int, timeout: float) -> bool:
+        """等待生成图片容器数量达到 expected
+
+        Args:
+            expected: 期望的容器数量
+            timeout: 超时时间（秒）
+
+        Returns:
+            bool: 是否在超时前达到
+        """
+        try:
+            await self.page.wait_for_function(
+                "([selector, expected]) => document.querySelectorAll(selector).length >= expected",
+                arg=[self.container_selector, expected],
+                timeout=timeout * 1000,
+            )
+            return True
+        except Exception as e:
+            self.logger.warning(f"等待 {expected} 个图片容器超时: {e}")
+            return False
+
+    async def load_all_containers(self, settle_timeout: float = 3.0, max_rounds: int = 50) -> int:
+        """打开已有对话时，反复滚动到最早的图片容器，直到不再加载出更早的对话
+
+        Args:
+            settle_timeout: 每次滚动后等待容器数量增加的时间（秒）
+            max_rounds: 最多滚动次数
+
+        Returns:
+            int: 最终的容器数量
+        """
+        count = await self.count_containers()
+        for _ in range(max_rounds):
+            await self.page.evaluate(
+                "selector => document.querySelector(selector)?.scrollIntoView({block: 'start'})",
+                self.container_selector,
+            )
+            try:
+                await self.page.wait_for_function(
+                    "([selector, count]) => document.querySelectorAll(selector).length > count",
+                    arg=[self.container_selector, count],
+                    timeout=settle_timeout * 1000,
+                )
+            except Exception:
+                break
+            count = await self.count_containers()
+        return count
+
+    async def harvest(self, timeout_ms: int = IMAGE_HARVEST_TIMEOUT) -> List[HarvestedContainer]:
+        """依次把每个容器滚动到视口中，等待图片加载完成并收集 URL
+
+        Args:
+            timeout_ms: 每个容器的最长等待时间（毫秒）
+
+        Returns:
+            List[HarvestedContainer]: 按页面顺序排列的收集结果
+        """
+        raw_results = await self.page.evaluate(
+            _HARVEST_SCRIPT, {'selector': self.container_selector, 'timeoutMs': timeout_ms}
+        )
+        results = [
+            HarvestedContainer(index=item['index'], urls=item['urls'], ready=item['ready'], visible=item['visible'])
+            for item in raw_results
+        ]
+
+        pending = [str(item.index + 1) for item in results if not item.ready]
+        if pending:
+            self.logger.warning(f"以下图片容器的图片未在 {timeout_ms / 1000:.0f} 秒内加载完成: {', '.join(pending)}")
+        self.logger.debug(f"✓ 已收集 {len(results)} 个图片容器，共 {sum(len(item.urls) for item in results)} 张图片")
+        return results
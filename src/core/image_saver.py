@@ -2,31 +2,188 @@
 图片保存模块
 """
 
+import asyncio
 import os
 import time
 from pathlib import Path
-import asyncio
-from typing import List
+from typing import List, Optional
 from urllib.parse import urlparse
 
+import aiohttp
+
+from src.config.settings import (
+    BLOB_STORE,
+    BLOB_STORE_DIR,
+    DOWNLOAD_CHUNK_SIZE,
+    GEMINI_ORIGIN,
+    IMAGE_CATALOG_PATH,
+    IMAGE_QUALITY_GATE,
+    SKIP_DUPLICATE_IMAGES,
+)
+from src.core.download_engine import DownloadEngine, DownloadJob
+from src.utils.blob_store import BlobStore
+from src.utils.file_utils import AtomicWriter, IMAGE_EXTENSIONS, atomic_write_bytes, temp_path_for
+from src.utils.image_quality import check_image_quality
+from src.utils.image_utils import register_image_file
 from src.utils.logger import get_logger
+from src.utils.timing import fixed_sleep
+
+
+class DuplicateImage(Exception):
+    """新保存的图片与已有图片重复，已按 SKIP_DUPLICATE_IMAGES 删除"""
 
 
 class ImageSaver:
     """图片保存类"""
     
-    def __init__(self, page, session_id=None):
+    def __init__(self, page, session_id=None, download_dir=None, direct_downloads=None, catalog_path=IMAGE_CATALOG_PATH,
+                 blob_dir=BLOB_STORE_DIR if BLOB_STORE else None):
         self.page = page
         self.session_id = session_id
         self.logger = get_logger(session_id)
+        # 本任务的下载暂存目录：原生下载先保存到这里，完成后再移动到目标位置
+        self.download_dir = download_dir
+        # 直接落盘下载器（见 src/core/direct_downloads.py），为 None 时使用 page.expect_download
+        self.direct_downloads = direct_downloads
+        # 下载策略引擎（按成功率排序尝试下载按钮 / 图片 URL / 截图，保存后检查图片质量）
+        self.engine = DownloadEngine(self, validator=check_image_quality if IMAGE_QUALITY_GATE else None)
+        self._button_lock = asyncio.Lock()
+        # 全局图片目录（跨主题/跨运行查找重复），为 None 时只在主题目录内查找
+        self.catalog_path = catalog_path
+        # 内容寻址存储：相同内容只保存一份，主题目录中是硬链接；为 None 时保存普通文件
+        self.blob_store = BlobStore(blob_dir) if blob_dir else None
+    
+    async def _download_via_button(self, download_button, save_path: Path, name_for) -> Path:
+        """点击下载按钮，使用浏览器原生下载保存图片
+
+        Args:
+            download_button: 下载按钮元素
+            save_path: 保存目录
+            name_for: 根据浏览器建议的文件名返回最终文件名
+
+        Returns:
+            Path: 保存的文件路径
+        """
+        if self.direct_downloads:
+            return await self.direct_downloads.download(download_button.click, save_path, name_for)
+        
+        # 监听下载事件（并行保存时串行化"点击 → 下载开始"，避免下载事件对应错图片）
+        async with self._button_lock:
+            async with self.page.expect_download(timeout=30000) as download_info:
+                await download_button.click()
+        
+        download = await download_info.value
+        file_path = save_path / name_for(download.suggested_filename or '')
+        await self._save_download(download, file_path)
+        return file_path
     
-    async def save_all_images_sequentially(self, save_dir: str, total_batches: int) -> List[str]:
+    async def _save_download(self, download, file_path: Path):
+        """保存浏览器原生下载的文件
+
+        先保存到下载暂存目录（没有时为目标目录下的临时文件），再原子移动到目标位置，
+        目标目录中不会出现下载到一半的文件，并行任务之间也不会互相覆盖。
+        """
+        if self.download_dir:
+            staging_path = Path(self.download_dir) / f"{time.time_ns()}_{file_path.name}"
+        else:
+            staging_path = temp_path_for(file_path)
+        await download.save_as(str(staging_path))
+        os.replace(staging_path, file_path)
+    
+    async def _download_url(self, url: str, file_path: Path):
+        """下载图片 URL 到文件
+
+        http(s) 地址携带页面上下文的 cookies 用 aiohttp 分块流式下载，内存占用与图片大小无关；
+        其它地址（blob: 等）或流式下载失败时回退到 Playwright 的 request API。
+        文件都先写入临时文件再原子重命名，写文件在线程池中执行，不阻塞事件循环。
+        """
+        if urlparse(url).scheme in ('http', 'https'):
+            try:
+                await self._stream_url(url, file_path)
+                return
+            except Exception as e:
+                self.logger.debug(f"流式下载失败，改用 Playwright 请求: {e}")
+        
+        response = await self.page.request.get(url)
+        if not response.ok:
+            raise Exception(f"下载失败，状态码: {response.status}")
+        content = await response.body()
+        await asyncio.to_thread(atomic_write_bytes, file_path, content)
+    
+    async def _stream_url(self, url: str, file_path: Path):
+        """用页面上下文的 cookies 分块下载 URL，写入临时文件后原子重命名"""
+        cookies = await self.page.context.cookies([url])
+        headers = {'Referer': self.page.url}
+        if cookies:
+            headers['Cookie'] = '; '.join(f"{c['name']}={c['value']}" for c in cookies)
+        
+        timeout = aiohttp.ClientTimeout(total=120)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(url, headers=headers) as response:
+                if response.status != 200:
+                    raise Exception(f"下载失败，状态码: {response.status}")
+                writer = AtomicWriter(file_path)
+                f = await asyncio.to_thread(writer.__enter__)
+                try:
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        await asyncio.to_thread(f.write, chunk)
+                except BaseException as e:
+                    await asyncio.to_thread(writer.__exit__, type(e), e, None)
+                    raise
+                await asyncio.to_thread(writer.__exit__, None, None, None)
+    
+    async def _register_image(self, file_path: Path, method: str) -> Path:
+        """按文件头识别真实格式（扩展名不符时改名），存入内容寻址存储，并把内容哈希、感知哈希记录到目录的 manifest.json
+
+        与已有图片（同一主题或全局图片目录中的其它主题）内容相同或近似重复时给出警告；
+        开启 SKIP_DUPLICATE_IMAGES 时删除该文件并抛出 DuplicateImage。
+
+        Returns:
+            Path: 修正扩展名后的文件路径
+        """
+        try:
+            new_path, entry = await asyncio.to_thread(
+                register_image_file, file_path, method, self.catalog_path, SKIP_DUPLICATE_IMAGES, self.blob_store
+            )
+        except Exception as e:
+            # 清单只是辅助信息，记录失败不影响已保存的图片
+            self.logger.warning(f"记录图片清单失败: {e}")
+            return file_path
+        if new_path != file_path:
+            self.logger.debug(f"按文件内容修正扩展名: {file_path.name} -> {new_path.name}")
+        if entry['duplicate_of']:
+            self.logger.warning(f"图片 {new_path.name} 与 {entry['duplicate_of']} 内容相同")
+        elif entry['near_duplicate_of']:
+            self.logger.warning(f"图片 {new_path.name} 与 {entry['near_duplicate_of']} 近似重复（感知哈希）")
+        elif entry['catalog_match']:
+            self.logger.warning(f"图片 {new_path.name} 与已有的 {entry['catalog_match']} 近似重复")
+        if entry.get('skipped'):
+            raise DuplicateImage(f"图片 {new_path.name} 与已有图片重复，未保存")
+        return new_path
+    
+    async def _save_download_stats(self):
+        """输出本次各下载策略的统计，并写回历史统计文件"""
+        summary = self.engine.format_summary()
+        if summary:
+            self.logger.debug("下载策略统计:\n" + summary)
+        await asyncio.to_thread(self.engine.save_stats)
+    
+    async def _save_screenshot(self, img_element, file_path: Path):
+        """截图保存图片元素（原子写入）"""
+        content = await img_element.screenshot()
+        await asyncio.to_thread(atomic_write_bytes, file_path, content)
+    
+    async def save_all_images_sequentially(
+        self, save_dir: str, total_batches: int, names: Optional[List[Optional[str]]] = None
+    ) -> List[str]:
         """
         按顺序保存所有生成的图片容器到本地文件夹（使用数字序号命名）
         
         Args:
             save_dir: 保存目录
             total_batches: 总批次数（用于验证容器数量）
+            names: 每个容器的文件名（不含扩展名，见 BatchReconciler.container_names）；
+                   为 None 时按容器顺序编号，某个容器对应 None 时跳过该容器
             
         Returns:
             List[str]: 保存的文件路径列表（按顺序，1.png, 2.png, ...）
@@ -52,20 +209,26 @@ class ImageSaver:
             container_count = len(containers)
             self.logger.debug(f"找到 {container_count} 个图片容器（期望 {total_batches} 个）")
             
-            if container_count != total_batches:
+            if names is None and container_count != total_batches:
                 self.logger.warning(f"容器数量 ({container_count}) 与批次数 ({total_batches}) 不一致，继续保存...")
             
             # 按顺序处理每个容器
             for idx, container in enumerate(containers, 1):
+                stem = str(idx)
+                if names is not None:
+                    stem = names[idx - 1] if idx <= len(names) else None
+                    if stem is None:
+                        self.logger.debug(f"跳过图片容器 {idx}（不属于任何批次，或同一批次有更新的结果）")
+                        continue
                 try:
                     self.logger.debug(f"处理图片容器 {idx}/{container_count}...")
                     
                     # ==================== 新增修复代码 ====================
                     # 1. 强制滚动到当前容器，触发懒加载
                     try:
+                        # 收集阶段（ImageHarvester）已逐个渲染过容器，这里不再固定等待，
+                        # 图片元素还没出现时由下面的轮询等待
                         await container.scroll_into_view_if_needed()
-                        # 额外等待一下，给浏览器渲染时间
-                        await asyncio.sleep(1)
                     except Exception as e:
                         print(f"[DEBUG] 滚动到容器 {idx} 失败: {e}")
 
@@ -79,129 +242,26 @@ class ImageSaver:
                             img_check = await container.query_selector('img[src]')
                             if img_check:
                                 break
-                            await asyncio.sleep(1)
+                            await fixed_sleep(1)
                     except Exception as wait_err:
                          print(f"[DEBUG] 等待图片元素出现出错: {wait_err}")
                     # ====================================================
 
-                    # 首先尝试在容器内查找子容器（generated-image），如果没有则直接使用主容器
-                    sub_container = None
-                    sub_container_selectors = [
-                        'generated-image',
-                        '.generated-image',
-                    ]
+                    # 优先使用容器内的子容器（generated-image），没有时使用主容器
+                    target_container = await self._resolve_target_container(container)
                     
-                    for sub_selector in sub_container_selectors:
-                        try:
-                            sub_container = await container.query_selector(sub_selector)
-                            if sub_container:
-                                self.logger.debug(f"✓ 在容器 {idx} 中找到子容器: {sub_selector}")
-                                break
-                        except:
-                            continue
+                    # 依次尝试下载按钮 / 图片 URL / 截图，使用数字序号命名
+                    file_path, method = await self.engine.save(DownloadJob(target_container, save_path, stem))
+                    file_path = await self._register_image(file_path, method)
+                    saved_files.append(str(file_path.absolute()))
                     
-                    # 如果找到子容器，使用子容器；否则使用主容器
-                    target_container = sub_container if sub_container else container
-                    
-                    # 方法1: 优先尝试点击下载按钮（获得原始清晰度）
-                    download_success = False
-                    try:
-                        download_button = await self._find_download_button(target_container)
-                        
-                        if download_button:
-                            # 使用 Playwright 的下载监听功能
-                            self.logger.debug("点击下载按钮，使用浏览器原生下载...")
-                            
-                            # 监听下载事件
-                            async with self.page.expect_download(timeout=30000) as download_info:
-                                await download_button.click()
-                            
-                            download = await download_info.value
-                            
-                            # 获取文件扩展名
-                            suggested_filename = download.suggested_filename
-                            if suggested_filename:
-                                ext = os.path.splitext(suggested_filename)[1] or '.png'
-                            else:
-                                ext = '.png'
-                            
-                            # 使用数字序号命名
-                            filename = f"{idx}{ext}"
-                            file_path = save_path / filename
-                            await download.save_as(str(file_path))
-                            
-                            saved_files.append(str(file_path.absolute()))
-                            self.logger.debug(f"✓ 图片已保存（原生下载）: {file_path.absolute()}")
-                            download_success = True
-                            
-                    except Exception as download_btn_error:
-                        self.logger.debug(f"下载按钮方式失败: {download_btn_error}")
-                    
-                    # 方法2: 如果下载按钮失败，尝试直接下载图片 URL
-                    if not download_success:
-                        try:
-                            img_element = await target_container.query_selector('img[src]')
-                            if not img_element:
-                                raise Exception("未找到图片元素")
-                            
-                            img_src = await img_element.get_attribute('src')
-                            if not img_src:
-                                raise Exception("图片没有 src 属性")
-                            
-                            # 处理相对 URL
-                            img_src = self._process_image_url(img_src)
-                            
-                            self.logger.debug(f"尝试直接下载图片 URL: {img_src[:80]}...")
-                            
-                            # 使用 Playwright 的 request API 下载
-                            response = await self.page.request.get(img_src)
-                            
-                            if response.ok:
-                                # 从 URL 获取文件扩展名
-                                parsed_url = urlparse(img_src)
-                                ext = os.path.splitext(parsed_url.path)[1] or '.png'
-                                
-                                # 使用数字序号命名
-                                filename = f"{idx}{ext}"
-                                file_path = save_path / filename
-                                
-                                content = await response.body()
-                                with open(file_path, 'wb') as f:
-                                    f.write(content)
-                                
-                                saved_files.append(str(file_path.absolute()))
-                                self.logger.debug(f"✓ 图片已保存（URL下载）: {file_path.absolute()}")
-                                download_success = True
-                            else:
-                                raise Exception(f"下载失败，状态码: {response.status}")
-                                
-                        except Exception as url_error:
-                            self.logger.debug(f"URL 下载失败: {url_error}")
-                    
-                    # 方法3: 如果都失败，使用截图作为兜底（清晰度较低）
-                    if not download_success:
-                        try:
-                            self.logger.debug("使用截图方式作为兜底...")
-                            img_element = await target_container.query_selector('img[src]')
-                            if img_element:
-                                # 使用数字序号命名
-                                filename = f"{idx}.png"
-                                file_path = save_path / filename
-                                
-                                await img_element.screenshot(path=str(file_path))
-                                
-                                saved_files.append(str(file_path.absolute()))
-                                self.logger.debug(f"✓ 图片已保存（截图方式，清晰度较低）: {file_path.absolute()}")
-                            else:
-                                raise Exception("未找到图片元素")
-                        except Exception as screenshot_error:
-                            self.logger.error(f"截图方式也失败: {screenshot_error}")
-                            self.logger.error(f"所有下载方式都失败，跳过图片容器 {idx}")
-                            
+                except DuplicateImage:
+                    continue
                 except Exception as e:
                     self.logger.error(f"处理图片容器 {idx} 时出错: {e}")
                     continue
             
+            await self._save_download_stats()
             self.logger.debug(f"共保存 {len(saved_files)} 张图片（按顺序命名）")
             return saved_files
             
@@ -259,101 +319,22 @@ class ImageSaver:
                 try:
                     self.logger.debug(f"处理图片 {idx + 1}/{len(containers)}...")
                     
-                    # 方法1: 优先尝试点击下载按钮（获得原始清晰度）
-                    download_success = False
-                    try:
-                        download_button = await self._find_download_button(container)
-                        
-                        if download_button:
-                            # 使用 Playwright 的下载监听功能
-                            self.logger.debug("点击下载按钮，使用浏览器原生下载...")
-                            
-                            # 监听下载事件
-                            async with self.page.expect_download(timeout=30000) as download_info:
-                                await download_button.click()
-                            
-                            download = await download_info.value
-                            
-                            # 生成文件名
-                            suggested_filename = download.suggested_filename
-                            if not suggested_filename:
-                                ext = '.png'  # 默认扩展名
-                                suggested_filename = f"image_{int(time.time())}_{idx + 1}{ext}"
-                            
-                            # 保存文件
-                            file_path = save_path / suggested_filename
-                            await download.save_as(str(file_path))
-                            
-                            saved_files.append(str(file_path.absolute()))
-                            self.logger.debug(f"✓ 图片已保存（原生下载）: {file_path.absolute()}")
-                            download_success = True
-                            
-                    except Exception as download_btn_error:
-                        self.logger.debug(f"下载按钮方式失败: {download_btn_error}")
-                    
-                    # 方法2: 如果下载按钮失败，尝试直接下载图片 URL
-                    if not download_success:
-                        try:
-                            img_element = await container.query_selector('img[src]')
-                            if not img_element:
-                                raise Exception("未找到图片元素")
-                            
-                            img_src = await img_element.get_attribute('src')
-                            if not img_src:
-                                raise Exception("图片没有 src 属性")
-                            
-                            # 处理相对 URL
-                            img_src = self._process_image_url(img_src)
-                            
-                            self.logger.debug(f"尝试直接下载图片 URL: {img_src[:80]}...")
-                            
-                            # 使用 Playwright 的 request API 下载
-                            response = await self.page.request.get(img_src)
-                            
-                            if response.ok:
-                                # 从 URL 获取文件扩展名
-                                parsed_url = urlparse(img_src)
-                                ext = os.path.splitext(parsed_url.path)[1] or '.jpg'
-                                
-                                filename = f"image_{int(time.time())}_{idx + 1}{ext}"
-                                file_path = save_path / filename
-                                
-                                content = await response.body()
-                                with open(file_path, 'wb') as f:
-                                    f.write(content)
-                                
-                                saved_files.append(str(file_path.absolute()))
-                                self.logger.debug(f"✓ 图片已保存（URL下载）: {file_path.absolute()}")
-                                download_success = True
-                            else:
-                                raise Exception(f"下载失败，状态码: {response.status}")
-                                
-                        except Exception as url_error:
-                            self.logger.debug(f"URL 下载失败: {url_error}")
+                    # 依次尝试下载按钮 / 图片 URL / 截图；原生下载沿用浏览器建议的文件名
+                    job = DownloadJob(
+                        container, save_path, f"image_{int(time.time())}_{idx + 1}",
+                        default_ext='.jpg', keep_suggested_name=True,
+                    )
+                    file_path, method = await self.engine.save(job)
+                    file_path = await self._register_image(file_path, method)
+                    saved_files.append(str(file_path.absolute()))
                     
-                    # 方法3: 如果都失败，使用截图作为兜底（清晰度较低）
-                    if not download_success:
-                        try:
-                            self.logger.debug("使用截图方式作为兜底...")
-                            img_element = await container.query_selector('img[src]')
-                            if img_element:
-                                filename = f"image_{int(time.time())}_{idx + 1}.png"
-                                file_path = save_path / filename
-                                
-                                await img_element.screenshot(path=str(file_path))
-                                
-                                saved_files.append(str(file_path.absolute()))
-                                self.logger.debug(f"✓ 图片已保存（截图方式，清晰度较低）: {file_path.absolute()}")
-                            else:
-                                raise Exception("未找到图片元素")
-                        except Exception as screenshot_error:
-                            self.logger.error(f"截图方式也失败: {screenshot_error}")
-                            self.logger.error(f"所有下载方式都失败，跳过图片 {idx + 1}")
-                            
+                except DuplicateImage:
+                    continue
                 except Exception as e:
                     self.logger.error(f"处理图片 {idx + 1} 时出错: {e}")
                     continue
             
+            await self._save_download_stats()
             self.logger.debug(f"共保存 {len(saved_files)} 张图片")
             return saved_files
             
@@ -437,86 +418,22 @@ class ImageSaver:
                     matched_count += 1
                     self.logger.debug(f"处理目标图片 {matched_count}/{len(target_urls)}...")
                     
-                    # 方法1: 优先尝试点击下载按钮（获得原始清晰度）
-                    download_success = False
-                    try:
-                        download_button = await self._find_download_button(container)
-                        
-                        if download_button:
-                            # 使用 Playwright 的下载监听功能
-                            self.logger.debug("点击下载按钮，使用浏览器原生下载...")
-                            
-                            # 监听下载事件
-                            async with self.page.expect_download(timeout=30000) as download_info:
-                                await download_button.click()
-                            
-                            download = await download_info.value
-                            
-                            # 生成文件名
-                            suggested_filename = download.suggested_filename
-                            if not suggested_filename:
-                                ext = '.png'  # 默认扩展名
-                                suggested_filename = f"image_{int(time.time())}_{matched_count}{ext}"
-                            
-                            # 保存文件
-                            file_path = save_path / suggested_filename
-                            await download.save_as(str(file_path))
-                            
-                            saved_files.append(str(file_path.absolute()))
-                            self.logger.debug(f"✓ 图片已保存（原生下载）: {file_path.absolute()}")
-                            download_success = True
-                            
-                    except Exception as download_btn_error:
-                        self.logger.debug(f"下载按钮方式失败: {download_btn_error}")
+                    # 依次尝试下载按钮 / 图片 URL / 截图；原生下载沿用浏览器建议的文件名
+                    job = DownloadJob(
+                        container, save_path, f"image_{int(time.time())}_{matched_count}",
+                        default_ext='.jpg', keep_suggested_name=True, img_element=img_element,
+                    )
+                    file_path, method = await self.engine.save(job)
+                    file_path = await self._register_image(file_path, method)
+                    saved_files.append(str(file_path.absolute()))
                     
-                    # 方法2: 如果下载按钮失败，尝试直接下载图片 URL
-                    if not download_success:
-                        try:
-                            self.logger.debug(f"尝试直接下载图片 URL: {processed_url[:80]}...")
-                            
-                            # 使用 Playwright 的 request API 下载
-                            response = await self.page.request.get(processed_url)
-                            
-                            if response.ok:
-                                # 从 URL 获取文件扩展名
-                                parsed_url = urlparse(processed_url)
-                                ext = os.path.splitext(parsed_url.path)[1] or '.jpg'
-                                
-                                filename = f"image_{int(time.time())}_{matched_count}{ext}"
-                                file_path = save_path / filename
-                                
-                                content = await response.body()
-                                with open(file_path, 'wb') as f:
-                                    f.write(content)
-                                
-                                saved_files.append(str(file_path.absolute()))
-                                self.logger.debug(f"✓ 图片已保存（URL下载）: {file_path.absolute()}")
-                                download_success = True
-                            else:
-                                raise Exception(f"下载失败，状态码: {response.status}")
-                                
-                        except Exception as url_error:
-                            self.logger.debug(f"URL 下载失败: {url_error}")
-                    
-                    # 方法3: 如果都失败，使用截图作为兜底（清晰度较低）
-                    if not download_success:
-                        try:
-                            self.logger.debug("使用截图方式作为兜底...")
-                            filename = f"image_{int(time.time())}_{matched_count}.png"
-                            file_path = save_path / filename
-                            
-                            await img_element.screenshot(path=str(file_path))
-                            
-                            saved_files.append(str(file_path.absolute()))
-                            self.logger.debug(f"✓ 图片已保存（截图方式，清晰度较低）: {file_path.absolute()}")
-                        except Exception as screenshot_error:
-                            self.logger.error(f"截图方式也失败: {screenshot_error}")
-                            self.logger.error(f"所有下载方式都失败，跳过图片 {matched_count}")
-                            
+                except DuplicateImage:
+                    continue
                 except Exception as e:
                     self.logger.error(f"处理图片 {idx + 1} 时出错: {e}")
                     continue
             
+            await self._save_download_stats()
             self.logger.debug(f"共保存 {len(saved_files)} 张目标图片（匹配到 {matched_count} 张）")
             return saved_files
             
@@ -524,6 +441,87 @@ class ImageSaver:
             self.logger.error(f"保存图片失败: {e}")
             return saved_files
     
+    async def save_containers_parallel(
+        self, save_dir: str, names: Optional[List[Optional[str]]] = None,
+        concurrency: int = 4, skip_existing: bool = True,
+    ) -> List[str]:
+        """
+        并行保存页面上所有生成的图片容器（命名方式与 save_all_images_sequentially 一致）
+        
+        用于从已有对话中补收图片：目录中已存在同名图片（任意图片扩展名）时跳过。
+        调用前应先用 ImageHarvester 让所有容器的图片渲染完成。
+        
+        Args:
+            save_dir: 保存目录
+            names: 每个容器的文件名（不含扩展名，见 BatchReconciler.harvest_names）；
+                   为 None 时按容器顺序编号，某个容器对应 None 时跳过该容器（重试遗留的容器、额外的回复）
+            concurrency: 同时保存的图片数量
+            skip_existing: 是否跳过目录中已存在的文件名
+            
+        Returns:
+            List[str]: 按页面顺序排列的图片文件路径（包括跳过的已有文件；保存失败的容器不在其中）
+        """
+        save_path = Path(save_dir)
+        save_path.mkdir(parents=True, exist_ok=True)
+        
+        containers = await self.page.query_selector_all('.attachment-container.generated-images')
+        if not containers:
+            self.logger.warning("未找到生成的图片容器")
+            return []
+        
+        existing = {}
+        if skip_existing:
+            for path in save_path.iterdir():
+                if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
+                    existing[path.stem] = path
+        
+        if names is None:
+            names = [str(idx) for idx in range(1, len(containers) + 1)]
+        jobs = [(name, container) for name, container in zip(names, containers) if name is not None]
+        if len(jobs) < len(containers):
+            self.logger.info(f"跳过 {len(containers) - len(jobs)} 个不属于任何批次的图片容器")
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        skipped = 0
+        
+        async def save_one(name: str, container) -> Optional[Path]:
+            nonlocal skipped
+            if name in existing:
+                skipped += 1
+                return existing[name]
+            async with semaphore:
+                try:
+                    target_container = await self._resolve_target_container(container)
+                    file_path, method = await self.engine.save(DownloadJob(target_container, save_path, name))
+                    return await self._register_image(file_path, method)
+                except DuplicateImage:
+                    return None
+                except Exception as e:
+                    self.logger.error(f"处理图片容器 {name} 时出错: {e}")
+                    return None
+        
+        results = await asyncio.gather(*(save_one(name, c) for name, c in jobs))
+        await self._save_download_stats()
+        
+        saved_files = [str(path.absolute()) for path in results if path]
+        failed = [name for (name, _), path in zip(jobs, results) if not path]
+        self.logger.info(
+            f"共 {len(jobs)} 个图片容器：新保存 {len(saved_files) - skipped} 张，"
+            f"已存在跳过 {skipped} 张" + (f"，失败: {', '.join(failed)}" if failed else "")
+        )
+        return saved_files
+    
+    async def _resolve_target_container(self, container):
+        """返回容器内的子容器（generated-image），没有时返回容器本身"""
+        for sub_selector in ('generated-image', '.generated-image'):
+            try:
+                sub_container = await container.query_selector(sub_selector)
+                if sub_container:
+                    return sub_container
+            except Exception:
+                continue
+        return container
+    
     async def _find_download_button(self, container):
         """查找下载按钮"""
         from src.config.settings import SELECTORS
@@ -545,5 +543,5 @@ class ImageSaver:
         if img_src.startswith('//'):
             img_src = 'https:' + img_src
         elif img_src.startswith('/'):
-            img_src = 'https://gemini.google.com' + img_src
+            img_src = GEMINI_ORIGIN + img_src
         return img_src
\ No newline at end of file
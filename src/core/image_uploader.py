@@ -2,7 +2,6 @@
 图片上传模块
 """
 
-import asyncio
 import os
 from typing import List
 
@@ -10,6 +9,7 @@ from src.config.settings import SELECTORS, UPLOAD_TIMEOUT
 from src.utils.browser_utils import verify_upload
 from src.utils.file_utils import get_absolute_path
 from src.utils.logger import get_logger
+from src.utils.timing import fixed_sleep
 
 
 class ImageUploader:
@@ -56,7 +56,7 @@ class ImageUploader:
                     raise Exception("无法找到上传按钮")
                 
                 await upload_button.click()
-                await asyncio.sleep(1)
+                await fixed_sleep(1)
                 
                 # 步骤3: 点击 "Upload files" 选项
                 self.logger.debug("步骤3: 查找并点击 'Upload files' 选项...")
@@ -83,7 +83,7 @@ class ImageUploader:
             
             # 步骤5: 等待并验证上传
             self.logger.debug("步骤5: 验证上传结果...")
-            await asyncio.sleep(2)
+            await fixed_sleep(2)
             
             attachment_selectors = [
                 'img[src*="blob"]',
@@ -143,7 +143,7 @@ class ImageUploader:
                 raise Exception("无法找到上传按钮")
             
             await upload_button.click()
-            await asyncio.sleep(1)
+            await fixed_sleep(1)
             
             # 步骤2: 查找所有文件输入框(包括隐藏的)
             self.logger.debug("步骤2: 查找所有文件输入框...")
@@ -204,7 +204,7 @@ class ImageUploader:
                     self.logger.debug(f"  ✓ 文件已设置并触发事件")
                     
                     # 等待并验证上传
-                    await asyncio.sleep(2)
+                    await fixed_sleep(2)
                     attachment_selectors = [
                         'img[src*="blob"]',
                         'img[src*="data:image"]',
@@ -326,7 +326,7 @@ class ImageUploader:
             self.logger.debug("  ✓ 拖放事件已触发")
             
             # 步骤4: 验证上传
-            await asyncio.sleep(2)
+            await fixed_sleep(2)
             attachment_selectors = [
                 'img[src*="blob"]',
                 'img[src*="data:image"]',
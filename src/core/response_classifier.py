@@ -0,0 +1,157 @@
+"""
+模型回复分类模块
+
+Gemini 拒绝生成或出错时（"I can't create that image"、"Something went wrong"）不会出现图片容器，
+等待图片的轮询只能一直等到 RESPONSE_TIMEOUT。这里在每次轮询时读取最新一轮模型回复的文本，
+识别拒绝、出错和额度用尽，返回带类型的结果，调用方可以立即重试、换个说法或退避。
+
+误判会导致重复发送同一批次并消耗额度，所以只认已经结束、没有图片的一轮回复，
+并且整段回复必须是简短的提示语（以拒绝/出错/额度提示开头），正文中出现"上限"、"请重试"等词不算；
+同一段文本在连续两次轮询中保持不变后才判定，避免按仍在输出的半截回复分类。
+"""
+
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+from src.config.settings import SELECTORS
+from src.utils.logger import get_logger
+
+
+class ResponseOutcome(Enum):
+    """最新一轮模型回复的状态"""
+    PENDING = 'pending'  # 还没有回复，或仍在生成
+    IMAGES = 'images'  # 回复中有图片
+    TEXT = 'text'  # 只有文本（不是图片请求时的正常回复）
+    REFUSAL = 'refusal'  # 拒绝生成 → 换个说法重试
+    ERROR = 'error'  # 出错 → 稍后原样重试
+    QUOTA = 'quota'  # 额度用尽或请求过多 → 退避后重试
+    LOCAL_ERROR = 'local_error'  # 本地代码或读取页面时出错，不是模型的回复 → 不重新发送
+
+    @property
+    def is_failure(self) -> bool:
+        return self in (ResponseOutcome.REFUSAL, ResponseOutcome.ERROR, ResponseOutcome.QUOTA)
+
+
+# 超过该长度的回复视为正常文本，不是拒绝/出错/额度提示 (字符)
+_BANNER_MAX_CHARS = 200
+
+# 提示语开头可能带的客套话
+_APOLOGY = r"(?:(?:sorry|i'm sorry|i apologi[sz]e)[,.!]?\s*|(?:抱歉|对不起|很抱歉)[，,。！!]?\s*)?"
+
+# 按优先级匹配：额度 > 出错 > 拒绝（额度提示里常带 "try again later"）；都从回复开头匹配
+_PATTERNS = (
+    (ResponseOutcome.QUOTA, re.compile(
+        _APOLOGY
+        + r"(?:you(?:'ve|’ve| have) reached (?:your|the) (?:\w+ )*limit|too many requests"
+        r"|(?:今天|今日)?的?(?:图片)?生成次数已(?:达上限|用完)|请求过多)",
+        re.IGNORECASE,
+    )),
+    (ResponseOutcome.ERROR, re.compile(
+        _APOLOGY + r"(?:something went wrong|an error occurred|network error|出了点问题|发生错误)",
+        re.IGNORECASE,
+    )),
+    (ResponseOutcome.REFUSAL, re.compile(
+        _APOLOGY
+        + r"(?:i (?:can't|can’t|cannot|won't|won’t) (?:create|generate|make|help|draw|produce)"
+        r"|i(?:'m|’m| am) (?:unable|not able) to (?:create|generate|make|help|draw|produce)"
+        r"|i'm just a language model"
+        r"|我?(?:无法|不能)(?:生成|创建|绘制|制作)(?:这|该|此)?(?:张|幅|个)?(?:图片|图像|图))",
+        re.IGNORECASE,
+    )),
+)
+
+
+@dataclass
+class ResponseClassification:
+    """一次分类的结果"""
+    outcome: ResponseOutcome
+    text: str = ''
+    image_count: int = 0
+
+    @property
+    def summary(self) -> str:
+        """日志用的简短描述"""
+        text = ' '.join(self.text.split())
+        return f"{self.outcome.value}: {text[:80]}" if text else self.outcome.value
+
+
+def classify_response(text: str, image_count: int = 0, pending: bool = False) -> ResponseClassification:
+    """根据最新一轮回复的文本与图片数量分类（只看这一次读取的内容，稳定性由 ResponseClassifier 判断）
+
+    Args:
+        text: 回复文本
+        image_count: 回复中的图片数量
+        pending: 回复是否仍在生成
+
+    Returns:
+        ResponseClassification: 分类结果
+    """
+    text = text or ''
+    if image_count > 0:
+        return ResponseClassification(ResponseOutcome.IMAGES, text, image_count)
+    if pending:
+        return ResponseClassification(ResponseOutcome.PENDING, text)
+    banner = ' '.join(text.split())
+    if not banner:
+        return ResponseClassification(ResponseOutcome.PENDING, text)
+    if len(banner) <= _BANNER_MAX_CHARS:
+        for outcome, pattern in _PATTERNS:
+            if pattern.match(banner):
+                return ResponseClassification(outcome, text)
+    return ResponseClassification(ResponseOutcome.TEXT, text)
+
+
+# 在一次页面调用中读取最新一轮模型回复：只认最后一条用户消息之后的回复，避免把上一轮的结果当成这一轮
+_LATEST_RESPONSE_SCRIPT = """
+({responseSelector, querySelector}) => {
+  const responses = document.querySelectorAll(responseSelector);
+  const latest = responses[responses.length - 1];
+  if (!latest) return null;
+  const queries = document.querySelectorAll(querySelector);
+  const lastQuery = queries[queries.length - 1];
+  if (lastQuery && !(lastQuery.compareDocumentPosition(latest) & Node.DOCUMENT_POSITION_FOLLOWING)) return null;
+  return {
+    text: latest.innerText || '',
+    imageCount: latest.querySelectorAll('.generated-images img[src], generated-image img[src]').length,
+    pending: latest.classList.contains('pending') || !!latest.querySelector('.loader, [role="progressbar"]'),
+  };
+}
+"""
+
+
+class ResponseClassifier:
+    """读取页面上最新一轮模型回复并分类
+
+    每个实例对应一次等待（一轮回复）：拒绝/出错/额度用尽只有在上一次轮询读到的文本与这一次相同时才返回，
+    否则返回 PENDING 并记下文本。
+    """
+
+    def __init__(self, page, session_id: Optional[str] = None):
+        self.page = page
+        self.logger = get_logger(session_id)
+        self._last_failure_text: Optional[str] = None
+
+    async def classify_latest(self) -> ResponseClassification:
+        """分类最新一轮模型回复（读取失败时视为仍在等待）"""
+        try:
+            latest = await self.page.evaluate(_LATEST_RESPONSE_SCRIPT, {
+                'responseSelector': ', '.join(SELECTORS["model_response"]),
+                'querySelector': ', '.join(SELECTORS["user_query"]),
+            })
+        except Exception as e:
+            self.logger.debug(f"读取最新回复失败: {e}")
+            return ResponseClassification(ResponseOutcome.PENDING)
+        if not latest:
+            self._last_failure_text = None
+            return ResponseClassification(ResponseOutcome.PENDING)
+        response = classify_response(latest['text'], latest['imageCount'], latest['pending'])
+        if not response.outcome.is_failure:
+            self._last_failure_text = None
+            return response
+        if response.text != self._last_failure_text:
+            # 第一次读到这段文本：回复可能还在输出，下一次轮询文本不变时再判定
+            self._last_failure_text = response.text
+            return ResponseClassification(ResponseOutcome.PENDING, response.text)
+        return response
@@ -0,0 +1 @@
+# 模拟服务模块
\ No newline at end of file
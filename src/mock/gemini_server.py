@@ -0,0 +1,451 @@
+"""
+本地模拟 Gemini 服务
+
+复现 settings.SELECTORS 依赖的页面结构（输入框、发送按钮、Tools / Create Images 菜单、
+上传菜单、生成图片容器、复制表格与下载按钮），用于在没有登录 Chrome 的情况下
+离线跑通端到端流程、做压测和基准测试。
+
+支持按计划注入生产环境中常见的故障（渲染缓慢、懒加载、缺少下载按钮、拒绝生成、
+请求出错、CDP 连接断开），并记录事件日志，用于度量各条恢复路径的耗时与浪费。
+
+使用方法:
+    python -m src.mock.gemini_server --port 8765 --image-latency 2
+
+    # 第 2 次生图请求渲染缓慢，第 3 次图片懒加载
+    python -m src.mock.gemini_server --faults slow_render:2,lazy_render:3
+
+    # 让工作流使用模拟服务
+    export AUTO_MANGA_GEMINI_URL=http://127.0.0.1:8765/app
+"""
+
+import argparse
+import asyncio
+import io
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from aiohttp import web
+
+
+PAGE_TEMPLATE_PATH = Path(__file__).parent / "gemini_page.html"
+
+# 第一批次提示词中的 P1-P4 这类宫格范围
+PANEL_RANGE_PATTERN = re.compile(r'P(\d+)\s*-\s*P(\d+)')
+
+# 可注入的故障类型
+# - slow_render: 图片生成延迟乘以 slow_render_factor
+# - lazy_render: 图片进入视口后才加载（刷新页面后恢复正常渲染）
+# - no_download_button: 图片不显示下载按钮
+# - refusal: 返回拒绝生成的文本回复，没有图片
+# - error: 请求失败，页面显示错误提示
+# - cdp_drop: 服务端照常回复，由基准测试在故障触发时断开 CDP 连接
+FAULT_KINDS = ('slow_render', 'lazy_render', 'no_download_button', 'refusal', 'error', 'cdp_drop')
+
+REFUSAL_TEXT = "I can't create that image. Try asking for something else."
+
+
+def parse_fault_schedule(spec: str) -> Dict[int, List[str]]:
+    """解析故障计划
+
+    格式为逗号分隔的 kind:N，N 是同一对话中第几次生图请求（从 1 开始），
+    例如 "slow_render:2,refusal:3"。同一次请求可以叠加多个故障。
+
+    Args:
+        spec: 故障计划字符串
+
+    Returns:
+        dict: {生图请求序号: [故障类型, ...]}
+
+    Raises:
+        ValueError: 格式错误或故障类型未知
+    """
+    schedule: Dict[int, List[str]] = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        kind, _, turn = item.partition(':')
+        if kind not in FAULT_KINDS:
+            raise ValueError(f"未知的故障类型: {kind}（可选: {', '.join(FAULT_KINDS)}）")
+        if not turn.isdigit() or int(turn) < 1:
+            raise ValueError(f"故障计划格式应为 kind:N（N 从 1 开始）: {item}")
+        schedule.setdefault(int(turn), []).append(kind)
+    return schedule
+
+
+@dataclass
+class MockGeminiConfig:
+    """模拟服务配置"""
+    # 文本响应（脚本表格）延迟（秒）
+    text_latency: float = 1.0
+    # 图片生成延迟（秒）
+    image_latency: float = 3.0
+    # 延迟随机抖动比例（0.2 表示 ±20%）
+    latency_jitter: float = 0.0
+    # 生成图片尺寸与格式
+    image_width: int = 1024
+    image_height: int = 1536
+    image_format: str = "png"
+    # 每次生成的图片数量
+    images_per_turn: int = 1
+    # 脚本表格的宫格数
+    panels: int = 8
+    # 随机数种子（影响抖动）
+    seed: Optional[int] = None
+    # 故障计划：{生图请求序号: [故障类型, ...]}，见 parse_fault_schedule
+    faults: Dict[int, List[str]] = field(default_factory=dict)
+    # slow_render 故障的延迟倍数
+    slow_render_factor: float = 10.0
+
+
+@dataclass
+class MockTurn:
+    """一轮对话"""
+    prompt: str
+    model: dict
+    created_at: float = field(default_factory=time.time)
+
+
+class MockGeminiState:
+    """模拟服务的会话状态与统计"""
+
+    def __init__(self, config: MockGeminiConfig):
+        self.config = config
+        self.chats: Dict[str, List[MockTurn]] = {}
+        self.random = random.Random(config.seed)
+        self._image_cache: Dict[tuple, bytes] = {}
+        self._image_requests: Dict[str, int] = {}
+        self._started = time.monotonic()
+        self.stats = {
+            'pages_served': 0,
+            'text_turns': 0,
+            'image_turns': 0,
+            'images_served': 0,
+            'image_bytes_served': 0,
+            'faults_injected': 0,
+        }
+        # 事件日志：页面加载、发送、图片请求、故障注入
+        self.events: List[dict] = []
+        # 故障触发时的回调 listener(kind, chat_id, turn_index)，供基准测试执行服务端做不到的故障（如断开 CDP）
+        self.fault_listeners: List[Callable[[str, str, int], None]] = []
+
+    def log_event(self, event: str, chat_id: Optional[str], **fields):
+        """记录一条事件（时间为服务启动后的秒数）"""
+        self.events.append({
+            'time': round(time.monotonic() - self._started, 3),
+            'event': event,
+            'chat_id': chat_id,
+            **fields,
+        })
+
+    def next_faults(self, chat_id: str, turn_index: int) -> List[str]:
+        """登记一次生图请求，返回按计划需要注入的故障"""
+        count = self._image_requests.get(chat_id, 0) + 1
+        self._image_requests[chat_id] = count
+        faults = self.config.faults.get(count, [])
+        for kind in faults:
+            self.stats['faults_injected'] += 1
+            self.log_event('fault', chat_id, turn=turn_index, fault=kind, image_request=count)
+            for listener in self.fault_listeners:
+                listener(kind, chat_id, turn_index)
+        return faults
+
+    def latency(self, base: float) -> float:
+        """按配置的抖动计算一次延迟"""
+        if self.config.latency_jitter <= 0:
+            return base
+        spread = base * self.config.latency_jitter
+        return max(0.0, base + self.random.uniform(-spread, spread))
+
+    def image_bytes(self, chat_id: str, turn_index: int, image_index: int) -> bytes:
+        """生成（或从缓存读取）一张 2x2 宫格图片"""
+        key = (chat_id, turn_index, image_index)
+        if key not in self._image_cache:
+            self._image_cache[key] = render_grid_image(
+                self.config.image_width,
+                self.config.image_height,
+                self.config.image_format,
+                label=f"{turn_index + 1}",
+                hue=(turn_index * 47 + image_index * 13) % 360,
+            )
+        return self._image_cache[key]
+
+
+def render_grid_image(width: int, height: int, image_format: str, label: str = "", hue: int = 0) -> bytes:
+    """绘制一张带白色间隔的 2x2 宫格图片
+
+    Args:
+        width: 图片宽度
+        height: 图片高度
+        image_format: png 或 jpeg
+        label: 绘制在每个格子里的文字
+        hue: 格子底色色相（0-359）
+
+    Returns:
+        bytes: 编码后的图片数据
+    """
+    from PIL import Image, ImageDraw
+
+    gutter = max(width // 64, 4)
+    image = Image.new('RGB', (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    cell_w = (width - gutter * 3) // 2
+    cell_h = (height - gutter * 3) // 2
+    for row in range(2):
+        for col in range(2):
+            x0 = gutter + col * (cell_w + gutter)
+            y0 = gutter + row * (cell_h + gutter)
+            shade = (hue + (row * 2 + col) * 20) % 360
+            color = _hue_to_rgb(shade)
+            draw.rectangle([x0, y0, x0 + cell_w - 1, y0 + cell_h - 1], fill=color, outline=(0, 0, 0), width=3)
+            draw.text((x0 + 16, y0 + 16), f"{label}-{row * 2 + col + 1}", fill=(0, 0, 0))
+
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG' if image_format.lower() in ('jpg', 'jpeg') else 'PNG')
+    return buffer.getvalue()
+
+
+def _hue_to_rgb(hue: int) -> tuple:
+    """色相转换为柔和的 RGB 颜色"""
+    import colorsys
+    r, g, b = colorsys.hsv_to_rgb(hue / 360.0, 0.35, 0.95)
+    return int(r * 255), int(g * 255), int(b * 255)
+
+
+def build_script_table(panels: int) -> str:
+    """生成一份宫格数为 panels 的脚本表格（与复制表格按钮的内容一致）"""
+    lines = ["| 格数 | 画面描述 | 台词/旁白 |"]
+    for index in range(1, panels + 1):
+        lines.append(f"| {index} | 第 {index} 格画面：机器人与猫的日常。 | 猫：这是第 {index} 句台词。 |")
+    return "\n".join(lines)
+
+
+class MockGeminiHandlers:
+    """HTTP 请求处理"""
+
+    def __init__(self, state: MockGeminiState):
+        self.state = state
+        self.page_html = PAGE_TEMPLATE_PATH.read_text(encoding='utf-8')
+
+    async def page(self, request: web.Request) -> web.Response:
+        self.state.stats['pages_served'] += 1
+        self.state.log_event('page', request.match_info.get('chat_id'))
+        return web.Response(text=self.page_html, content_type='text/html')
+
+    async def send(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        chat_id = payload.get('chat_id') or uuid.uuid4().hex[:12]
+        turns = self.state.chats.setdefault(chat_id, [])
+        text = payload.get('text', '')
+        turn_index = len(turns)
+        mode = payload.get('mode', 'text')
+        self.state.log_event('send', chat_id, turn=turn_index, mode=mode)
+
+        model = await self.build_model_turn(
+            chat_id,
+            turn_index,
+            text,
+            mode,
+            int(payload.get('attachments') or 0),
+        )
+        # 懒加载只影响当次渲染，刷新页面后从历史记录正常渲染
+        turns.append(MockTurn(prompt=text, model={k: v for k, v in model.items() if k != 'lazy'}))
+        return web.json_response({'chat_id': chat_id, 'turn': turn_index, 'model': model})
+
+    async def build_model_turn(self, chat_id: str, turn_index: int, text: str, mode: str, attachments: int) -> dict:
+        """根据提示词与模式构造模型回复"""
+        config = self.state.config
+        wants_images = mode == 'images' and (attachments > 0 or PANEL_RANGE_PATTERN.search(text))
+
+        if not wants_images:
+            await asyncio.sleep(self.state.latency(config.text_latency))
+            self.state.stats['text_turns'] += 1
+            if mode == 'images':
+                return {'kind': 'text', 'text': '好的。'}
+            return {
+                'kind': 'table',
+                'intro': '核心比喻：把这个概念比作一场荒诞的厨房实验。',
+                'text': build_script_table(config.panels),
+            }
+
+        faults = self.state.next_faults(chat_id, turn_index)
+        if 'error' in faults:
+            await asyncio.sleep(self.state.latency(config.text_latency))
+            raise web.HTTPInternalServerError(text='mock fault: error')
+        if 'refusal' in faults:
+            await asyncio.sleep(self.state.latency(config.text_latency))
+            self.state.stats['text_turns'] += 1
+            return {'kind': 'text', 'text': REFUSAL_TEXT}
+
+        latency = self.state.latency(config.image_latency)
+        if 'slow_render' in faults:
+            latency *= config.slow_render_factor
+        await asyncio.sleep(latency)
+        self.state.stats['image_turns'] += 1
+        ext = 'jpg' if config.image_format.lower() in ('jpg', 'jpeg') else 'png'
+        images = []
+        for image_index in range(config.images_per_turn):
+            image = {
+                'url': f"/mock/images/{chat_id}/{turn_index}/{image_index}.{ext}",
+                'filename': f"Gemini_Generated_Image_{chat_id}_{turn_index}_{image_index}.{ext}",
+            }
+            if 'no_download_button' in faults:
+                image['download'] = False
+            images.append(image)
+        model = {'kind': 'images', 'text': '这是生成的图片。', 'images': images}
+        if 'lazy_render' in faults:
+            model['lazy'] = True
+        return model
+
+    async def chat(self, request: web.Request) -> web.Response:
+        chat_id = request.match_info['chat_id']
+        turns = self.state.chats.get(chat_id)
+        if turns is None:
+            raise web.HTTPNotFound()
+        return web.json_response({
+            'chat_id': chat_id,
+            'turns': [{'prompt': turn.prompt, 'model': turn.model} for turn in turns],
+        })
+
+    async def image(self, request: web.Request) -> web.Response:
+        chat_id = request.match_info['chat_id']
+        turn_index = int(request.match_info['turn'])
+        image_index = int(request.match_info['index'])
+        if chat_id not in self.state.chats:
+            raise web.HTTPNotFound()
+        ext = request.match_info['ext']
+        body = self.state.image_bytes(chat_id, turn_index, image_index)
+        self.state.stats['images_served'] += 1
+        self.state.stats['image_bytes_served'] += len(body)
+        self.state.log_event('image', chat_id, turn=turn_index, download='download' in request.query)
+        headers = {}
+        if 'download' in request.query:
+            headers['Content-Disposition'] = (
+                f'attachment; filename="Gemini_Generated_Image_{chat_id}_{turn_index}_{image_index}.{ext}"'
+            )
+        content_type = 'image/jpeg' if ext == 'jpg' else 'image/png'
+        return web.Response(body=body, content_type=content_type, headers=headers)
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.state.stats)
+
+    async def events(self, request: web.Request) -> web.Response:
+        return web.json_response(self.state.events)
+
+
+STATE_KEY = web.AppKey('state', MockGeminiState)
+
+
+def create_app(config: MockGeminiConfig = None) -> web.Application:
+    """创建模拟服务的 aiohttp 应用
+
+    Args:
+        config: 模拟服务配置，None 时使用默认配置
+
+    Returns:
+        web.Application: aiohttp 应用，状态保存在 app[STATE_KEY]
+    """
+    state = MockGeminiState(config or MockGeminiConfig())
+    handlers = MockGeminiHandlers(state)
+
+    app = web.Application()
+    app[STATE_KEY] = state
+    app.router.add_get('/app', handlers.page)
+    app.router.add_get('/app/{chat_id}', handlers.page)
+    app.router.add_post('/mock/api/send', handlers.send)
+    app.router.add_get('/mock/api/chats/{chat_id}', handlers.chat)
+    app.router.add_get('/mock/api/stats', handlers.stats)
+    app.router.add_get('/mock/api/events', handlers.events)
+    app.router.add_get('/mock/images/{chat_id}/{turn}/{index}.{ext}', handlers.image)
+    return app
+
+
+class MockGeminiServer:
+    """在当前事件循环中运行的模拟服务（供测试与基准测试使用）"""
+
+    def __init__(self, config: MockGeminiConfig = None, host: str = '127.0.0.1', port: int = 0):
+        self.app = create_app(config)
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def state(self) -> MockGeminiState:
+        return self.app[STATE_KEY]
+
+    @property
+    def url(self) -> str:
+        """模拟 Gemini 首页地址（对应 settings.GEMINI_URL）"""
+        return f"http://{self.host}:{self.port}/app"
+
+    async def start(self) -> str:
+        """启动服务，返回首页地址"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        if self.port == 0:
+            self.port = site._server.sockets[0].getsockname()[1]
+        return self.url
+
+    async def stop(self):
+        """停止服务"""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def parse_size(value: str) -> tuple:
+    """解析 WIDTHxHEIGHT 格式的尺寸"""
+    match = re.fullmatch(r'(\d+)[xX](\d+)', value)
+    if not match:
+        raise argparse.ArgumentTypeError("尺寸格式应为 WIDTHxHEIGHT，例如 1024x1536")
+    return int(match.group(1)), int(match.group(2))
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='本地模拟 Gemini 服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认: 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口（默认: 8765）')
+    parser.add_argument('--text-latency', type=float, default=1.0, help='文本响应延迟，秒（默认: 1.0）')
+    parser.add_argument('--image-latency', type=float, default=3.0, help='图片生成延迟，秒（默认: 3.0）')
+    parser.add_argument('--jitter', type=float, default=0.0, help='延迟抖动比例，例如 0.2 表示 ±20%%')
+    parser.add_argument('--image-size', type=parse_size, default=(1024, 1536), metavar='WxH',
+                        help='生成图片尺寸（默认: 1024x1536）')
+    parser.add_argument('--image-format', choices=['png', 'jpeg'], default='png', help='生成图片格式')
+    parser.add_argument('--images-per-turn', type=int, default=1, help='每次生成的图片数量（默认: 1）')
+    parser.add_argument('--panels', type=int, default=8, help='脚本表格的宫格数（默认: 8）')
+    parser.add_argument('--seed', type=int, default=None, help='随机数种子')
+    parser.add_argument('--faults', type=str, default='',
+                        help=f"故障计划，例如 slow_render:2,refusal:3（可选: {', '.join(FAULT_KINDS)}）")
+    parser.add_argument('--slow-factor', type=float, default=10.0, help='slow_render 故障的延迟倍数（默认: 10）')
+    args = parser.parse_args()
+
+    try:
+        faults = parse_fault_schedule(args.faults)
+    except ValueError as e:
+        parser.error(str(e))
+
+    config = MockGeminiConfig(
+        text_latency=args.text_latency,
+        image_latency=args.image_latency,
+        latency_jitter=args.jitter,
+        image_width=args.image_size[0],
+        image_height=args.image_size[1],
+        image_format=args.image_format,
+        images_per_turn=args.images_per_turn,
+        panels=args.panels,
+        seed=args.seed,
+        faults=faults,
+        slow_render_factor=args.slow_factor,
+    )
+    print(f"模拟 Gemini 服务: http://{args.host}:{args.port}/app")
+    print(f"使用方法: export AUTO_MANGA_GEMINI_URL=http://{args.host}:{args.port}/app")
+    web.run_app(create_app(config), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# 后期处理模块（宫格切分等，只依赖 Pillow/NumPy，不加载浏览器相关模块）
@@ -0,0 +1,220 @@
+"""
+宫格切分模块
+
+Gemini 每个批次返回一张 4 宫格拼图（见 batch_reconciler），排版前需要把它切成单独的宫格。
+这里用 NumPy 计算每一行/列像素的均值与标准差：接近纯白或纯黑、且几乎没有变化的行/列视为分隔带，
+先按整行分隔带切出横条，再在每个横条内按列分隔带切出宫格（XY-cut），不要求宫格等大。
+
+切出的宫格按全局编号命名（P1…P32）：主题目录中的 "1.png"、"2.png" 是按批次编号保存的，
+第 n 批的第一个宫格为 P(4n-3)，同一张图内按从上到下、从左到右的阅读顺序编号。
+没有检测到分隔带的拼图不切分（记录为未切分，原图留在主题目录），不把整张图当作一个宫格输出。
+多张图片在进程池中并行切分。切分时同时计算每个宫格的感知哈希，近似重复的宫格（如两个批次画了同一格）会给出警告。
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from src.core.batch_reconciler import BatchRange, plan_batches
+from src.utils.file_utils import AtomicWriter, dedupe_image_stems, get_image_files
+from src.utils.logger import get_logger
+from src.utils.perceptual_hash import PerceptualIndex, dhash, phash
+
+
+PANELS_DIRNAME = "panels"
+
+# 分隔带判定：行/列的灰度标准差低于 GUTTER_MAX_STD，且均值离纯白或纯黑不超过 GUTTER_TOLERANCE
+GUTTER_MAX_STD = 10.0
+GUTTER_TOLERANCE = 40.0
+# 比这更窄的分隔带不切（占边长的比例），比这更小的片段并入相邻片段
+MIN_GUTTER_RATIO = 0.004
+MIN_PANEL_RATIO = 0.12
+
+
+@dataclass
+class SliceResult:
+    """一张拼图的切分结果"""
+    source: str
+    panels: List[str] = field(default_factory=list)  # 输出文件路径（按宫格编号顺序）
+    hashes: List[Tuple[str, str]] = field(default_factory=list)  # 每个宫格的 (dHash, pHash)
+    detected: int = 0  # 检测到的宫格数量
+    expected: int = 0  # 该批次应有的宫格数量
+    unsliced: bool = False  # 没有检测到分隔带，未输出任何宫格
+    error: Optional[str] = None
+
+
+def _gutter_mask(gray: np.ndarray, axis: int, max_std: float, tolerance: float) -> np.ndarray:
+    """沿 axis 求每一行（axis=1）或每一列（axis=0）是否为分隔带"""
+    mean = gray.mean(axis=axis)
+    std = gray.std(axis=axis)
+    extreme = (mean >= 255.0 - tolerance) | (mean <= tolerance)
+    return (std <= max_std) & extreme
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """mask 中连续 True 片段的 [start, end) 列表"""
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return list(zip(edges[0::2].tolist(), edges[1::2].tolist()))
+
+
+def split_segments(gutter: np.ndarray, min_gutter: int, min_panel: int) -> List[Tuple[int, int]]:
+    """把一维分隔带标记切成内容片段 [start, end)
+
+    去掉两端的边框；短于 min_gutter 的分隔带不切；短于 min_panel 的片段并入间隔较小的相邻片段。
+    """
+    gutter = gutter.copy()
+    length = len(gutter)
+    for start, end in _runs(gutter):
+        if end - start < min_gutter and start > 0 and end < length:
+            gutter[start:end] = False
+    segments = _runs(~gutter)
+    while len(segments) > 1:
+        sizes = [end - start for start, end in segments]
+        smallest = int(np.argmin(sizes))
+        if sizes[smallest] >= min_panel:
+            break
+        if smallest == 0:
+            neighbour = 1
+        elif smallest == len(segments) - 1:
+            neighbour = smallest - 1
+        else:
+            gap_before = segments[smallest][0] - segments[smallest - 1][1]
+            gap_after = segments[smallest + 1][0] - segments[smallest][1]
+            neighbour = smallest - 1 if gap_before <= gap_after else smallest + 1
+        first, second = sorted((smallest, neighbour))
+        segments[first:second + 1] = [(segments[first][0], segments[second][1])]
+    return segments or [(0, length)]
+
+
+def detect_panels(
+    image: Image.Image,
+    max_std: float = GUTTER_MAX_STD,
+    tolerance: float = GUTTER_TOLERANCE,
+) -> List[Tuple[int, int, int, int]]:
+    """检测宫格，返回按阅读顺序排列的 (left, top, right, bottom)"""
+    gray = np.asarray(image.convert('L'), dtype=np.float32)
+    height, width = gray.shape
+    boxes = []
+    row_segments = split_segments(
+        _gutter_mask(gray, 1, max_std, tolerance),
+        max(1, int(height * MIN_GUTTER_RATIO)), int(height * MIN_PANEL_RATIO),
+    )
+    for top, bottom in row_segments:
+        band = gray[top:bottom]
+        column_segments = split_segments(
+            _gutter_mask(band, 0, max_std, tolerance),
+            max(1, int(width * MIN_GUTTER_RATIO)), int(width * MIN_PANEL_RATIO),
+        )
+        for left, right in column_segments:
+            # 去掉宫格内残留的上下边框（该列范围内的整行分隔带）
+            inner = split_segments(
+                _gutter_mask(band[:, left:right], 1, max_std, tolerance),
+                bottom - top, 0,
+            )
+            boxes.append((left, top + inner[0][0], right, top + inner[-1][1]))
+    return boxes
+
+
+def batch_for_image(filepath: Union[str, Path], batches: List[BatchRange]) -> Optional[BatchRange]:
+    """按文件名中的批次编号（"3.png" → 第 3 批）找到对应批次，不是批次图片时返回 None"""
+    stem = Path(filepath).stem
+    if not stem.isdigit():
+        return None
+    index = int(stem) - 1
+    return batches[index] if 0 <= index < len(batches) else None
+
+
+def slice_image_file(source: str, output_dir: str, start_panel: int, expected: int) -> SliceResult:
+    """切分一张拼图并保存为 P{n}.png（在子进程中执行）"""
+    result = SliceResult(source=source, expected=expected)
+    try:
+        with Image.open(source) as image:
+            image.load()
+            boxes = detect_panels(image)
+            result.detected = len(boxes)
+            if len(boxes) == 1 and expected > 1:
+                result.unsliced = True
+                return result
+            for offset, box in enumerate(boxes[:expected]):
+                target = Path(output_dir) / f"P{start_panel + offset}.png"
+                panel = image.crop(box)
+                with AtomicWriter(target) as f:
+                    panel.save(f, format='PNG')
+                result.panels.append(str(target))
+                gray = panel.convert('L')
+                result.hashes.append((f"{dhash(gray):016x}", f"{phash(gray):016x}"))
+    except Exception as e:
+        result.error = str(e)
+    return result
+
+
+def slice_theme_images(
+    theme_dir: Union[str, Path],
+    panel_count: int,
+    output_dir: Union[str, Path] = None,
+    workers: Optional[int] = None,
+    session_id: Optional[str] = None,
+) -> Dict[int, str]:
+    """切分主题目录中按批次编号保存的所有拼图
+
+    Args:
+        theme_dir: 主题目录
+        panel_count: 宫格总数（用于划分批次）
+        output_dir: 输出目录，默认为 theme_dir/panels
+        workers: 进程数，默认为 CPU 核数；为 1 时在当前进程中执行
+        session_id: 会话ID（用于日志）
+
+    Returns:
+        Dict[int, str]: {宫格编号: 文件路径}
+    """
+    logger = get_logger(session_id)
+    batches = plan_batches(panel_count)
+    output_dir = Path(output_dir) if output_dir else Path(theme_dir) / PANELS_DIRNAME
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = []
+    for filepath in dedupe_image_stems(get_image_files(str(theme_dir))):
+        batch = batch_for_image(filepath, batches)
+        if batch is not None:
+            jobs.append((filepath, str(output_dir), batch.start_panel, batch.end_panel - batch.start_panel + 1))
+    if not jobs:
+        logger.warning(f"{theme_dir} 中没有按批次编号保存的图片，跳过宫格切分")
+        return {}
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    if workers == 1:
+        results = [slice_image_file(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(slice_image_file, *zip(*jobs)))
+
+    panels = {}
+    hashes = []
+    for (_, _, start_panel, _), result in zip(jobs, results):
+        name = Path(result.source).name
+        if result.error:
+            logger.warning(f"宫格切分失败 {name}: {result.error}")
+            continue
+        if result.unsliced:
+            logger.warning(f"{name} 没有检测到分隔带，未切分（原图保留在主题目录）")
+            continue
+        if result.detected != result.expected:
+            logger.warning(f"{name} 检测到 {result.detected} 个宫格，应有 {result.expected} 个")
+        for offset, path in enumerate(result.panels):
+            panels[start_panel + offset] = path
+        hashes.extend((f"P{start_panel + offset}", *pair) for offset, pair in enumerate(result.hashes))
+
+    for first, second in PerceptualIndex(hashes).duplicate_pairs():
+        logger.warning(f"宫格 {second} 与 {first} 近似重复（感知哈希）")
+
+    missing = [n for n in range(1, panel_count + 1) if n not in panels]
+    if missing:
+        logger.warning(f"以下宫格没有切分结果: {', '.join(f'P{n}' for n in missing)}")
+    logger.info(f"✓ 宫格切分完成: {len(panels)}/{panel_count} 个宫格 -> {output_dir}")
+    return panels
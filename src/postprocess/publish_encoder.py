@@ -0,0 +1,295 @@
+"""
+发布编码模块
+
+面向手机阅读的发布版本：每张图片输出 JPEG 和 WebP（Pillow 支持时再加 AVIF），
+每种格式单独二分查找编码质量：
+- 设置了目标感知质量（PUBLISH_TARGET_SSIM）时，取达到目标 SSIM 的最低质量
+- 设置了体积上限（PUBLISH_MAX_BYTES）时，质量不超过体积上限允许的最高值（即使更低的 SSIM 也以体积为准）
+
+多张图片在进程池中并行编码。编码结果按"源文件内容哈希 + 编码参数"缓存在 PUBLISH_CACHE_DIR，
+源图片和参数不变时再次发布直接复用缓存结果（以硬链接放到 publish/，不再多占一份空间）。
+"""
+
+import hashlib
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from src.config.settings import (
+    PUBLISH_CACHE_DIR,
+    PUBLISH_FORMATS,
+    PUBLISH_MAX_BYTES,
+    PUBLISH_QUALITY_RANGE,
+    PUBLISH_TARGET_SSIM,
+)
+from src.utils.file_utils import AtomicWriter, atomic_write_text, link_or_copy
+from src.utils.image_utils import inspect_image_file
+from src.utils.logger import get_logger
+
+
+PUBLISH_DIRNAME = "publish"
+CACHE_INDEX_FILENAME = "index.json"
+# 编码逻辑变化时递增，使旧的缓存结果失效
+ENCODER_VERSION = 1
+
+_FORMAT_EXTS = {'jpeg': '.jpg', 'webp': '.webp', 'avif': '.avif'}
+_SAVE_OPTIONS = {
+    'jpeg': {'format': 'JPEG', 'optimize': True, 'progressive': True},
+    'webp': {'format': 'WEBP', 'method': 4},
+    'avif': {'format': 'AVIF'},
+}
+
+
+def available_formats(formats: Sequence[str] = PUBLISH_FORMATS) -> List[str]:
+    """过滤出当前 Pillow 能编码的格式（AVIF 需要 Pillow 11.2+ 或 pillow-avif-plugin）"""
+    Image.init()
+    return [fmt for fmt in formats if fmt in _SAVE_OPTIONS and _SAVE_OPTIONS[fmt]['format'] in Image.SAVE]
+
+
+def block_ssim(reference: np.ndarray, candidate: np.ndarray, block: int = 8) -> float:
+    """按 block x block 的不重叠块计算亮度 SSIM 的均值（向量化实现）"""
+    height = (reference.shape[0] // block) * block
+    width = (reference.shape[1] // block) * block
+    if not height or not width:
+        return 1.0 if np.array_equal(reference, candidate) else 0.0
+    shape = (height // block, block, width // block, block)
+    a = reference[:height, :width].reshape(shape)
+    b = candidate[:height, :width].reshape(shape)
+    mu_a = a.mean(axis=(1, 3))
+    mu_b = b.mean(axis=(1, 3))
+    var_a = (a * a).mean(axis=(1, 3)) - mu_a ** 2
+    var_b = (b * b).mean(axis=(1, 3)) - mu_b ** 2
+    cov = (a * b).mean(axis=(1, 3)) - mu_a * mu_b
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    ssim = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(ssim.mean())
+
+
+def _luma(image: Image.Image) -> np.ndarray:
+    return np.asarray(image.convert('L'), dtype=np.float32)
+
+
+def _search(lo: int, hi: int, ok) -> Optional[int]:
+    """在 [lo, hi] 中二分查找使 ok(q) 为真的最小质量（ok 随质量单调），都不满足时返回 None"""
+    found = None
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        if ok(mid):
+            found, hi = mid, mid - 1
+        else:
+            lo = mid + 1
+    return found
+
+
+@dataclass
+class EncodedImage:
+    """一种格式的编码结果"""
+    source: str
+    format: str
+    path: str = ''
+    quality: int = 0
+    bytes: int = 0
+    ssim: Optional[float] = None  # 未设置目标 SSIM 时不计算
+    over_budget: bool = False  # 最低质量仍超过体积上限
+    cached: bool = False
+
+
+def encode_image(
+    image: Image.Image,
+    fmt: str,
+    max_bytes: Optional[int] = PUBLISH_MAX_BYTES,
+    target_ssim: Optional[float] = PUBLISH_TARGET_SSIM,
+    quality_range: Tuple[int, int] = PUBLISH_QUALITY_RANGE,
+) -> Tuple[bytes, dict]:
+    """把一张 RGB 图片编码为 fmt，按目标 SSIM 和体积上限选择质量
+
+    Returns:
+        Tuple[bytes, dict]: (编码结果, {quality, bytes, ssim, over_budget})
+    """
+    lo, hi = quality_range
+    reference = _luma(image) if target_ssim else None
+    encoded: Dict[int, bytes] = {}
+    scores: Dict[int, float] = {}
+
+    def encode(quality: int) -> bytes:
+        if quality not in encoded:
+            buffer = io.BytesIO()
+            image.save(buffer, quality=quality, **_SAVE_OPTIONS[fmt])
+            encoded[quality] = buffer.getvalue()
+        return encoded[quality]
+
+    def score(quality: int) -> float:
+        if quality not in scores:
+            with Image.open(io.BytesIO(encode(quality))) as decoded:
+                scores[quality] = block_ssim(reference, _luma(decoded))
+        return scores[quality]
+
+    quality = hi
+    if target_ssim:
+        quality = _search(lo, hi, lambda q: score(q) >= target_ssim) or hi
+    over_budget = False
+    if max_bytes and len(encode(quality)) > max_bytes:
+        # 体积超限：取不超过上限的最高质量（体积随质量单调，查找"超限"的最低质量再减一）
+        first_over = _search(lo, quality, lambda q: len(encode(q)) > max_bytes)
+        quality = max(lo, first_over - 1)
+        over_budget = len(encode(quality)) > max_bytes
+
+    data = encode(quality)
+    return data, {
+        'quality': quality,
+        'bytes': len(data),
+        'ssim': round(score(quality), 4) if target_ssim else None,
+        'over_budget': over_budget,
+    }
+
+
+def _load_rgb(source: str) -> Image.Image:
+    """解码图片并把透明区域合成到白色背景上"""
+    with Image.open(source) as image:
+        if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+            rgba = image.convert('RGBA')
+            return Image.alpha_composite(Image.new('RGBA', rgba.size, (255, 255, 255, 255)), rgba).convert('RGB')
+        return image.convert('RGB')
+
+
+def _encode_job(source: str, targets: List[Tuple[str, str]], settings: dict) -> Dict[str, dict]:
+    """在子进程中解码一次源图片，编码所需的各种格式并写入缓存
+
+    Args:
+        source: 源图片路径
+        targets: [(格式, 缓存文件路径)]
+        settings: encode_image 的参数
+    """
+    image = _load_rgb(source)
+    results = {}
+    for fmt, cache_path in targets:
+        data, meta = encode_image(image, fmt, **settings)
+        Path(cache_path).parent.mkdir(parents=True, exist_ok=True)
+        with AtomicWriter(cache_path) as f:
+            f.write(data)
+        results[fmt] = meta
+    return results
+
+
+class EncodeCache:
+    """按"源文件哈希 + 编码参数"索引的编码结果缓存"""
+
+    def __init__(self, directory: Union[str, Path] = PUBLISH_CACHE_DIR):
+        self.directory = Path(directory)
+        self.index_path = self.directory / CACHE_INDEX_FILENAME
+        self.entries: Dict[str, dict] = {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    @staticmethod
+    def key(source_sha256: str, fmt: str, settings: dict) -> str:
+        payload = json.dumps({'sha256': source_sha256, 'format': fmt, 'version': ENCODER_VERSION, **settings},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def path_for(self, key: str, fmt: str) -> Path:
+        return self.directory / key[:2] / f"{key}{_FORMAT_EXTS[fmt]}"
+
+    def get(self, key: str, fmt: str) -> Optional[dict]:
+        """缓存命中时返回记录（缓存文件被删除时视为未命中）"""
+        entry = self.entries.get(key)
+        if entry and self.path_for(key, fmt).exists():
+            return entry
+        return None
+
+    def put(self, key: str, meta: dict):
+        self.entries[key] = meta
+
+    def save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.index_path, json.dumps({'version': 1, 'entries': self.entries}, indent=2, sort_keys=True))
+
+
+def encode_for_publish(
+    sources: List[str],
+    output_dir: Union[str, Path],
+    formats: Sequence[str] = PUBLISH_FORMATS,
+    max_bytes: Optional[int] = PUBLISH_MAX_BYTES,
+    target_ssim: Optional[float] = PUBLISH_TARGET_SSIM,
+    quality_range: Tuple[int, int] = PUBLISH_QUALITY_RANGE,
+    workers: Optional[int] = None,
+    cache_dir: Union[str, Path] = PUBLISH_CACHE_DIR,
+    session_id: Optional[str] = None,
+) -> List[EncodedImage]:
+    """把图片编码为发布用的各种格式，输出到 output_dir/<文件名>.<格式扩展名>
+
+    Args:
+        sources: 源图片路径
+        output_dir: 输出目录
+        formats: 输出格式，当前 Pillow 不支持的格式（如 AVIF）会跳过
+        max_bytes: 每个文件的体积上限，None 表示不限制
+        target_ssim: 目标 SSIM，None 表示直接使用最高质量（再受体积上限约束）
+        quality_range: 质量查找范围
+        workers: 进程数，默认为 CPU 核数；为 1 时在当前进程中执行
+        cache_dir: 编码缓存目录
+        session_id: 会话ID（用于日志）
+
+    Returns:
+        List[EncodedImage]: 每张图片每种格式的编码结果
+    """
+    logger = get_logger(session_id)
+    formats = available_formats(formats)
+    settings = {'max_bytes': max_bytes, 'target_ssim': target_ssim, 'quality_range': tuple(quality_range)}
+    cache = EncodeCache(cache_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    results: List[EncodedImage] = []
+    jobs = []  # (源文件, [(格式, 缓存路径)], [(EncodedImage, 缓存键)])
+    for source in sources:
+        _, sha256, _ = inspect_image_file(source)
+        targets, pending = [], []
+        for fmt in formats:
+            key = cache.key(sha256, fmt, settings)
+            result = EncodedImage(source, fmt, str(output_dir / f"{Path(source).stem}{_FORMAT_EXTS[fmt]}"))
+            results.append(result)
+            entry = cache.get(key, fmt)
+            if entry:
+                result.__dict__.update(entry, cached=True)
+                link_or_copy(cache.path_for(key, fmt), result.path)
+            else:
+                targets.append((fmt, str(cache.path_for(key, fmt))))
+                pending.append((result, key))
+        if targets:
+            jobs.append((source, targets, pending))
+
+    workers = min(workers or os.cpu_count() or 1, len(jobs)) if jobs else 1
+    if workers == 1:
+        outcomes = [_encode_job(source, targets, settings) for source, targets, _ in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(
+                _encode_job, *zip(*[(source, targets, settings) for source, targets, _ in jobs])
+            ))
+
+    for (_, _, pending), outcome in zip(jobs, outcomes):
+        for result, key in pending:
+            meta = outcome[result.format]
+            result.__dict__.update(meta)
+            cache.put(key, meta)
+            link_or_copy(cache.path_for(key, result.format), result.path)
+    cache.save()
+
+    for result in results:
+        if result.over_budget:
+            logger.warning(f"{Path(result.path).name} 在最低质量 {result.quality} 下仍有 {result.bytes / 1024:.0f} KB，"
+                           f"超过上限 {max_bytes / 1024:.0f} KB")
+    hits = sum(result.cached for result in results)
+    logger.info(f"✓ 发布编码完成: {len(sources)} 张图片 x {len(formats)} 种格式（{', '.join(formats)}），"
+                f"缓存命中 {hits}/{len(results)}")
+    return results
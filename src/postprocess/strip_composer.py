@@ -0,0 +1,244 @@
+"""
+长图拼接模块
+
+公众号文章发布需要一张（或几张）竖向长图。把 8 张以上的原图全部解码后再用 Pillow 拼接，
+内存占用是所有图片之和；这里先只读取文件头规划版面（缩放后的高度、分隔带、按最大高度分段），
+再逐张解码、缩放，按行带（每次 STRIP_BAND_ROWS 行）压缩写入 PNG，内存峰值约为一张原图。
+
+PNG 文件头需要预先写入图片高度，所以先规划、后写入；行带使用 Sub 滤波（NumPy 向量化）后再 zlib 压缩。
+"""
+
+import re
+import struct
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from src.config.settings import STRIP_GUTTER, STRIP_MAX_HEIGHT, STRIP_WIDTH
+from src.postprocess.panel_slicer import PANELS_DIRNAME
+from src.utils.file_utils import AtomicWriter, dedupe_image_stems, get_image_files
+from src.utils.logger import get_logger
+
+
+STRIP_DIRNAME = "strip"
+STRIP_BAND_ROWS = 256  # 每次压缩写入的行数
+COVER_STEM = "封面"
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PANEL_STEM = re.compile(r'P(\d+)$')
+
+
+class PNGStreamWriter:
+    """按行带写入 RGB PNG，不在内存中保留整张图片
+
+    用法:
+        with PNGStreamWriter(path, width, height) as writer:
+            writer.write_rows(rows)  # uint8 数组，形状 (n, width, 3)
+    """
+
+    def __init__(self, filepath: Union[str, Path], width: int, height: int, compress_level: int = 6):
+        self.filepath = Path(filepath)
+        self.width = width
+        self.height = height
+        self.compress_level = compress_level
+        self.rows_written = 0
+        self._writer = AtomicWriter(self.filepath)
+        self._file = None
+        self._compressor = None
+
+    def __enter__(self):
+        self._file = self._writer.__enter__()
+        self._compressor = zlib.compressobj(self.compress_level)
+        self._file.write(_PNG_SIGNATURE)
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', self.width, self.height, 8, 2, 0, 0, 0))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None and self.rows_written != self.height:
+            self._writer.__exit__(ValueError, None, None)  # 丢弃临时文件
+            raise ValueError(f"写入了 {self.rows_written} 行，PNG 文件头中的高度为 {self.height}")
+        if exc_type is None:
+            self._chunk(b'IDAT', self._compressor.flush())
+            self._chunk(b'IEND', b'')
+        return self._writer.__exit__(exc_type, exc, tb)
+
+    def _chunk(self, kind: bytes, data: bytes):
+        if kind == b'IDAT' and not data:
+            return
+        self._file.write(struct.pack('>I', len(data)) + kind + data)
+        self._file.write(struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    def write_rows(self, rows: np.ndarray):
+        """写入若干行（Sub 滤波：每个字节减去左侧像素的同一通道）"""
+        filtered = rows.astype(np.uint8, copy=True)
+        filtered[:, 1:] -= rows[:, :-1]
+        scanlines = np.empty((rows.shape[0], 1 + self.width * 3), dtype=np.uint8)
+        scanlines[:, 0] = 1
+        scanlines[:, 1:] = filtered.reshape(rows.shape[0], -1)
+        self._chunk(b'IDAT', self._compressor.compress(scanlines.tobytes()))
+        self.rows_written += rows.shape[0]
+
+
+@dataclass
+class StripSegment:
+    """长图中的一段：一张图片的若干行（缩放后的坐标），或 source 为 None 的分隔带"""
+    source: Optional[str]
+    start: int
+    end: int
+
+    @property
+    def height(self) -> int:
+        return self.end - self.start
+
+
+@dataclass
+class StripPart:
+    """一张输出长图"""
+    segments: List[StripSegment] = field(default_factory=list)
+
+    @property
+    def height(self) -> int:
+        return sum(segment.height for segment in self.segments)
+
+
+def ordered_theme_images(theme_dir: Union[str, Path], use_panels: bool = False, include_cover: bool = True) -> List[str]:
+    """主题目录中按顺序排列的图片：封面在前，然后是批次图片 1、2、3……（或 panels/ 中的 P1、P2……）
+
+    同名的 PNG 与 JPEG（convert_to_jpeg.py 转换后）只取一张，见 dedupe_image_stems。
+    """
+    theme_dir = Path(theme_dir)
+    numbered = []
+    cover = None
+    if use_panels:
+        for filepath in dedupe_image_stems(get_image_files(str(theme_dir / PANELS_DIRNAME))):
+            match = _PANEL_STEM.match(Path(filepath).stem)
+            if match:
+                numbered.append((int(match.group(1)), filepath))
+    for filepath in dedupe_image_stems(get_image_files(str(theme_dir))):
+        stem = Path(filepath).stem
+        if stem == COVER_STEM:
+            cover = filepath
+        elif stem.isdigit() and not use_panels:
+            numbered.append((int(stem), filepath))
+    ordered = [filepath for _, filepath in sorted(numbered)]
+    return [cover] + ordered if include_cover and cover else ordered
+
+
+def scaled_height(filepath: str, width: int) -> int:
+    """只读取文件头，计算缩放到 width 后的高度"""
+    with Image.open(filepath) as image:
+        source_width, source_height = image.size
+    return max(1, round(source_height * width / source_width))
+
+
+def plan_strips(heights: List[Tuple[str, int]], gutter: int, max_height: int) -> List[StripPart]:
+    """规划长图分段：图片之间插入分隔带，放不下时另起一张；单张图片超过 max_height 时跨张切开
+
+    Args:
+        heights: [(图片路径, 缩放后的高度)]，按顺序排列
+        gutter: 图片之间的分隔带高度
+        max_height: 每张长图的最大高度
+    """
+    parts = [StripPart()]
+    for source, height in heights:
+        current = parts[-1]
+        if current.segments and current.height + gutter + height > max_height:
+            current = StripPart()
+            parts.append(current)
+        if current.segments:
+            current.segments.append(StripSegment(None, 0, gutter))
+        start = 0
+        while start < height:
+            if current.height >= max_height:
+                current = StripPart()
+                parts.append(current)
+            end = min(height, start + max_height - current.height)
+            current.segments.append(StripSegment(source, start, end))
+            start = end
+    return [part for part in parts if part.segments]
+
+
+def _load_scaled(source: str, width: int, background: Tuple[int, int, int]) -> np.ndarray:
+    """解码一张图片，去掉透明通道并缩放到 width，返回 (h, width, 3) 的数组"""
+    with Image.open(source) as image:
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            flattened = Image.new('RGB', image.size, background)
+            flattened.paste(image, mask=image.split()[-1])
+            image = flattened
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        if image.width != width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        return np.asarray(image)
+
+
+def compose_strips(
+    sources: List[str],
+    output_dir: Union[str, Path],
+    width: int = STRIP_WIDTH,
+    gutter: int = STRIP_GUTTER,
+    max_height: int = STRIP_MAX_HEIGHT,
+    background: Tuple[int, int, int] = (255, 255, 255),
+    prefix: str = "strip",
+    session_id: Optional[str] = None,
+) -> List[str]:
+    """把图片按顺序拼成竖向长图（PNG），超过 max_height 时分成多张
+
+    Args:
+        sources: 按顺序排列的图片路径
+        output_dir: 输出目录
+        width: 长图宽度，图片等比缩放到该宽度
+        gutter: 图片之间的分隔带高度
+        max_height: 每张长图的最大高度
+        background: 分隔带和透明区域的颜色
+        prefix: 输出文件名前缀（strip-1.png、strip-2.png……）
+        session_id: 会话ID（用于日志）
+
+    Returns:
+        List[str]: 输出文件路径
+    """
+    logger = get_logger(session_id)
+    if not sources:
+        logger.warning("没有需要拼接的图片")
+        return []
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    parts = plan_strips([(source, scaled_height(source, width)) for source in sources], gutter, max_height)
+    gutter_rows = np.empty((0, width, 3), dtype=np.uint8)
+    loaded_source, loaded = None, None
+    outputs = []
+    for number, part in enumerate(parts, 1):
+        target = output_dir / f"{prefix}-{number}.png"
+        with PNGStreamWriter(target, width, part.height) as writer:
+            for segment in part.segments:
+                if segment.source is None:
+                    if len(gutter_rows) != segment.height:
+                        gutter_rows = np.empty((segment.height, width, 3), dtype=np.uint8)
+                        gutter_rows[:] = background
+                    writer.write_rows(gutter_rows)
+                    continue
+                if segment.source != loaded_source:
+                    # 同一时刻只保留一张解码后的图片（跨张切开的图片不会重复解码）
+                    loaded = None
+                    loaded = _load_scaled(segment.source, width, background)
+                    loaded_source = segment.source
+                for band_start in range(segment.start, segment.end, STRIP_BAND_ROWS):
+                    writer.write_rows(loaded[band_start:min(segment.end, band_start + STRIP_BAND_ROWS)])
+        outputs.append(str(target))
+        logger.debug(f"长图已保存: {target} ({width}x{part.height})")
+    logger.info(f"✓ 长图拼接完成: {len(sources)} 张图片 -> {len(outputs)} 张长图")
+    return outputs
+
+
+def compose_theme_strips(theme_dir: Union[str, Path], use_panels: bool = False, include_cover: bool = True,
+                         output_dir: Union[str, Path] = None, **kwargs) -> List[str]:
+    """把主题目录中的图片按顺序拼成长图，默认输出到 theme_dir/strip"""
+    sources = ordered_theme_images(theme_dir, use_panels, include_cover)
+    output_dir = output_dir or Path(theme_dir) / STRIP_DIRNAME
+    return compose_strips(sources, output_dir, **kwargs)
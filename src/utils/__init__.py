@@ -1,4 +1,29 @@
 # 工具模块
-from .path_utils import get_project_root, setup_python_path
-from .browser_utils import find_working_selector, wait_for_content_stabilization, wait_for_images_loading, verify_upload
-from .file_utils import ensure_directory_exists, save_text_to_file, load_text_from_file, extract_table_from_session, count_panels_from_table, get_image_files, get_file_size, get_absolute_path
\ No newline at end of file
+# 按需导入子模块（PEP 562），导入 src.utils.path_utils 等轻量模块时不会加载 asyncio 等依赖
+import importlib
+
+_EXPORTS = {
+    'get_project_root': 'path_utils',
+    'setup_python_path': 'path_utils',
+    'find_working_selector': 'browser_utils',
+    'wait_for_content_stabilization': 'browser_utils',
+    'wait_for_images_loading': 'browser_utils',
+    'verify_upload': 'browser_utils',
+    'ensure_directory_exists': 'file_utils',
+    'save_text_to_file': 'file_utils',
+    'load_text_from_file': 'file_utils',
+    'extract_table_from_session': 'file_utils',
+    'count_panels_from_table': 'file_utils',
+    'get_image_files': 'file_utils',
+    'get_file_size': 'file_utils',
+    'get_absolute_path': 'file_utils',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        module = importlib.import_module(f'.{_EXPORTS[name]}', __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,204 @@
+"""
+内容寻址的图片存储（blob store）
+
+同一张图片（封面、参考图、重复生成的结果）以前在每个主题目录里各存一份，data/images 随运行次数无限增长。
+现在每份内容只在 data/blobs/<sha256 前两位>/<sha256><扩展名> 保存一次，主题目录中的文件是指向它的硬链接：
+- 对使用者透明：主题目录中仍然是普通文件，可以直接打开、复制、上传
+- 本项目写文件都是先写临时文件再 os.replace（AtomicWriter），覆盖主题目录中的文件只会断开链接，不会改动 blob
+- 不再被任何主题目录引用的 blob 链接数为 1，gc 按链接数回收，不需要扫描主题目录
+
+文件系统不支持硬链接（或与存储目录不在同一设备）时保留原文件，不影响保存流程。
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Tuple, Union
+
+from src.config.settings import BLOB_STORE_DIR
+from src.utils.file_utils import IMAGE_EXTENSIONS, temp_path_for
+from src.utils.image_utils import ImageManifest
+from src.utils.logger import get_deferred_logger
+
+logger = get_deferred_logger()
+
+_READ_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(filepath: Union[str, Path]) -> str:
+    """分块计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class StoreStats:
+    """存储统计"""
+    blobs: int = 0
+    bytes: int = 0  # blob 实际占用
+    linked_bytes: int = 0  # 各主题目录中的文件合计（没有存储时需要的空间）
+    unreferenced: int = 0
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.linked_bytes - self.bytes
+
+
+@dataclass
+class GCResult:
+    """一次 gc 的结果"""
+    removed: int = 0
+    freed_bytes: int = 0
+    kept: int = 0
+
+
+class BlobStore:
+    """按内容哈希保存图片，主题目录中的文件以硬链接引用"""
+
+    def __init__(self, root: Union[str, Path] = BLOB_STORE_DIR):
+        self.root = Path(root)
+
+    def path_for(self, sha256: str, ext: str = '') -> Path:
+        """内容对应的 blob 路径（按哈希前两位分目录，保留扩展名便于直接查看）"""
+        return self.root / sha256[:2] / f"{sha256}{ext.lower()}"
+
+    def ingest(self, filepath: Union[str, Path], sha256: Optional[str] = None) -> bool:
+        """把文件纳入存储
+
+        内容已有 blob 时把文件替换为指向 blob 的硬链接（释放重复的一份），否则把文件本身链接为新的 blob。
+
+        Args:
+            filepath: 主题目录中的图片
+            sha256: 已知的内容哈希（省去重新读取文件）
+
+        Returns:
+            bool: 文件现在是否与 blob 共享存储
+        """
+        filepath = Path(filepath)
+        try:
+            sha256 = sha256 or file_sha256(filepath)
+            blob = self.path_for(sha256, filepath.suffix)
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            file_stat = filepath.stat()
+            try:
+                blob_stat = blob.stat()
+            except FileNotFoundError:
+                try:
+                    os.link(filepath, blob)
+                    return True
+                except FileExistsError:
+                    blob_stat = blob.stat()  # 另一个进程刚刚存入了同样的内容
+            if os.path.samestat(blob_stat, file_stat):
+                return True
+            if blob_stat.st_size != file_stat.st_size:
+                # blob 被就地改写过（与内容哈希不符），以当前文件为准重新建立
+                logger.warning(f"blob 与内容哈希不符，重新存入: {blob}")
+                source, target = filepath, blob
+            else:
+                source, target = blob, filepath
+            # 先链接到同目录的临时文件再原子替换，任何时刻目标路径上都是完整的文件
+            temp = temp_path_for(target)
+            os.link(source, temp)
+            try:
+                os.replace(temp, target)
+            finally:
+                if os.path.lexists(temp):
+                    os.unlink(temp)
+            return True
+        except OSError as e:
+            logger.debug(f"无法以硬链接存入 {filepath}: {e}")
+            return False
+
+    def ingest_tree(self, directory: Union[str, Path]) -> Tuple[int, int]:
+        """把目录树中已有的图片纳入存储（迁移旧的主题目录）
+
+        已经是硬链接的文件直接跳过；清单中大小和修改时间未变的图片沿用记录的哈希，不重新读取。
+
+        Returns:
+            tuple: (新纳入存储的文件数, 因去重释放的字节数)
+        """
+        ingested = freed = 0
+        root = self.root.resolve()
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if (Path(dirpath) / d).resolve() != root]
+            manifest = ImageManifest(dirpath)
+            changed = False
+            for name in sorted(filenames):
+                path = Path(dirpath) / name
+                if name.startswith('.') or path.suffix.lower() not in IMAGE_EXTENSIONS:
+                    continue
+                st = path.stat()
+                if st.st_nlink > 1:
+                    continue
+                entry = manifest.images.get(name)
+                sha256 = entry['sha256'] if manifest.is_unchanged(name, st.st_size, st.st_mtime) else file_sha256(path)
+                existed = self.path_for(sha256, path.suffix).exists()
+                if not self.ingest(path, sha256):
+                    continue
+                ingested += 1
+                if existed:
+                    freed += st.st_size
+                if entry and entry.get('sha256') == sha256:
+                    entry['mtime'] = path.stat().st_mtime  # 换成 blob 的链接后修改时间随之改变
+                    changed = True
+            if changed:
+                manifest.save()
+        return ingested, freed
+
+    def iter_blobs(self) -> Iterator[os.DirEntry]:
+        """遍历所有 blob（跳过临时文件）"""
+        if not self.root.is_dir():
+            return
+        with os.scandir(self.root) as shards:
+            for shard in shards:
+                if len(shard.name) != 2 or not shard.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(shard.path) as entries:
+                    for entry in entries:
+                        if entry.is_file(follow_symlinks=False) and not entry.name.startswith('.'):
+                            yield entry
+
+    def stats(self) -> StoreStats:
+        """统计 blob 数量、实际占用和去重节省的空间"""
+        stats = StoreStats()
+        for entry in self.iter_blobs():
+            st = entry.stat(follow_symlinks=False)
+            stats.blobs += 1
+            stats.bytes += st.st_size
+            stats.linked_bytes += st.st_size * (st.st_nlink - 1)
+            if st.st_nlink <= 1:
+                stats.unreferenced += 1
+        return stats
+
+    def gc(self, dry_run: bool = False) -> GCResult:
+        """删除没有被任何文件引用（硬链接数为 1）的 blob，以及因此变空的分目录
+
+        Args:
+            dry_run: 只统计不删除
+        """
+        result = GCResult()
+        for entry in self.iter_blobs():
+            st = entry.stat(follow_symlinks=False)
+            if st.st_nlink > 1:
+                result.kept += 1
+                continue
+            if not dry_run:
+                try:
+                    os.unlink(entry.path)
+                except FileNotFoundError:
+                    continue
+                logger.debug(f"删除未引用的 blob: {entry.name}")
+            result.removed += 1
+            result.freed_bytes += st.st_size
+        if not dry_run and self.root.is_dir():
+            for shard in self.root.iterdir():
+                if shard.is_dir() and len(shard.name) == 2:
+                    try:
+                        shard.rmdir()  # 只删除空目录
+                    except OSError:
+                        pass
+        return result
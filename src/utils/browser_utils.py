@@ -7,8 +7,9 @@ import time
 from typing import List, Optional
 
 # 获取默认日志记录器
-from src.utils.logger import get_logger
-logger = get_logger()
+from src.utils.logger import get_deferred_logger
+from src.utils.timing import fixed_sleep, tracked_wait
+logger = get_deferred_logger()
 
 
 async def find_working_selector(page, selectors: List[str], timeout: int = 10000) -> Optional[str]:
@@ -37,6 +38,7 @@ async def find_working_selector(page, selectors: List[str], timeout: int = 10000
     return None
 
 
+@tracked_wait("等待内容稳定")
 async def wait_for_content_stabilization(
     page, 
     content_selector: str, 
@@ -84,13 +86,14 @@ async def wait_for_content_stabilization(
                 current_stable_count = 0
                 last_text = current_text
             
-            await asyncio.sleep(check_interval / 1000.0)
+            await fixed_sleep(check_interval / 1000.0)
             
         except Exception as e:
             logger.debug(f"检查内容状态时出错: {e}，继续等待...")
-            await asyncio.sleep(check_interval / 1000.0)
+            await fixed_sleep(check_interval / 1000.0)
 
 
+@tracked_wait("等待图片加载")
 async def wait_for_images_loading(
     page,
     container_selector: str,
@@ -101,6 +104,10 @@ async def wait_for_images_loading(
     """
     等待图片加载完成
     
+    只检查最后一个（最新的）匹配容器，其中每一张图片都已解码（naturalWidth > 0；
+    带 image 类的生成图片还需要有 loaded 类）才算完成。此前只要有一张图片带 loaded 类就返回，
+    同一容器里其它仍在加载的图片会被当作已完成。
+    
     Args:
         page: Playwright页面对象
         container_selector: 图片容器选择器
@@ -109,7 +116,7 @@ async def wait_for_images_loading(
         check_interval: 检查间隔（毫秒）
         
     Returns:
-        bool: 是否成功等待到图片加载完成
+        bool: 是否成功等待到图片加载完成（有图片加载失败时返回 False）
     """
     start_time = time.time()
     timeout_seconds = min(max_timeout / 1000.0, 30)
@@ -121,42 +128,54 @@ async def wait_for_images_loading(
             return False
         
         try:
-            # 检查是否有已加载的图片
-            loaded_images_count = await page.locator(
-                f'{container_selector} img.image.loaded'
-            ).count()
-            
-            # 检查是否有任何图片（即使没有 loaded 类）
-            all_images_count = await page.locator(
-                f'{container_selector} {image_selector}'
-            ).count()
+            state = await page.evaluate(_IMAGES_LOADING_SCRIPT, {
+                'containerSelector': container_selector,
+                'imageSelector': image_selector,
+            })
+            total, loaded, broken = state['total'], state['loaded'], state['broken']
             
-            # 如果检测到已加载的图片，即使 loader 还在也认为完成
-            if loaded_images_count > 0:
-                logger.debug(f"✓ 检测到 {loaded_images_count} 张图片已加载完成")
+            if total > 0 and loaded == total:
+                logger.debug(f"✓ 最新容器中的 {total} 张图片已全部加载完成")
                 return True
             
-            # 如果有图片但还没加载完成，继续等待
-            if all_images_count > 0:
-                loader_count = await page.locator(
-                    f'{container_selector} .loader'
-                ).count()
-                if loader_count == 0:
-                    logger.debug("✓ 所有 loader 已消失")
-                    return True
-                else:
-                    logger.debug(f"检测到 {all_images_count} 张图片，还有 {loader_count} 个 loader，继续等待...")
-            else:
-                # 没有图片，继续等待
-                pass
+            if total > 0 and loaded + broken == total:
+                logger.warning(f"最新容器中有 {broken}/{total} 张图片加载失败")
+                return False
+            
+            if total > 0:
+                logger.debug(f"检测到 {total} 张图片，已加载 {loaded} 张，继续等待...")
                 
-            await asyncio.sleep(check_interval / 1000.0)
+            await fixed_sleep(check_interval / 1000.0)
             
         except Exception as e:
             logger.debug(f"检查图片状态时出错: {e}，继续等待...")
-            await asyncio.sleep(check_interval / 1000.0)
+            await fixed_sleep(check_interval / 1000.0)
+
+
+# 统计最后一个容器中的图片：已加载（解码成功，生成图片还需带 loaded 类）、加载失败、总数；
+# 有未加载的图片且容器不在视口内时把容器滚动到视口（懒加载的图片只在可见时才开始加载）
+_IMAGES_LOADING_SCRIPT = """
+({containerSelector, imageSelector}) => {
+  const containers = document.querySelectorAll(containerSelector);
+  const container = containers[containers.length - 1];
+  if (!container) return {total: 0, loaded: 0, broken: 0};
+  const images = [...container.querySelectorAll(imageSelector)];
+  let loaded = 0, broken = 0;
+  for (const img of images) {
+    if (!img.complete) continue;
+    if (img.naturalWidth === 0) broken++;
+    else if (!img.classList.contains('image') || img.classList.contains('loaded')) loaded++;
+  }
+  if (loaded < images.length) {
+    const rect = container.getBoundingClientRect();
+    if (rect.bottom < 0 || rect.top > window.innerHeight) container.scrollIntoView({block: 'end'});
+  }
+  return {total: images.length, loaded, broken};
+}
+"""
 
 
+@tracked_wait("验证上传")
 async def verify_upload(
     page,
     attachment_selectors: List[str],
@@ -189,7 +208,7 @@ async def verify_upload(
             except:
                 continue
         
-        await asyncio.sleep(0.5)
+        await fixed_sleep(0.5)
     
     logger.debug("✗ 未检测到图片附件")
     return False
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""
+CDP 调用统计模块
+
+为 Playwright 的 Page / ElementHandle / Locator 等对象提供可选的包装层，
+统计每一次协议往返调用：按方法、按调用位置计数，并记录耗时直方图。
+
+包装后的对象对调用方透明：返回的 ElementHandle、Locator 会被继续包装，
+作为参数传回 Playwright 时会自动解包。
+"""
+
+import bisect
+import inspect
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent.parent)
+
+# 需要包装的 Playwright 对象类型（按类名判断，避免在此处导入 playwright）
+INSTRUMENTED_TYPES = {
+    'Page',
+    'Frame',
+    'ElementHandle',
+    'JSHandle',
+    'Locator',
+    'Keyboard',
+    'Mouse',
+    'APIRequestContext',
+    'APIResponse',
+}
+
+# 直方图桶上限（毫秒），最后一个桶收纳所有更慢的调用
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+
+class MethodStats:
+    """单个方法的调用统计"""
+
+    __slots__ = ('count', 'errors', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, seconds: float, ok: bool):
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+
+    def percentile(self, q: float) -> float:
+        """根据直方图估算分位数（毫秒，取桶上限）"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                if index < len(LATENCY_BUCKETS_MS):
+                    return float(LATENCY_BUCKETS_MS[index])
+                return self.max * 1000
+        return self.max * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total_ms': round(self.total * 1000, 1),
+            'mean_ms': round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'max_ms': round(self.max * 1000, 1),
+            'histogram': {
+                **{f"<={bound}ms": n for bound, n in zip(LATENCY_BUCKETS_MS, self.buckets)},
+                f">{LATENCY_BUCKETS_MS[-1]}ms": self.buckets[-1],
+            },
+        }
+
+
+class CDPStats:
+    """一次运行内的 CDP 调用统计"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清空统计数据"""
+        self.by_method: Dict[str, MethodStats] = {}
+        self.by_site: Dict[Tuple[str, str], int] = {}
+
+    def record(self, method: str, site: str, seconds: float, ok: bool = True):
+        """记录一次调用
+
+        Args:
+            method: 方法名（如 "ElementHandle.get_attribute"）
+            site: 调用位置
+            seconds: 调用耗时（秒）
+            ok: 调用是否成功
+        """
+        self.by_method.setdefault(method, MethodStats()).add(seconds, ok)
+        key = (method, site)
+        self.by_site[key] = self.by_site.get(key, 0) + 1
+
+    @property
+    def total_calls(self) -> int:
+        return sum(stats.count for stats in self.by_method.values())
+
+    @property
+    def total_time(self) -> float:
+        return sum(stats.total for stats in self.by_method.values())
+
+    def snapshot(self) -> dict:
+        """导出为可序列化的字典（供基准测试使用）"""
+        return {
+            'total_calls': self.total_calls,
+            'total_time_ms': round(self.total_time * 1000, 1),
+            'methods': {method: stats.to_dict() for method, stats in self.by_method.items()},
+            'sites': [
+                {'method': method, 'site': site, 'count': count}
+                for (method, site), count in sorted(self.by_site.items(), key=lambda item: -item[1])
+            ],
+        }
+
+    def format_report(self, top: int = 15) -> str:
+        """生成可读的调用统计报告
+
+        Args:
+            top: 最多列出的方法数与调用位置数
+
+        Returns:
+            str: 报告文本
+        """
+        lines = [
+            "=" * 80,
+            "CDP 调用统计",
+            "=" * 80,
+            f"调用总数: {self.total_calls}，累计耗时: {self.total_time:.2f} 秒",
+        ]
+
+        if self.by_method:
+            lines.append("-" * 80)
+            lines.append("按方法（按累计耗时排序）:")
+            ranked = sorted(self.by_method.items(), key=lambda item: item[1].total, reverse=True)
+            for method, stats in ranked[:top]:
+                lines.append(
+                    f"  x{stats.count:<6d} 累计 {stats.total:7.2f}s  p50 {stats.percentile(0.5):>6.0f}ms"
+                    f"  p95 {stats.percentile(0.95):>6.0f}ms  最长 {stats.max * 1000:7.0f}ms"
+                    f"  失败 {stats.errors:<4d} {method}"
+                )
+
+        if self.by_site:
+            lines.append("-" * 80)
+            lines.append("按调用位置（按调用次数排序）:")
+            ranked_sites = sorted(self.by_site.items(), key=lambda item: -item[1])
+            for (method, site), count in ranked_sites[:top]:
+                lines.append(f"  x{count:<6d} {method:<32s} {site}")
+
+        lines.append("=" * 80)
+        return "\n".join(lines)
+
+
+def _call_site() -> str:
+    """返回包装层之外的调用位置描述：相对路径:行号 函数名"""
+    frame = sys._getframe(2)
+    filename = frame.f_code.co_filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    return f"{filename}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+def _wrap(value, stats: CDPStats):
+    """按需包装 Playwright 返回值"""
+    if isinstance(value, list):
+        return [_wrap(item, stats) for item in value]
+    if type(value).__name__ in INSTRUMENTED_TYPES:
+        return InstrumentedObject(value, stats)
+    return value
+
+
+def _unwrap(value):
+    """将包装对象还原为原始 Playwright 对象（传回 Playwright 时使用）"""
+    if isinstance(value, InstrumentedObject):
+        return value._target
+    if isinstance(value, list):
+        return [_unwrap(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_unwrap(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _unwrap(item) for key, item in value.items()}
+    return value
+
+
+class InstrumentedObject:
+    """Playwright 对象的统计包装层"""
+
+    __slots__ = ('_target', '_stats', '_kind')
+
+    def __init__(self, target, stats: CDPStats):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_stats', stats)
+        object.__setattr__(self, '_kind', type(target).__name__)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if inspect.iscoroutinefunction(attr):
+            return self._wrap_coroutine(name, attr)
+        if callable(attr) and not isinstance(attr, type):
+            return self._wrap_sync(attr)
+        return _wrap(attr, self._stats)
+
+    def __setattr__(self, name, value):
+        setattr(self._target, name, value)
+
+    def __repr__(self):
+        return f"<Instrumented {self._target!r}>"
+
+    def _wrap_coroutine(self, name: str, func):
+        method = f"{self._kind}.{name}"
+        stats = self._stats
+
+        async def wrapper(*args, **kwargs):
+            site = _call_site()
+            start = time.perf_counter()
+            ok = False
+            try:
+                result = await func(*_unwrap(args), **_unwrap(kwargs))
+                ok = True
+            finally:
+                stats.record(method, site, time.perf_counter() - start, ok)
+            return _wrap(result, stats)
+
+        return wrapper
+
+    def _wrap_sync(self, func):
+        stats = self._stats
+
+        def wrapper(*args, **kwargs):
+            return _wrap(func(*_unwrap(args), **_unwrap(kwargs)), stats)
+
+        return wrapper
+
+
+def instrument(target, stats: CDPStats):
+    """包装 Playwright 对象，开始统计其协议调用
+
+    Args:
+        target: Playwright 对象（通常是 Page）
+        stats: 统计实例
+
+    Returns:
+        包装后的对象；如果 target 已经被包装则原样返回
+    """
+    if isinstance(target, InstrumentedObject):
+        return target
+    return InstrumentedObject(target, stats)
+
+
+def unwrap(target):
+    """返回包装对象内部的原始 Playwright 对象"""
+    return _unwrap(target)
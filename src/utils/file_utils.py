@@ -2,15 +2,20 @@
 文件处理工具模块
 """
 
+import itertools
 import os
 import re
+import shutil
 import time
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Tuple, Union
 
 # 获取默认日志记录器
-from src.utils.logger import get_logger
-logger = get_logger()
+from src.utils.logger import get_deferred_logger
+logger = get_deferred_logger()
+
+# 视为图片文件的扩展名（小写）
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.avif')
 
 
 def ensure_directory_exists(directory: str) -> Path:
@@ -28,6 +33,143 @@ def ensure_directory_exists(directory: str) -> Path:
     return dir_path
 
 
+_temp_counter = itertools.count()
+
+
+def temp_path_for(filepath: Union[str, Path]) -> Path:
+    """返回与目标文件同目录的临时文件路径（以 . 开头、.tmp 结尾，不会被当作图片或 session）"""
+    filepath = Path(filepath)
+    return filepath.with_name(f".{filepath.name}.{os.getpid()}.{next(_temp_counter)}.tmp")
+
+
+class AtomicWriter:
+    """原子写文件：先写入同目录的临时文件，成功后 os.replace 为目标文件
+
+    进程在写入过程中崩溃时，目标路径上不会出现写了一半的文件。
+
+    用法:
+        with AtomicWriter(path) as f:
+            f.write(chunk)
+    """
+
+    def __init__(self, filepath: Union[str, Path], mode: str = 'wb', encoding: str = None):
+        self.filepath = Path(filepath)
+        self.temp_path = temp_path_for(self.filepath)
+        self.mode = mode
+        self.encoding = encoding
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.temp_path, self.mode, encoding=self.encoding)
+        return self._file
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._file.close()
+            if exc_type is None:
+                os.replace(self.temp_path, self.filepath)
+        finally:
+            if self.temp_path.exists():
+                self.temp_path.unlink()
+        return False
+
+
+def atomic_write_bytes(filepath: Union[str, Path], data: bytes) -> Path:
+    """原子写入二进制内容（阻塞调用，异步代码中请配合 asyncio.to_thread 使用）"""
+    with AtomicWriter(filepath, 'wb') as f:
+        f.write(data)
+    return Path(filepath)
+
+
+def atomic_write_text(filepath: Union[str, Path], content: str) -> Path:
+    """原子写入 UTF-8 文本（阻塞调用，异步代码中请配合 asyncio.to_thread 使用）"""
+    with AtomicWriter(filepath, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return Path(filepath)
+
+
+class FileLock:
+    """跨进程的文件锁：以 O_CREAT | O_EXCL 创建锁文件（内容为持有者 pid），释放时删除
+
+    不可重入；锁文件超过 stale_after 秒仍未释放时视为持有者异常退出后遗留的，直接接管。
+
+    用法:
+        with FileLock(path.with_name(path.name + '.lock')):
+            ...  # 读取-修改-写回
+    """
+
+    def __init__(self, path: Union[str, Path], timeout: float = 30.0, stale_after: float = 60.0,
+                 poll_interval: float = 0.01):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+
+    def acquire(self):
+        """阻塞直到拿到锁
+
+        Raises:
+            TimeoutError: timeout 秒内没有拿到锁
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    if time.time() - self.path.stat().st_mtime >= self.stale_after:
+                        self.path.unlink()
+                        continue
+                except FileNotFoundError:
+                    continue  # 持有者刚好释放
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"等待文件锁超时: {self.path}")
+                time.sleep(self.poll_interval)
+                continue
+            os.write(fd, str(os.getpid()).encode())
+            os.close(fd)
+            return
+
+    def release(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def link_or_copy(source: Union[str, Path], target: Union[str, Path]) -> Path:
+    """把 source 以硬链接放到 target（覆盖已有文件），不支持硬链接（如跨设备）时原子复制
+
+    只适用于不会被就地改写的文件（本项目的写入都经过 AtomicWriter）。
+    """
+    target = Path(target)
+    temp = temp_path_for(target)
+    try:
+        os.link(source, temp)
+    except OSError:
+        with open(source, 'rb') as src, AtomicWriter(target) as dst:
+            shutil.copyfileobj(src, dst)
+        return target
+    try:
+        os.replace(temp, target)
+    finally:
+        if temp.exists():
+            temp.unlink()
+    return target
+
+
 def save_text_to_file(content: str, filename: str = None, directory: str = 'data/sessions') -> str:
     """
     将文本内容保存到文件
@@ -48,8 +190,7 @@ def save_text_to_file(content: str, filename: str = None, directory: str = 'data
     filepath = dir_path / filename
     
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        atomic_write_text(filepath, content)
         logger.debug(f"✓ 文件已保存到: {filepath.absolute()}")
         return str(filepath.absolute())
     except Exception as e:
@@ -165,16 +306,40 @@ def get_image_files(directory: str) -> List[str]:
     if not dir_path.exists():
         return []
     
-    image_extensions = ['.png', '.jpg', '.jpeg', '.gif', '.bmp']
     image_files = []
     
     for file_path in dir_path.iterdir():
-        if file_path.is_file() and file_path.suffix.lower() in image_extensions:
+        if file_path.is_file() and file_path.suffix.lower() in IMAGE_EXTENSIONS:
             image_files.append(str(file_path.absolute()))
     
     return image_files
 
 
+def dedupe_image_stems(image_files: List[str]) -> List[str]:
+    """
+    同一目录下同名（不同扩展名）的图片只保留一张，按 IMAGE_EXTENSIONS 的顺序优先
+    （例如 convert_to_jpeg.py 转换后同时存在 1.png 和 1.jpg 时保留 1.png）
+    
+    Args:
+        image_files: 图片文件路径列表
+        
+    Returns:
+        List[str]: 去重后的图片文件路径列表，保持原有顺序
+    """
+    def rank(filepath: str) -> int:
+        suffix = Path(filepath).suffix.lower()
+        return IMAGE_EXTENSIONS.index(suffix) if suffix in IMAGE_EXTENSIONS else len(IMAGE_EXTENSIONS)
+    
+    chosen = {}
+    for filepath in image_files:
+        path = Path(filepath)
+        key = (str(path.parent), path.stem)
+        if key not in chosen or rank(filepath) < rank(chosen[key]):
+            chosen[key] = filepath
+    kept = set(chosen.values())
+    return [filepath for filepath in image_files if filepath in kept]
+
+
 def get_file_size(filepath: str) -> int:
     """
     获取文件大小
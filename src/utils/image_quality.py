@@ -0,0 +1,120 @@
+"""
+图片质量检查模块
+
+截图兜底等保存方式可能拿到占位图、加载动画或低分辨率的渲染结果，此前只要写出了文件就计为成功。
+这里在保存后立即做一次快速检查（缩小到 QUALITY_SAMPLE_SIZE 以内再用 NumPy 统计，单张图片几毫秒）：
+- 分辨率下限：短边小于 QUALITY_MIN_SIDE
+- 文件大小与分辨率：文件过小，或每像素字节数低得只可能是纯色图
+- 几乎是纯色：亮度标准差低于 QUALITY_MIN_STD
+- 疑似加载动画/占位图：背景色之外的像素很少，且集中在画面中央的一小块区域
+
+未通过检查时由下载引擎删除该文件，换下一种下载方式重新获取。
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+from PIL import Image
+
+from src.config.settings import (
+    QUALITY_MIN_BYTES,
+    QUALITY_MIN_BYTES_PER_PIXEL,
+    QUALITY_MIN_SIDE,
+    QUALITY_MIN_STD,
+)
+
+
+QUALITY_SAMPLE_SIZE = 256  # 统计像素前缩小到的最大边长
+# 与背景色亮度相差超过该值的像素视为前景
+_FOREGROUND_DELTA = 24
+# 前景占比低于该值、外接矩形不超过画面该比例且居中时，视为加载动画/占位图
+_SPINNER_MAX_COVERAGE = 0.12
+_SPINNER_MAX_EXTENT = 0.4
+
+
+@dataclass
+class QualityReport:
+    """一张图片的质量检查结果"""
+    ok: bool
+    reasons: List[str] = field(default_factory=list)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    bytes: int = 0
+    std: Optional[float] = None  # 亮度标准差
+    foreground: Optional[float] = None  # 与背景色不同的像素占比
+
+    @property
+    def summary(self) -> str:
+        return "通过" if self.ok else "；".join(self.reasons)
+
+
+def _border_background(gray: np.ndarray) -> float:
+    """取四条边像素亮度的中位数作为背景色"""
+    border = np.concatenate((gray[0], gray[-1], gray[:, 0], gray[:, -1]))
+    return float(np.median(border))
+
+
+def is_spinner_like(gray: np.ndarray) -> bool:
+    """背景之外只有居中的一小块内容（加载动画、占位图标）"""
+    mask = np.abs(gray - _border_background(gray)) > _FOREGROUND_DELTA
+    coverage = mask.mean()
+    if coverage == 0 or coverage >= _SPINNER_MAX_COVERAGE:
+        return False
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    height, width = gray.shape
+    extent_h = (rows[-1] - rows[0] + 1) / height
+    extent_w = (cols[-1] - cols[0] + 1) / width
+    center_y = (rows[0] + rows[-1]) / 2 / height
+    center_x = (cols[0] + cols[-1]) / 2 / width
+    return (extent_h <= _SPINNER_MAX_EXTENT and extent_w <= _SPINNER_MAX_EXTENT
+            and abs(center_y - 0.5) < 0.2 and abs(center_x - 0.5) < 0.2)
+
+
+def check_image_quality(
+    filepath: Union[str, Path],
+    min_side: int = QUALITY_MIN_SIDE,
+    min_bytes: int = QUALITY_MIN_BYTES,
+    min_bytes_per_pixel: float = QUALITY_MIN_BYTES_PER_PIXEL,
+    min_std: float = QUALITY_MIN_STD,
+) -> QualityReport:
+    """检查一张已保存的图片是否像是真正的生成结果
+
+    Args:
+        filepath: 图片路径
+        min_side: 短边最小像素数
+        min_bytes: 最小文件大小
+        min_bytes_per_pixel: 每像素最小字节数
+        min_std: 亮度标准差下限
+
+    Returns:
+        QualityReport: 检查结果（无法解码时 ok 为 False）
+    """
+    filepath = Path(filepath)
+    report = QualityReport(ok=True)
+    try:
+        report.bytes = filepath.stat().st_size
+        with Image.open(filepath) as image:
+            report.width, report.height = image.size
+            image.draft('L', (QUALITY_SAMPLE_SIZE, QUALITY_SAMPLE_SIZE))  # JPEG 解码时直接缩小
+            sample = image.convert('L')
+            sample.thumbnail((QUALITY_SAMPLE_SIZE, QUALITY_SAMPLE_SIZE))
+            gray = np.asarray(sample, dtype=np.float32)
+    except Exception as e:
+        return QualityReport(ok=False, reasons=[f"无法解码: {e}"], bytes=report.bytes)
+
+    pixels = report.width * report.height
+    if min(report.width, report.height) < min_side:
+        report.reasons.append(f"分辨率过低 {report.width}x{report.height}")
+    if report.bytes < min_bytes or report.bytes < pixels * min_bytes_per_pixel:
+        report.reasons.append(f"文件过小 {report.bytes} 字节（{report.width}x{report.height}）")
+    report.std = float(gray.std())
+    report.foreground = float((np.abs(gray - _border_background(gray)) > _FOREGROUND_DELTA).mean())
+    if is_spinner_like(gray):
+        report.reasons.append(f"疑似加载动画或占位图（内容只占 {report.foreground:.1%}）")
+    elif report.std < min_std:
+        report.reasons.append(f"几乎是纯色（亮度标准差 {report.std:.1f}）")
+    report.ok = not report.reasons
+    return report
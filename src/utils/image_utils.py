@@ -0,0 +1,488 @@
+"""
+图片文件工具模块
+
+- 根据文件头（magic bytes）识别图片格式与尺寸，不依赖扩展名，也不需要解码整张图片
+- 每个主题目录一份 manifest.json，记录每张图片的内容哈希、感知哈希、格式、尺寸和来源，
+  用于快速发现重复、近似重复或未变化的图片，后续处理也无需再次读取、解码文件
+- 可选的全局图片目录（catalog.json）记录所有主题图片的哈希，用于发现跨主题、跨运行的重复；
+  多个进程共用，变更追加到日志文件，在文件锁内读写
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from src.utils.file_utils import FileLock, atomic_write_text
+from src.utils.perceptual_hash import PerceptualIndex, image_hashes, nearest_duplicate
+
+
+MANIFEST_FILENAME = "manifest.json"
+
+# 计算哈希时的读块大小，以及用于识别格式的文件头长度（JPEG 的 SOF 可能在较大的 EXIF 之后）
+_READ_CHUNK_SIZE = 1024 * 1024
+_SNIFF_BYTES = 512 * 1024
+
+# 清单和图片目录都是"读取-修改-写回"，并行保存图片时（多个线程）需要串行；
+# 图片目录还会被其它进程同时使用，另有文件锁（见 ImageCatalog.lock）
+_MANIFEST_LOCK = threading.Lock()
+
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+@dataclass
+class ImageInfo:
+    """图片格式信息"""
+    format: str  # png / jpeg / gif / webp / bmp / avif / heic
+    ext: str  # 对应的扩展名（含点）
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def _png_info(data: bytes) -> ImageInfo:
+    width, height = struct.unpack('>II', data[16:24]) if len(data) >= 24 else (None, None)
+    return ImageInfo('png', '.png', width, height)
+
+
+def _jpeg_info(data: bytes) -> ImageInfo:
+    info = ImageInfo('jpeg', '.jpg')
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            pos += 1
+            continue
+        marker = data[pos + 1]
+        if marker == 0xFF:  # 填充字节
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:  # 无长度字段的标记
+            pos += 2
+            continue
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if marker in _JPEG_SOF_MARKERS and pos + 9 <= len(data):
+            info.height, info.width = struct.unpack('>HH', data[pos + 5:pos + 9])
+            break
+        pos += 2 + length
+    return info
+
+
+def _webp_info(data: bytes) -> ImageInfo:
+    info = ImageInfo('webp', '.webp')
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30:
+        width, height = struct.unpack('<HH', data[26:30])
+        info.width, info.height = width & 0x3FFF, height & 0x3FFF
+    elif chunk == b'VP8L' and len(data) >= 25:
+        b0, b1, b2, b3 = data[21:25]
+        info.width = 1 + (((b1 & 0x3F) << 8) | b0)
+        info.height = 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+    elif chunk == b'VP8X' and len(data) >= 30:
+        info.width = 1 + int.from_bytes(data[24:27], 'little')
+        info.height = 1 + int.from_bytes(data[27:30], 'little')
+    return info
+
+
+def _isobmff_info(data: bytes, image_format: str, ext: str) -> ImageInfo:
+    info = ImageInfo(image_format, ext)
+    pos = data.find(b'ispe')
+    if pos >= 0 and pos + 16 <= len(data):
+        info.width, info.height = struct.unpack('>II', data[pos + 8:pos + 16])
+    return info
+
+
+def sniff_image(data: bytes) -> Optional[ImageInfo]:
+    """根据文件头识别图片格式与尺寸
+
+    Args:
+        data: 文件开头的若干字节（尺寸信息不在其中时 width/height 为 None）
+
+    Returns:
+        ImageInfo: 识别结果；不是已知图片格式时返回 None
+    """
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return _png_info(data)
+    if data.startswith(b'\xff\xd8\xff'):
+        return _jpeg_info(data)
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        width, height = struct.unpack('<HH', data[6:10]) if len(data) >= 10 else (None, None)
+        return ImageInfo('gif', '.gif', width, height)
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return _webp_info(data)
+    if data[:2] == b'BM' and len(data) >= 26:
+        width, height = struct.unpack('<ii', data[18:26])
+        return ImageInfo('bmp', '.bmp', width, abs(height))
+    if data[4:8] == b'ftyp':
+        brand = data[8:12]
+        if brand in (b'avif', b'avis'):
+            return _isobmff_info(data, 'avif', '.avif')
+        if brand in (b'heic', b'heix', b'mif1', b'msf1'):
+            return _isobmff_info(data, 'heic', '.heic')
+    return None
+
+
+def inspect_image_file(filepath: Union[str, Path]) -> Tuple[Optional[ImageInfo], str, int]:
+    """一次读取文件，同时识别格式并计算 SHA-256
+
+    Returns:
+        tuple: (ImageInfo 或 None, sha256 十六进制字符串, 文件字节数)
+    """
+    digest = hashlib.sha256()
+    header = bytearray()
+    size = 0
+    with open(filepath, 'rb') as f:
+        while True:
+            chunk = f.read(_READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+            if len(header) < _SNIFF_BYTES:
+                header += chunk[:_SNIFF_BYTES - len(header)]
+    return sniff_image(bytes(header)), digest.hexdigest(), size
+
+
+class ImageManifest:
+    """主题目录的图片清单（manifest.json）
+
+    格式:
+        {
+          "version": 1,
+          "images": {
+            "1.png": {"sha256": "...", "bytes": 123, "format": "png", "width": 1024, "height": 1536,
+                      "method": "download", "saved_at": 1700000000.0, "duplicate_of": null,
+                      "dhash": "...", "phash": "...", "near_duplicate_of": null}
+          }
+        }
+    """
+
+    VERSION = 1
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.path = self.directory / MANIFEST_FILENAME
+        self.images: Dict[str, dict] = {}
+        self.load()
+
+    def load(self):
+        """从磁盘读取清单（不存在或损坏时为空）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.images = json.load(f).get('images', {})
+        except (FileNotFoundError, ValueError):
+            self.images = {}
+
+    def save(self):
+        """原子写回清单"""
+        content = json.dumps({'version': self.VERSION, 'images': self.images}, ensure_ascii=False, indent=2)
+        atomic_write_text(self.path, content + '\n')
+
+    def find_by_hash(self, sha256: str) -> List[str]:
+        """返回内容哈希相同的文件名"""
+        return [name for name, entry in self.images.items() if entry.get('sha256') == sha256]
+
+    def is_unchanged(self, name: str, size: int, mtime: float) -> bool:
+        """文件大小与修改时间都与清单一致时视为未变化（无需重新计算哈希）"""
+        entry = self.images.get(name)
+        return bool(entry) and entry.get('bytes') == size and entry.get('mtime') == mtime
+
+    def perceptual_index(self) -> PerceptualIndex:
+        """清单中有感知哈希的图片"""
+        return PerceptualIndex(
+            (name, entry['dhash'], entry['phash'])
+            for name, entry in self.images.items() if entry.get('dhash') and entry.get('phash')
+        )
+
+    def find_duplicates(self, name: str, sha256: str, hashes: Optional[Tuple[str, str]]) -> Tuple[Optional[str], Optional[str]]:
+        """返回 (内容相同的图片, 近似重复的图片)，不含 name 本身"""
+        duplicates = [other for other in self.find_by_hash(sha256) if other != name]
+        if duplicates:
+            return duplicates[0], None
+        return None, nearest_duplicate(self.perceptual_index(), hashes, exclude=[name])
+
+    def record(self, name: str, info: Optional[ImageInfo], sha256: str, size: int, method: str = None,
+               hashes: Optional[Tuple[str, str]] = None) -> dict:
+        """记录一张图片（已存在同名记录时覆盖），并标记重复与近似重复
+
+        Args:
+            hashes: (dHash, pHash)，无法解码时为 None
+
+        Returns:
+            dict: 清单中的记录
+        """
+        duplicate_of, near_duplicate_of = self.find_duplicates(name, sha256, hashes)
+        entry = {
+            'sha256': sha256,
+            'bytes': size,
+            'format': info.format if info else None,
+            'width': info.width if info else None,
+            'height': info.height if info else None,
+            'method': method,
+            'saved_at': round(time.time(), 3),
+            'mtime': os.path.getmtime(self.directory / name),
+            'duplicate_of': duplicate_of,
+            'dhash': hashes[0] if hashes else None,
+            'phash': hashes[1] if hashes else None,
+            'near_duplicate_of': near_duplicate_of,
+        }
+        self.images[name] = entry
+        return entry
+
+    def rename(self, old_name: str, new_name: str):
+        """文件重命名后同步更新清单"""
+        entry = self.images.pop(old_name, None)
+        if entry is None:
+            return
+        for other in self.images.values():
+            for key in ('duplicate_of', 'near_duplicate_of'):
+                if other.get(key) == old_name:
+                    other[key] = new_name
+        entry['mtime'] = os.path.getmtime(self.directory / new_name)
+        self.images[new_name] = entry
+
+
+class ImageCatalog:
+    """所有主题图片的哈希目录（默认 data/images/catalog.json），键为 "主题目录名/文件名"
+
+    格式:
+        {"version": 1, "images": {"主题/1.png": {"sha256": "...", "dhash": "...", "phash": "..."}}}
+
+    新增和改名追加到同目录的日志（catalog.json.journal，每行一条 JSON），保存一张图片不必重写整个目录；
+    日志条数超过目录条数的一半时合并回 catalog.json（合并的总开销与条数成正比）。
+    多个进程同时使用时，读写都应在 lock() 内进行。
+    """
+
+    VERSION = 1
+    # 日志至少积累这么多条才合并，避免目录很小时频繁重写
+    COMPACT_MIN_ENTRIES = 256
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.journal_path = self.path.with_name(self.path.name + '.journal')
+        self.images: Dict[str, dict] = {}
+        self._loaded_from = None  # 已加载的 catalog.json 与日志文件的标识，被其它进程改写后需要重新加载
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self.refresh()
+
+    def lock(self) -> FileLock:
+        """跨进程的文件锁（catalog.json.lock）"""
+        return FileLock(self.path.with_name(self.path.name + '.lock'))
+
+    def _identity(self):
+        identity = []
+        for path in (self.path, self.journal_path):
+            try:
+                stat = path.stat()
+                identity.append((stat.st_ino, stat.st_mtime_ns) if path == self.path else stat.st_ino)
+            except FileNotFoundError:
+                identity.append(None)
+        return tuple(identity)
+
+    def refresh(self):
+        """读取其它进程的变更：目录被合并改写过时重新加载，否则只读取日志新增的部分"""
+        identity = self._identity()
+        if identity != self._loaded_from:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.images = json.load(f).get('images', {})
+            except (FileNotFoundError, ValueError):
+                self.images = {}
+            self._loaded_from = identity
+            self._journal_offset = 0
+            self._journal_entries = 0
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        complete = data.rfind(b'\n') + 1  # 只处理完整的行
+        for line in data[:complete].splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                continue  # 进程崩溃时写了一半的行
+            self._journal_entries += 1
+        self._journal_offset += complete
+
+    def _apply(self, change: dict):
+        if change['op'] == 'record':
+            self.images[change['key']] = change['entry']
+        elif change['op'] == 'rename':
+            entry = self.images.pop(change['old'], None)
+            if entry is not None:
+                self.images[change['new']] = entry
+
+    def _append(self, change: dict):
+        """追加一条变更到日志，日志过长时合并回 catalog.json"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_path, 'ab') as f:
+            f.write(json.dumps(change, ensure_ascii=False).encode('utf-8') + b'\n')
+            self._journal_offset = f.tell()
+        self._journal_entries += 1
+        self._loaded_from = self._identity()
+        if self._journal_entries > max(len(self.images) // 2, self.COMPACT_MIN_ENTRIES):
+            self.save()
+
+    def save(self):
+        """原子写回完整的图片目录，并清空日志"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps({'version': self.VERSION, 'images': self.images}, ensure_ascii=False, indent=2)
+        atomic_write_text(self.path, content + '\n')
+        try:
+            self.journal_path.unlink()
+        except FileNotFoundError:
+            pass
+        self._loaded_from = self._identity()
+        self._journal_offset = 0
+        self._journal_entries = 0
+
+    def find_duplicate(self, key: str, sha256: str, hashes: Optional[Tuple[str, str]]) -> Optional[str]:
+        """在其它主题中查找内容相同或近似重复的图片"""
+        theme = key.split('/', 1)[0] + '/'
+        others = {name: entry for name, entry in self.images.items() if not name.startswith(theme)}
+        for name, entry in others.items():
+            if entry.get('sha256') == sha256:
+                return name
+        index = PerceptualIndex(
+            (name, entry['dhash'], entry['phash']) for name, entry in others.items() if entry.get('phash')
+        )
+        return nearest_duplicate(index, hashes)
+
+    def rename(self, old_key: str, new_key: str):
+        if old_key in self.images:
+            self.images[new_key] = self.images.pop(old_key)
+            self._append({'op': 'rename', 'old': old_key, 'new': new_key})
+
+    def record(self, key: str, sha256: str, hashes: Optional[Tuple[str, str]]):
+        entry = {
+            'sha256': sha256,
+            'dhash': hashes[0] if hashes else None,
+            'phash': hashes[1] if hashes else None,
+        }
+        self.images[key] = entry
+        self._append({'op': 'record', 'key': key, 'entry': entry})
+
+
+# 进程内按路径缓存的图片目录，每次使用时只读取其它进程新增的变更
+_catalogs: Dict[Path, ImageCatalog] = {}
+
+
+@contextmanager
+def _locked_catalog(catalog_path: Union[str, Path, None]):
+    """在文件锁内使用全局图片目录（调用方需持有 _MANIFEST_LOCK）；catalog_path 为 None 时得到 None"""
+    if not catalog_path:
+        yield None
+        return
+    path = Path(catalog_path).absolute()
+    catalog = _catalogs.get(path)
+    if catalog is None:
+        catalog = _catalogs[path] = ImageCatalog(path)
+    with catalog.lock():
+        catalog.refresh()
+        yield catalog
+
+
+def catalog_key(filepath: Union[str, Path]) -> str:
+    """图片在全局图片目录中的键：主题目录名/文件名"""
+    filepath = Path(filepath)
+    return f"{filepath.parent.name}/{filepath.name}"
+
+
+def register_image_file(
+    filepath: Union[str, Path],
+    method: str = None,
+    catalog_path: Union[str, Path, None] = None,
+    skip_duplicates: bool = False,
+    blob_store=None,
+) -> Tuple[Path, dict]:
+    """识别已保存图片的真实格式、修正扩展名，并记录到所在目录的清单中
+
+    阻塞调用（读取整个文件计算哈希），异步代码中请配合 asyncio.to_thread 使用。
+
+    Args:
+        filepath: 图片文件路径
+        method: 保存方式（download / url / screenshot 等）
+        catalog_path: 全局图片目录路径，为 None 时不查找跨主题重复
+        skip_duplicates: 与已有图片内容相同或近似重复时删除该文件，不记录（返回的记录中 skipped 为 True）
+        blob_store: 内容寻址存储（BlobStore），不为 None 时把图片换成指向存储中 blob 的硬链接
+
+    Returns:
+        tuple: (修正扩展名后的文件路径, 清单记录)；修正后的文件名已被其它文件占用时保留原文件名
+    """
+    filepath = Path(filepath)
+    info, sha256, size = inspect_image_file(filepath)
+    if info and filepath.suffix.lower() not in _equivalent_exts(info.ext):
+        corrected = filepath.with_suffix(info.ext)
+        if not corrected.exists():  # 不覆盖已有的图片（如上一次运行保存的同名文件）
+            os.replace(filepath, corrected)
+            filepath = corrected
+    try:
+        hashes = image_hashes(filepath)
+    except Exception:
+        hashes = None
+
+    # 无法解码的文件不进入目录
+    with _MANIFEST_LOCK, _locked_catalog(catalog_path if hashes else None) as catalog:
+        manifest = ImageManifest(filepath.parent)
+        key = catalog_key(filepath)
+        catalog_match = catalog.find_duplicate(key, sha256, hashes) if catalog else None
+
+        if skip_duplicates:
+            duplicate_of, near_duplicate_of = manifest.find_duplicates(filepath.name, sha256, hashes)
+            if duplicate_of or near_duplicate_of or catalog_match:
+                filepath.unlink()
+                return filepath, {
+                    'skipped': True, 'duplicate_of': duplicate_of,
+                    'near_duplicate_of': near_duplicate_of, 'catalog_match': catalog_match,
+                }
+
+        if blob_store is not None and hashes:
+            blob_store.ingest(filepath, sha256)  # 先于 record，清单中记录链接后的修改时间
+        entry = manifest.record(filepath.name, info, sha256, size, method, hashes)
+        entry['catalog_match'] = catalog_match
+        manifest.save()
+        if catalog:
+            catalog.record(key, sha256, hashes)
+    return filepath, entry
+
+
+def rename_image_file(filepath: Union[str, Path], new_stem: str, catalog_path: Union[str, Path, None] = None) -> Path:
+    """重命名图片（保留按内容识别出的扩展名），并同步更新所在目录的清单和全局图片目录
+
+    Args:
+        filepath: 图片文件路径
+        new_stem: 新文件名（不含扩展名），如 "封面"
+        catalog_path: 全局图片目录路径，为 None 时不更新
+
+    Returns:
+        Path: 新文件路径（目标已存在时覆盖）
+    """
+    filepath = Path(filepath)
+    new_path = filepath.with_name(new_stem + filepath.suffix)
+    os.replace(filepath, new_path)
+
+    with _MANIFEST_LOCK, _locked_catalog(catalog_path) as catalog:
+        manifest = ImageManifest(filepath.parent)
+        if filepath.name in manifest.images:
+            manifest.images.pop(new_path.name, None)
+            manifest.rename(filepath.name, new_path.name)
+            manifest.save()
+        if catalog:
+            catalog.rename(catalog_key(filepath), catalog_key(new_path))
+    return new_path
+
+
+def _equivalent_exts(ext: str) -> Tuple[str, ...]:
+    return ('.jpg', '.jpeg') if ext == '.jpg' else (ext,)
+
+
+def image_info_dict(info: Optional[ImageInfo]) -> dict:
+    """ImageInfo 转换为 dict（None 时返回空 dict）"""
+    return asdict(info) if info else {}
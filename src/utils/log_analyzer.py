@@ -0,0 +1,350 @@
+"""
+运行日志分析模块
+
+逐行流式读取 data/logs/<会话>_run.log（包括日志保留压缩出的 .log.gz），还原每次运行的：
+- 各阶段耗时：优先使用运行结束时的"阶段耗时"汇总行；运行中断时按"阶段开始"日志的时间戳推算
+- 每个批次的延迟（首次发送生成请求到生成完成）、发送次数和结果
+- 重试次数（被拒绝 / 出错 / 额度用尽，以及对账时重新请求的批次）
+- 警告和错误（数字归一化后按类型计数）
+
+多次运行的耗时汇总到按对数分桶的直方图（DurationStats）中估算分位数，内存占用与日志数量无关；
+单次运行的结果通过回调逐个交给调用方，不在内存中保留。
+"""
+
+import bisect
+import gzip
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Union
+
+
+# 日志行格式见 src/utils/logger.py: 时间 - 记录器 - 级别 - 文件:行号 - 消息
+_LINE_RE = re.compile(
+    r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - \S+ - (DEBUG|INFO|WARNING|ERROR|CRITICAL) - \S+ - (.*)$'
+)
+_PHASE_BEGIN_RE = re.compile(r'^阶段开始: (\S+)')
+_PHASE_SUMMARY_RE = re.compile(r'^阶段耗时: (.*)$')
+_PHASE_ITEM_RE = re.compile(r'(\S+)=([\d.]+)s')
+_BATCH_SEND_RE = re.compile(r'^发送生成请求: (P\d+-P\d+)')
+_BATCH_DONE_RE = re.compile(r'^✓ 批次 (\d+) 图片生成完成')
+_BATCH_NO_URLS_RE = re.compile(r'^批次 (\d+) 图片生成成功，但未检测到新图片URL')
+_BATCH_FAILED_RE = re.compile(r'^批次 (\d+) \((P\d+-P\d+)\) 图片生成失败')
+_RECONCILE_RE = re.compile(r'^以下批次没有图片，只重新请求这些批次: (.*)$')
+_RETRY_PATTERNS = (
+    ('refused', re.compile(r'^生成请求被拒绝')),
+    ('quota', re.compile(r'^模型回复额度用尽')),
+    ('error', re.compile(r'^模型回复出错')),
+)
+_RUN_COMPLETED = '=== 工作流执行完成 ==='
+_RUN_FAILED_RE = re.compile(r'^工作流执行(过程中发生错误|失败)')
+
+# 归一化警告/错误消息：数字、URL、路径替换为占位符，便于按类型计数
+_NORMALIZE_RES = (
+    (re.compile(r'https?://\S+'), '<url>'),
+    (re.compile(r'(?:[\w.-]*/)+[\w.-]+'), '<path>'),
+    (re.compile(r'\d+(?:\.\d+)?'), 'N'),
+)
+_MESSAGE_KEY_LENGTH = 80
+
+# 直方图：0.1 秒到约 12 小时，相邻桶上限相差 5%（估算误差不超过 5%）
+_BUCKET_MIN = 0.1
+_BUCKET_GROWTH = 1.05
+DURATION_BUCKETS = tuple(_BUCKET_MIN * _BUCKET_GROWTH ** i for i in range(int(math.log(432000) / math.log(_BUCKET_GROWTH)) + 1))
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class DurationStats:
+    """耗时分布（固定的对数分桶直方图，分位数取桶上限并以最大值封顶）"""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[bisect.bisect_left(DURATION_BUCKETS, seconds)] += 1
+
+    def percentile(self, q: float) -> float:
+        """估算分位数（秒）"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                bound = DURATION_BUCKETS[index] if index < len(DURATION_BUCKETS) else self.max
+                return min(max(bound, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 2) if self.count else 0.0,
+            **{f"p{round(q * 100)}": round(self.percentile(q), 2) for q in PERCENTILES},
+            'min': round(self.min, 2) if self.count else 0.0,
+            'max': round(self.max, 2),
+        }
+
+
+@dataclass
+class BatchRecord:
+    """一个批次的一次生成（含其中的重试）"""
+    label: str
+    latency: float  # 首次发送到结果出现 (秒)
+    attempts: int  # 发送次数
+    outcome: str  # ok / no_urls / failed
+
+
+@dataclass
+class RunReport:
+    """一次运行（一个会话日志文件）的分析结果"""
+    source: str
+    session: str
+    started_at: Optional[datetime] = None
+    ended_at: Optional[datetime] = None
+    status: str = 'incomplete'  # completed / failed / incomplete
+    phases: Dict[str, float] = field(default_factory=dict)
+    batches: List[BatchRecord] = field(default_factory=list)
+    retries: Counter = field(default_factory=Counter)  # 原因 -> 次数
+    warnings: int = 0
+    errors: int = 0
+    issues: Counter = field(default_factory=Counter)  # 归一化的警告/错误消息 -> 次数
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.ended_at is None:
+            return 0.0
+        return (self.ended_at - self.started_at).total_seconds()
+
+    @property
+    def retry_count(self) -> int:
+        return sum(self.retries.values())
+
+    def to_dict(self) -> dict:
+        return {
+            'source': self.source,
+            'session': self.session,
+            'started_at': self.started_at.isoformat(sep=' ') if self.started_at else None,
+            'duration': self.duration,
+            'status': self.status,
+            'phases': {name: round(seconds, 2) for name, seconds in self.phases.items()},
+            'batches': [batch.__dict__ for batch in self.batches],
+            'retries': dict(self.retries),
+            'warnings': self.warnings,
+            'errors': self.errors,
+        }
+
+
+def normalize_message(message: str) -> str:
+    """把消息中的数字、URL、路径替换为占位符，截断到固定长度"""
+    for pattern, placeholder in _NORMALIZE_RES:
+        message = pattern.sub(placeholder, message)
+    return message[:_MESSAGE_KEY_LENGTH]
+
+
+def open_log(path: Union[str, Path]) -> TextIO:
+    """按扩展名打开日志文本（.gz 透明解压），无法解码的字节替换掉"""
+    path = Path(path)
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+
+def session_of(path: Union[str, Path]) -> str:
+    """从日志文件名取会话 ID（<会话>_run.log[.gz]）"""
+    name = Path(path).name
+    for suffix in ('.gz', '.log', '_run', '_error'):
+        if name.endswith(suffix):
+            name = name[: -len(suffix)]
+    return name
+
+
+def parse_run(lines: Iterable[str], source: str = '', session: str = '') -> RunReport:
+    """逐行解析一次运行的日志（不匹配日志格式的行，例如异常堆栈，直接跳过）"""
+    report = RunReport(source=source, session=session)
+    phase_marks = []  # [(阶段名称, 开始时间)]
+    summary_phases = None
+    batch = None  # 正在进行的批次: [label, 首次发送时间, 发送次数]
+    timestamp = None
+
+    for line in lines:
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        stamp, level, message = match.groups()
+        message = message.rstrip()
+        timestamp = datetime.strptime(stamp, '%Y-%m-%d %H:%M:%S')
+        if report.started_at is None:
+            report.started_at = timestamp
+
+        if level == 'WARNING':
+            report.warnings += 1
+            report.issues[normalize_message(message)] += 1
+        elif level in ('ERROR', 'CRITICAL'):
+            report.errors += 1
+            report.issues[normalize_message(message)] += 1
+
+        m = _BATCH_SEND_RE.match(message)
+        if m:
+            if batch and batch[0] == m.group(1):
+                batch[2] += 1
+            else:
+                batch = [m.group(1), timestamp, 1]
+            continue
+        for outcome, pattern in (('ok', _BATCH_DONE_RE), ('no_urls', _BATCH_NO_URLS_RE), ('failed', _BATCH_FAILED_RE)):
+            if pattern.match(message):
+                if batch:
+                    latency = (timestamp - batch[1]).total_seconds()
+                    report.batches.append(BatchRecord(batch[0], latency, batch[2], outcome))
+                    batch = None
+                break
+        else:
+            m = _PHASE_BEGIN_RE.match(message)
+            if m:
+                phase_marks.append((m.group(1), timestamp))
+                continue
+            m = _PHASE_SUMMARY_RE.match(message)
+            if m:
+                summary_phases = {name: float(value) for name, value in _PHASE_ITEM_RE.findall(m.group(1))}
+                continue
+            m = _RECONCILE_RE.match(message)
+            if m:
+                report.retries['reconcile'] += len([label for label in m.group(1).split(',') if label.strip()])
+                continue
+            for reason, pattern in _RETRY_PATTERNS:
+                if pattern.match(message):
+                    report.retries[reason] += 1
+                    break
+            else:
+                if message.startswith(_RUN_COMPLETED):
+                    if report.status != 'failed':  # 旧版本 main.py 在工作流失败后也会记录完成
+                        report.status = 'completed'
+                elif _RUN_FAILED_RE.match(message):
+                    report.status = 'failed'
+
+    report.ended_at = timestamp
+    if summary_phases is not None:
+        report.phases = summary_phases
+    else:
+        # 没有汇总行（运行中断）：按阶段开始的时间戳推算，最后一个阶段持续到最后一行日志
+        for (name, begin), (_, end) in zip(phase_marks, phase_marks[1:] + [(None, timestamp)]):
+            report.phases[name] = report.phases.get(name, 0.0) + (end - begin).total_seconds()
+    return report
+
+
+def analyze_file(path: Union[str, Path]) -> RunReport:
+    """流式分析一个日志文件"""
+    with open_log(path) as f:
+        return parse_run(f, source=str(path), session=session_of(path))
+
+
+def iter_log_files(paths: Iterable[Union[str, Path]]) -> Iterator[Path]:
+    """展开参数中的目录（其中的 *_run.log 和 *_run.log.gz），按文件名排序"""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            yield from sorted(p for p in path.iterdir() if p.name.endswith(('_run.log', '_run.log.gz')))
+        else:
+            yield path
+
+
+class LogAnalysis:
+    """多次运行的汇总（只保留直方图和计数）"""
+
+    def __init__(self):
+        self.runs = 0
+        self.status = Counter()
+        self.run_duration = DurationStats()
+        self.phases: Dict[str, DurationStats] = {}
+        self.batch_latency = DurationStats()
+        self.batch_attempts = Counter()  # 发送次数 -> 批次数
+        self.batch_outcomes = Counter()
+        self.retries = Counter()
+        self.warnings = 0
+        self.errors = 0
+        self.issues = Counter()
+
+    def add(self, report: RunReport):
+        self.runs += 1
+        self.status[report.status] += 1
+        if report.started_at is not None:
+            self.run_duration.add(report.duration)
+        for name, seconds in report.phases.items():
+            self.phases.setdefault(name, DurationStats()).add(seconds)
+        for batch in report.batches:
+            self.batch_latency.add(batch.latency)
+            self.batch_attempts[batch.attempts] += 1
+            self.batch_outcomes[batch.outcome] += 1
+        self.retries.update(report.retries)
+        self.warnings += report.warnings
+        self.errors += report.errors
+        self.issues.update(report.issues)
+
+    def to_dict(self, top: int = 10) -> dict:
+        return {
+            'runs': self.runs,
+            'status': dict(self.status),
+            'run_duration': self.run_duration.to_dict(),
+            'phases': {name: stats.to_dict() for name, stats in self.phases.items()},
+            'batch_latency': self.batch_latency.to_dict(),
+            'batch_attempts': {str(n): count for n, count in sorted(self.batch_attempts.items())},
+            'batch_outcomes': dict(self.batch_outcomes),
+            'retries': dict(self.retries),
+            'warnings': self.warnings,
+            'errors': self.errors,
+            'top_issues': self.issues.most_common(top),
+        }
+
+    def format_report(self, top: int = 10) -> str:
+        """生成可读的汇总报告"""
+        def row(name: str, stats: DurationStats) -> str:
+            cells = "  ".join(f"p{round(q * 100)} {stats.percentile(q):8.1f}s" for q in PERCENTILES)
+            return f"  {name:<12} x{stats.count:<5d} {cells}  最长 {stats.max:8.1f}s"
+
+        status = "，".join(f"{name} {count}" for name, count in self.status.most_common())
+        lines = [f"运行次数: {self.runs}（{status or '无'}）", "耗时分布:", row("整次运行", self.run_duration)]
+        lines += [row(name, stats) for name, stats in self.phases.items()]
+        lines.append(row("批次延迟", self.batch_latency))
+        if self.batch_latency.count:
+            attempts = "，".join(f"{n} 次 {count} 个" for n, count in sorted(self.batch_attempts.items()))
+            outcomes = "，".join(f"{name} {count}" for name, count in self.batch_outcomes.most_common())
+            lines.append(f"批次发送次数: {attempts}；结果: {outcomes}")
+        retries = "，".join(f"{name} {count}" for name, count in self.retries.most_common())
+        lines.append(f"重试: {sum(self.retries.values())} 次（{retries or '无'}）")
+        lines.append(f"警告 {self.warnings} 条，错误 {self.errors} 条")
+        for message, count in self.issues.most_common(top):
+            lines.append(f"  x{count:<5d} {message}")
+        return "\n".join(lines)
+
+
+def analyze_logs(
+    paths: Iterable[Union[str, Path]],
+    on_run: Optional[Callable[[RunReport], None]] = None,
+) -> LogAnalysis:
+    """逐个文件流式分析并汇总
+
+    Args:
+        paths: 日志文件或日志目录
+        on_run: 每分析完一次运行时调用（例如输出单次运行的明细）
+    """
+    analysis = LogAnalysis()
+    for path in iter_log_files(paths):
+        report = analyze_file(path)
+        analysis.add(report)
+        if on_run is not None:
+            on_run(report)
+    return analysis
@@ -0,0 +1,306 @@
+"""
+日志保留模块
+
+日志是 DEBUG 级别并包含完整提示词，data/logs 增长很快。这里做三件事：
+- 压缩：已关闭的会话日志（不属于当前会话或其他运行中的会话，且 LOG_COMPRESS_IDLE 秒内没有写入）流式压缩为 <名称>.log.gz
+- 期限：超过 LOG_RETENTION_DAYS 天的日志和压缩包删除
+- 总量：日志目录超过 LOG_RETENTION_MAX_BYTES 时，从最旧的压缩包开始删除，直到回到预算内
+
+已压缩的文件记录在 .archive_index.json（原始大小、压缩后大小、修改时间、压缩时间），每次只需列一次目录：
+索引中已有的压缩包不再 stat，也不会重新读取，只处理新出现的 .log 文件。
+运行中的会话由 SessionLogger 写入的 .<会话ID>.live 标记识别（错误日志可能很久没有写入但仍然打开着），
+标记中的进程已经退出时视为异常退出后遗留的标记并删除。
+同一时间只有一个进程整理（.retention.lock），既可以由 scripts/clean_logs.py 手动运行，
+也会在每次运行期间作为后台线程定期执行（start_background_retention）。
+"""
+
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+from src.config.settings import (
+    DEFAULT_LOGS_DIR,
+    LOG_COMPRESS_IDLE,
+    LOG_RETENTION_DAYS,
+    LOG_RETENTION_INTERVAL,
+    LOG_RETENTION_MAX_BYTES,
+)
+from src.utils.file_utils import AtomicWriter, atomic_write_text
+from src.utils.logger import LIVE_MARKER_SUFFIX, get_deferred_logger
+
+logger = get_deferred_logger()
+
+ARCHIVE_INDEX_FILENAME = ".archive_index.json"
+LOCK_FILENAME = ".retention.lock"
+# 锁文件超过该时间视为上一次整理异常退出后遗留的 (秒)
+_STALE_LOCK_SECONDS = 600
+# 索引中保留的最近删除记录数
+_REMOVED_HISTORY = 200
+
+
+def _pid_alive(pid: int) -> bool:
+    """进程是否仍在运行"""
+    if pid <= 0:
+        return False
+    if os.name == 'nt':
+        # Windows 上 os.kill 会结束进程，无法用来探测；保守地视为仍在运行
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # 其他用户的进程
+    return True
+
+
+@dataclass
+class RetentionResult:
+    """一次整理的结果"""
+    compressed: int = 0
+    compressed_bytes: int = 0  # 压缩前的大小合计
+    deleted: int = 0
+    freed_bytes: int = 0  # 压缩与删除共释放的空间
+    total_bytes: int = 0  # 整理后日志目录的大小
+    skipped: bool = False  # 其他进程正在整理
+
+
+class LogRetention:
+    """按期限和总量整理日志目录"""
+
+    def __init__(
+        self,
+        log_dir: Union[str, Path] = DEFAULT_LOGS_DIR,
+        max_age_days: Optional[float] = LOG_RETENTION_DAYS,
+        max_total_bytes: Optional[int] = LOG_RETENTION_MAX_BYTES,
+        compress_idle: float = LOG_COMPRESS_IDLE,
+        current_session: Optional[str] = None,
+    ):
+        """
+        Args:
+            log_dir: 日志目录
+            max_age_days: 保留天数，None 表示不按期限删除
+            max_total_bytes: 日志目录总大小上限，None 表示不限制
+            compress_idle: 日志多久没有写入视为已关闭 (秒)
+            current_session: 当前会话 ID，其日志不会被压缩或删除（其他运行中的会话由 .live 标记识别）
+        """
+        self.log_dir = Path(log_dir)
+        self.max_age_days = max_age_days
+        self.max_total_bytes = max_total_bytes
+        self.compress_idle = compress_idle
+        self.current_session = current_session
+        self.index_path = self.log_dir / ARCHIVE_INDEX_FILENAME
+        self.live_sessions = set()
+
+    def load_index(self) -> dict:
+        """读取压缩索引（不存在或损坏时为空）"""
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (FileNotFoundError, ValueError):
+            index = {}
+        index.setdefault('version', 1)
+        index.setdefault('archives', {})
+        index.setdefault('removed', [])
+        return index
+
+    def _is_current(self, name: str) -> bool:
+        """日志属于当前会话或其他运行中的会话（按 <会话ID>_run.log / <会话ID>_error.log 精确匹配）"""
+        sessions = self.live_sessions | ({self.current_session} if self.current_session else set())
+        return any(name in (f"{session}_run.log", f"{session}_error.log") for session in sessions)
+
+    def _check_live_marker(self, name: str, dry_run: bool):
+        """读取 .<会话ID>.live 标记：进程仍在运行时记为运行中的会话，否则删除遗留的标记"""
+        session = name[1:-len(LIVE_MARKER_SUFFIX)]
+        path = self.log_dir / name
+        try:
+            pid = int(path.read_text(encoding='utf-8').strip() or 0)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            pid = None  # 正在写入或无法读取，按运行中处理
+        if pid is None or _pid_alive(pid):
+            self.live_sessions.add(session)
+        elif not dry_run:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _acquire_lock(self) -> bool:
+        lock = self.log_dir / LOCK_FILENAME
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime < _STALE_LOCK_SECONDS:
+                    return False
+                lock.unlink()
+            except FileNotFoundError:
+                pass
+            return self._acquire_lock()
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        return True
+
+    def _release_lock(self):
+        try:
+            (self.log_dir / LOCK_FILENAME).unlink()
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def compress_file(source: Path, target: Path):
+        """流式 gzip 压缩（先写临时文件），压缩包保留原文件的修改时间"""
+        mtime = source.stat().st_mtime
+        with open(source, 'rb') as src, AtomicWriter(target) as raw:
+            with gzip.GzipFile(filename=source.name, mode='wb', fileobj=raw, compresslevel=6, mtime=int(mtime)) as gz:
+                shutil.copyfileobj(src, gz, 1024 * 1024)
+        os.utime(target, (mtime, mtime))
+
+    def run(self, dry_run: bool = False) -> RetentionResult:
+        """整理一次日志目录
+
+        Args:
+            dry_run: 只统计将要压缩和删除的文件，不做改动
+        """
+        result = RetentionResult()
+        if not self.log_dir.is_dir():
+            return result
+        if not dry_run and not self._acquire_lock():
+            result.skipped = True
+            return result
+        try:
+            self._run(result, dry_run)
+        finally:
+            if not dry_run:
+                self._release_lock()
+        return result
+
+    def _run(self, result: RetentionResult, dry_run: bool):
+        now = time.time()
+        index = self.load_index()
+        archives: Dict[str, dict] = index['archives']
+
+        # 列一次目录：未压缩的日志需要 stat，索引中已有的压缩包直接使用记录
+        logs: Dict[str, os.stat_result] = {}
+        seen_archives = set()
+        self.live_sessions = set()
+        with os.scandir(self.log_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') and entry.name.endswith(LIVE_MARKER_SUFFIX):
+                    self._check_live_marker(entry.name, dry_run)
+                elif entry.name.endswith('.log') and entry.is_file():
+                    logs[entry.name] = entry.stat()
+                elif entry.name.endswith('.log.gz') and entry.is_file():
+                    seen_archives.add(entry.name)
+                    if entry.name not in archives:  # 其他方式放进来的压缩包
+                        st = entry.stat()
+                        archives[entry.name] = {
+                            'bytes': st.st_size, 'original_bytes': None,
+                            'mtime': st.st_mtime, 'archived_at': round(now, 3),
+                        }
+        for name in set(archives) - seen_archives:  # 被手动删除的压缩包
+            del archives[name]
+
+        def remove(name: str, size: int, mtime: float, reason: str):
+            if not dry_run:
+                try:
+                    os.unlink(self.log_dir / name)
+                except FileNotFoundError:
+                    return
+                index['removed'].append({'name': name, 'bytes': size, 'mtime': mtime,
+                                         'removed_at': round(now, 3), 'reason': reason})
+            archives.pop(name, None)
+            logs.pop(name, None)
+            result.deleted += 1
+            result.freed_bytes += size
+
+        # 期限
+        if self.max_age_days is not None:
+            cutoff = now - self.max_age_days * 86400
+            for name, meta in list(archives.items()):
+                if meta['mtime'] < cutoff:
+                    remove(name, meta['bytes'], meta['mtime'], 'age')
+            for name, st in list(logs.items()):
+                if st.st_mtime < cutoff and not self._is_current(name):
+                    remove(name, st.st_size, st.st_mtime, 'age')
+
+        # 压缩已关闭的日志
+        for name, st in sorted(logs.items(), key=lambda item: item[1].st_mtime):
+            if self._is_current(name) or now - st.st_mtime < self.compress_idle:
+                continue
+            target = f"{name}.gz"
+            result.compressed += 1
+            result.compressed_bytes += st.st_size
+            if dry_run:
+                continue
+            try:
+                self.compress_file(self.log_dir / name, self.log_dir / target)
+                os.unlink(self.log_dir / name)
+            except FileNotFoundError:
+                continue  # 另一个进程刚处理过
+            size = (self.log_dir / target).stat().st_size
+            archives[target] = {
+                'bytes': size, 'original_bytes': st.st_size,
+                'mtime': st.st_mtime, 'archived_at': round(now, 3),
+            }
+            del logs[name]
+            result.freed_bytes += st.st_size - size
+
+        # 总量：从最旧的压缩包开始删除，其次是最旧的已关闭日志
+        total = sum(meta['bytes'] for meta in archives.values()) + sum(st.st_size for st in logs.values())
+        if self.max_total_bytes is not None and total > self.max_total_bytes:
+            candidates = sorted(
+                [(meta['mtime'], name, meta['bytes']) for name, meta in archives.items()]
+                + [(st.st_mtime, name, st.st_size) for name, st in logs.items()
+                   if not self._is_current(name) and now - st.st_mtime >= self.compress_idle]
+            )
+            for mtime, name, size in candidates:
+                if total <= self.max_total_bytes:
+                    break
+                remove(name, size, mtime, 'budget')
+                total -= size
+        result.total_bytes = total
+
+        if not dry_run:
+            index['removed'] = index['removed'][-_REMOVED_HISTORY:]
+            index['updated_at'] = round(now, 3)
+            atomic_write_text(self.index_path, json.dumps(index, ensure_ascii=False, indent=2) + '\n')
+
+
+def start_background_retention(
+    current_session: Optional[str],
+    interval: Optional[float] = LOG_RETENTION_INTERVAL,
+    log_dir: Union[str, Path] = DEFAULT_LOGS_DIR,
+) -> Optional[threading.Event]:
+    """在后台线程中整理日志：启动时一次，之后每 interval 秒一次（守护线程，随进程退出）
+
+    Returns:
+        threading.Event: set() 后停止；interval 为 None 时不启动，返回 None
+    """
+    if interval is None:
+        return None
+    stop = threading.Event()
+    retention = LogRetention(log_dir, current_session=current_session)
+
+    def loop():
+        while True:
+            try:
+                result = retention.run()
+                if result.compressed or result.deleted:
+                    logger.debug(f"日志整理: 压缩 {result.compressed} 个，删除 {result.deleted} 个，"
+                                 f"释放 {result.freed_bytes / 1024 / 1024:.1f} MB")
+            except Exception as e:
+                logger.debug(f"日志整理失败: {e}")
+            if stop.wait(interval):
+                return
+
+    threading.Thread(target=loop, name="log-retention", daemon=True).start()
+    return stop
@@ -4,6 +4,7 @@
 提供统一的日志记录功能，支持分级别日志和按session分割的日志文件
 """
 
+import atexit
 import logging
 import os
 import sys
@@ -13,20 +14,29 @@ from typing import Optional
 
 from src.config.settings import DEFAULT_LOGS_DIR, LOG_LEVEL
 
+# 运行中会话的标记文件后缀：日志目录下的 .<会话ID>.live，内容为进程 ID，进程退出时删除。
+# 日志整理（log_retention）据此跳过仍打开着日志文件的会话，即使日志长时间没有写入
+LIVE_MARKER_SUFFIX = ".live"
+
+
+def live_marker_path(log_dir, session_id: str) -> Path:
+    """会话的运行中标记文件路径"""
+    return Path(log_dir) / f".{session_id}{LIVE_MARKER_SUFFIX}"
+
 
 class SessionLogger:
     """基于会话的日志管理器"""
     
-    def __init__(self, session_id: Optional[str] = None, log_dir: str = DEFAULT_LOGS_DIR):
+    def __init__(self, session_id: Optional[str] = None, log_dir: Optional[str] = None):
         """
         初始化日志管理器
         
         Args:
             session_id: 会话ID，用作日志文件名前缀
-            log_dir: 日志目录路径
+            log_dir: 日志目录路径，默认为 DEFAULT_LOGS_DIR
         """
         self.session_id = session_id or datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.log_dir = Path(log_dir)
+        self.log_dir = Path(log_dir or DEFAULT_LOGS_DIR)
         self.log_dir.mkdir(parents=True, exist_ok=True)
         
         # 创建日志文件名
@@ -35,6 +45,29 @@ class SessionLogger:
         
         # 设置日志记录器
         self._setup_loggers()
+        self._mark_live()
+    
+    def _mark_live(self):
+        """写入运行中标记，close() 或进程退出时删除"""
+        live_marker_path(self.log_dir, self.session_id).write_text(str(os.getpid()), encoding='utf-8')
+        atexit.register(self._unmark_live)
+    
+    def _unmark_live(self):
+        """删除运行中标记（只删除本进程写入的标记）"""
+        marker = live_marker_path(self.log_dir, self.session_id)
+        try:
+            if marker.read_text(encoding='utf-8') == str(os.getpid()):
+                marker.unlink()
+        except OSError:
+            pass
+    
+    def close(self):
+        """关闭日志文件并删除运行中标记"""
+        for handler in self.logger.handlers + self.error_logger.handlers:
+            handler.close()
+        self.logger.handlers.clear()
+        self.error_logger.handlers.clear()
+        self._unmark_live()
     
     def _setup_loggers(self):
         """设置运行日志和错误日志记录器"""
@@ -129,13 +162,37 @@ def get_logger(session_id: Optional[str] = None) -> SessionLogger:
     return _global_logger
 
 
-def init_logger(session_id: str) -> SessionLogger:
-    """初始化日志记录器并返回实例"""
+def init_logger(session_id: str, log_dir: Optional[str] = None) -> SessionLogger:
+    """初始化日志记录器并返回实例（log_dir 默认为 DEFAULT_LOGS_DIR）"""
     global _global_logger
-    _global_logger = SessionLogger(session_id=session_id)
+    _global_logger = SessionLogger(session_id=session_id, log_dir=log_dir)
     return _global_logger
 
 
+def close_logger():
+    """关闭全局日志记录器，之后 get_logger 会重新创建"""
+    global _global_logger
+    if _global_logger is not None:
+        _global_logger.close()
+        _global_logger = None
+
+
+class DeferredLogger:
+    """模块级日志记录器代理
+
+    第一次记录日志时才获取全局日志记录器，导入模块时不会创建日志文件，
+    并且始终写入当前会话（init_logger 之后）的日志。
+    """
+
+    def __getattr__(self, name):
+        return getattr(get_logger(), name)
+
+
+def get_deferred_logger() -> DeferredLogger:
+    """获取模块级使用的延迟日志记录器"""
+    return DeferredLogger()
+
+
 # 简化的日志函数，方便直接调用
 def debug(message: str):
     """记录调试信息"""
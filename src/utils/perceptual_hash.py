@@ -0,0 +1,130 @@
+"""
+感知哈希模块
+
+内容哈希（sha256）只能发现逐字节相同的图片；Gemini 给两个批次返回同一张图、或续跑时重新下载已有图片时，
+重新编码、截图或缩放后的文件字节不同，URL 去重（saved_image_urls）也发现不了。
+这里为每张图片计算两个 64 位感知哈希（都用 NumPy 向量化计算）：
+- dHash：缩小到 9x8 灰度图，比较相邻像素的明暗
+- pHash：缩小到 32x32 灰度图做二维 DCT，取左上 8x8 低频系数与中位数比较
+两个哈希的汉明距离都不超过阈值时视为近似重复。PerceptualIndex 批量比较一组哈希。
+"""
+
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from src.config.settings import DHASH_MAX_DISTANCE, PHASH_MAX_DISTANCE
+
+
+_PHASH_SIZE = 32
+_PHASH_LOW = 8
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """n 点 DCT-II 变换矩阵"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+
+_DCT = _dct_matrix(_PHASH_SIZE)
+_BIT_WEIGHTS = (1 << np.arange(63, -1, -1, dtype=np.uint64)).astype(np.uint64)
+
+
+def _pack_bits(bits: np.ndarray) -> int:
+    """64 个布尔值按高位在前打包为整数"""
+    return int(np.bitwise_or.reduce(bits.ravel().astype(np.uint64) * _BIT_WEIGHTS))
+
+
+def dhash(image: Image.Image) -> int:
+    """差异哈希"""
+    gray = np.asarray(image.convert('L').resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    return _pack_bits(gray[:, 1:] > gray[:, :-1])
+
+
+def phash(image: Image.Image) -> int:
+    """DCT 感知哈希"""
+    gray = np.asarray(image.convert('L').resize((_PHASH_SIZE, _PHASH_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT @ gray @ _DCT.T)[:_PHASH_LOW, :_PHASH_LOW]
+    median = np.median(low.ravel()[1:])  # 不含直流分量
+    return _pack_bits(low > median)
+
+
+def image_hashes(filepath: Union[str, Path]) -> Tuple[str, str]:
+    """计算图片文件的 (dHash, pHash)，各为 16 位十六进制字符串
+
+    Raises:
+        Exception: 无法解码图片
+    """
+    with Image.open(filepath) as image:
+        image.draft('L', (_PHASH_SIZE * 4, _PHASH_SIZE * 4))  # JPEG 解码时直接缩小
+        image = image.convert('L')
+        return f"{dhash(image):016x}", f"{phash(image):016x}"
+
+
+def hamming(a: str, b: str) -> int:
+    """两个十六进制哈希的汉明距离"""
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    """uint64 数组逐元素的置位数"""
+    return np.unpackbits(values.view(np.uint8).reshape(*values.shape, 8), axis=-1).sum(axis=-1)
+
+
+class PerceptualIndex:
+    """一组图片的感知哈希，批量查找近似重复"""
+
+    def __init__(self, items: Iterable[Tuple[str, str, str]] = ()):
+        """
+        Args:
+            items: [(名称, dHash, pHash)]
+        """
+        items = list(items)
+        self.keys = [key for key, _, _ in items]
+        self.dhashes = np.array([int(d, 16) for _, d, _ in items], dtype=np.uint64)
+        self.phashes = np.array([int(p, 16) for _, _, p in items], dtype=np.uint64)
+
+    def find(
+        self,
+        dhash_hex: str,
+        phash_hex: str,
+        exclude: Iterable[str] = (),
+        max_dhash: int = DHASH_MAX_DISTANCE,
+        max_phash: int = PHASH_MAX_DISTANCE,
+    ) -> List[Tuple[str, int, int]]:
+        """查找与给定哈希近似的图片，按 pHash 距离升序返回 [(名称, dHash 距离, pHash 距离)]"""
+        if not self.keys:
+            return []
+        d = _popcount(self.dhashes ^ np.uint64(int(dhash_hex, 16)))
+        p = _popcount(self.phashes ^ np.uint64(int(phash_hex, 16)))
+        exclude = set(exclude)
+        matches = [
+            (self.keys[i], int(d[i]), int(p[i]))
+            for i in np.flatnonzero((d <= max_dhash) & (p <= max_phash))
+            if self.keys[i] not in exclude
+        ]
+        return sorted(matches, key=lambda match: (match[2], match[1]))
+
+    def duplicate_pairs(
+        self,
+        max_dhash: int = DHASH_MAX_DISTANCE,
+        max_phash: int = PHASH_MAX_DISTANCE,
+    ) -> List[Tuple[str, str]]:
+        """两两比较所有图片，返回近似重复的 (前一张, 后一张)"""
+        d = _popcount(self.dhashes[:, None] ^ self.dhashes[None, :])
+        p = _popcount(self.phashes[:, None] ^ self.phashes[None, :])
+        first, second = np.nonzero(np.triu((d <= max_dhash) & (p <= max_phash), k=1))
+        return [(self.keys[i], self.keys[j]) for i, j in zip(first.tolist(), second.tolist())]
+
+
+def nearest_duplicate(index: PerceptualIndex, hashes: Optional[Tuple[str, str]], exclude: Iterable[str] = ()) -> Optional[str]:
+    """返回最接近的近似重复图片名称（hashes 为 None 或没有近似图片时返回 None）"""
+    if not hashes:
+        return None
+    matches = index.find(*hashes, exclude=exclude)
+    return matches[0][0] if matches else None
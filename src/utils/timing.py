@@ -0,0 +1,337 @@
+"""
+等待耗时统计模块
+
+把运行过程中的等待分成两类分别统计：
+- 固定休眠：硬编码的 asyncio.sleep，无论页面状态如何都要等满，属于"死等"时间
+- 条件等待：等待页面真实状态变化（响应生成、图片加载等），耗时取决于 Gemini
+
+每次固定休眠都会归属到调用位置（文件:行号 函数名），运行结束时输出报告，
+用于判断哪些固定休眠最值得优先改成基于事件的等待。
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent.parent)
+
+
+class SiteStats:
+    """单个调用位置（或等待标签）的耗时统计"""
+
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total': round(self.total, 3),
+            'max': round(self.max, 3),
+        }
+
+
+class WaitAccounting:
+    """一次运行内的等待耗时统计"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清空统计数据，并重新开始计时"""
+        self.started_at = time.perf_counter()
+        # 不在任何条件等待内的固定休眠：调用位置 -> 统计
+        self.sleeps: Dict[str, SiteStats] = {}
+        # 条件等待：标签 -> 统计
+        self.waits: Dict[str, SiteStats] = {}
+        # 条件等待中的轮询休眠：标签 -> 统计（已计入条件等待耗时，不算死等）
+        self.polls: Dict[str, SiteStats] = {}
+        self.wait_timeouts: Dict[str, int] = {}
+
+    def record_sleep(self, site: str, seconds: float, wait_label: Optional[str] = None):
+        """记录一次固定休眠
+
+        Args:
+            site: 调用位置
+            seconds: 实际休眠时长（秒）
+            wait_label: 所属的条件等待标签；为 None 时计入死等时间
+        """
+        if wait_label is None:
+            self.sleeps.setdefault(site, SiteStats()).add(seconds)
+        else:
+            self.polls.setdefault(wait_label, SiteStats()).add(seconds)
+
+    def record_wait(self, label: str, seconds: float, ok: bool = True):
+        """记录一次条件等待
+
+        Args:
+            label: 等待标签
+            seconds: 等待时长（秒）
+            ok: 是否等到了目标条件（False 表示超时或失败）
+        """
+        self.waits.setdefault(label, SiteStats()).add(seconds)
+        if not ok:
+            self.wait_timeouts[label] = self.wait_timeouts.get(label, 0) + 1
+
+    @property
+    def dead_time(self) -> float:
+        """固定休眠总耗时（秒）"""
+        return sum(stats.total for stats in self.sleeps.values())
+
+    @property
+    def condition_wait_time(self) -> float:
+        """条件等待总耗时（秒）"""
+        return sum(stats.total for stats in self.waits.values())
+
+    @property
+    def elapsed(self) -> float:
+        """自开始统计以来的墙钟时间（秒）"""
+        return time.perf_counter() - self.started_at
+
+    def snapshot(self) -> dict:
+        """导出为可序列化的字典（供基准测试使用）"""
+        return {
+            'elapsed': round(self.elapsed, 3),
+            'dead_time': round(self.dead_time, 3),
+            'condition_wait_time': round(self.condition_wait_time, 3),
+            'sleeps': {site: stats.to_dict() for site, stats in self.sleeps.items()},
+            'waits': {label: stats.to_dict() for label, stats in self.waits.items()},
+            'polls': {label: stats.to_dict() for label, stats in self.polls.items()},
+            'wait_timeouts': dict(self.wait_timeouts),
+        }
+
+    def format_report(self, top: int = 15) -> str:
+        """生成可读的等待耗时报告
+
+        Args:
+            top: 最多列出的固定休眠调用位置数量
+
+        Returns:
+            str: 报告文本
+        """
+        elapsed = self.elapsed
+        dead = self.dead_time
+        waiting = self.condition_wait_time
+
+        def percent(value: float) -> str:
+            return f"{value / elapsed * 100:5.1f}%" if elapsed > 0 else "  n/a"
+
+        lines = [
+            "=" * 80,
+            "等待耗时报告",
+            "=" * 80,
+            f"运行总耗时: {elapsed:8.2f} 秒",
+            f"固定休眠:   {dead:8.2f} 秒 ({percent(dead)})",
+            f"条件等待:   {waiting:8.2f} 秒 ({percent(waiting)})",
+            f"其他操作:   {max(elapsed - dead - waiting, 0.0):8.2f} 秒",
+        ]
+
+        if self.sleeps:
+            lines.append("-" * 80)
+            lines.append("固定休眠（按总耗时排序）:")
+            ranked = sorted(self.sleeps.items(), key=lambda item: item[1].total, reverse=True)
+            for site, stats in ranked[:top]:
+                lines.append(f"  {stats.total:7.2f}s  x{stats.count:<4d} 最长 {stats.max:5.2f}s  {site}")
+            if len(ranked) > top:
+                rest = sum(stats.total for _, stats in ranked[top:])
+                lines.append(f"  {rest:7.2f}s  其余 {len(ranked) - top} 个调用位置")
+
+        if self.waits:
+            lines.append("-" * 80)
+            lines.append("条件等待:")
+            ranked = sorted(self.waits.items(), key=lambda item: item[1].total, reverse=True)
+            for label, stats in ranked:
+                poll = self.polls.get(label)
+                poll_text = f"，其中轮询休眠 {poll.total:.2f}s" if poll else ""
+                timeout_text = f"，超时 {self.wait_timeouts[label]} 次" if label in self.wait_timeouts else ""
+                lines.append(
+                    f"  {stats.total:7.2f}s  x{stats.count:<4d} 最长 {stats.max:5.2f}s  {label}{poll_text}{timeout_text}"
+                )
+
+        lines.append("=" * 80)
+        return "\n".join(lines)
+
+
+# 默认的统计实例；并发任务可以通过 use_wait_accounting 使用各自的实例
+_default_accounting = WaitAccounting()
+_current_accounting: contextvars.ContextVar = contextvars.ContextVar('wait_accounting', default=None)
+_current_wait_label: contextvars.ContextVar = contextvars.ContextVar('wait_label', default=None)
+# 最外层条件等待中 dead=True 的固定休眠累计时长（[秒]），从该条件等待的耗时中扣除
+_current_wait_dead: contextvars.ContextVar = contextvars.ContextVar('wait_dead', default=None)
+
+
+def get_wait_accounting() -> WaitAccounting:
+    """获取当前上下文的等待统计实例"""
+    return _current_accounting.get() or _default_accounting
+
+
+def use_wait_accounting(accounting: WaitAccounting) -> contextvars.Token:
+    """让当前上下文（及其创建的任务）使用指定的统计实例
+
+    Returns:
+        contextvars.Token: 可用于 reset_wait_accounting 恢复
+    """
+    return _current_accounting.set(accounting)
+
+
+def reset_wait_accounting(token: contextvars.Token):
+    """恢复 use_wait_accounting 之前的统计实例"""
+    _current_accounting.reset(token)
+
+
+def _call_site(depth: int) -> str:
+    """返回调用位置描述：相对路径:行号 函数名"""
+    frame = sys._getframe(depth + 1)
+    filename = frame.f_code.co_filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    return f"{filename}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+async def fixed_sleep(seconds: float, dead: bool = False):
+    """替代 asyncio.sleep 的固定休眠，并记录到调用位置
+
+    在 condition_wait 内调用时视为轮询间隔，计入对应的条件等待；
+    否则计入死等时间。
+
+    Args:
+        seconds: 休眠时长（秒）
+        dead: 不是轮询间隔而是无条件的等待（例如"额外等 2 秒确保渲染完成"）：
+              即使在条件等待内也计入死等，并从所属条件等待的耗时中扣除
+    """
+    site = _call_site(1)
+    start = time.perf_counter()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        elapsed = time.perf_counter() - start
+        wait_dead = _current_wait_dead.get()
+        if dead and wait_dead is not None:
+            wait_dead[0] += elapsed
+        get_wait_accounting().record_sleep(site, elapsed, None if dead else _current_wait_label.get())
+
+
+@asynccontextmanager
+async def condition_wait(label: str):
+    """统计一段条件等待的耗时
+
+    用法:
+        async with condition_wait("等待响应") as wait:
+            ...
+            wait.ok = False  # 超时或失败时标记
+
+    Args:
+        label: 等待标签
+    """
+    state = _WaitState()
+    outer_label = _current_wait_label.get()
+    # 嵌套的条件等待归入最外层，避免重复计时
+    token = _current_wait_label.set(outer_label or label)
+    dead_token = _current_wait_dead.set([0.0]) if outer_label is None else None
+    start = time.perf_counter()
+    try:
+        yield state
+    except BaseException:
+        state.ok = False
+        raise
+    finally:
+        _current_wait_label.reset(token)
+        if dead_token is not None:
+            dead = _current_wait_dead.get()[0]
+            _current_wait_dead.reset(dead_token)
+            get_wait_accounting().record_wait(label, max(time.perf_counter() - start - dead, 0.0), state.ok)
+
+
+class _WaitState:
+    """condition_wait 的结果标记"""
+
+    __slots__ = ('ok',)
+
+    def __init__(self):
+        self.ok = True
+
+
+def tracked_wait(label: str):
+    """装饰异步等待方法，将其整体计为条件等待
+
+    被装饰方法返回 False，或返回首元素为 False 的元组时，视为等待失败。
+
+    Args:
+        label: 等待标签
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            async with condition_wait(label) as wait:
+                result = await func(*args, **kwargs)
+                if result is False or (isinstance(result, tuple) and result and result[0] is False):
+                    wait.ok = False
+                return result
+        return wrapper
+    return decorator
+
+
+class PhaseTimer:
+    """按阶段统计墙钟耗时
+
+    阶段按顺序切换：begin() 会先结束当前阶段再开始新阶段，finish() 结束当前阶段。
+    同名阶段多次出现时耗时累加。
+    """
+
+    def __init__(self, on_begin: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            on_begin: 每个阶段开始时调用（参数为阶段名称），用于把阶段切换写入日志
+        """
+        self.on_begin = on_begin
+        self.reset()
+
+    def reset(self):
+        """清空阶段耗时"""
+        self.durations: Dict[str, float] = {}
+        self._current: Optional[str] = None
+        self._started_at = 0.0
+
+    def begin(self, name: str):
+        """结束当前阶段并开始新阶段
+
+        Args:
+            name: 阶段名称
+        """
+        self.finish()
+        self._current = name
+        self._started_at = time.perf_counter()
+        if self.on_begin is not None:
+            self.on_begin(name)
+
+    def finish(self):
+        """结束当前阶段"""
+        if self._current is not None:
+            elapsed = time.perf_counter() - self._started_at
+            self.durations[self._current] = self.durations.get(self._current, 0.0) + elapsed
+            self._current = None
+
+    def snapshot(self) -> dict:
+        """导出为可序列化的字典（秒）"""
+        return {name: round(seconds, 3) for name, seconds in self.durations.items()}
+
+    def format_summary(self) -> str:
+        """单行阶段耗时摘要，例如 "阶段耗时: connect=1.20s script=35.10s" """
+        parts = [f"{name}={seconds:.2f}s" for name, seconds in self.durations.items()]
+        return "阶段耗时: " + " ".join(parts) if parts else "阶段耗时: 无"
@@ -0,0 +1,24 @@
+"""
+pytest 公共设置：会话日志写到临时目录，运行测试不在仓库的 data/logs 中留下文件
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils import logger as logger_module
+
+
+@pytest.fixture(autouse=True, scope="session")
+def temp_logs_dir(tmp_path_factory):
+    """把默认日志目录指向临时目录"""
+    original = logger_module.DEFAULT_LOGS_DIR
+    logger_module.DEFAULT_LOGS_DIR = str(tmp_path_factory.mktemp("logs"))
+    yield
+    logger_module.close_logger()
+    logger_module.DEFAULT_LOGS_DIR = original
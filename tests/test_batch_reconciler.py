@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+测试批次对账：把图片容器对应回宫格范围，找出缺失的批次
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.batch_reconciler import BatchReconciler, parse_panel_range, plan_batches
+
+
+def test_plan_batches_and_parse_range():
+    """按 4 个一组划分批次；首批消息带整张表格，取最后一个范围"""
+    batches = plan_batches(10)
+    assert [batch.label for batch in batches] == ['P1-P4', 'P5-P8', 'P9-P10']
+    assert parse_panel_range("| P1 | ... | P12 |\n请生成 P1-P4 宫格") == (1, 4)
+    assert parse_panel_range("请重新绘制 P5 - P8") == (5, 8)
+    assert parse_panel_range("好的") is None
+
+
+class FakePage:
+    def __init__(self, container_queries):
+        self.container_queries = container_queries
+
+    async def evaluate(self, script, arg):
+        return self.container_queries
+
+
+def test_reconciler_finds_missing_batches_and_names_by_batch():
+    """第二批被拒绝后重试，重试产生的容器按批次编号；第三批没有图片"""
+    page = FakePage([
+        {'query': '表格 P1 P2 ... 生成 P1-P4', 'images': 4},
+        {'query': '生成 P5-P8', 'images': 0},
+        {'query': '生成 P9-P12', 'images': 0},
+        {'query': '重新绘制 生成 P5-P8', 'images': 4},
+        {'query': '随便聊聊', 'images': 1},
+    ])
+    reconciler = BatchReconciler(page, plan_batches(12))
+
+    assignments = asyncio.run(reconciler.map_containers())
+
+    assert assignments == {0: 0, 1: 3}
+    assert [batch.label for batch in reconciler.missing(assignments)] == ['P9-P12']
+    assert reconciler.container_names(assignments, 5) == ['1', None, None, '2', None]
+
+
+
+def test_harvest_names_skip_orphan_container_of_retried_batch():
+    """只收集模式：批次由页面上的宫格范围推算；重试前的容器和闲聊回复不保存，后面的批次不错位"""
+    page = FakePage([
+        {'query': '表格 ... 生成 P1-P4', 'images': 4},
+        {'query': '生成 P5-P8', 'images': 4},
+        {'query': '重新绘制 生成 P5-P8', 'images': 4},
+        {'query': '再画一张猫', 'images': 1},
+        {'query': '生成 P9-P10', 'images': 2},
+    ])
+    reconciler = BatchReconciler(page, [])
+
+    names = asyncio.run(reconciler.harvest_names())
+
+    assert names == ['1', None, '2', None, '3']
+    assert [batch.label for batch in reconciler.batches] == ['P1-P4', 'P5-P8', 'P9-P10']
+    assert asyncio.run(BatchReconciler(FakePage([{'query': '你好', 'images': 1}]), []).harvest_names()) is None
+
+
+if __name__ == "__main__":
+    test_plan_batches_and_parse_range()
+    test_reconciler_finds_missing_batches_and_names_by_batch()
+    test_harvest_names_skip_orphan_container_of_retried_batch()
+    print("✓ 测试通过")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+测试内容寻址的图片存储（硬链接去重与 gc）
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from PIL import Image
+
+from src.utils.blob_store import BlobStore, file_sha256
+from src.utils.file_utils import atomic_write_bytes, link_or_copy
+from src.utils.image_utils import ImageManifest, register_image_file
+
+
+def png_bytes(color) -> bytes:
+    """渐变背景上一个色块，能正常解码和计算感知哈希"""
+    image = Image.linear_gradient('L').resize((64, 48)).convert('RGB')
+    image.paste(color, (0, 0, 16, 16))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def write(path: Path, data: bytes) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_identical_files_share_one_blob():
+    """不同主题目录中的相同内容只占一份空间"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = BlobStore(tmp / 'blobs')
+        data = png_bytes((255, 0, 0))
+        a = write(tmp / 'images' / 'theme-a' / '封面.png', data)
+        b = write(tmp / 'images' / 'theme-b' / '封面.png', data)
+        assert store.ingest(a) and store.ingest(b)
+
+        assert os.path.samefile(a, b)
+        assert a.stat().st_nlink == 3
+        assert b.read_bytes() == data
+        stats = store.stats()
+        assert (stats.blobs, stats.bytes, stats.saved_bytes) == (1, len(data), len(data))
+        # 重复存入不会改变什么
+        assert store.ingest(a)
+        assert store.stats().blobs == 1
+
+
+def test_overwrite_breaks_link_and_gc_collects():
+    """原子覆盖只影响该文件；没有引用的 blob 由 gc 删除"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = BlobStore(tmp / 'blobs')
+        old, new = png_bytes((255, 0, 0)), png_bytes((0, 0, 255))
+        a = write(tmp / 'images' / 'theme-a' / '1.png', old)
+        b = write(tmp / 'images' / 'theme-b' / '1.png', old)
+        store.ingest(a)
+        store.ingest(b)
+
+        atomic_write_bytes(a, new)
+        assert b.read_bytes() == old
+        store.ingest(a)
+        assert store.stats().blobs == 2
+
+        shutil.rmtree(tmp / 'images' / 'theme-b')
+        assert store.gc(dry_run=True).removed == 1
+        assert store.stats().blobs == 2
+        result = store.gc()
+        assert (result.removed, result.freed_bytes, result.kept) == (1, len(old), 1)
+        assert a.read_bytes() == new
+        assert sorted(p.name for p in (tmp / 'blobs').iterdir()) == [store.path_for(file_sha256(a)).parent.name]
+
+
+def test_ingest_tree_updates_manifest():
+    """迁移已有目录：跳过清单和临时文件，去重后同步清单中的修改时间"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = BlobStore(tmp / 'images' / '.blobs')
+        data = png_bytes((0, 255, 0))
+        for theme in ('theme-a', 'theme-b'):
+            register_image_file(write(tmp / 'images' / theme / '1.png', data))
+        write(tmp / 'images' / 'theme-a' / '.1.png.tmp', data)
+
+        ingested, freed = store.ingest_tree(tmp / 'images')
+        assert (ingested, freed) == (2, len(data))
+        assert store.stats().blobs == 1
+        manifest = ImageManifest(tmp / 'images' / 'theme-b')
+        assert manifest.is_unchanged('1.png', len(data), (tmp / 'images' / 'theme-b' / '1.png').stat().st_mtime)
+        # 再次运行时已是硬链接的文件直接跳过
+        assert store.ingest_tree(tmp / 'images') == (0, 0)
+
+
+def test_register_image_file_links_into_store():
+    """保存图片时直接存入存储，清单中的修改时间与链接后的文件一致"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = BlobStore(tmp / 'blobs')
+        data = png_bytes((0, 0, 0))
+        register_image_file(write(tmp / 'theme-a' / '1.png', data), blob_store=store)
+        path, entry = register_image_file(write(tmp / 'theme-b' / '2.png', data), blob_store=store)
+        assert os.path.samefile(path, tmp / 'theme-a' / '1.png')
+        assert entry['mtime'] == path.stat().st_mtime
+        # 无法解码的文件不存入
+        fake, _ = register_image_file(write(tmp / 'theme-a' / '3.png', b'not an image'), blob_store=store)
+        assert fake.stat().st_nlink == 1
+
+
+def test_link_or_copy_replaces_target():
+    """发布时从缓存硬链接到输出目录，覆盖旧文件且不留下临时文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = write(tmp / 'cache' / 'a.webp', b'new')
+        target = write(tmp / 'publish' / 'a.webp', b'old')
+        link_or_copy(source, target)
+        assert target.read_bytes() == b'new'
+        assert os.path.samefile(source, target)
+        assert sorted(p.name for p in target.parent.iterdir()) == ['a.webp']
+
+
+if __name__ == '__main__':
+    test_identical_files_share_one_blob()
+    test_overwrite_breaks_link_and_gc_collects()
+    test_ingest_tree_updates_manifest()
+    test_register_image_file_links_into_store()
+    test_link_or_copy_replaces_target()
+    print("✓ 内容寻址存储测试通过")
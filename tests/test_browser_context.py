@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+测试每个任务独立的浏览器上下文与下载暂存目录
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.browser_controller import BrowserController
+from src.core.direct_downloads import DirectDownloads
+from src.core.image_saver import ImageSaver
+from src.utils.logger import get_logger
+
+
+class FakeContext:
+    def __init__(self, state=None):
+        self.state = state or {'cookies': [{'name': 'SID', 'value': 'secret'}], 'origins': []}
+        self.pages = []
+
+    async def storage_state(self, path=None):
+        return self.state
+
+
+class FakeBrowser:
+    def __init__(self, contexts):
+        self.contexts = contexts
+        self.created = []
+
+    async def new_context(self, **kwargs):
+        self.created.append(kwargs)
+        context = FakeContext(kwargs.get('storage_state'))
+        return context
+
+
+class FakeDownload:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.saved_to = None
+
+    async def save_as(self, path):
+        self.saved_to = path
+        Path(path).write_bytes(self.body)
+
+
+def make_controller(browser, launch_mode='cdp'):
+    controller = BrowserController()
+    controller.logger = get_logger()
+    controller.browser = browser
+    controller.launch_mode = launch_mode
+    return controller
+
+
+def test_isolated_context_clones_login_state():
+    """cdp 模式下新上下文克隆已登录上下文的状态，而不是共用它"""
+    logged_in = FakeContext()
+    browser = FakeBrowser([logged_in])
+    controller = make_controller(browser)
+
+    async def run():
+        first = await controller._new_job_context()
+        second = await controller._new_job_context()
+        assert first is not logged_in and second is not first
+        assert browser.created[0]['storage_state'] == logged_in.state
+        assert browser.created[0]['accept_downloads'] is True
+
+    asyncio.run(run())
+
+
+def test_launch_mode_uses_storage_state_file():
+    """launch 模式使用导出的登录状态文件；文件不存在时创建未登录的上下文"""
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = Path(tmp) / 'storage_state.json'
+        browser = FakeBrowser([FakeContext()])
+        controller = make_controller(browser, launch_mode='launch')
+        controller.storage_state_path = str(state_file)
+
+        async def run():
+            await controller._new_job_context()
+            state_file.write_text('{"cookies": [], "origins": []}')
+            await controller._new_job_context()
+
+        asyncio.run(run())
+        assert browser.created[0]['storage_state'] is None
+        assert browser.created[1]['storage_state'] == str(state_file)
+
+
+def test_download_is_staged_then_moved():
+    """原生下载先保存到任务的暂存目录，完成后移动到目标位置"""
+    with tempfile.TemporaryDirectory() as download_dir, tempfile.TemporaryDirectory() as save_dir:
+        saver = ImageSaver(page=None, download_dir=download_dir)
+        download = FakeDownload(b'\x89PNG data')
+        target = Path(save_dir) / '1.png'
+
+        asyncio.run(saver._save_download(download, target))
+
+        assert Path(download.saved_to).parent == Path(download_dir)
+        assert target.read_bytes() == b'\x89PNG data'
+        assert list(Path(download_dir).iterdir()) == []
+
+
+class FakeCDPSession:
+    def __init__(self, context_id='CTX1', frame_id='F1'):
+        self.handlers = {}
+        self.sent = []
+        self.context_id = context_id
+        self.frame_id = frame_id
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def emit(self, event, params):
+        for handler in self.handlers.get(event, []):
+            handler(params)
+
+    async def send(self, method, params=None):
+        self.sent.append((method, params))
+        if method == 'Target.getTargetInfo':
+            return {'targetInfo': {'browserContextId': self.context_id}}
+        if method == 'Page.getFrameTree':
+            return {'frameTree': {'frame': {'id': self.frame_id},
+                                  'childFrames': [{'frame': {'id': f'{self.frame_id}-child'}}]}}
+        return {}
+
+    async def detach(self):
+        pass
+
+
+class FakeCDPBrowser:
+    def __init__(self):
+        self.session = FakeCDPSession()
+
+    async def new_browser_cdp_session(self):
+        return self.session
+
+
+class FakeCDPPage:
+    def __init__(self, context_id='CTX1', frame_id='F1'):
+        self.context = self
+        self.context_id = context_id
+        self.frame_id = frame_id
+
+    async def new_cdp_session(self, page):
+        return FakeCDPSession(self.context_id, self.frame_id)
+
+
+def test_direct_download_lands_in_target_directory():
+    """浏览器按 guid 写入目标目录，完成后原地重命名为最终文件名"""
+    browser = FakeCDPBrowser()
+    session = browser.session
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        async def run():
+            downloads = DirectDownloads(browser, FakeCDPPage())
+            await downloads.start()
+
+            async def click():
+                # 模拟浏览器：开始下载 -> 写入 guid 文件 -> 完成
+                session.emit('Browser.downloadWillBegin',
+                             {'guid': 'g1', 'frameId': 'F1', 'suggestedFilename': 'Gemini_1.png'})
+                (Path(save_dir) / 'g1').write_bytes(b'image')
+                asyncio.get_running_loop().call_soon(
+                    session.emit, 'Browser.downloadProgress', {'guid': 'g1', 'state': 'completed'}
+                )
+
+            path = await downloads.download(click, Path(save_dir), lambda suggested: '1' + Path(suggested).suffix)
+            await downloads.close()
+            return path
+
+        path = asyncio.run(run())
+        assert path.name == '1.png' and path.read_bytes() == b'image'
+        assert sorted(p.name for p in Path(save_dir).iterdir()) == ['1.png']
+
+    behavior = [params for method, params in session.sent if method == 'Browser.setDownloadBehavior']
+    assert behavior[0]['behavior'] == 'allowAndName'
+    assert behavior[0]['browserContextId'] == 'CTX1'
+
+
+def test_concurrent_jobs_only_claim_their_own_downloads():
+    """两个任务共用一个浏览器级会话，同时收到对方的下载事件，各自只认领本页面框架发起的下载"""
+    browser = FakeCDPBrowser()
+    session = browser.session
+
+    with tempfile.TemporaryDirectory() as dir_a, tempfile.TemporaryDirectory() as dir_b:
+        async def run():
+            job_a = DirectDownloads(browser, FakeCDPPage('CTX_A', 'FA'))
+            job_b = DirectDownloads(browser, FakeCDPPage('CTX_B', 'FB'))
+            await job_a.start()
+            await job_b.start()
+            loop = asyncio.get_running_loop()
+            b_clicked = asyncio.Event()
+
+            async def click_a():
+                # B 的下载先开始：A 不能认领它
+                await b_clicked.wait()
+                session.emit('Browser.downloadWillBegin',
+                             {'guid': 'ga', 'frameId': 'FA-child', 'suggestedFilename': 'a.png'})
+                (Path(dir_a) / 'ga').write_bytes(b'image-a')
+                loop.call_soon(session.emit, 'Browser.downloadProgress', {'guid': 'ga', 'state': 'completed'})
+
+            async def click_b():
+                session.emit('Browser.downloadWillBegin',
+                             {'guid': 'gb', 'frameId': 'FB', 'suggestedFilename': 'b.png'})
+                (Path(dir_b) / 'gb').write_bytes(b'image-b')
+                b_clicked.set()
+                await asyncio.sleep(0)
+                loop.call_soon(session.emit, 'Browser.downloadProgress', {'guid': 'gb', 'state': 'completed'})
+
+            results = await asyncio.gather(
+                job_a.download(click_a, Path(dir_a), lambda suggested: '1.png', timeout=5),
+                job_b.download(click_b, Path(dir_b), lambda suggested: '1.png', timeout=5),
+            )
+            await job_a.close()
+            await job_b.close()
+            return results
+
+        path_a, path_b = asyncio.run(run())
+        assert path_a.read_bytes() == b'image-a' and path_b.read_bytes() == b'image-b'
+        assert sorted(p.name for p in Path(dir_a).iterdir()) == ['1.png']
+        assert sorted(p.name for p in Path(dir_b).iterdir()) == ['1.png']
+
+
+if __name__ == "__main__":
+    test_isolated_context_clones_login_state()
+    test_launch_mode_uses_storage_state_file()
+    test_download_is_staged_then_moved()
+    test_direct_download_lands_in_target_directory()
+    test_concurrent_jobs_only_claim_their_own_downloads()
+    print("✓ 测试通过")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+测试 Chromium 启动器（使用模拟调试端口的假浏览器进程）
+"""
+
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import aiohttp
+
+from src.core.browser_launcher import ChromiumLauncher
+
+
+# 假浏览器：在随机端口提供 /json/version，并像 Chromium 一样写出 DevToolsActivePort
+FAKE_CHROMIUM = f"""#!{sys.executable}
+import http.server, json, sys
+user_data_dir = next(arg.split('=', 1)[1] for arg in sys.argv if arg.startswith('--user-data-dir='))
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({{'webSocketDebuggerUrl': 'ws://127.0.0.1/devtools/browser/fake'}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+server = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+with open(user_data_dir + '/DevToolsActivePort', 'w') as f:
+    f.write(f"{{server.server_address[1]}}\\n/devtools/browser/fake")
+server.serve_forever()
+"""
+
+
+def test_launcher_start_restart_and_stop():
+    """启动器应等待调试端口就绪，进程意外退出后可重启，关闭时清理用户数据目录"""
+    with tempfile.TemporaryDirectory() as tmp:
+        executable = os.path.join(tmp, 'fake-chromium')
+        Path(executable).write_text(FAKE_CHROMIUM)
+        os.chmod(executable, os.stat(executable).st_mode | stat.S_IEXEC)
+
+        async def run():
+            launcher = ChromiumLauncher(executable=executable)
+            cdp_url = await launcher.start()
+            try:
+                assert '--headless=new' in launcher._build_args()
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(f"{cdp_url}/json/version") as response:
+                        assert response.status == 200
+
+                # 模拟浏览器崩溃
+                first_dir = launcher.user_data_dir
+                launcher.process.kill()
+                await launcher.process.wait()
+                assert not launcher.is_running
+
+                await launcher.ensure_running()
+                assert launcher.is_running
+                assert launcher.restarts == 1
+                assert not os.path.exists(first_dir)
+            finally:
+                user_data_dir = launcher.user_data_dir
+                await launcher.stop()
+            assert not launcher.is_running
+            assert not os.path.exists(user_data_dir)
+
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_launcher_start_restart_and_stop()
+    print("✓ 测试通过")
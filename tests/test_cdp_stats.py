@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+测试 CDP 调用统计包装层
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.cdp_stats import CDPStats, instrument
+
+
+class ElementHandle:
+    """模拟 Playwright ElementHandle"""
+
+    def __init__(self, src):
+        self.src = src
+
+    async def get_attribute(self, name):
+        return self.src
+
+
+class Page:
+    """模拟 Playwright Page"""
+
+    url = "http://localhost/app"
+
+    def __init__(self):
+        self.evaluated_with = None
+
+    async def query_selector_all(self, selector):
+        return [ElementHandle("a.png"), ElementHandle("b.png")]
+
+    async def evaluate(self, script, arg=None):
+        self.evaluated_with = arg
+        return True
+
+
+def test_instrumented_page_counts_calls():
+    """包装后的页面应统计调用次数，并继续包装返回的元素"""
+    stats = CDPStats()
+    raw_page = Page()
+    page = instrument(raw_page, stats)
+
+    async def run():
+        images = await page.query_selector_all("img")
+        urls = [await img.get_attribute("src") for img in images]
+        await page.evaluate("(el) => el", images[0])
+        return urls
+
+    urls = asyncio.run(run())
+
+    assert urls == ["a.png", "b.png"]
+    assert page.url == "http://localhost/app"
+    assert stats.total_calls == 4
+    assert stats.by_method["ElementHandle.get_attribute"].count == 2
+    # 作为参数传回时应自动解包
+    assert isinstance(raw_page.evaluated_with, ElementHandle)
+
+    snapshot = stats.snapshot()
+    assert snapshot["methods"]["Page.query_selector_all"]["count"] == 1
+    assert any(site["site"].startswith("tests/test_cdp_stats.py:") for site in snapshot["sites"])
+    assert "ElementHandle.get_attribute" in stats.format_report()
+
+
+if __name__ == "__main__":
+    test_instrumented_page_counts_calls()
+    print("✓ 测试通过")
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+测试 JPEG 转换脚本：透明通道合成与增量转换
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# 添加项目根目录和 scripts 目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(project_root / 'scripts'))
+
+from convert_to_jpeg import MANIFEST_FILENAME, convert_images_in_directory, flatten_alpha, scan_images
+
+
+def test_flatten_alpha_matches_pillow_composite():
+    """NumPy 合成结果与 Pillow 的 alpha 合成一致（误差不超过 1）"""
+    rng = np.random.default_rng(0)
+    rgba = Image.fromarray(rng.integers(0, 256, (32, 32, 4), dtype=np.uint8), 'RGBA')
+    expected = Image.alpha_composite(Image.new('RGBA', rgba.size, (255, 255, 255, 255)), rgba).convert('RGB')
+
+    flattened = flatten_alpha(rgba)
+
+    assert flattened.mode == 'RGB'
+    diff = np.abs(np.asarray(flattened, dtype=np.int16) - np.asarray(expected, dtype=np.int16))
+    assert diff.max() <= 1
+
+
+def test_incremental_conversion_uses_manifest():
+    """第二次运行只转换新增或内容变化的文件；只改 mtime 不会重新转换"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / 'theme').mkdir()
+        Image.new('RGBA', (16, 16), (255, 0, 0, 128)).save(root / 'theme' / '1.PNG')
+        Image.new('RGB', (16, 16), (0, 255, 0)).save(root / 'theme' / '2.webp')
+        Image.new('RGB', (16, 16), (0, 0, 255)).save(root / 'theme' / '3.jpg')
+        assert [p.name for p in scan_images(root)] == ['1.PNG', '2.webp', '3.jpg']
+
+        convert_images_in_directory(str(root), workers=2)
+        manifest = json.loads((root / MANIFEST_FILENAME).read_text(encoding='utf-8'))['files']
+        assert sorted(manifest) == ['theme/1.PNG', 'theme/2.webp']
+        first_output_mtime = (root / 'theme' / '1.jpg').stat().st_mtime_ns
+
+        # 只改 mtime：按内容哈希判断未变化，不重新转换
+        os.utime(root / 'theme' / '1.PNG', (1, 1))
+        # 内容变化：重新转换
+        Image.new('RGB', (16, 16), (0, 0, 0)).save(root / 'theme' / '2.webp')
+        os.utime(root / 'theme' / '2.webp', (2, 2))
+        convert_images_in_directory(str(root), workers=1)
+
+        assert (root / 'theme' / '1.jpg').stat().st_mtime_ns == first_output_mtime
+        with Image.open(root / 'theme' / '2.jpg') as image:
+            assert max(image.getpixel((8, 8))) < 16
+        manifest = json.loads((root / MANIFEST_FILENAME).read_text(encoding='utf-8'))['files']
+        assert manifest['theme/1.PNG']['mtime'] == 1
+
+
+if __name__ == "__main__":
+    test_flatten_alpha_matches_pillow_composite()
+    test_incremental_conversion_uses_manifest()
+    print("✓ 测试通过")
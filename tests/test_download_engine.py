@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+测试下载策略引擎：成功率排序、不可用时立即跳过、熔断与统计持久化
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.download_engine import (
+    DownloadEngine,
+    DownloadJob,
+    DownloadStatsStore,
+    DownloadStrategy,
+    StrategyUnavailable,
+)
+from src.utils.logger import get_logger
+
+
+class FakeSaver:
+    def __init__(self):
+        self.logger = get_logger()
+
+
+class FakeStrategy(DownloadStrategy):
+    def __init__(self, name, outcome, last_resort=False):
+        self.name = name
+        self.label = name
+        self.outcome = outcome  # 'ok' / 'fail' / 'unavailable'
+        self.last_resort = last_resort
+        self.calls = 0
+
+    async def save(self, saver, job):
+        self.calls += 1
+        if self.outcome == 'unavailable':
+            raise StrategyUnavailable("不可用")
+        if self.outcome == 'fail':
+            raise Exception("失败")
+        return job.save_dir / f"{job.stem}.png"
+
+
+def test_engine_orders_by_success_rate_and_breaks_circuit():
+    """失败的策略排到后面，连续失败的策略被熔断，不可用的策略不计为失败"""
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_path = Path(tmp) / 'download_stats.json'
+        button = FakeStrategy('button', 'fail')
+        url = FakeStrategy('url', 'ok')
+        screenshot = FakeStrategy('screenshot', 'ok', last_resort=True)
+        engine = DownloadEngine(FakeSaver(), [screenshot, button, url], DownloadStatsStore(stats_path))
+        assert [s.name for s in engine.ordered_strategies()] == ['button', 'url', 'screenshot']
+
+        async def run():
+            results = []
+            for idx in range(1, 6):
+                results.append(await engine.save(DownloadJob(None, Path(tmp), str(idx))))
+            return results
+
+        results = asyncio.run(run())
+        assert all(method == 'url' for _, method in results)
+        assert results[0][0] == Path(tmp) / '1.png'
+        # 按钮失败一次后成功率低于 URL，之后先试 URL
+        assert button.calls == 1 and url.calls == 5 and screenshot.calls == 0
+        assert engine.ordered_strategies()[0].name == 'url'
+
+        engine.save_stats()
+        reloaded = DownloadStatsStore(stats_path)
+        assert reloaded.get('url').attempts == 2.5  # 历史计数衰减一半
+        assert reloaded.get('button').success_rate < reloaded.get('url').success_rate
+
+    # 连续失败 3 次后熔断：即使历史成功率更高，冷却期内也不再尝试
+    broken = FakeStrategy('button', 'fail')
+    fallback = FakeStrategy('screenshot', 'ok', last_resort=True)
+    engine = DownloadEngine(FakeSaver(), [broken, fallback], DownloadStatsStore(None))
+    for idx in range(3):
+        asyncio.run(engine.save(DownloadJob(None, Path('.'), str(idx))))
+    assert engine.stats.get('button').is_open()
+    engine.strategies.insert(1, FakeStrategy('url', 'ok'))
+    engine.stats.get('button').successes = 100
+    engine.stats.get('button').attempts = 103
+    assert [s.name for s in engine.ordered_strategies()] == ['url', 'screenshot']
+    asyncio.run(engine.save(DownloadJob(None, Path('.'), '4')))
+    assert broken.calls == 3
+
+    unavailable = FakeStrategy('button', 'unavailable')
+    engine = DownloadEngine(FakeSaver(), [unavailable, FakeStrategy('url', 'ok')], DownloadStatsStore(None))
+    _, method = asyncio.run(engine.save(DownloadJob(None, Path('.'), '1')))
+    assert method == 'url'
+    assert engine.stats.get('button').attempts == 0 and engine.stats.get('button').unavailable == 1
+
+
+class SlowStrategy(FakeStrategy):
+    """让出一次事件循环，模拟并发保存中尚未结束的下载"""
+
+    async def save(self, saver, job):
+        await asyncio.sleep(0)
+        return await super().save(saver, job)
+
+
+def test_breaker_allows_single_half_open_probe():
+    """冷却结束后只放行一次试探：失败则重新熔断，成功则恢复"""
+    broken = SlowStrategy('button', 'fail')
+    url = FakeStrategy('url', 'ok')
+    engine = DownloadEngine(FakeSaver(), [broken, url], DownloadStatsStore(None))
+    stats = engine.stats.get('button')
+    stats.successes, stats.attempts = 100, 100
+    for idx in range(3):
+        asyncio.run(engine.save(DownloadJob(None, Path('.'), str(idx))))
+    assert stats.is_open() and broken.calls == 3
+
+    async def save_concurrently(count):
+        return await asyncio.gather(*(engine.save(DownloadJob(None, Path('.'), str(idx))) for idx in range(count)))
+
+    # 冷却结束：并发保存时只有一个任务试探，试探失败后重新熔断
+    stats.open_until = 0.0
+    assert [s.name for s in engine.ordered_strategies()] == ['button', 'url']
+    results = asyncio.run(save_concurrently(4))
+    assert all(method == 'url' for _, method in results)
+    assert broken.calls == 4 and stats.is_open() and not stats.probing
+
+    # 再次冷却结束：试探成功后恢复正常
+    stats.open_until = 0.0
+    broken.outcome = 'ok'
+    results = asyncio.run(save_concurrently(4))
+    assert results[0][1] == 'button'
+    assert stats.consecutive_failures == 0 and not stats.is_half_open()
+    assert [s.name for s in engine.ordered_strategies()] == ['button', 'url']
+
+
+class RejectUrlOutputs:
+    """把 URL 下载保存的文件判为未通过质量检查"""
+
+    def __init__(self):
+        self.checked = []
+
+    def __call__(self, path):
+        self.checked.append(path.name)
+        ok = not path.name.startswith('url-')
+        return type('Report', (), {'ok': ok, 'summary': '通过' if ok else '几乎是纯色'})()
+
+
+class WritingStrategy(FakeStrategy):
+    """真正写出文件，文件名带策略名"""
+
+    async def save(self, saver, job):
+        self.calls += 1
+        path = job.save_dir / f"{self.name}-{job.stem}.png"
+        path.write_bytes(b'data')
+        return path
+
+
+def test_engine_refetches_when_quality_check_fails():
+    """保存结果未通过质量检查时删除文件、计为失败，换下一个策略重新获取"""
+    with tempfile.TemporaryDirectory() as tmp:
+        validator = RejectUrlOutputs()
+        url = WritingStrategy('url', 'ok')
+        screenshot = WritingStrategy('screenshot', 'ok', last_resort=True)
+        engine = DownloadEngine(FakeSaver(), [url, screenshot], DownloadStatsStore(None), validator=validator)
+
+        path, method = asyncio.run(engine.save(DownloadJob(None, Path(tmp), '1')))
+
+        assert method == 'screenshot' and path.name == 'screenshot-1.png'
+        assert validator.checked == ['url-1.png', 'screenshot-1.png']
+        assert not (Path(tmp) / 'url-1.png').exists()
+        assert engine.stats.get('url').attempts == 1 and engine.stats.get('url').successes == 0
+
+
+if __name__ == "__main__":
+    test_engine_orders_by_success_rate_and_breaks_circuit()
+    test_breaker_allows_single_half_open_probe()
+    test_engine_refetches_when_quality_check_fails()
+    print("✓ 测试通过")
@@ -3,14 +3,16 @@
 测试文件保存功能
 """
 
+import asyncio
 import sys
+import tempfile
 from pathlib import Path
 
 # 添加项目根目录到 Python 路径
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from src.utils.file_utils import save_text_to_file
+from src.utils.file_utils import AtomicWriter, atomic_write_bytes, save_text_to_file
 
 def test_file_save():
     """测试文件保存功能"""
@@ -39,5 +41,66 @@ def test_file_save():
     except Exception as e:
         print(f"✗ 保存失败: {e}")
 
+def test_atomic_write_leaves_no_partial_file():
+    """写入中途出错时目标文件不存在，也不留下临时文件"""
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / '3.png'
+        try:
+            with AtomicWriter(target) as f:
+                f.write(b'half')
+                raise RuntimeError('crash')
+        except RuntimeError:
+            pass
+        assert list(Path(tmp).iterdir()) == []
+
+        atomic_write_bytes(target, b'complete')
+        assert target.read_bytes() == b'complete'
+        assert [p.name for p in Path(tmp).iterdir()] == ['3.png']
+
+
+def test_image_url_is_streamed_to_disk():
+    """URL 下载携带页面 cookies 分块写入，完成后才出现目标文件"""
+    from aiohttp import web
+    from src.core.image_saver import ImageSaver
+
+    body = bytes(range(256)) * 4096  # 1 MB，大于一个分块
+    seen_cookies = []
+
+    async def image(request):
+        seen_cookies.append(request.headers.get('Cookie'))
+        return web.Response(body=body, content_type='image/png')
+
+    class FakeContext:
+        async def cookies(self, urls):
+            return [{'name': 'SID', 'value': 'abc'}]
+
+    class FakePage:
+        url = 'http://127.0.0.1/app'
+        context = FakeContext()
+
+    async def run(save_dir):
+        app = web.Application()
+        app.router.add_get('/image.png', image)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            target = Path(save_dir) / '1.png'
+            await ImageSaver(FakePage())._download_url(f"http://127.0.0.1:{port}/image.png", target)
+            return target
+        finally:
+            await runner.cleanup()
+
+    with tempfile.TemporaryDirectory() as save_dir:
+        target = asyncio.run(run(save_dir))
+        assert target.read_bytes() == body
+        assert [p.name for p in Path(save_dir).iterdir()] == ['1.png']
+    assert seen_cookies == ['SID=abc']
+
+
 if __name__ == "__main__":
-    test_file_save()
\ No newline at end of file
+    test_file_save()
+    test_atomic_write_leaves_no_partial_file()
+    test_image_url_is_streamed_to_disk()
\ No newline at end of file
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+测试生成图片收集（使用返回固定结果的假页面）
+"""
+
+import asyncio
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.download_engine import DownloadEngine, DownloadStatsStore, DownloadStrategy
+from src.core.image_harvester import GENERATED_CONTAINER_SELECTOR, ImageHarvester
+from src.core.image_saver import ImageSaver
+from src.utils.logger import close_logger, init_logger
+
+
+class FakePage:
+    def __init__(self, results, containers):
+        self.results = results
+        self.containers = containers
+        self.evaluate_calls = []
+        self.reloads = 0
+
+    async def evaluate(self, script, arg):
+        self.evaluate_calls.append(arg)
+        return self.results
+
+    async def wait_for_function(self, script, arg=None, timeout=None):
+        selector, expected = arg
+        if self.containers < expected:
+            raise TimeoutError(f"Timeout {timeout}ms exceeded")
+
+    async def reload(self, **kwargs):
+        self.reloads += 1
+
+
+@contextmanager
+def temp_session_logger(session_id: str):
+    """会话日志写到临时目录，测试不在仓库的 data/logs 中留下文件"""
+    with tempfile.TemporaryDirectory() as log_dir:
+        init_logger(session_id, log_dir=log_dir)
+        try:
+            yield Path(log_dir)
+        finally:
+            close_logger()
+
+
+def test_harvest_collects_urls_in_one_pass():
+    """一次页面调用按顺序收集所有容器的 URL，不刷新页面"""
+    page = FakePage(
+        [
+            {'index': 0, 'visible': True, 'ready': True, 'urls': ['http://x/1.png']},
+            {'index': 1, 'visible': True, 'ready': False, 'urls': []},
+        ],
+        containers=2,
+    )
+
+    async def run():
+        assert await harvester.wait_for_containers(2, timeout=1)
+        assert not await harvester.wait_for_containers(3, timeout=1)
+        return await harvester.harvest(timeout_ms=500)
+
+    with temp_session_logger('test_harvest'):
+        harvester = ImageHarvester(page, session_id='test_harvest')
+        results = asyncio.run(run())
+    assert [item.urls for item in results] == [['http://x/1.png'], []]
+    assert [item.ready for item in results] == [True, False]
+    assert page.evaluate_calls == [{'selector': GENERATED_CONTAINER_SELECTOR, 'timeoutMs': 500}]
+    assert page.reloads == 0
+
+
+class FakeContainer:
+    async def query_selector(self, selector):
+        return None
+
+
+class FakeContainerPage:
+    def __init__(self, count):
+        self.containers = [FakeContainer() for _ in range(count)]
+
+    async def query_selector_all(self, selector):
+        return self.containers
+
+
+class WriteStrategy(DownloadStrategy):
+    """把序号写入文件的假下载策略，记录同时进行的下载数"""
+
+    name = 'url'
+    label = 'URL下载'
+
+    def __init__(self):
+        self.saved = []
+        self.active = 0
+        self.max_active = 0
+
+    async def save(self, saver, job):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        path = job.save_dir / f"{job.stem}.png"
+        path.write_bytes(b'\x89PNG\r\n\x1a\n' + job.stem.encode())
+        self.saved.append(job.stem)
+        return path
+
+
+def test_parallel_save_skips_existing_files():
+    """只收集模式并行保存所有容器，按页面顺序编号，已存在的序号跳过"""
+    with tempfile.TemporaryDirectory() as tmp, temp_session_logger('test_harvest') as data_dir:
+        # 图片目录和 blob 存储放在临时目录，不写入仓库的 data/
+        (Path(tmp) / '2.jpg').write_bytes(b'existing')
+        saver = ImageSaver(FakeContainerPage(4), session_id='test_harvest',
+                           catalog_path=data_dir / 'catalog.json', blob_dir=data_dir / 'blobs')
+        strategy = WriteStrategy()
+        saver.engine = DownloadEngine(saver, [strategy], DownloadStatsStore(None))
+
+        saved_files = asyncio.run(saver.save_containers_parallel(tmp, concurrency=2))
+
+        assert [Path(p).name for p in saved_files] == ['1.png', '2.jpg', '3.png', '4.png']
+        assert sorted(strategy.saved) == ['1', '3', '4']
+        assert strategy.max_active == 2
+
+
+def test_parallel_save_names_by_batch_and_skips_orphans():
+    """按批次编号保存：重试遗留的容器（名称为 None）不保存，已存在的按批次编号跳过"""
+    with tempfile.TemporaryDirectory() as tmp, temp_session_logger('test_harvest') as data_dir:
+        (Path(tmp) / '2.jpg').write_bytes(b'existing')
+        saver = ImageSaver(FakeContainerPage(4), session_id='test_harvest',
+                           catalog_path=data_dir / 'catalog.json', blob_dir=data_dir / 'blobs')
+        strategy = WriteStrategy()
+        saver.engine = DownloadEngine(saver, [strategy], DownloadStatsStore(None))
+
+        saved_files = asyncio.run(saver.save_containers_parallel(tmp, ['1', None, '2', '3'], concurrency=2))
+
+        assert [Path(p).name for p in saved_files] == ['1.png', '2.jpg', '3.png']
+        assert sorted(strategy.saved) == ['1', '3']
+        assert sorted(p.name for p in Path(tmp).glob('[0-9]*')) == ['1.png', '2.jpg', '3.png']
+
+
+if __name__ == "__main__":
+    test_harvest_collects_urls_in_one_pass()
+    test_parallel_save_skips_existing_files()
+    test_parallel_save_names_by_batch_and_skips_orphans()
+    print("✓ 测试通过")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+测试图片质量检查：纯色图、加载动画、低分辨率和过小文件，以及图片加载完成的判定
+"""
+
+import asyncio
+import io
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.mock.gemini_server import render_grid_image
+from src.utils.browser_utils import wait_for_images_loading
+from src.utils.image_quality import check_image_quality
+
+
+def save(directory, name, image=None, data=None):
+    path = Path(directory) / name
+    if data is None:
+        buffer = io.BytesIO()
+        image.save(buffer, 'PNG')
+        data = buffer.getvalue()
+    path.write_bytes(data)
+    return path
+
+
+def test_quality_gate_accepts_real_images_and_flags_bad_captures():
+    """宫格图片通过；纯色、居中的加载动画、低分辨率截图和过小文件不通过"""
+    rng = np.random.default_rng(0)
+    spinner = Image.new('RGB', (800, 800), (240, 240, 240))
+    ImageDraw.Draw(spinner).ellipse((370, 370, 430, 430), outline=(60, 120, 220), width=8)
+    noise = Image.fromarray(rng.integers(0, 256, (600, 600, 3), dtype=np.uint8))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        grid_png = save(tmp, 'grid.png', data=render_grid_image(1024, 1536, 'png', '1'))
+        grid_jpg = save(tmp, 'grid.jpg', data=render_grid_image(1024, 1024, 'jpeg', '2'))
+        assert check_image_quality(grid_png).ok
+        assert check_image_quality(grid_jpg).ok
+        assert check_image_quality(save(tmp, 'noise.png', noise)).ok
+
+        blank = check_image_quality(save(tmp, 'blank.png', Image.new('RGB', (1024, 1024), (250, 250, 250))))
+        assert not blank.ok and '纯色' in blank.summary
+
+        loading = check_image_quality(save(tmp, 'spinner.png', spinner))
+        assert not loading.ok and '加载动画' in loading.summary
+
+        small = check_image_quality(save(tmp, 'small.png', noise.resize((200, 120))))
+        assert not small.ok and '分辨率' in small.summary
+
+        broken = check_image_quality(save(tmp, 'broken.png', data=b'\x89PNG\r\n\x1a\n' + b'\x00' * 32))
+        assert not broken.ok and '无法解码' in broken.summary
+
+
+class FakeLoadingPage:
+    """依次返回预设的图片加载状态"""
+
+    def __init__(self, states):
+        self.states = list(states)
+
+    async def evaluate(self, script, arg):
+        return self.states.pop(0) if len(self.states) > 1 else self.states[0]
+
+
+def test_wait_for_images_loading_requires_every_image():
+    """只有一张图片加载完成时继续等待；有图片加载失败时返回 False"""
+    page = FakeLoadingPage([
+        {'total': 4, 'loaded': 1, 'broken': 0},
+        {'total': 4, 'loaded': 3, 'broken': 0},
+        {'total': 4, 'loaded': 4, 'broken': 0},
+    ])
+    assert asyncio.run(wait_for_images_loading(page, '.generated-images', check_interval=1))
+    assert page.states == [{'total': 4, 'loaded': 4, 'broken': 0}]
+
+    broken = FakeLoadingPage([{'total': 2, 'loaded': 1, 'broken': 1}])
+    assert not asyncio.run(wait_for_images_loading(broken, '.generated-images', check_interval=1))
+
+
+if __name__ == "__main__":
+    test_quality_gate_accepts_real_images_and_flags_bad_captures()
+    test_wait_for_images_loading_requires_every_image()
+    print("✓ 测试通过")
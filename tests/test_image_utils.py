@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+测试图片格式识别与主题目录图片清单
+"""
+
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from PIL import Image
+
+from src.utils.image_utils import (
+    MANIFEST_FILENAME,
+    register_image_file,
+    rename_image_file,
+    sniff_image,
+)
+
+
+def encode(image_format: str, size=(37, 21), **kwargs) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, image_format, **kwargs)
+    return buffer.getvalue()
+
+
+def test_sniff_formats_and_dimensions():
+    """只根据文件头识别格式和尺寸"""
+    cases = [
+        ('PNG', {}, 'png'),
+        ('JPEG', {}, 'jpeg'),
+        ('JPEG', {'progressive': True, 'exif': b'Exif\x00\x00' + b'\x00' * 4000}, 'jpeg'),
+        ('GIF', {}, 'gif'),
+        ('BMP', {}, 'bmp'),
+        ('WEBP', {}, 'webp'),
+        ('WEBP', {'lossless': True}, 'webp'),
+    ]
+    for image_format, kwargs, expected in cases:
+        info = sniff_image(encode(image_format, **kwargs))
+        assert info is not None, image_format
+        assert (info.format, info.width, info.height) == (expected, 37, 21), (image_format, info)
+
+    assert sniff_image(b'<html>not an image</html>') is None
+
+
+def test_register_fixes_extension_and_flags_duplicates():
+    """扩展名按内容修正，相同内容的图片在清单中标记为重复"""
+    with tempfile.TemporaryDirectory() as tmp:
+        jpeg = encode('JPEG')
+        (Path(tmp) / '1.png').write_bytes(jpeg)
+        (Path(tmp) / '2.jpeg').write_bytes(jpeg)
+
+        first, entry = register_image_file(Path(tmp) / '1.png', 'download')
+        second, duplicate = register_image_file(Path(tmp) / '2.jpeg', 'url')
+
+        assert first.name == '1.jpg' and not (Path(tmp) / '1.png').exists()
+        assert second.name == '2.jpeg'
+        assert entry['format'] == 'jpeg' and entry['width'] == 37 and entry['duplicate_of'] is None
+        assert duplicate['duplicate_of'] == '1.jpg'
+
+        cover = rename_image_file(first, '封面')
+        assert cover.name == '封面.jpg'
+
+        manifest = json.loads((Path(tmp) / MANIFEST_FILENAME).read_text(encoding='utf-8'))
+        assert set(manifest['images']) == {'封面.jpg', '2.jpeg'}
+        assert manifest['images']['2.jpeg']['duplicate_of'] == '封面.jpg'
+        assert manifest['images']['封面.jpg']['sha256'] == manifest['images']['2.jpeg']['sha256']
+
+
+def test_extension_fix_does_not_overwrite_existing_file():
+    """修正扩展名后的文件名已存在时保留原文件名，不覆盖已有图片"""
+    with tempfile.TemporaryDirectory() as tmp:
+        existing = Path(tmp) / '1.jpg'
+        existing.write_bytes(encode('JPEG'))
+        (Path(tmp) / '1.png').write_bytes(encode('JPEG', quality=50))
+
+        path, entry = register_image_file(Path(tmp) / '1.png', 'url')
+
+        assert path.name == '1.png' and path.exists()
+        assert existing.read_bytes() == encode('JPEG')
+        assert entry['format'] == 'jpeg'
+
+
+if __name__ == "__main__":
+    test_sniff_formats_and_dimensions()
+    test_register_fixes_extension_and_flags_duplicates()
+    test_extension_fix_does_not_overwrite_existing_file()
+    print("✓ 测试通过")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+测试运行日志分析（阶段耗时、批次延迟、重试与分位数）
+"""
+
+import gzip
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.log_analyzer import DurationStats, analyze_file, analyze_logs, normalize_message
+
+
+START = datetime(2024, 5, 1, 10, 0, 0)
+
+
+def log_lines(session: str, events) -> str:
+    """按 src/utils/logger.py 的格式生成日志：events 为 [(秒, 级别, 消息)]"""
+    lines = []
+    for offset, level, message in events:
+        stamp = (START + timedelta(seconds=offset)).strftime('%Y-%m-%d %H:%M:%S')
+        lines.append(f"{stamp} - session_{session} - {level} - auto_manga_workflow.py:1 - {message}\n")
+    return ''.join(lines)
+
+
+COMPLETED_RUN = [
+    (0, 'INFO', '=== Auto-Manga 自动漫画生成项目启动 ==='),
+    (0, 'DEBUG', '阶段开始: connect'),
+    (2, 'DEBUG', '阶段开始: batches'),
+    (2, 'DEBUG', '发送生成请求: P1-P4'),
+    (40, 'INFO', '生成请求被拒绝，换一种说法重试...'),
+    (41, 'DEBUG', '发送生成请求: P1-P4'),
+    (90, 'DEBUG', '✓ 批次 1 图片生成完成，检测到 1 张新图片'),
+    (92, 'DEBUG', '发送生成请求: P5-P8'),
+    (150, 'DEBUG', '✓ 批次 2 图片生成完成，检测到 1 张新图片'),
+    (151, 'DEBUG', '阶段开始: harvest'),
+    (160, 'WARNING', '图片 2.png 与 1.png 近似重复（感知哈希）'),
+    (170, 'INFO', '阶段耗时: connect=1.50s batches=148.25s harvest=19.00s'),
+    (170, 'INFO', '=== 工作流执行完成 ==='),
+]
+
+INCOMPLETE_RUN = [
+    (0, 'INFO', '=== Auto-Manga 自动漫画生成项目启动 ==='),
+    (0, 'DEBUG', '阶段开始: connect'),
+    (5, 'DEBUG', '阶段开始: batches'),
+    (5, 'DEBUG', '发送生成请求: P1-P4'),
+    (65, 'INFO', '模型回复额度用尽，60 秒后重试...'),
+    (125, 'DEBUG', '发送生成请求: P1-P4'),
+    (185, 'WARNING', '批次 1 (P1-P4) 图片生成失败（超时）'),
+    (186, 'DEBUG', '阶段开始: reconcile'),
+    (190, 'WARNING', '以下批次没有图片，只重新请求这些批次: P1-P4, P9-P12'),
+    (200, 'ERROR', '工作流执行失败: Target closed'),
+]
+
+
+def test_completed_run_uses_phase_summary():
+    """正常结束的运行：阶段耗时取汇总行，批次延迟从首次发送算起"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / '1714528800_run.log'
+        path.write_text(log_lines('1714528800', COMPLETED_RUN) + "Traceback (most recent call last):\n  ...\n",
+                        encoding='utf-8')
+        report = analyze_file(path)
+        assert report.session == '1714528800'
+        assert report.status == 'completed'
+        assert report.duration == 170
+        assert report.phases == {'connect': 1.5, 'batches': 148.25, 'harvest': 19.0}
+        assert [(b.label, b.latency, b.attempts, b.outcome) for b in report.batches] == [
+            ('P1-P4', 88, 2, 'ok'), ('P5-P8', 58, 1, 'ok'),
+        ]
+        assert dict(report.retries) == {'refused': 1}
+        assert report.warnings == 1
+        assert list(report.issues) == ['图片 N.png 与 N.png 近似重复（感知哈希）']
+
+
+def test_incomplete_gzip_run_rebuilds_phases():
+    """中断的运行（已压缩）：按阶段开始的时间戳推算耗时，记录失败和重试"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / '2_run.log.gz'
+        path.write_bytes(gzip.compress(log_lines('2', INCOMPLETE_RUN).encode('utf-8')))
+        report = analyze_file(path)
+        assert report.session == '2'
+        assert report.status == 'failed'
+        assert report.phases == {'connect': 5, 'batches': 181, 'reconcile': 14}
+        assert [(b.latency, b.attempts, b.outcome) for b in report.batches] == [(180, 2, 'failed')]
+        assert dict(report.retries) == {'quota': 1, 'reconcile': 2}
+        assert (report.warnings, report.errors) == (2, 1)
+
+
+def test_failure_is_not_overridden_by_completion_line():
+    """失败之后又出现完成行（旧版本 main.py 的日志）：仍记为失败"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / '3_run.log'
+        events = INCOMPLETE_RUN + [(201, 'INFO', '阶段耗时: connect=5.00s batches=181.00s'),
+                                   (201, 'INFO', '=== 工作流执行完成 ===')]
+        path.write_text(log_lines('3', events), encoding='utf-8')
+        assert analyze_file(path).status == 'failed'
+
+
+def test_analyze_directory_aggregates_runs():
+    """目录中的 .log 与 .log.gz 都参与汇总，错误日志不重复计算"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        (log_dir / '1_run.log').write_text(log_lines('1', COMPLETED_RUN), encoding='utf-8')
+        (log_dir / '1_error.log').write_text(log_lines('1', COMPLETED_RUN[-4:-3]), encoding='utf-8')
+        (log_dir / '2_run.log.gz').write_bytes(gzip.compress(log_lines('2', INCOMPLETE_RUN).encode('utf-8')))
+        seen = []
+        analysis = analyze_logs([log_dir], on_run=lambda report: seen.append(report.session))
+        assert seen == ['1', '2']
+        summary = analysis.to_dict()
+        assert summary['runs'] == 2
+        assert summary['status'] == {'completed': 1, 'failed': 1}
+        assert summary['phases']['batches']['count'] == 2
+        assert summary['batch_latency']['count'] == 3
+        assert summary['batch_attempts'] == {'1': 1, '2': 2}
+        assert summary['retries'] == {'refused': 1, 'quota': 1, 'reconcile': 2}
+        assert '批次延迟' in analysis.format_report()
+
+
+def test_duration_percentiles_within_bucket_error():
+    """直方图估算的分位数与精确值相差不超过一个桶（5%）"""
+    rng = random.Random(0)
+    values = [rng.lognormvariate(4, 0.8) for _ in range(5000)]
+    stats = DurationStats()
+    for value in values:
+        stats.add(value)
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * len(ordered)) - 1]
+        assert abs(stats.percentile(q) - exact) / exact < 0.06
+    assert stats.percentile(1.0) == max(values)
+    assert normalize_message('保存到 data/images/主题/3.png 失败 https://x.y/z?a=1') == '保存到 <path> 失败 <url>'
+
+
+if __name__ == '__main__':
+    test_completed_run_uses_phase_summary()
+    test_incomplete_gzip_run_rebuilds_phases()
+    test_failure_is_not_overridden_by_completion_line()
+    test_analyze_directory_aggregates_runs()
+    test_duration_percentiles_within_bucket_error()
+    print("✓ 日志分析测试通过")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+测试日志保留：压缩已关闭的日志、期限与总量限制、压缩索引
+"""
+
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.log_retention import ARCHIVE_INDEX_FILENAME, LOCK_FILENAME, LogRetention
+from src.utils.logger import SessionLogger, live_marker_path
+
+
+def write_log(log_dir: Path, name: str, age: float, lines: int = 2000) -> Path:
+    """写一个日志文件，并把修改时间设为 age 秒前"""
+    path = log_dir / name
+    path.write_text(''.join(f"2024-01-01 00:00:{i % 60:02d} - DEBUG - step {i} prompt ...\n" for i in range(lines)),
+                    encoding='utf-8')
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_compresses_closed_logs_only():
+    """只压缩已关闭的日志；当前会话和刚写入的日志保持原样"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        old = write_log(log_dir, '100_run.log', age=7200)
+        content = old.read_bytes()
+        write_log(log_dir, '100_error.log', age=7200, lines=0)
+        write_log(log_dir, '200_run.log', age=10)
+        write_log(log_dir, '300_run.log', age=7200)
+
+        result = LogRetention(log_dir, compress_idle=3600, current_session='300').run()
+        assert (result.compressed, result.deleted) == (2, 0)
+        assert sorted(p.name for p in log_dir.iterdir()) == [
+            ARCHIVE_INDEX_FILENAME, '100_error.log.gz', '100_run.log.gz', '200_run.log', '300_run.log',
+        ]
+        archive = log_dir / '100_run.log.gz'
+        assert gzip.decompress(archive.read_bytes()) == content
+        assert abs(archive.stat().st_mtime - (time.time() - 7200)) < 5
+        index = json.loads((log_dir / ARCHIVE_INDEX_FILENAME).read_text(encoding='utf-8'))
+        assert index['archives']['100_run.log.gz']['original_bytes'] == len(content)
+        assert result.freed_bytes > len(content) // 2
+
+        # 再次运行没有新工作
+        again = LogRetention(log_dir, compress_idle=3600, current_session='300').run()
+        assert (again.compressed, again.deleted) == (0, 0)
+
+
+def test_age_and_budget_limits():
+    """超过期限的删除；超过总量时从最旧的开始删除，并记录在索引中"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        write_log(log_dir, '1_run.log', age=40 * 86400)
+        for session, age in (('2', 5 * 86400), ('3', 4 * 86400), ('4', 3 * 86400)):
+            write_log(log_dir, f'{session}_run.log', age=age, lines=20000)
+        LogRetention(log_dir, max_age_days=None, max_total_bytes=None, compress_idle=3600).run()
+        sizes = {p.name: p.stat().st_size for p in log_dir.glob('*.gz')}
+
+        budget = sizes['3_run.log.gz'] + sizes['4_run.log.gz']
+        result = LogRetention(log_dir, max_age_days=30, max_total_bytes=budget, compress_idle=3600).run()
+        assert result.deleted == 2
+        assert sorted(p.name for p in log_dir.glob('*.gz')) == ['3_run.log.gz', '4_run.log.gz']
+        assert result.total_bytes == budget
+        index = json.loads((log_dir / ARCHIVE_INDEX_FILENAME).read_text(encoding='utf-8'))
+        assert [(r['name'], r['reason']) for r in index['removed']] == [
+            ('1_run.log.gz', 'age'), ('2_run.log.gz', 'budget'),
+        ]
+        assert sorted(index['archives']) == ['3_run.log.gz', '4_run.log.gz']
+
+
+def test_dry_run_and_lock():
+    """dry_run 不做改动；其他进程持有锁时跳过"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        write_log(log_dir, '1_run.log', age=7200)
+        result = LogRetention(log_dir, compress_idle=3600).run(dry_run=True)
+        assert result.compressed == 1
+        assert sorted(p.name for p in log_dir.iterdir()) == ['1_run.log']
+
+        (log_dir / LOCK_FILENAME).write_text('123')
+        assert LogRetention(log_dir, compress_idle=3600).run().skipped
+        stale = time.time() - 3600
+        os.utime(log_dir / LOCK_FILENAME, (stale, stale))
+        assert LogRetention(log_dir, compress_idle=3600).run().compressed == 1
+        assert not (log_dir / LOCK_FILENAME).exists()
+
+
+def test_skips_other_live_sessions():
+    """另一个仍在运行的会话：错误日志很久没有写入也不压缩、不删除；进程已退出的会话照常整理"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        live = SessionLogger('100', log_dir=tmp)
+        assert live_marker_path(log_dir, '100').read_text(encoding='utf-8') == str(os.getpid())
+        live.info('批次 1 开始')
+        write_log(log_dir, '100_error.log', age=7200)
+        write_log(log_dir, '200_run.log', age=7200)
+        write_log(log_dir, '200_error.log', age=7200)
+        exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+        exited.wait()
+        live_marker_path(log_dir, '200').write_text(str(exited.pid), encoding='utf-8')
+
+        result = LogRetention(log_dir, max_total_bytes=0, compress_idle=3600, current_session='300').run()
+        names = sorted(p.name for p in log_dir.iterdir())
+        assert '100_run.log' in names and '100_error.log' in names
+        assert live_marker_path(log_dir, '100').name in names
+        assert not any(name.startswith('200_') for name in names)
+        assert live_marker_path(log_dir, '200').name not in names
+        assert (result.compressed, result.deleted) == (2, 2)
+
+        for handler in live.logger.handlers + live.error_logger.handlers:
+            handler.close()
+
+
+def test_live_session_does_not_cover_prefixed_sessions():
+    """运行中的会话 abc 不会保护会话 abc_def 的日志"""
+    with tempfile.TemporaryDirectory() as tmp:
+        log_dir = Path(tmp)
+        live_marker_path(log_dir, 'abc').write_text(str(os.getpid()), encoding='utf-8')
+        write_log(log_dir, 'abc_error.log', age=7200)
+        write_log(log_dir, 'abc_def_run.log', age=7200)
+        write_log(log_dir, 'abc_def_error.log', age=7200)
+
+        result = LogRetention(log_dir, compress_idle=3600, current_session='xyz').run()
+        assert result.compressed == 2
+        assert sorted(p.name for p in log_dir.glob('abc*')) == [
+            'abc_def_error.log.gz', 'abc_def_run.log.gz', 'abc_error.log',
+        ]
+
+
+if __name__ == '__main__':
+    test_compresses_closed_logs_only()
+    test_age_and_budget_limits()
+    test_dry_run_and_lock()
+    test_skips_other_live_sessions()
+    test_live_session_does_not_cover_prefixed_sessions()
+    print("✓ 日志保留测试通过")
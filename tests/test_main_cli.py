@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+测试 main.py 命令行的快速退出路径不加载浏览器相关模块、不创建日志文件，以及工作流失败时的退出状态
+"""
+
+import asyncio
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+
+CHECK_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import main
+try:
+    main.main({argv!r})
+except SystemExit as e:
+    code = e.code
+heavy = [name for name in ('playwright', 'aiohttp', 'pyperclip') if name in sys.modules]
+print(code, ','.join(heavy))
+"""
+
+# 把 harvest_chat 换成直接返回固定结果的假函数，不连接浏览器
+HARVEST_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+import main
+
+async def fake_harvest_chat(args, session_id, logger):
+    return {saved!r}
+
+main.harvest_chat = fake_harvest_chat
+try:
+    main.main({argv!r})
+    code = 0
+except SystemExit as e:
+    code = e.code
+print(code)
+"""
+
+
+def run_main(argv: list, cwd: str) -> tuple:
+    """在子进程中调用 main.main(argv)，返回 (退出码, 已导入的重量级模块)"""
+    completed = subprocess.run(
+        [sys.executable, '-c', CHECK_SCRIPT.format(root=str(project_root), argv=argv)],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    code, _, heavy = completed.stdout.strip().splitlines()[-1].partition(' ')
+    return code, heavy
+
+
+def test_help_and_bad_args_are_lightweight():
+    """--help 与参数错误不导入 playwright 等模块，也不创建日志文件"""
+    with tempfile.TemporaryDirectory() as cwd:
+        assert run_main(['--help'], cwd) == ('0', '')
+        assert run_main([], cwd) == ('1', '')
+        assert not (Path(cwd) / 'data').exists()
+
+
+def test_missing_session_file_fails_before_browser_import():
+    """session 文件无效时在导入浏览器模块之前退出"""
+    with tempfile.TemporaryDirectory() as cwd:
+        assert run_main(['missing_session.txt'], cwd) == ('1', '')
+
+
+def test_harvest_requires_url_and_theme_dir():
+    """--harvest 缺少 --theme-dir 或 URL 不完整时在导入浏览器模块之前退出"""
+    with tempfile.TemporaryDirectory() as cwd:
+        assert run_main(['--harvest', 'https://gemini.google.com/app/abc'], cwd) == ('1', '')
+        assert run_main(['--harvest', 'abc', '--theme-dir', 'out'], cwd) == ('1', '')
+        assert not (Path(cwd) / 'data').exists()
+
+
+def test_harvest_exit_status_reflects_saved_images():
+    """只收集模式没有保存任何图片时以非零状态退出"""
+    argv = ['--harvest', 'https://gemini.google.com/app/abc', '--theme-dir', 'out']
+    for saved, expected in (([], '1'), (['out/1.png'], '0')):
+        with tempfile.TemporaryDirectory() as cwd:
+            completed = subprocess.run(
+                [sys.executable, '-c', HARVEST_SCRIPT.format(root=str(project_root), argv=argv, saved=saved)],
+                cwd=cwd, capture_output=True, text=True, check=True,
+            )
+            assert completed.stdout.strip().splitlines()[-1] == expected
+
+
+def test_failed_workflow_is_not_logged_as_completed():
+    """工作流失败时 run_workflow 返回 False，不记录完成行（会话日志写到临时目录）"""
+    import main
+    from src.core.auto_manga_workflow import AutoMangaWorkflow
+    from src.utils.logger import close_logger, init_logger
+
+    class RecordingLogger:
+        def __init__(self):
+            self.messages = []
+
+        def info(self, message):
+            self.messages.append(message)
+
+        exception = info
+
+    async def unreachable(self):
+        raise ConnectionError("无法连接到浏览器")
+
+    logger = RecordingLogger()
+    original = AutoMangaWorkflow.connect_to_browser
+    AutoMangaWorkflow.connect_to_browser = unreachable
+    with tempfile.TemporaryDirectory() as log_dir:
+        init_logger('test_main_cli', log_dir=log_dir)
+        try:
+            args = main.build_parser().parse_args(['--cover', '测试主题'])
+            assert asyncio.run(main.run_workflow(args, 'test_main_cli', logger)) is False
+            assert (Path(log_dir) / 'test_main_cli_error.log').exists()
+        finally:
+            AutoMangaWorkflow.connect_to_browser = original
+            close_logger()
+    assert "=== 工作流执行完成 ===" not in logger.messages
+    assert not (project_root / 'data' / 'logs' / 'test_main_cli_run.log').exists()
+
+
+if __name__ == "__main__":
+    test_help_and_bad_args_are_lightweight()
+    test_missing_session_file_fails_before_browser_import()
+    test_harvest_requires_url_and_theme_dir()
+    test_harvest_exit_status_reflects_saved_images()
+    test_failed_workflow_is_not_logged_as_completed()
+    print("✓ 测试通过")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+测试本地模拟 Gemini 服务
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import aiohttp
+
+from src.mock.gemini_server import MockGeminiConfig, MockGeminiServer, parse_fault_schedule
+from src.utils.file_utils import count_panels_from_table
+
+
+def test_mock_server_script_and_images():
+    """模拟服务应返回脚本表格与宫格图片"""
+    config = MockGeminiConfig(text_latency=0, image_latency=0, image_width=128, image_height=192, panels=8)
+
+    async def run():
+        server = MockGeminiServer(config)
+        url = await server.start()
+        base = url.rsplit('/app', 1)[0]
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url) as response:
+                    page = await response.text()
+                assert 'class="ql-editor' in page
+                assert 'data-test-id="local-images-files-uploader-button"' in page
+
+                async with session.post(f"{base}/mock/api/send", json={'text': '脚本', 'mode': 'text'}) as response:
+                    script = await response.json()
+                assert script['model']['kind'] == 'table'
+                assert count_panels_from_table(script['model']['text']) == 8
+
+                chat_id = script['chat_id']
+                payload = {'chat_id': chat_id, 'text': '生成P1-P4 的宫格漫画图片', 'mode': 'images'}
+                async with session.post(f"{base}/mock/api/send", json=payload) as response:
+                    turn = await response.json()
+                assert turn['model']['kind'] == 'images'
+
+                image_url = turn['model']['images'][0]['url']
+                async with session.get(base + image_url) as response:
+                    body = await response.read()
+                assert body.startswith(b'\x89PNG')
+
+                async with session.get(f"{base}/mock/api/chats/{chat_id}") as response:
+                    chat = await response.json()
+                assert len(chat['turns']) == 2
+            assert server.state.stats['image_turns'] == 1
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+def test_parse_fault_schedule():
+    """故障计划按生图请求序号分组，未知类型报错"""
+    assert parse_fault_schedule("slow_render:2, refusal:3,lazy_render:2") == {
+        2: ['slow_render', 'lazy_render'],
+        3: ['refusal'],
+    }
+    assert parse_fault_schedule("") == {}
+    for spec in ("unknown:1", "refusal", "refusal:0"):
+        try:
+            parse_fault_schedule(spec)
+        except ValueError:
+            continue
+        raise AssertionError(f"应拒绝故障计划: {spec}")
+
+
+def test_mock_server_fault_injection():
+    """按计划注入故障并记录事件日志"""
+    config = MockGeminiConfig(
+        text_latency=0,
+        image_latency=0,
+        image_width=64,
+        image_height=96,
+        faults=parse_fault_schedule("refusal:1,error:2,no_download_button:3,lazy_render:3,cdp_drop:3"),
+    )
+    triggered = []
+
+    async def run():
+        server = MockGeminiServer(config)
+        server.state.fault_listeners.append(lambda kind, chat_id, turn: triggered.append(kind))
+        url = await server.start()
+        base = url.rsplit('/app', 1)[0]
+        try:
+            async with aiohttp.ClientSession() as session:
+                async def send(chat_id=None):
+                    payload = {'chat_id': chat_id, 'text': '生成P1-P4 的宫格漫画图片', 'mode': 'images'}
+                    async with session.post(f"{base}/mock/api/send", json=payload) as response:
+                        return response.status, (await response.json() if response.status == 200 else None)
+
+                status, refusal = await send()
+                assert status == 200 and refusal['model']['kind'] == 'text'
+                chat_id = refusal['chat_id']
+
+                status, _ = await send(chat_id)
+                assert status == 500
+
+                status, turn = await send(chat_id)
+                assert turn['model']['lazy'] is True
+                assert turn['model']['images'][0]['download'] is False
+
+                async with session.get(f"{base}/mock/api/chats/{chat_id}") as response:
+                    chat = await response.json()
+                # 刷新后的历史记录不再懒加载；出错的请求不会留下对话轮次
+                assert len(chat['turns']) == 2
+                assert 'lazy' not in chat['turns'][1]['model']
+
+                async with session.get(f"{base}/mock/api/events") as response:
+                    events = await response.json()
+            faults = [event['fault'] for event in events if event['event'] == 'fault']
+            assert faults == ['refusal', 'error', 'no_download_button', 'lazy_render', 'cdp_drop']
+            assert triggered == faults
+            assert server.state.stats['faults_injected'] == 5
+        finally:
+            await server.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_mock_server_script_and_images()
+    test_parse_fault_schedule()
+    test_mock_server_fault_injection()
+    print("✓ 测试通过")
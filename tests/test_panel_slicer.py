@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+测试宫格切分：分隔带检测与按全局编号命名
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.postprocess import panel_slicer
+from src.postprocess.panel_slicer import detect_panels, slice_theme_images, split_segments
+
+
+def make_grid(cells=4, size=400, gutter=10, background=255):
+    """生成 2x2 拼图：宫格内容为随机噪声，上部有一条纯色（不应被当作分隔带）"""
+    rng = np.random.default_rng(cells)
+    array = np.full((size, size, 3), background, dtype=np.uint8)
+    panel = (size - gutter) // 2
+    for index in range(cells):
+        row, column = divmod(index, 2)
+        top, left = row * (panel + gutter), column * (panel + gutter)
+        array[top:top + panel, left:left + panel] = rng.integers(0, 256, (panel, panel, 3))
+        array[top:top + panel // 3, left:left + panel] = (30, 120, 200)
+    return Image.fromarray(array)
+
+
+def test_split_segments_merges_small_pieces():
+    """两端边框去掉，窄分隔带不切，过小的片段并入相邻片段"""
+    gutter = np.zeros(100, dtype=bool)
+    gutter[:5] = gutter[48:52] = gutter[95:] = True
+    assert split_segments(gutter, 2, 10) == [(5, 48), (52, 95)]
+    assert split_segments(gutter, 5, 10) == [(5, 95)]
+
+    gutter[60:62] = True
+    assert split_segments(gutter, 2, 20) == [(5, 48), (52, 95)]
+
+
+def test_detect_panels_white_and_black_gutters():
+    """白色与黑色分隔带都能识别，按阅读顺序返回"""
+    expected = [(0, 0, 195, 195), (205, 0, 400, 195), (0, 205, 195, 400), (205, 205, 400, 400)]
+    assert detect_panels(make_grid()) == expected
+    assert detect_panels(make_grid(background=0)) == expected
+    assert detect_panels(make_grid(cells=3)) == expected[:3]
+
+
+def test_slice_theme_images_names_by_global_panel():
+    """按批次编号找到宫格范围：第 2 批的宫格为 P5-P8，最后一批只取应有的数量"""
+    with tempfile.TemporaryDirectory() as tmp:
+        make_grid().save(Path(tmp) / '1.png')
+        make_grid().save(Path(tmp) / '2.png')
+        make_grid().save(Path(tmp) / '3.png')
+        make_grid().save(Path(tmp) / '封面.png')
+
+        panels = slice_theme_images(tmp, 10, workers=2)
+
+        assert sorted(panels) == list(range(1, 11))
+        assert Path(panels[6]) == Path(tmp) / 'panels' / 'P6.png'
+        with Image.open(panels[6]) as image:
+            assert image.size == (195, 195)
+
+
+def test_slice_theme_images_one_job_per_batch_after_jpeg_conversion():
+    """convert_to_jpeg.py 转换后 1.png 与 1.jpg 并存：每个批次只切分一张（优先 PNG）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        make_grid().save(Path(tmp) / '1.png')
+        make_grid().convert('RGB').save(Path(tmp) / '1.jpg', quality=90)
+        make_grid().save(Path(tmp) / '2.png')
+        make_grid().convert('RGB').save(Path(tmp) / '2.jpg', quality=90)
+
+        sources = []
+        original = panel_slicer.slice_image_file
+
+        def recording(source, *args):
+            sources.append(Path(source).name)
+            return original(source, *args)
+
+        panel_slicer.slice_image_file = recording
+        try:
+            panels = slice_theme_images(tmp, 8, workers=1)
+        finally:
+            panel_slicer.slice_image_file = original
+
+        assert sorted(sources) == ['1.png', '2.png']
+        assert sorted(panels) == list(range(1, 9))
+
+
+def test_image_without_gutters_is_left_unsliced():
+    """没有分隔带的图片不输出整张图作为 P1，记录为未切分"""
+    with tempfile.TemporaryDirectory() as tmp:
+        rng = np.random.default_rng(0)
+        Image.fromarray(rng.integers(0, 256, (400, 400, 3), dtype=np.uint8)).save(Path(tmp) / '1.png')
+        make_grid().save(Path(tmp) / '2.png')
+
+        result = panel_slicer.slice_image_file(str(Path(tmp) / '1.png'), tmp, 1, 4)
+        assert result.unsliced and result.panels == [] and result.error is None
+        assert not (Path(tmp) / 'P1.png').exists()
+
+        panels = slice_theme_images(tmp, 8, workers=1)
+
+        assert sorted(panels) == [5, 6, 7, 8]
+        assert (Path(tmp) / '1.png').exists()
+        assert not (Path(tmp) / 'panels' / 'P1.png').exists()
+
+
+if __name__ == "__main__":
+    test_split_segments_merges_small_pieces()
+    test_detect_panels_white_and_black_gutters()
+    test_slice_theme_images_names_by_global_panel()
+    test_slice_theme_images_one_job_per_batch_after_jpeg_conversion()
+    test_image_without_gutters_is_left_unsliced()
+    print("✓ 测试通过")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+测试感知哈希、近似重复检测与全局图片目录
+"""
+
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+from PIL import Image
+
+from src.utils import image_utils
+from src.utils.image_utils import ImageCatalog, register_image_file, rename_image_file
+from src.utils.perceptual_hash import PerceptualIndex, hamming, image_hashes
+
+
+def natural_image(seed: int, size=(512, 384)) -> Image.Image:
+    """由若干高斯光斑叠加成的“自然”图片，缩放和重新压缩后哈希应保持稳定"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    canvas = np.zeros((height, width, 3), dtype=np.float32)
+    for _ in range(12):
+        cx, cy = rng.uniform(0, width), rng.uniform(0, height)
+        radius = rng.uniform(20, 120)
+        color = rng.uniform(0, 255, 3)
+        blob = np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2 * radius ** 2))
+        canvas += blob[..., None] * color
+    return Image.fromarray(np.clip(canvas, 0, 255).astype(np.uint8), 'RGB')
+
+
+def save(image: Image.Image, path: Path, image_format='PNG', **kwargs) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **kwargs)
+    path.write_bytes(buffer.getvalue())
+    return path
+
+
+def test_hashes_survive_resize_and_recompression():
+    """缩小并以 JPEG 重新压缩后仍在阈值内，不同图片超出阈值"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        original = natural_image(1)
+        a = image_hashes(save(original, tmp / 'a.png'))
+        b = image_hashes(save(original.resize((256, 192)), tmp / 'b.jpg', 'JPEG', quality=60))
+        c = image_hashes(save(natural_image(2), tmp / 'c.png'))
+
+        index = PerceptualIndex([('a', *a), ('c', *c)])
+        assert [match[0] for match in index.find(*b)] == ['a']
+        assert hamming(a[1], c[1]) > 10
+        assert index.duplicate_pairs() == []
+        assert PerceptualIndex([('a', *a), ('b', *b), ('c', *c)]).duplicate_pairs() == [('a', 'b')]
+
+
+def test_manifest_marks_near_duplicates():
+    """同一主题目录中重新编码的图片记为 near_duplicate_of"""
+    with tempfile.TemporaryDirectory() as tmp:
+        theme = Path(tmp) / 'theme'
+        image = natural_image(3)
+        register_image_file(save(image, theme / '1.png'))
+        _, entry = register_image_file(save(image, theme / '2.jpg', 'JPEG', quality=70))
+        assert entry['duplicate_of'] is None
+        assert entry['near_duplicate_of'] == '1.png'
+        _, other = register_image_file(save(natural_image(4), theme / '3.png'))
+        assert other['near_duplicate_of'] is None
+
+
+def test_catalog_matches_across_themes():
+    """全局图片目录能找出其他主题中的近似图片，改名后记录同步更新"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        catalog_path = tmp / 'catalog.json'
+        image = natural_image(5)
+        first, _ = register_image_file(save(image, tmp / 'theme-a' / '1.png'), catalog_path=catalog_path)
+        rename_image_file(first, '封面', catalog_path=catalog_path)
+
+        _, entry = register_image_file(
+            save(image.resize((400, 300)), tmp / 'theme-b' / '1.png'), catalog_path=catalog_path
+        )
+        assert entry['catalog_match'] == 'theme-a/封面.png'
+        assert set(ImageCatalog(catalog_path).images) == {'theme-a/封面.png', 'theme-b/1.png'}
+
+        # 同一主题内不作为跨主题重复
+        _, again = register_image_file(save(image, tmp / 'theme-b' / '2.png'), catalog_path=catalog_path)
+        assert again['catalog_match'] == 'theme-a/封面.png'
+
+
+def test_skip_duplicates_removes_file():
+    """开启跳过重复时删除近似重复的文件，不写入清单"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        catalog_path = tmp / 'catalog.json'
+        image = natural_image(6)
+        register_image_file(save(image, tmp / 'theme-a' / '1.png'), catalog_path=catalog_path)
+        path, entry = register_image_file(
+            save(image, tmp / 'theme-b' / '1.jpg', 'JPEG', quality=80),
+            catalog_path=catalog_path, skip_duplicates=True,
+        )
+        assert entry['skipped'] is True
+        assert entry['catalog_match'] == 'theme-a/1.png'
+        assert not path.exists()
+        assert list(ImageCatalog(catalog_path).images) == ['theme-a/1.png']
+
+
+CATALOG_WRITER_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+from src.utils.image_utils import ImageCatalog
+catalog = ImageCatalog({path!r})
+for idx in range({count}):
+    with catalog.lock():
+        catalog.refresh()
+        catalog.record('{theme}/%d.png' % idx, '{theme}-%d' % idx, None)
+"""
+
+
+def test_catalog_appends_changes_and_is_shared_across_processes():
+    """保存图片只追加日志，不重写整个目录；多个进程同时写入时不丢失记录"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        catalog_path = tmp / 'catalog.json'
+        # 上一次异常退出遗留的锁文件被接管
+        lock_path = tmp / 'catalog.json.lock'
+        lock_path.write_text('0')
+        os.utime(lock_path, (time.time() - 3600, time.time() - 3600))
+
+        register_image_file(save(natural_image(7), tmp / 'theme-a' / '1.png'), catalog_path=catalog_path)
+        register_image_file(save(natural_image(8), tmp / 'theme-a' / '2.png'), catalog_path=catalog_path)
+        assert not catalog_path.exists() and not lock_path.exists()
+        assert len((tmp / 'catalog.json.journal').read_text(encoding='utf-8').splitlines()) == 2
+
+        writers = [
+            subprocess.Popen([sys.executable, '-c', CATALOG_WRITER_SCRIPT.format(
+                root=str(project_root), path=str(catalog_path), count=150, theme=theme)])
+            for theme in ('theme-b', 'theme-c')
+        ]
+        assert all(writer.wait(timeout=60) == 0 for writer in writers)
+
+        # 日志超过 COMPACT_MIN_ENTRIES 后合并回 catalog.json
+        catalog = ImageCatalog(catalog_path)
+        assert len(catalog.images) == 302
+        assert catalog.images['theme-c/149.png']['sha256'] == 'theme-c-149'
+        assert catalog_path.exists()
+
+        # 进程内缓存的目录能读到其它进程的写入
+        _, entry = register_image_file(save(natural_image(7), tmp / 'theme-d' / '1.png'), catalog_path=catalog_path)
+        assert entry['catalog_match'] == 'theme-a/1.png'
+        assert len(image_utils._catalogs[catalog_path.absolute()].images) == 303
+
+
+if __name__ == '__main__':
+    test_hashes_survive_resize_and_recompression()
+    test_manifest_marks_near_duplicates()
+    test_catalog_matches_across_themes()
+    test_skip_duplicates_removes_file()
+    test_catalog_appends_changes_and_is_shared_across_processes()
+    print("✓ 感知哈希测试通过")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+测试发布编码：按体积上限/目标 SSIM 选择质量，按源文件哈希 + 参数缓存
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.postprocess.publish_encoder import block_ssim, encode_for_publish, encode_image
+
+
+def make_image(seed=0, size=128):
+    """渐变背景加噪声，体积随质量明显变化"""
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(0, 255, size)
+    base = np.stack([np.add.outer(ramp, ramp) / 2] * 3, axis=-1)
+    return Image.fromarray(np.clip(base + rng.normal(0, 20, base.shape), 0, 255).astype(np.uint8))
+
+
+def test_block_ssim_identity_and_degradation():
+    """相同图片 SSIM 为 1，加噪声后下降"""
+    reference = np.asarray(make_image().convert('L'), dtype=np.float32)
+    noisy = reference + np.random.default_rng(1).normal(0, 30, reference.shape).astype(np.float32)
+    assert block_ssim(reference, reference) == 1.0
+    assert block_ssim(reference, noisy) < 0.9
+
+
+def test_encode_image_respects_budget_and_target():
+    """体积上限优先：质量取不超过上限的最高值；目标 SSIM 越高，选出的质量越高"""
+    image = make_image()
+    _, unlimited = encode_image(image, 'jpeg', max_bytes=None, target_ssim=None)
+    assert unlimited['quality'] == 95
+
+    budget = unlimited['bytes'] // 2
+    data, limited = encode_image(image, 'jpeg', max_bytes=budget, target_ssim=None)
+    assert len(data) <= budget and not limited['over_budget']
+    next_quality = (limited['quality'] + 1, limited['quality'] + 1)
+    _, above = encode_image(image, 'jpeg', max_bytes=None, target_ssim=None, quality_range=next_quality)
+    assert above['bytes'] > budget
+
+    _, low = encode_image(image, 'webp', max_bytes=None, target_ssim=0.8)
+    _, high = encode_image(image, 'webp', max_bytes=None, target_ssim=0.97)
+    assert low['quality'] <= high['quality'] and high['ssim'] >= 0.97
+
+    _, impossible = encode_image(image, 'jpeg', max_bytes=100, target_ssim=None)
+    assert impossible['quality'] == 30 and impossible['over_budget']
+
+
+def test_encode_for_publish_caches_by_hash_and_settings():
+    """源文件和参数不变时直接使用缓存；改变参数后重新编码"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        sources = []
+        for index in range(2):
+            path = root / f'strip-{index + 1}.png'
+            make_image(index).save(path)
+            sources.append(str(path))
+        kwargs = {'formats': ['jpeg', 'webp'], 'workers': 2, 'cache_dir': root / 'cache', 'max_bytes': None}
+
+        first = encode_for_publish(sources, root / 'publish', target_ssim=0.9, **kwargs)
+        again = encode_for_publish(sources, root / 'publish', target_ssim=0.9, **kwargs)
+        changed = encode_for_publish(sources, root / 'publish', target_ssim=0.95, **kwargs)
+
+        assert sorted(p.name for p in (root / 'publish').iterdir()) == [
+            'strip-1.jpg', 'strip-1.webp', 'strip-2.jpg', 'strip-2.webp'
+        ]
+        assert not any(result.cached for result in first)
+        assert all(result.cached for result in again)
+        assert [result.quality for result in again] == [result.quality for result in first]
+        assert not any(result.cached for result in changed)
+
+
+if __name__ == "__main__":
+    test_block_ssim_identity_and_degradation()
+    test_encode_image_respects_budget_and_target()
+    test_encode_for_publish_caches_by_hash_and_settings()
+    print("✓ 测试通过")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+测试模型回复分类：拒绝、出错、额度用尽在一次轮询内识别
+"""
+
+import asyncio
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.core.response_classifier import ResponseClassifier, ResponseOutcome, classify_response
+from src.mock.gemini_server import REFUSAL_TEXT
+from src.utils.logger import close_logger, init_logger
+
+
+@contextmanager
+def temp_session_logger(session_id: str):
+    """会话日志写到临时目录，测试不在仓库的 data/logs 中留下文件"""
+    with tempfile.TemporaryDirectory() as log_dir:
+        init_logger(session_id, log_dir=log_dir)
+        try:
+            yield Path(log_dir)
+        finally:
+            close_logger()
+
+
+def test_classify_response_text():
+    """按文本识别回复类型，有图片或仍在生成时不看文本"""
+    cases = [
+        (REFUSAL_TEXT, ResponseOutcome.REFUSAL),
+        ("I’m unable to generate images of real people.", ResponseOutcome.REFUSAL),
+        ("抱歉，我无法生成这张图片。", ResponseOutcome.REFUSAL),
+        ("Something went wrong. Please try again.", ResponseOutcome.ERROR),
+        ("You've reached your image generation limit for today. Try again later.", ResponseOutcome.QUOTA),
+        ("今天的图片生成次数已达上限", ResponseOutcome.QUOTA),
+        ("好的。", ResponseOutcome.TEXT),
+        ("", ResponseOutcome.PENDING),
+        # 正文中出现这些词不是提示语
+        ("第三格：主角喊道“额度已达上限，请重试！”", ResponseOutcome.TEXT),
+        ("Here is the plan. If something went wrong, please try again.", ResponseOutcome.TEXT),
+        ("模型的配额（quota）和 rate limit 有什么区别？", ResponseOutcome.TEXT),
+        ("这个功能暂时无法提供，但我可以先写脚本。", ResponseOutcome.TEXT),
+        ("Something went wrong. " + "后面是一大段正常的故事文本。" * 20, ResponseOutcome.TEXT),
+    ]
+    for text, expected in cases:
+        assert classify_response(text).outcome is expected, (text, expected)
+
+    assert classify_response(REFUSAL_TEXT, image_count=4).outcome is ResponseOutcome.IMAGES
+    assert classify_response("Something went wrong", pending=True).outcome is ResponseOutcome.PENDING
+    assert ResponseOutcome.QUOTA.is_failure and not ResponseOutcome.TEXT.is_failure
+
+
+class FakePage:
+    def __init__(self, *latest):
+        self.latest = list(latest)
+
+    async def evaluate(self, script, arg):
+        return self.latest.pop(0) if len(self.latest) > 1 else self.latest[0]
+
+
+def reply(text):
+    return {'text': text, 'imageCount': 0, 'pending': False}
+
+
+def test_classifier_reads_latest_response():
+    """最新回复不在最后一条用户消息之后（页面返回 None）时视为仍在等待；拒绝在连续两次读到相同文本后判定"""
+    refusal = ResponseClassifier(FakePage(reply(REFUSAL_TEXT)))
+    waiting = ResponseClassifier(FakePage(None))
+
+    async def poll(classifier, times):
+        return [(await classifier.classify_latest()).outcome for _ in range(times)]
+
+    assert asyncio.run(poll(refusal, 2)) == [ResponseOutcome.PENDING, ResponseOutcome.REFUSAL]
+    assert asyncio.run(poll(waiting, 2)) == [ResponseOutcome.PENDING, ResponseOutcome.PENDING]
+
+
+def test_classifier_waits_for_streaming_text_to_settle():
+    """仍在输出的回复：开头像出错提示，但文本每次轮询都在变长，最后是正常回复，不判定为出错"""
+    streaming = ResponseClassifier(FakePage(
+        reply("Something went wrong"),
+        reply("Something went wrong in panel 3, so the hero"),
+        reply("Something went wrong in panel 3, so the hero goes back home. " + "The story continues. " * 10),
+    ))
+
+    async def poll(times):
+        return [(await streaming.classify_latest()).outcome for _ in range(times)]
+
+    assert asyncio.run(poll(4)) == [ResponseOutcome.PENDING, ResponseOutcome.PENDING,
+                                    ResponseOutcome.TEXT, ResponseOutcome.TEXT]
+
+
+def test_local_exception_does_not_resend_batch():
+    """等待图片时本地代码出错：返回 LOCAL_ERROR，不当作页面报告的出错重新发送"""
+    from src.core import image_saver
+    from src.core.auto_manga_workflow import AutoMangaWorkflow
+    from src.core.batch_reconciler import BatchRange
+
+    class EmptyPage:
+        async def query_selector_all(self, selector):
+            return []
+
+    class BrokenSaver:
+        def __init__(self, *args, **kwargs):
+            raise AttributeError("'NoneType' object has no attribute 'url'")
+
+    sent = []
+
+    async def send_message(message):
+        sent.append(message)
+
+    original = image_saver.ImageSaver
+    image_saver.ImageSaver = BrokenSaver
+    try:
+        with temp_session_logger('test_classifier'):
+            workflow = AutoMangaWorkflow(session_id='test_classifier')
+            workflow.page = EmptyPage()
+            workflow.send_message = send_message
+            success, urls, response = asyncio.run(
+                workflow.generate_batch(BatchRange(0, 1, 4), "P1-P4", "P1-P4", set())
+            )
+    finally:
+        image_saver.ImageSaver = original
+
+    assert not success and urls == []
+    assert response.outcome is ResponseOutcome.LOCAL_ERROR and not response.outcome.is_failure
+    assert sent == ["P1-P4"]
+
+
+if __name__ == "__main__":
+    test_classify_response_text()
+    test_classifier_reads_latest_response()
+    test_classifier_waits_for_streaming_text_to_settle()
+    test_local_exception_does_not_resend_batch()
+    print("✓ 测试通过")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+测试长图拼接：版面规划与按行带写入的 PNG
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.postprocess.strip_composer import (
+    PNGStreamWriter,
+    compose_theme_strips,
+    ordered_theme_images,
+    plan_strips,
+)
+
+
+def test_plan_strips_splits_at_max_height():
+    """放不下的图片另起一张，超高的图片跨张切开，长图开头不放分隔带"""
+    parts = plan_strips([('a', 400), ('b', 500), ('c', 1500)], gutter=20, max_height=1000)
+    layout = [[(s.source, s.start, s.end) for s in part.segments] for part in parts]
+    assert layout == [
+        [('a', 0, 400), (None, 0, 20), ('b', 0, 500)],
+        [('c', 0, 1000)],
+        [('c', 1000, 1500)],
+    ]
+
+
+def test_png_stream_writer_round_trip():
+    """按行带写入的 PNG 与原始像素一致"""
+    rows = np.random.default_rng(0).integers(0, 256, (300, 77, 3), dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as tmp:
+        target = Path(tmp) / 'out.png'
+        with PNGStreamWriter(target, 77, 300) as writer:
+            for start in range(0, 300, 64):
+                writer.write_rows(rows[start:start + 64])
+        with Image.open(target) as image:
+            assert np.array_equal(np.asarray(image), rows)
+
+
+def test_compose_theme_strips_orders_cover_and_batches():
+    """封面在最上面，批次图片按编号排列，缩放到统一宽度"""
+    with tempfile.TemporaryDirectory() as tmp:
+        colors = {'封面': (255, 0, 0), '1': (0, 255, 0), '2': (0, 0, 255), '10': (9, 9, 9)}
+        for stem, color in colors.items():
+            Image.new('RGB', (200, 100), color).save(Path(tmp) / f'{stem}.png')
+        assert [Path(p).stem for p in ordered_theme_images(tmp)] == ['封面', '1', '2', '10']
+
+        outputs = compose_theme_strips(tmp, width=100, gutter=10, max_height=120)
+
+        assert len(outputs) == 2
+        with Image.open(outputs[0]) as image:
+            strip = np.asarray(image)
+        assert strip.shape == (110, 100, 3)
+        assert tuple(strip[0, 0]) == (255, 0, 0)
+        assert tuple(strip[55, 0]) == (255, 255, 255)
+        assert tuple(strip[60, 0]) == (0, 255, 0)
+        with Image.open(outputs[1]) as image:
+            assert image.size == (100, 110)
+
+
+def test_ordered_theme_images_after_jpeg_conversion():
+    """convert_to_jpeg.py 转换后 PNG 与 JPEG 并存：每个编号只取一张，避免重复拼接和发布时互相覆盖"""
+    with tempfile.TemporaryDirectory() as tmp:
+        for stem in ('封面', '1', '2'):
+            image = Image.new('RGB', (200, 100), (0, 128, 0))
+            image.save(Path(tmp) / f'{stem}.png')
+            image.save(Path(tmp) / f'{stem}.jpg', quality=90)
+        (Path(tmp) / 'panels').mkdir()
+        for stem in ('P1', 'P2'):
+            Image.new('RGB', (100, 100)).save(Path(tmp) / 'panels' / f'{stem}.jpg')
+            Image.new('RGB', (100, 100)).save(Path(tmp) / 'panels' / f'{stem}.png')
+
+        assert [Path(p).name for p in ordered_theme_images(tmp)] == ['封面.png', '1.png', '2.png']
+        assert [Path(p).name for p in ordered_theme_images(tmp, use_panels=True)] == ['封面.png', 'P1.png', 'P2.png']
+
+
+if __name__ == "__main__":
+    test_plan_strips_splits_at_max_height()
+    test_png_stream_writer_round_trip()
+    test_compose_theme_strips_orders_cover_and_batches()
+    test_ordered_theme_images_after_jpeg_conversion()
+    print("✓ 测试通过")
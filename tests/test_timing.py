@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+测试等待耗时统计功能
+"""
+
+import asyncio
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.utils.logger import close_logger, init_logger
+from src.utils.timing import (
+    WaitAccounting,
+    condition_wait,
+    fixed_sleep,
+    reset_wait_accounting,
+    tracked_wait,
+    use_wait_accounting,
+)
+
+
+@contextmanager
+def temp_session_logger(session_id: str):
+    """会话日志写到临时目录，测试不在仓库的 data/logs 中留下文件"""
+    with tempfile.TemporaryDirectory() as log_dir:
+        init_logger(session_id, log_dir=log_dir)
+        try:
+            yield Path(log_dir)
+        finally:
+            close_logger()
+
+
+def test_fixed_sleep_attributed_to_call_site():
+    """固定休眠应计入死等时间，并归属到调用位置"""
+    accounting = WaitAccounting()
+
+    async def run():
+        token = use_wait_accounting(accounting)
+        try:
+            for _ in range(2):
+                await fixed_sleep(0.01)
+        finally:
+            reset_wait_accounting(token)
+
+    asyncio.run(run())
+
+    assert len(accounting.sleeps) == 1
+    site, stats = next(iter(accounting.sleeps.items()))
+    assert site.startswith("tests/test_timing.py:")
+    assert site.endswith(" run")
+    assert stats.count == 2
+    assert accounting.dead_time >= 0.02
+    assert accounting.condition_wait_time == 0
+
+
+def test_polls_inside_condition_wait_are_not_dead_time():
+    """条件等待中的轮询休眠计入条件等待，不计入死等"""
+    accounting = WaitAccounting()
+
+    @tracked_wait("等待测试条件")
+    async def wait_for_condition():
+        async with condition_wait("内层等待"):
+            await fixed_sleep(0.01)
+        return (False, [])
+
+    async def run():
+        token = use_wait_accounting(accounting)
+        try:
+            await wait_for_condition()
+        finally:
+            reset_wait_accounting(token)
+
+    asyncio.run(run())
+
+    assert accounting.dead_time == 0
+    assert list(accounting.waits) == ["等待测试条件"]
+    assert accounting.polls["等待测试条件"].count == 1
+    assert accounting.wait_timeouts == {"等待测试条件": 1}
+
+    report = accounting.format_report()
+    assert "等待测试条件" in report
+    assert "超时 1 次" in report
+
+
+def test_quota_backoff_is_dead_time_and_image_wait_is_tracked():
+    """额度用尽的退避计入死等；等待图片生成（含封面）整体计为条件等待"""
+    from src.core import auto_manga_workflow
+    from src.core.auto_manga_workflow import AutoMangaWorkflow
+    from src.core.response_classifier import ResponseClassification, ResponseOutcome
+
+    assert hasattr(AutoMangaWorkflow.wait_for_images_generated, '__wrapped__')
+    assert not hasattr(AutoMangaWorkflow.prepare_batch_retry, '__wrapped__')
+
+    with temp_session_logger("test_timing"):
+        accounting = WaitAccounting()
+        workflow = AutoMangaWorkflow(session_id="test_timing")
+        original_backoff = auto_manga_workflow.QUOTA_BACKOFF
+        auto_manga_workflow.QUOTA_BACKOFF = 0.01
+
+        async def run():
+            token = use_wait_accounting(accounting)
+            try:
+                return await workflow.prepare_batch_retry(ResponseClassification(ResponseOutcome.QUOTA), "P1-P4", 0)
+            finally:
+                reset_wait_accounting(token)
+
+        try:
+            assert asyncio.run(run()) == "P1-P4"
+        finally:
+            auto_manga_workflow.QUOTA_BACKOFF = original_backoff
+
+        assert accounting.dead_time >= 0.01
+        assert accounting.waits == {}
+
+
+def test_generate_batch_send_sleeps_are_dead_time():
+    """发送消息中的固定休眠计入死等，只有等待图片生成本身计为条件等待"""
+    from src.core.auto_manga_workflow import AutoMangaWorkflow
+    from src.core.batch_reconciler import BatchRange
+    from src.core.response_classifier import ResponseClassification, ResponseOutcome
+
+    class FakePage:
+        async def query_selector_all(self, selector):
+            return []
+
+    with temp_session_logger("test_timing"):
+        accounting = WaitAccounting()
+        workflow = AutoMangaWorkflow(session_id="test_timing")
+        workflow.page = FakePage()
+
+        async def send_message(message):
+            await fixed_sleep(0.01)
+
+        @tracked_wait("等待图片生成")
+        async def wait_for_images_generated(initial_image_count=0, saved_image_urls=None):
+            await fixed_sleep(0.01)
+            return True, ["url-1"], ResponseClassification(ResponseOutcome.IMAGES)
+
+        workflow.send_message = send_message
+        workflow.wait_for_images_generated = wait_for_images_generated
+
+        async def run():
+            token = use_wait_accounting(accounting)
+            try:
+                return await workflow.generate_batch(BatchRange(0, 1, 4), "P1-P4", "P1-P4", set())
+            finally:
+                reset_wait_accounting(token)
+
+        success, urls, _ = asyncio.run(run())
+        assert success and urls == ["url-1"]
+        assert [site.split()[-1] for site in accounting.sleeps] == ["send_message"]
+        assert list(accounting.waits) == ["等待图片生成"]
+        assert accounting.polls["等待图片生成"].count == 1
+
+
+def test_dead_sleep_inside_condition_wait_is_dead_time():
+    """条件等待中的无条件固定休眠计入死等，并从条件等待耗时中扣除"""
+    accounting = WaitAccounting()
+
+    @tracked_wait("等待测试条件")
+    async def wait_for_condition():
+        await fixed_sleep(0.05, dead=True)
+        await fixed_sleep(0.01)
+        return True
+
+    async def run():
+        token = use_wait_accounting(accounting)
+        try:
+            await wait_for_condition()
+        finally:
+            reset_wait_accounting(token)
+
+    asyncio.run(run())
+
+    assert [site.split()[-1] for site in accounting.sleeps] == ["wait_for_condition"]
+    assert accounting.dead_time >= 0.05
+    assert accounting.polls["等待测试条件"].count == 1
+    assert accounting.condition_wait_time < 0.05
+
+
+def test_response_settle_sleep_is_dead_time_and_copy_button_is_condition_wait():
+    """等待响应后的渲染休眠计入死等；等待复制按钮是条件等待，不再固定等 10 秒"""
+    from src.core import auto_manga_workflow
+    from src.core.auto_manga_workflow import AutoMangaWorkflow
+
+    class FakePage:
+        def __init__(self):
+            self.selectors = []
+
+        async def wait_for_selector(self, selector, **kwargs):
+            self.selectors.append(selector)
+
+    async def no_sleep(seconds, dead=False):
+        await fixed_sleep(0.01, dead=dead)
+
+    async def stabilized(*args, **kwargs):
+        return True
+
+    with temp_session_logger("test_timing"):
+        accounting = WaitAccounting()
+        workflow = AutoMangaWorkflow(session_id="test_timing")
+        workflow.page = FakePage()
+        original_sleep = auto_manga_workflow.fixed_sleep
+        original_stabilization = auto_manga_workflow.wait_for_content_stabilization
+        auto_manga_workflow.fixed_sleep = no_sleep
+        auto_manga_workflow.wait_for_content_stabilization = stabilized
+
+        async def run():
+            token = use_wait_accounting(accounting)
+            try:
+                return await workflow.wait_for_response(), await workflow.wait_for_copy_button()
+            finally:
+                reset_wait_accounting(token)
+
+        try:
+            assert asyncio.run(run()) == (True, True)
+        finally:
+            auto_manga_workflow.fixed_sleep = original_sleep
+            auto_manga_workflow.wait_for_content_stabilization = original_stabilization
+
+        assert accounting.dead_time >= 0.01
+        assert "等待响应生成" not in accounting.polls
+        assert set(accounting.waits) == {"等待响应生成", "等待复制按钮"}
+        assert 'copy-table-button' in workflow.page.selectors[-1]
+
+
+if __name__ == "__main__":
+    test_fixed_sleep_attributed_to_call_site()
+    test_polls_inside_condition_wait_are_not_dead_time()
+    test_quota_backoff_is_dead_time_and_image_wait_is_tracked()
+    test_generate_batch_send_sleeps_are_dead_time()
+    print("✓ 测试通过")
+    test_dead_sleep_inside_condition_wait_is_dead_time()
+    test_response_settle_sleep_is_dead_time_and_copy_button_is_condition_wait()